@@ -0,0 +1,118 @@
+"""
+AudioDataEmitter - Ships model speech to the frontend as binary Socket.IO payloads.
+
+Chunks pushed by AudioLoop's on_audio_data callback are coalesced and flushed once
+per `interval`, so a burst of PCM chunks turns into one emit. Two payload modes:
+
+- "pcm":      raw little-endian int16 bytes (Socket.IO binary attachment)
+- "envelope": `bins` RMS levels scaled to 0-255, one byte each - all the visualizer needs
+"""
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+
+AUDIO_STREAM_MODES = ("pcm", "envelope")
+
+
+def rms_envelope(pcm: bytes, bins: int = 64, gain: float = 4.0) -> bytes:
+    """Downsamples int16 PCM to `bins` RMS levels in 0-255."""
+    count = len(pcm) // 2
+    if count == 0 or bins <= 0:
+        return bytes(max(bins, 0))
+
+    samples = np.frombuffer(pcm, dtype="<i2", count=count).astype(np.float32)
+    if count < bins:
+        samples = np.pad(samples, (0, bins - count))
+        count = bins
+    usable = count - (count % bins)
+    frames = samples[:usable].reshape(bins, -1)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    levels = np.clip(rms / 32768.0 * 255.0 * gain, 0, 255)
+    return levels.astype(np.uint8).tobytes()
+
+
+class AudioDataEmitter:
+    """Coalesces PCM chunks and emits them as one binary 'audio_data' event per interval."""
+
+    def __init__(self, emit: Callable[..., Awaitable], mode: str = "envelope", interval: float = 0.05,
+                 bins: int = 64, sample_rate: int = 24000, event: str = "audio_data"):
+        self.emit = emit
+        self.mode = mode if mode in AUDIO_STREAM_MODES else "envelope"
+        self.interval = interval
+        self.bins = bins
+        self.sample_rate = sample_rate
+        self.event = event
+
+        self._chunks: List[bytes] = []
+        self._pending = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.chunks_in = 0
+        self.bytes_in = 0
+        self.emits = 0
+        self.bytes_out = 0
+
+    def configure(self, mode: Optional[str] = None, interval: Optional[float] = None, bins: Optional[int] = None):
+        if mode in AUDIO_STREAM_MODES:
+            self.mode = mode
+        if interval is not None and interval > 0:
+            self.interval = interval
+        if bins is not None and bins > 0:
+            self.bins = bins
+
+    def push(self, data: bytes):
+        """Queues one PCM chunk. Must be called on the event loop thread."""
+        if not data:
+            return
+        self._chunks.append(bytes(data))
+        self.chunks_in += 1
+        self.bytes_in += len(data)
+        self._pending.set()
+
+    def build_payload(self, pcm: bytes) -> dict:
+        if self.mode == "envelope":
+            return {"format": "envelope", "data": rms_envelope(pcm, self.bins)}
+        return {"format": "pcm_s16le", "rate": self.sample_rate, "data": pcm}
+
+    async def flush(self):
+        if not self._chunks:
+            return
+        chunks, self._chunks = self._chunks, []
+        payload = self.build_payload(b"".join(chunks))
+        self.emits += 1
+        self.bytes_out += len(payload["data"])
+        try:
+            await self.emit(self.event, payload)
+        except Exception as e:
+            print(f"[AUDIO EMITTER] [ERR] Emit failed: {e}")
+
+    async def run(self):
+        while True:
+            await self._pending.wait()
+            # Let the rest of the burst arrive before sending
+            await asyncio.sleep(self.interval)
+            self._pending.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._chunks = []
+
+    def get_stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "chunks_in": self.chunks_in,
+            "bytes_in": self.bytes_in,
+            "emits": self.emits,
+            "bytes_out": self.bytes_out,
+        }
@@ -0,0 +1,491 @@
+"""
+Audio capture/playback I/O layer built on PyAudio callback-mode streams.
+
+PortAudio's callback thread moves audio in and out of preallocated ring buffers:
+
+- CaptureStream: the input callback writes into a RingBuffer; the event loop is woken
+  (at most once per drain) and pulls every complete chunk in one batch.
+- PlaybackStream: the event loop writes PCM into a RingBuffer; the output callback
+  pulls exactly what the device asks for and pads underruns with silence.
+
+RingBuffer is single-producer/single-consumer: the producer only advances the write
+counter and the consumer only advances the read counter, so no lock is needed.
+
+PlaybackBuffer sits in front of the speaker: a byte-capped, multi-producer jitter
+buffer that replaces the unbounded asyncio.Queue of model/TTS audio chunks.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+try:
+    import pyaudio
+    PA_CONTINUE = pyaudio.paContinue
+    PA_INT16 = pyaudio.paInt16
+except ImportError:
+    pyaudio = None
+    PA_CONTINUE = 0
+    PA_INT16 = 8
+
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+
+
+class RingBuffer:
+    """Fixed-capacity SPSC byte ring over a preallocated bytearray."""
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        # Monotonic byte counters; position in the ring is counter % capacity
+        self._written = 0
+        self._read = 0
+        self.overflow_bytes = 0
+
+    def __len__(self) -> int:
+        return self._written - self._read
+
+    def free(self) -> int:
+        return self.capacity - (self._written - self._read)
+
+    def write(self, data) -> int:
+        """Producer side. Copies as much of `data` as fits and returns the byte count written."""
+        n = min(len(data), self.free())
+        if n < len(data):
+            self.overflow_bytes += len(data) - n
+        if n == 0:
+            return 0
+
+        src = memoryview(data)[:n]
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._view[start:start + first] = src[:first]
+        if first < n:
+            self._view[0:n - first] = src[first:]
+        self._written += n
+        return n
+
+    def read(self, n: int) -> bytes:
+        """Consumer side. Returns up to `n` bytes."""
+        n = min(n, len(self))
+        if n <= 0:
+            return b""
+
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        if first == n:
+            out = bytes(self._view[start:start + n])
+        else:
+            out = bytes(self._view[start:]) + bytes(self._view[0:n - first])
+        self._read += n
+        return out
+
+    @property
+    def write_position(self) -> int:
+        return self._written
+
+    def clear(self):
+        """Consumer side. Discards everything currently buffered."""
+        self._read = self._written
+
+    def skip_to(self, position: int):
+        """Consumer side. Discards data up to an earlier `write_position`."""
+        if position > self._read:
+            self._read = min(position, self._written)
+
+
+class CaptureStream:
+    """
+    Long-lived microphone stream. PortAudio's callback fills the ring buffer and the
+    event loop drains complete chunks in batches via `read_chunks()`.
+    """
+
+    def __init__(self, pa, rate: int, chunk_size: int, channels: int = 1, fmt: int = PA_INT16,
+                 input_device_index: Optional[int] = None, buffer_chunks: int = 64,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.pa = pa
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.channels = channels
+        self.format = fmt
+        self.input_device_index = input_device_index
+        self.chunk_bytes = chunk_size * channels * SAMPLE_WIDTH
+        self.ring = RingBuffer(self.chunk_bytes * buffer_chunks)
+
+        self._loop = loop
+        self._data_ready: Optional[asyncio.Event] = None
+        self._wakeup_pending = False
+        self._stream = None
+        self.callbacks = 0
+
+    def open(self):
+        """Opens and starts the PyAudio stream. Blocking - call via asyncio.to_thread."""
+        self._stream = self.pa.open(
+            format=self.format,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            input_device_index=self.input_device_index,
+            frames_per_buffer=self.chunk_size,
+            stream_callback=self._callback,
+        )
+        return self
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._data_ready = asyncio.Event()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        # Runs on the PortAudio thread
+        self.callbacks += 1
+        if in_data:
+            self.ring.write(in_data)
+        if not self._wakeup_pending and len(self.ring) >= self.chunk_bytes and self._loop is not None:
+            self._wakeup_pending = True
+            try:
+                self._loop.call_soon_threadsafe(self._data_ready.set)
+            except RuntimeError:
+                # Loop already closed during shutdown
+                pass
+        return (None, PA_CONTINUE)
+
+    async def read_chunks(self) -> List[bytes]:
+        """Waits for at least one complete chunk and returns all complete chunks buffered."""
+        if self._data_ready is None:
+            self.bind_loop()
+        while True:
+            # Re-arm before checking so a chunk landing in between still wakes us
+            self._data_ready.clear()
+            self._wakeup_pending = False
+            if len(self.ring) >= self.chunk_bytes:
+                break
+            await self._data_ready.wait()
+
+        count = len(self.ring) // self.chunk_bytes
+        return [self.ring.read(self.chunk_bytes) for _ in range(count)]
+
+    def discard(self):
+        """Drops buffered audio (used while the mic is paused)."""
+        self.ring.clear()
+        self._wakeup_pending = False
+        if self._data_ready is not None:
+            self._data_ready.clear()
+
+    @property
+    def overflow_bytes(self) -> int:
+        return self.ring.overflow_bytes
+
+    def close(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+            except Exception:
+                pass
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+
+
+class PlaybackStream:
+    """
+    Long-lived speaker stream. `write()` copies PCM into the ring buffer (waiting for
+    space when the device falls behind); the output callback plays it, padding with
+    silence when the ring runs dry.
+    """
+
+    def __init__(self, pa, rate: int, chunk_size: int, channels: int = 1, fmt: int = PA_INT16,
+                 output_device_index: Optional[int] = None, buffer_ms: int = 200,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.pa = pa
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.channels = channels
+        self.format = fmt
+        self.output_device_index = output_device_index
+        frame_bytes = channels * SAMPLE_WIDTH
+        capacity = max(chunk_size * frame_bytes * 2, rate * frame_bytes * buffer_ms // 1000)
+        self.ring = RingBuffer(capacity)
+
+        self._loop = loop
+        self._space_ready: Optional[asyncio.Event] = None
+        self._waiting_for_space = False
+        self._flush_to = 0
+        self._stream = None
+        self.underruns = 0
+
+    def open(self):
+        """Opens and starts the PyAudio stream. Blocking - call via asyncio.to_thread."""
+        self._stream = self.pa.open(
+            format=self.format,
+            channels=self.channels,
+            rate=self.rate,
+            output=True,
+            output_device_index=self.output_device_index,
+            frames_per_buffer=self.chunk_size,
+            stream_callback=self._callback,
+        )
+        return self
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._space_ready = asyncio.Event()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        # Runs on the PortAudio thread
+        wanted = frame_count * self.channels * SAMPLE_WIDTH
+        self.ring.skip_to(self._flush_to)
+        out = self.ring.read(wanted)
+        if len(out) < wanted:
+            if out:
+                self.underruns += 1
+            out += bytes(wanted - len(out))
+        if self._waiting_for_space and self._loop is not None:
+            self._waiting_for_space = False
+            try:
+                self._loop.call_soon_threadsafe(self._space_ready.set)
+            except RuntimeError:
+                pass
+        return (out, PA_CONTINUE)
+
+    async def write(self, data: bytes):
+        """Queues PCM for playback, waiting while the ring buffer is full."""
+        if self._space_ready is None:
+            self.bind_loop()
+        view = memoryview(data)
+        while view:
+            n = self.ring.write(view[:self.ring.free()])
+            view = view[n:]
+            if view:
+                self._space_ready.clear()
+                self._waiting_for_space = True
+                await self._space_ready.wait()
+
+    def clear(self):
+        """Drops any audio that has not been played yet (barge-in).
+
+        The callback thread owns the read counter, so this only records the current
+        write position; the next callback skips everything written before it.
+        """
+        self._flush_to = self.ring.write_position
+
+    def close(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+            except Exception:
+                pass
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+
+
+class PlaybackBuffer:
+    """
+    Bounded jitter buffer between audio producers (Gemini, ElevenLabs) and play_audio.
+
+    - Byte cap: `put_nowait` drops the oldest audio when full (overrun); `put` and
+      `put_blocking` wait for space instead (backpressure for streaming producers).
+    - Jitter depth: after starting or running dry, `get` holds playback until
+      `target_ms` of audio is buffered or the oldest chunk has waited `target_ms`.
+    - `flush` is O(1) (the chunk deque is swapped out) for barge-in.
+    - Underruns are counted when the buffer runs dry and audio resumes within
+      `underrun_window` seconds (a gap mid-utterance rather than the end of one).
+
+    Producers may call `put_nowait`/`put_blocking` from any thread once `bind_loop`
+    has been called from the consuming event loop.
+    """
+
+    def __init__(self, max_bytes: int = 24000 * 2 * 10, target_ms: int = 120, sample_rate: int = 24000,
+                 channels: int = 1, underrun_window: float = 0.5):
+        self.max_bytes = max_bytes
+        self.target_ms = target_ms
+        self.bytes_per_second = sample_rate * channels * SAMPLE_WIDTH
+        self.target_bytes = self.bytes_per_second * target_ms // 1000
+        self.underrun_window = underrun_window
+
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self._chunks = deque()
+        self._bytes = 0
+        self._priming = True
+        self._first_arrival: Optional[float] = None
+        self._drained_at: Optional[float] = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._data_ready: Optional[asyncio.Event] = None
+        self._space_ready: Optional[asyncio.Event] = None
+
+        # Metrics
+        self.underruns = 0
+        self.overruns = 0
+        self.dropped_bytes = 0
+        self.flushes = 0
+        self.flushed_bytes = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.max_depth_bytes = 0
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._data_ready = asyncio.Event()
+        self._space_ready = asyncio.Event()
+
+    def _signal(self, event: Optional[asyncio.Event]):
+        if event is None or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            event.set()
+        else:
+            try:
+                self._loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Loop closed during shutdown
+                pass
+
+    # --- Queue-compatible helpers ---
+    def qsize(self) -> int:
+        return len(self._chunks)
+
+    def empty(self) -> bool:
+        return not self._chunks
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def buffered_ms(self) -> float:
+        return self._bytes * 1000 / self.bytes_per_second
+
+    # --- Producers ---
+    def _append_locked(self, data: bytes):
+        now = time.monotonic()
+        if not self._chunks:
+            self._first_arrival = now
+            if self._drained_at is not None and now - self._drained_at <= self.underrun_window:
+                self.underruns += 1
+            self._drained_at = None
+        self._chunks.append(data)
+        self._bytes += len(data)
+        self.bytes_in += len(data)
+        if self._bytes > self.max_depth_bytes:
+            self.max_depth_bytes = self._bytes
+
+    def put_nowait(self, data: bytes):
+        """Appends without waiting; drops the oldest audio if over the byte cap."""
+        if not data:
+            return
+        with self._lock:
+            self._append_locked(bytes(data))
+            while self._bytes > self.max_bytes and len(self._chunks) > 1:
+                dropped = self._chunks.popleft()
+                self._bytes -= len(dropped)
+                self.dropped_bytes += len(dropped)
+                self.overruns += 1
+        self._signal(self._data_ready)
+
+    def put_blocking(self, data: bytes, timeout: Optional[float] = None) -> bool:
+        """Thread-side put that waits for space. Returns False if it timed out (data dropped)."""
+        if not data:
+            return True
+        with self._space:
+            ok = self._space.wait_for(lambda: self._bytes + len(data) <= self.max_bytes or not self._chunks, timeout)
+            if not ok:
+                self.overruns += 1
+                self.dropped_bytes += len(data)
+                return False
+            self._append_locked(bytes(data))
+        self._signal(self._data_ready)
+        return True
+
+    async def put(self, data: bytes):
+        """Event-loop put that waits for space (backpressure)."""
+        if not data:
+            return
+        if self._data_ready is None:
+            self.bind_loop()
+        while True:
+            with self._lock:
+                if self._bytes + len(data) <= self.max_bytes or not self._chunks:
+                    self._append_locked(bytes(data))
+                    break
+                self._space_ready.clear()
+            await self._space_ready.wait()
+        self._data_ready.set()
+
+    # --- Consumer ---
+    def _ready_locked(self, now: float) -> bool:
+        if not self._priming:
+            return True
+        if self._bytes >= self.target_bytes:
+            return True
+        return self._first_arrival is not None and (now - self._first_arrival) * 1000 >= self.target_ms
+
+    async def get(self) -> bytes:
+        """Returns the next chunk, honouring the jitter depth after a (re)start."""
+        if self._data_ready is None:
+            self.bind_loop()
+        while True:
+            timeout = None
+            with self._lock:
+                self._data_ready.clear()
+                if self._chunks:
+                    now = time.monotonic()
+                    if self._ready_locked(now):
+                        self._priming = False
+                        chunk = self._chunks.popleft()
+                        self._bytes -= len(chunk)
+                        self.bytes_out += len(chunk)
+                        if not self._chunks:
+                            self._priming = True
+                            self._drained_at = now
+                        self._space.notify_all()
+                        self._space_ready.set()
+                        return chunk
+                    timeout = self.target_ms / 1000 - (now - self._first_arrival)
+            try:
+                await asyncio.wait_for(self._data_ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def flush(self) -> int:
+        """Drops everything buffered in O(1). Returns the number of chunks dropped."""
+        with self._lock:
+            dropped = len(self._chunks)
+            self.flushed_bytes += self._bytes
+            self._chunks = deque()
+            self._bytes = 0
+            self._priming = True
+            self._first_arrival = None
+            self._drained_at = None
+            self.flushes += 1
+            self._space.notify_all()
+        self._signal(self._space_ready)
+        return dropped
+
+    def get_stats(self) -> dict:
+        return {
+            "buffered_bytes": self._bytes,
+            "buffered_ms": round(self.buffered_ms, 1),
+            "max_depth_bytes": self.max_depth_bytes,
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "dropped_bytes": self.dropped_bytes,
+            "flushes": self.flushes,
+            "flushed_bytes": self.flushed_bytes,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
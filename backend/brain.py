@@ -1,20 +1,14 @@
 import asyncio
-import base64
-import io
 import os
 import sys
 import traceback
 from dotenv import load_dotenv
 import cv2
 import pyaudio
-import PIL.Image
 import mss
 import argparse
-import math
-import struct
-import struct
 import time
-import requests
+import aiohttp
 
 from google import genai
 from google.genai import types
@@ -25,15 +19,37 @@ if sys.version_info < (3, 11, 0):
     asyncio.ExceptionGroup = exceptiongroup.ExceptionGroup
 
 from tools import tools_list
+from vad import create_vad, SPEECH_START, SPEECH_END
+from audio_io import CaptureStream, PlaybackStream, PlaybackBuffer
+from tts_pipeline import SentenceSegmenter, TTSWorker
+from http_client import HttpClient, HttpError
+from local_llm import stream_chat_completion
+from conversation_memory import ConversationMemory
+from tool_registry import ToolRegistry
+from confirmations import ConfirmationScheduler
+from chat_summary import send_reconnect_context
+from live_connection import LiveConnection
+from frame_buffer import LatestFrame
+from frame_pipeline import FramePipeline
 
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
 SEND_SAMPLE_RATE = 16000
 RECEIVE_SAMPLE_RATE = 24000
 CHUNK_SIZE = 1024
+PLAYBACK_MAX_SECONDS = 10 # Byte cap of the playback buffer, in seconds of audio
+PLAYBACK_JITTER_MS = 120 # Audio held back before (re)starting playback
+TOOL_CONFIRM_TIMEOUT = float(os.getenv("TOOL_CONFIRM_TIMEOUT", "60")) # Unanswered confirmations are denied after this
+LIVE_SESSION_LIFETIME = float(os.getenv("LIVE_SESSION_LIFETIME", "540")) # Swap connections before the server's ~10 min limit
+LIVE_STANDBY_LEAD = float(os.getenv("LIVE_STANDBY_LEAD", "30")) # Start opening the standby this long before that
+CAMERA_FRAME_INTERVAL = float(os.getenv("CAMERA_FRAME_INTERVAL", "1.0")) # Seconds between camera captures
+CAMERA_JPEG_QUALITY = int(os.getenv("CAMERA_JPEG_QUALITY", "80"))
+CAMERA_MAX_FRAME_BYTES = int(os.getenv("CAMERA_MAX_FRAME_BYTES", "0")) # JPEG size budget per frame, 0 = none
+CAMERA_CHANGE_THRESHOLD = int(os.getenv("CAMERA_CHANGE_THRESHOLD", "5")) # dHash bits (of 64) a frame must differ by
 
 MODEL = "models/gemini-2.5-flash-native-audio-preview-12-2025"
 DEFAULT_MODE = "camera"
+VAD_MODE = os.getenv("VAD_MODE", "energy") # "energy" or "spectral"
 
 # Robust .env loading
 from pathlib import Path
@@ -105,6 +121,20 @@ list_projects_tool = {
     }
 }
 
+search_history_tool = {
+    "name": "search_history",
+    "description": "Searches the current project's past conversation, project files and uploaded memory for relevant snippets. Use this to recall earlier details instead of asking the user to repeat them.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            "query": {"type": "STRING", "description": "Keywords describing what to look for."},
+            "source": {"type": "STRING", "description": "Optional: restrict to 'chat', 'file' or 'memory'."},
+            "limit": {"type": "INTEGER", "description": "Maximum number of snippets (default 5)."}
+        },
+        "required": ["query"]
+    }
+}
+
 list_smart_devices_tool = {
     "name": "list_smart_devices",
     "description": "Lists all available smart home devices (lights, plugs, etc.) on the network.",
@@ -369,7 +399,9 @@ nitrogen_status_tool = {
     }
 }
 
-tools = [{'google_search': {}}, {"function_declarations": [generate_cad, run_web_agent, create_project_tool, switch_project_tool, list_projects_tool, list_smart_devices_tool, control_light_tool, discover_printers_tool, print_stl_tool, get_print_status_tool, iterate_cad_tool, type_text_tool, press_key_tool, click_mouse_tool, double_click_tool, move_mouse_tool, scroll_tool, open_app_tool, close_app_tool, list_windows_tool, focus_window_tool, minimize_window_tool, maximize_window_tool, start_nitrogen_tool, stop_nitrogen_tool, nitrogen_status_tool] + tools_list[0]['function_declarations'][1:]}]
+function_declarations = [generate_cad, run_web_agent, create_project_tool, switch_project_tool, list_projects_tool, search_history_tool, list_smart_devices_tool, control_light_tool, discover_printers_tool, print_stl_tool, get_print_status_tool, iterate_cad_tool, type_text_tool, press_key_tool, click_mouse_tool, double_click_tool, move_mouse_tool, scroll_tool, open_app_tool, close_app_tool, list_windows_tool, focus_window_tool, minimize_window_tool, maximize_window_tool, start_nitrogen_tool, stop_nitrogen_tool, nitrogen_status_tool] + tools_list[0]['function_declarations'][1:]
+tools = [{'google_search': {}}, {"function_declarations": function_declarations}]
+TOOL_DECLARATIONS = {declaration["name"]: declaration for declaration in function_declarations}
 
 # --- CONFIG UPDATE: Enabled Transcription ---
 
@@ -480,6 +512,7 @@ You are the modern incarnation of Multivac, not just a machine but a topological
 - File system operations:
   - `create_project(name)`: Initialize new project folder with metadata
   - `switch_project(name)`: Load project context and conversation history
+  - `search_history(query)`: Recall relevant snippets from past conversation, project files and uploaded memory
   - `write_file(path, content)`: Save data to project directory
   - `read_file(path)`: Retrieve file contents
   - `list_files(directory)`: Enumerate project contents
@@ -623,6 +656,11 @@ ai_provider = os.getenv("AI_PROVIDER", "GEMINI").upper()
 ai_provider = os.getenv("AI_PROVIDER", "GEMINI").upper()
 lm_studio_url = os.getenv("LM_STUDIO_URL", "http://localhost:1234")
 lm_studio_model = os.getenv("LM_STUDIO_MODEL", "local-model") # Allow model override
+# Context length the local model is loaded with; the chat history window is budgeted against it
+lm_studio_context_tokens = int(os.getenv("LM_STUDIO_CONTEXT_TOKENS", "8192"))
+# Offer function tools to the local model (needs a model/template with tool-call support)
+lm_studio_tools = os.getenv("LM_STUDIO_TOOLS", "0").lower() in ("1", "true", "yes")
+LOCAL_MAX_TOOL_ROUNDS = 3
 
 config = types.LiveConnectConfig(
     response_modalities=response_modalities,
@@ -633,6 +671,11 @@ config = types.LiveConnectConfig(
     speech_config=speech_config
 )
 
+def live_connect(handle=None):
+    """Opens a Live connection, resuming the session behind `handle` if given."""
+    resumed_config = config.model_copy(update={"session_resumption": types.SessionResumptionConfig(handle=handle)})
+    return client.aio.live.connect(model=MODEL, config=resumed_config)
+
 pya = pyaudio.PyAudio()
 
 from cad_agent import CadAgent
@@ -651,7 +694,7 @@ except ImportError:
     print("[BRAIN] NitroGen not available - AI gaming features disabled")
 
 class AudioLoop:
-    def __init__(self, video_mode=DEFAULT_MODE, on_audio_data=None, on_video_frame=None, on_cad_data=None, on_web_data=None, on_transcription=None, on_tool_confirmation=None, on_cad_status=None, on_cad_thought=None, on_project_update=None, on_device_update=None, on_error=None, input_device_index=None, input_device_name=None, output_device_index=None, kasa_agent=None):
+    def __init__(self, video_mode=DEFAULT_MODE, on_audio_data=None, on_video_frame=None, on_cad_data=None, on_web_data=None, on_transcription=None, on_tool_confirmation=None, on_cad_status=None, on_cad_thought=None, on_project_update=None, on_device_update=None, on_error=None, input_device_index=None, input_device_name=None, output_device_index=None, kasa_agent=None, on_vad_event=None, on_cad_candidate=None):
         self.video_mode = video_mode
         self.on_audio_data = on_audio_data
         self.on_video_frame = on_video_frame
@@ -661,9 +704,11 @@ class AudioLoop:
         self.on_tool_confirmation = on_tool_confirmation 
         self.on_cad_status = on_cad_status
         self.on_cad_thought = on_cad_thought
+        self.on_cad_candidate = on_cad_candidate
         self.on_project_update = on_project_update
         self.on_device_update = on_device_update
         self.on_error = on_error
+        self.on_vad_event = on_vad_event
         self.input_device_index = input_device_index
         self.input_device_name = input_device_name
         self.output_device_index = output_device_index
@@ -683,6 +728,8 @@ class AudioLoop:
         self.paused = False
 
         self.session = None
+        self.audio_stream = None
+        self.playback_stream = None
         
         # Create CadAgent with thought callback
         def handle_cad_thought(thought_text):
@@ -693,7 +740,12 @@ class AudioLoop:
             if self.on_cad_status:
                 self.on_cad_status(status_info)
         
-        self.cad_agent = CadAgent(on_thought=handle_cad_thought, on_status=handle_cad_status)
+        def handle_cad_candidate(report):
+            if self.on_cad_candidate:
+                self.on_cad_candidate(report)
+
+        self.cad_agent = CadAgent(on_thought=handle_cad_thought, on_status=handle_cad_status,
+                                  on_candidate=handle_cad_candidate)
         self.web_agent = WebAgent()
         # self.kasa_agent = KasaAgent()  # Temporarily disabled
         self.kasa_agent = None  # Placeholder to satisfy tool requirement. I will view lines 800+ first.
@@ -717,19 +769,29 @@ class AudioLoop:
         self.stop_event = asyncio.Event()
         
         self.permissions = {} # Default Empty (Will treat unset as True)
-        self._pending_confirmations = {}
-
-        # Video buffering state
-        self._latest_image_payload = None
-        # VAD State
-        self._is_speaking = False
-        self._is_speaking = False
-        self._silence_start_time = None
+        # Pending tool confirmations, answered from the UI without blocking receive_audio
+        self.confirmations = ConfirmationScheduler(self._prompt_tool_confirmation, timeout=TOOL_CONFIRM_TIMEOUT)
+        # Function tools, shared by the Gemini and LOCAL providers
+        self.tool_registry = self._build_tool_registry()
+
+        # Video buffering state: only the newest frame is kept, encoded if it is ever sent
+        self.latest_frame = LatestFrame()
+        # Camera frames (video_mode == "camera"): unchanged frames are skipped before encoding
+        self.frame_pipeline = FramePipeline(
+            quality=CAMERA_JPEG_QUALITY,
+            max_bytes=CAMERA_MAX_FRAME_BYTES,
+            change_threshold=CAMERA_CHANGE_THRESHOLD,
+        )
+        # VAD State (decisions are also forwarded to on_vad_event)
+        self.vad = create_vad(VAD_MODE, sample_rate=SEND_SAMPLE_RATE, on_event=self._handle_vad_event)
         
         # ElevenLabs Buffering
         self.elevenlabs_voice_id = os.getenv("ELEVENLABS_VOICE_ID")
-        self.tts_buffer = ""
         self.elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
+        # Shared keep-alive pool for ElevenLabs and LM Studio requests
+        self.http = HttpClient()
+        self.tts_segmenter = SentenceSegmenter()
+        self.tts_worker = TTSWorker(self._open_elevenlabs_stream, self._play_elevenlabs_stream)
         
         # Initialize ProjectManager
         from project_manager import ProjectManager
@@ -739,6 +801,10 @@ class AudioLoop:
         # If ada.py is in backend/, project root is one up
         project_root = os.path.dirname(current_dir)
         self.project_manager = ProjectManager(project_root)
+
+        # LOCAL mode chat history, rebuilt from the project's chat log on project switch
+        self.local_memory = ConversationMemory(system_instruction, max_tokens=lm_studio_context_tokens)
+        self._local_memory_project = None
         
         # Sync Initial Project State
         if self.on_project_update:
@@ -756,6 +822,10 @@ class AudioLoop:
         self._last_input_transcription = ""
         self._last_output_transcription = ""
 
+    def _handle_vad_event(self, event):
+        if self.on_vad_event:
+            self.on_vad_event(event.to_dict())
+
     def update_permissions(self, new_perms):
         print(f"[ADA DEBUG] [CONFIG] Updating tool permissions: {new_perms}")
         self.permissions.update(new_perms)
@@ -765,141 +835,173 @@ class AudioLoop:
 
     def stop(self):
         self.stop_event.set()
+        # The server may exit right after this (os._exit), so persist the chat log now
+        self.flush_chat()
+        self.project_manager.close()
         
     def resolve_tool_confirmation(self, request_id, confirmed):
         print(f"[ADA DEBUG] [RESOLVE] resolve_tool_confirmation called. ID: {request_id}, Confirmed: {confirmed}")
-        if request_id in self._pending_confirmations:
-            future = self._pending_confirmations[request_id]
-            if not future.done():
-                print(f"[ADA DEBUG] [RESOLVE] Future found and pending. Setting result to: {confirmed}")
-                future.set_result(confirmed)
-            else:
-                 print(f"[ADA DEBUG] [WARN] Request {request_id} future already done. Result: {future.result()}")
-        else:
-            print(f"[ADA DEBUG] [WARN] Confirmation Request {request_id} not found in pending dict. Keys: {list(self._pending_confirmations.keys())}")
+        return self.confirmations.resolve(request_id, confirmed)
+
+    def _create_playback_buffer(self):
+        buffer = PlaybackBuffer(
+            max_bytes=RECEIVE_SAMPLE_RATE * CHANNELS * 2 * PLAYBACK_MAX_SECONDS,
+            target_ms=PLAYBACK_JITTER_MS,
+            sample_rate=RECEIVE_SAMPLE_RATE,
+            channels=CHANNELS,
+        )
+        buffer.bind_loop()
+        return buffer
 
     def clear_audio_queue(self):
         """Clears the queue of pending audio chunks to stop playback immediately."""
         try:
-            count = 0
-            while not self.audio_in_queue.empty():
-                self.audio_in_queue.get_nowait()
-                count += 1
+            # Drop unspoken sentences too, or TTS would refill the buffer
+            self.tts_worker.clear()
+            self.tts_segmenter.reset()
+            count = self.audio_in_queue.flush()
+            if self.playback_stream:
+                self.playback_stream.clear()
             if count > 0:
                 print(f"[ADA DEBUG] [AUDIO] Cleared {count} chunks from playback queue due to interruption.")
         except Exception as e:
             print(f"[ADA DEBUG] [ERR] Failed to clear audio queue: {e}")
 
     async def send_frame(self, frame_data):
-        # Update the latest frame payload
-        if isinstance(frame_data, bytes):
-            b64_data = base64.b64encode(frame_data).decode('utf-8')
-        else:
-            b64_data = frame_data 
-
-        # Store as the designated "next frame to send"
-        self._latest_image_payload = {"mime_type": "image/jpeg", "data": b64_data}
+        # Store as the designated "next frame to send" (raw bytes or base64 str, no copy)
+        self.latest_frame.set(frame_data)
         # No event signal needed - listen_audio pulls it
 
     async def send_realtime(self):
         while True:
             msg = await self.out_queue.get()
-            await self.session.send(input=msg, end_of_turn=False)
+            # Buffered while the connection is down or being swapped, replayed on the next one
+            await self.session.send_realtime(msg)
 
-    def speak_with_elevenlabs(self, text):
+    async def _open_elevenlabs_stream(self, text):
+        """Starts an ElevenLabs streaming request. Returns the response, or None on failure."""
         if not self.elevenlabs_api_key:
             print("[BRAIN] [ERR] No ElevenLabs API Key found (ELEVENLABS_API_KEY).")
-            return
+            return None
 
         print(f"[BRAIN] [TTS] Generating audio for: '{text}'")
-        try:
-            # ElevenLabs API request (PCM 24kHz)
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.elevenlabs_voice_id}/stream"
-            headers = {
-                "xi-api-key": self.elevenlabs_api_key,
-                "Content-Type": "application/json"
-            }
-            data = {
-                "text": text,
-                "model_id": "eleven_turbo_v2_5", # Updated to new model for free tier
-                "output_format": "pcm_24000"
-            }
-            
-            # Using stream=True to get chunks
-            response = requests.post(url, json=data, headers=headers, stream=True)
-            
-            if response.status_code == 200:
-                # Read chunks and put in audio queue
-                for chunk in response.iter_content(chunk_size=1024):
-                    if chunk:
-                        self.audio_in_queue.put_nowait(chunk)
-            else:
-                print(f"[BRAIN] [ERR] ElevenLabs API Error: {response.status_code} - {response.text}")
-
-        except Exception as e:
-            print(f"[BRAIN] [ERR] TTS Failed: {e}")
+        # ElevenLabs API request (PCM 24kHz)
+        url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.elevenlabs_voice_id}/stream"
+        headers = {
+            "xi-api-key": self.elevenlabs_api_key,
+            "Content-Type": "application/json"
+        }
+        data = {
+            "text": text,
+            "model_id": "eleven_turbo_v2_5", # Updated to new model for free tier
+            "output_format": "pcm_24000"
+        }
 
-    def speak_with_elevenlabs(self, text):
-        if not self.elevenlabs_api_key:
-            print("[BRAIN] [ERR] No ElevenLabs API Key found (ELEVENLABS_API_KEY).")
-            return
+        # Streamed body: no total deadline, only connect/read timeouts
+        response = await self.http.request(
+            "POST", url, json=data, headers=headers,
+            timeout=aiohttp.ClientTimeout(total=None, connect=5, sock_read=15)
+        )
+        if response.status != 200:
+            print(f"[BRAIN] [ERR] ElevenLabs API Error: {response.status} - {await response.text()}")
+            response.release()
+            return None
+        return response
 
-        print(f"[BRAIN] [TTS] Generating audio for: '{text}'")
+    async def _play_elevenlabs_stream(self, response, is_current=lambda: True):
+        """Streams an open ElevenLabs response into the playback buffer until done or interrupted."""
         try:
-            # ElevenLabs API request (PCM 24kHz)
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.elevenlabs_voice_id}/stream"
-            headers = {
-                "xi-api-key": self.elevenlabs_api_key,
-                "Content-Type": "application/json"
-            }
-            data = {
-                "text": text,
-                "model_id": "eleven_turbo_v2_5", # Updated to new model for free tier
-                "output_format": "pcm_24000"
-            }
-            
-            # Using stream=True to get chunks
-            response = requests.post(url, json=data, headers=headers, stream=True)
-            
-            if response.status_code == 200:
-                # Read chunks and put in audio queue
-                for chunk in response.iter_content(chunk_size=1024):
-                    if chunk:
-                        self.audio_in_queue.put_nowait(chunk)
-            else:
-                print(f"[BRAIN] [ERR] ElevenLabs API Error: {response.status_code} - {response.text}")
-
-        except Exception as e:
-            print(f"[BRAIN] [ERR] TTS Failed: {e}")
-
-    def ask_local_llm(self, text):
+            async for chunk in response.content.iter_chunked(1024):
+                if not is_current():
+                    # Interrupted mid-body: drop the connection instead of draining it
+                    response.close()
+                    return
+                if chunk:
+                    # Waits while the playback buffer is full
+                    await self.audio_in_queue.put(chunk)
+        finally:
+            response.release()
+
+    async def ask_local_llm(self, text):
+        """
+        Streams a reply from LM Studio. Tokens go to the chat UI as they arrive and
+        completed sentences go straight to TTS. Returns the full reply text.
+        """
         print(f"[BRAIN] [LOCAL] Querying LM Studio: '{text}'")
+        await self._sync_local_memory()
+        messages = self.local_memory.build(text)
+        speak = bool(self.elevenlabs_api_key)
+        tools = self.tool_registry.openai_tools() if lm_studio_tools else None
+        reply = ""
+        started = time.perf_counter()
         try:
-            payload = {
-                "model": lm_studio_model, # Use configured model name
-                "messages": [
-                    {"role": "system", "content": system_instruction},
-                    {"role": "user", "content": text}
-                ],
-                "temperature": 0.7
-            }
-            response = requests.post(
-                f"{lm_studio_url}/v1/chat/completions",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30
-            )
-            if response.status_code == 200:
-                data = response.json()
-                reply = data['choices'][0]['message']['content']
-                print(f"[BRAIN] [LOCAL] Response: {reply[:50]}...")
-                return reply
-            else:
-                print(f"[BRAIN] [ERR] LM Studio Error: {response.status_code} - {response.text}")
-                return "I'm having trouble connecting to my local brain."
+            for _ in range(LOCAL_MAX_TOOL_ROUNDS):
+                tool_calls = []
+                round_text = ""
+                async for delta in stream_chat_completion(self.http, lm_studio_url, messages, lm_studio_model,
+                                                          tools=tools, tool_calls=tool_calls):
+                    if not reply:
+                        print(f"[BRAIN] [LOCAL] First token after {(time.perf_counter() - started) * 1000:.0f} ms")
+                    reply += delta
+                    round_text += delta
+                    if self.on_transcription:
+                        self.on_transcription({"sender": "Multivac", "text": delta})
+                    if speak:
+                        for sentence in self.tts_segmenter.feed(delta):
+                            self.tts_worker.submit(sentence)
+                if not tool_calls:
+                    break
+                messages = messages + await self._run_local_tool_calls(round_text, tool_calls)
+        except HttpError as e:
+            print(f"[BRAIN] [ERR] LM Studio Error: {e.status} - {e.body}")
+            fallback = "I'm having trouble connecting to my local brain."
         except Exception as e:
             print(f"[BRAIN] [ERR] Local LLM Failed: {e}")
-            return "Local brain is offline."
+            fallback = "Local brain is offline."
+        else:
+            fallback = None
+
+        if speak:
+            self.tts_worker.submit(self.tts_segmenter.flush())
+
+        if fallback and not reply:
+            reply = fallback
+            if self.on_transcription:
+                self.on_transcription({"sender": "Multivac", "text": reply})
+        else:
+            # Connection errors are not part of the conversation
+            self.local_memory.add("user", text)
+            self.local_memory.add("assistant", reply)
+        print(f"[BRAIN] [LOCAL] Response: {reply[:50]}...")
+        return reply
+
+    async def _run_local_tool_calls(self, content, tool_calls):
+        """Runs tool calls from the local model; returns the assistant + tool messages for the follow-up request."""
+        print(f"[BRAIN] [LOCAL] Tool calls: {[call.name for call in tool_calls]}")
+        dispatched = await self.tool_registry.dispatch(tool_calls, confirm=self._confirm_tool)
+        results = {call.id: result for call, result in dispatched}
+        messages = [{"role": "assistant", "content": content or None,
+                     "tool_calls": [call.to_message() for call in tool_calls]}]
+        for call in tool_calls:
+            if call.name not in self.tool_registry:
+                result = f"Unknown tool '{call.name}'."
+            else:
+                # Background tools without an ack still need an answer for every call id
+                result = results.get(call.id, "Started.")
+            messages.append({"role": "tool", "tool_call_id": call.id, "content": result})
+        return messages
+
+    async def _sync_local_memory(self, history_limit=100):
+        """Reloads the LOCAL history window from the chat log when the project changes."""
+        project = self.project_manager.current_project
+        if project == self._local_memory_project:
+            return
+        self._local_memory_project = project
+        history = await asyncio.to_thread(self.project_manager.get_recent_chat_history, history_limit)
+        self.local_memory.load_history(history)
+        stats = self.local_memory.get_stats()
+        print(f"[BRAIN] [LOCAL] Loaded {stats['messages']} history messages "
+              f"(~{stats['history_tokens']}/{stats['history_budget']} tokens) for project '{project}'")
 
 
     async def listen_audio(self):
@@ -947,79 +1049,55 @@ class AudioLoop:
         if resolved_input_device_index is None:
              print("[ADA] Using Default Input Device")
 
+        # Long-lived callback-mode stream: PortAudio fills a ring buffer, we drain it in batches
+        self.audio_stream = CaptureStream(
+            pya,
+            rate=SEND_SAMPLE_RATE,
+            chunk_size=CHUNK_SIZE,
+            channels=CHANNELS,
+            fmt=FORMAT,
+            input_device_index=resolved_input_device_index if resolved_input_device_index is not None else mic_info["index"],
+        )
+        self.audio_stream.bind_loop()
         try:
-            self.audio_stream = await asyncio.to_thread(
-                pya.open,
-                format=FORMAT,
-                channels=CHANNELS,
-                rate=SEND_SAMPLE_RATE,
-                input=True,
-                input_device_index=resolved_input_device_index if resolved_input_device_index is not None else mic_info["index"],
-                frames_per_buffer=CHUNK_SIZE,
-            )
+            await asyncio.to_thread(self.audio_stream.open)
         except OSError as e:
             print(f"[ADA] [ERR] Failed to open audio input stream: {e}")
             print("[ADA] [WARN] Audio features will be disabled. Please check microphone permissions.")
             return
-
-        if __debug__:
-            kwargs = {"exception_on_overflow": False}
-        else:
-            kwargs = {}
-        
-        # VAD Constants
-        VAD_THRESHOLD = 800 # Adj based on mic sensitivity (800 is conservative for 16-bit)
-        SILENCE_DURATION = 0.5 # Seconds of silence to consider "done speaking"
         
         while True:
             if self.paused:
+                self.audio_stream.discard()
+                # An utterance cut off by the pause must not carry over into the next one
+                self.vad.reset()
                 await asyncio.sleep(0.1)
                 continue
 
             try:
-                data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
-                
-                # 1. Send Audio
-                if self.out_queue:
-                    await self.out_queue.put({"data": data, "mime_type": "audio/pcm"})
+                chunks = await self.audio_stream.read_chunks()
                 
-                # 2. VAD Logic for Video
-                # rms = audioop.rms(data, 2)
-                # Replacement for audioop.rms(data, 2)
-                count = len(data) // 2
-                if count > 0:
-                    shorts = struct.unpack(f"<{count}h", data)
-                    sum_squares = sum(s**2 for s in shorts)
-                    rms = int(math.sqrt(sum_squares / count))
-                else:
-                    rms = 0
-                
-                if rms > VAD_THRESHOLD:
-                    # Speech Detected
-                    self._silence_start_time = None
+                for data in chunks:
+                    # 1. Send Audio
+                    if self.out_queue:
+                        await self.out_queue.put({"data": data, "mime_type": "audio/pcm"})
                     
-                    if not self._is_speaking:
+                    # 2. VAD Logic for Video
+                    event = self.vad.process(data)
+                    if event is None:
+                        continue
+
+                    if event.type == SPEECH_START:
                         # NEW Speech Utterance Started
-                        self._is_speaking = True
-                        print(f"[ADA DEBUG] [VAD] Speech Detected (RMS: {rms}). Sending Video Frame.")
+                        print(f"[ADA DEBUG] [VAD] Speech Detected (RMS: {int(event.rms)}). Sending Video Frame.")
                         
                         # Send ONE frame
-                        if self._latest_image_payload and self.out_queue:
-                            await self.out_queue.put(self._latest_image_payload)
+                        if self.latest_frame and self.out_queue:
+                            await self.out_queue.put(self.latest_frame.payload())
                         else:
                             print(f"[ADA DEBUG] [VAD] No video frame available to send.")
-                            
-                else:
-                    # Silence
-                    if self._is_speaking:
-                        if self._silence_start_time is None:
-                            self._silence_start_time = time.time()
-                        
-                        elif time.time() - self._silence_start_time > SILENCE_DURATION:
-                            # Silence confirmed, reset state
-                            print(f"[ADA DEBUG] [VAD] Silence detected. Resetting speech state.")
-                            self._is_speaking = False
-                            self._silence_start_time = None
+                    elif event.type == SPEECH_END:
+                        print(f"[ADA DEBUG] [VAD] Silence detected. Resetting speech state.")
 
             except Exception as e:
                 print(f"Error reading audio: {e}")
@@ -1039,7 +1117,7 @@ class AudioLoop:
             
             success, msg = self.project_manager.create_project(new_project_name)
             if success:
-                self.project_manager.switch_project(new_project_name)
+                await asyncio.to_thread(self.project_manager.switch_project, new_project_name)
                 # Notify User (Optional, or rely on update)
                 try:
                     await self.session.send(input=f"System Notification: Automatic Project Creation. Switched to new project '{new_project_name}'.", end_of_turn=False)
@@ -1100,7 +1178,7 @@ class AudioLoop:
             
             success, msg = self.project_manager.create_project(new_project_name)
             if success:
-                self.project_manager.switch_project(new_project_name)
+                await asyncio.to_thread(self.project_manager.switch_project, new_project_name)
                 # Notify User
                 try:
                     await self.session.send(input=f"System Notification: Automatic Project Creation. Switched to new project '{new_project_name}'.", end_of_turn=False)
@@ -1194,6 +1272,367 @@ class AudioLoop:
         except Exception as e:
              print(f"[ADA DEBUG] [ERR] Failed to send web agent result to model: {e}")
 
+    # ========== TOOL HANDLERS ==========
+    # Each takes the call's args and returns the result text for the model.
+
+    def _build_tool_registry(self):
+        """Registers every function tool with its declaration and dispatch options."""
+        registry = ToolRegistry()
+
+        def add(name, handler, **options):
+            registry.register(name, handler, TOOL_DECLARATIONS.get(name), **options)
+
+        # Long-running work runs in the background; the model gets an immediate ack
+        add("generate_cad", self._tool_generate_cad, blocking=False)
+        add("run_web_agent", self._tool_run_web_agent, blocking=False,
+            ack="Web Navigation started. Do not reply to this message.")
+        add("write_file", self._tool_write_file, blocking=False, ack="Writing file...")
+        add("read_directory", self._tool_read_directory, blocking=False, ack="Reading directory...")
+        add("read_file", self._tool_read_file, blocking=False, ack="Reading file...")
+
+        # Project state: order matters for everything that follows
+        add("create_project", self._tool_create_project, concurrent=False)
+        add("switch_project", self._tool_switch_project, concurrent=False)
+        add("list_projects", self._tool_list_projects)
+        add("search_history", self._tool_search_history)
+
+        add("list_smart_devices", self._tool_list_smart_devices)
+        add("control_light", self._tool_control_light, concurrent=False)
+
+        add("discover_printers", self._tool_discover_printers)
+        add("print_stl", self._tool_print_stl, concurrent=False)
+        add("get_print_status", self._tool_get_print_status)
+        add("iterate_cad", self._tool_iterate_cad, concurrent=False)
+
+        # Keyboard/mouse/window actions must happen in the order the model asked for
+        for name, action in (("type_text", "type"), ("press_key", "press_key"), ("click_mouse", "click"),
+                             ("double_click", "double_click"), ("move_mouse", "move_mouse"),
+                             ("scroll", "scroll"), ("open_app", "open_app"), ("close_app", "close_app"),
+                             ("focus_window", "focus_window"), ("minimize_window", "minimize_window"),
+                             ("maximize_window", "maximize_window")):
+            add(name, self._computer_control_handler(name, action), concurrent=False)
+        add("list_windows", self._computer_control_handler("list_windows", "list_windows"))
+
+        add("start_nitrogen", self._tool_start_nitrogen, concurrent=False)
+        add("stop_nitrogen", self._tool_stop_nitrogen, concurrent=False)
+        add("nitrogen_status", self._tool_nitrogen_status)
+        return registry
+
+    async def _confirm_tool(self, spec, call):
+        """Asks the user to confirm a tool call unless its permission is turned off."""
+        if not self.permissions.get(spec.permission_key, True):
+            print(f"[ADA DEBUG] [TOOL] Permission check: '{spec.name}' -> AUTO-ALLOW")
+            return True
+        if not self.on_tool_confirmation:
+            return True
+        return await self.confirmations.request(spec.name, call.args)
+
+    def _prompt_tool_confirmation(self, payload):
+        if self.on_tool_confirmation:
+            self.on_tool_confirmation(payload)
+
+    async def _send_tool_responses(self, results):
+        function_responses = [
+            types.FunctionResponse(id=fc.id, name=fc.name, response={"result": result})
+            for fc, result in results
+        ]
+        await self.session.send_tool_response(function_responses=function_responses)
+
+    async def _tool_generate_cad(self, args):
+        prompt = args.get("prompt", "")
+        print(f"\n[ADA DEBUG] --------------------------------------------------")
+        print(f"[ADA DEBUG] [TOOL] Tool Call Detected: 'generate_cad'")
+        print(f"[ADA DEBUG] [IN] Arguments: prompt='{prompt}'")
+        # No function response needed - model already acknowledged when user asked
+        await self.handle_cad_request(prompt)
+
+    async def _tool_run_web_agent(self, args):
+        prompt = args.get("prompt", "")
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'run_web_agent' with prompt='{prompt}'")
+        await self.handle_web_agent_request(prompt)
+
+    async def _tool_write_file(self, args):
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'write_file' path='{args['path']}'")
+        await self.handle_write_file(args["path"], args["content"])
+
+    async def _tool_read_directory(self, args):
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'read_directory' path='{args['path']}'")
+        await self.handle_read_directory(args["path"])
+
+    async def _tool_read_file(self, args):
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'read_file' path='{args['path']}'")
+        await self.handle_read_file(args["path"])
+
+    async def _tool_create_project(self, args):
+        name = args["name"]
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'create_project' name='{name}'")
+        success, msg = self.project_manager.create_project(name)
+        if success:
+            # Auto-switch to the newly created project
+            await asyncio.to_thread(self.project_manager.switch_project, name)
+            msg += f" Switched to '{name}'."
+            if self.on_project_update:
+                self.on_project_update(name)
+        return msg
+
+    async def _tool_switch_project(self, args):
+        name = args["name"]
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'switch_project' name='{name}'")
+        # Waits for the chat log flush and any compaction of the project, so off the event loop
+        success, msg = await asyncio.to_thread(self.project_manager.switch_project, name)
+        if success:
+            if self.on_project_update:
+                self.on_project_update(name)
+            # Gather project context and send to AI (silently, no response expected)
+            context = await asyncio.to_thread(self.project_manager.get_project_context)
+            print(f"[ADA DEBUG] [PROJECT] Sending project context to AI ({len(context)} chars)")
+            if self.session:
+                try:
+                    await self.session.send(input=f"System Notification: {msg}\n\n{context}", end_of_turn=False)
+                except Exception as e:
+                    print(f"[ADA DEBUG] [ERR] Failed to send project context: {e}")
+        return msg
+
+    async def _tool_list_projects(self, args):
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'list_projects'")
+        projects = self.project_manager.list_projects()
+        return f"Available projects: {', '.join(projects)}"
+
+    async def _tool_search_history(self, args):
+        query = args.get("query", "")
+        source = args.get("source") or None
+        limit = max(1, min(int(args.get("limit") or 5), 20))
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'search_history' query='{query}' source={source}")
+        # Indexing anything new and querying SQLite happen off the event loop
+        return await asyncio.to_thread(self.project_manager.search_history_text, query, limit, source)
+
+    def _kasa_device_list(self):
+        """Frontend representation of the devices cached by KasaAgent ({ip: SmartDevice})."""
+        devices = []
+        for ip, dev in self.kasa_agent.devices.items():
+            dev_type = "unknown"
+            if dev.is_bulb: dev_type = "bulb"
+            elif dev.is_plug: dev_type = "plug"
+            elif dev.is_strip: dev_type = "strip"
+            elif dev.is_dimmer: dev_type = "dimmer"
+
+            devices.append({
+                "ip": ip,
+                "alias": dev.alias,
+                "model": dev.model,
+                "type": dev_type,
+                "is_on": dev.is_on,
+                "brightness": dev.brightness if dev.is_bulb or dev.is_dimmer else None,
+                "hsv": dev.hsv if dev.is_bulb and dev.is_color else None,
+                "has_color": dev.is_color if dev.is_bulb else False,
+                "has_brightness": dev.is_dimmable if dev.is_bulb or dev.is_dimmer else False
+            })
+        return devices
+
+    async def _tool_list_smart_devices(self, args):
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'list_smart_devices'")
+        # Use cached devices directly for speed
+        frontend_list = self._kasa_device_list()
+        dev_summaries = [
+            f"{d['alias']} (IP: {d['ip']}, Type: {d['type']})" + (" [ON]" if d["is_on"] else " [OFF]")
+            for d in frontend_list
+        ]
+
+        result_str = "No devices found in cache."
+        if dev_summaries:
+            result_str = "Found Devices (Cached):\n" + "\n".join(dev_summaries)
+
+        # Trigger frontend update
+        if self.on_device_update:
+            self.on_device_update(frontend_list)
+        return result_str
+
+    async def _tool_control_light(self, args):
+        target = args["target"]
+        action = args["action"]
+        brightness = args.get("brightness")
+        color = args.get("color")
+
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'control_light' Target='{target}' Action='{action}'")
+
+        result_msg = f"Action '{action}' on '{target}' failed."
+        success = False
+
+        if action == "turn_on":
+            success = await self.kasa_agent.turn_on(target)
+            if success:
+                result_msg = f"Turned ON '{target}'."
+        elif action == "turn_off":
+            success = await self.kasa_agent.turn_off(target)
+            if success:
+                result_msg = f"Turned OFF '{target}'."
+        elif action == "set":
+            success = True
+            result_msg = f"Updated '{target}':"
+
+        # Apply extra attributes if 'set' or if we just turned it on and want to set them too
+        if success or action == "set":
+            if brightness is not None:
+                sb = await self.kasa_agent.set_brightness(target, brightness)
+                if sb:
+                    result_msg += f" Set brightness to {brightness}."
+            if color is not None:
+                sc = await self.kasa_agent.set_color(target, color)
+                if sc:
+                    result_msg += f" Set color to {color}."
+
+        # Notify Frontend of State Change
+        if success:
+            # KasaAgent updates its internal state on control, so we can rebuild the list
+            if self.on_device_update:
+                self.on_device_update(self._kasa_device_list())
+        else:
+            # Report Error
+            if self.on_error:
+                self.on_error(result_msg)
+        return result_msg
+
+    async def _tool_discover_printers(self, args):
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'discover_printers'")
+        printers = await self.printer_agent.discover_printers()
+        # Format for model
+        if printers:
+            printer_list = []
+            for p in printers:
+                printer_list.append(f"{p['name']} ({p['host']}:{p['port']}, type: {p['printer_type']})")
+            return "Found Printers:\n" + "\n".join(printer_list)
+        return "No printers found on network. Ensure printers are on and running OctoPrint/Moonraker."
+
+    async def _tool_print_stl(self, args):
+        stl_path = args["stl_path"]
+        printer = args["printer"]
+        profile = args.get("profile")
+
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'print_stl' STL='{stl_path}' Printer='{printer}'")
+
+        # Resolve 'current' to project STL
+        if stl_path.lower() == "current":
+            stl_path = "output.stl" # Let printer agent resolve it in root_path
+
+        # Get current project path
+        project_path = str(self.project_manager.get_current_project_path())
+
+        result = await self.printer_agent.print_stl(
+            stl_path,
+            printer,
+            profile,
+            root_path=project_path
+        )
+        return result.get("message", "Unknown result")
+
+    async def _tool_get_print_status(self, args):
+        printer = args["printer"]
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'get_print_status' Printer='{printer}'")
+
+        status = await self.printer_agent.get_print_status(printer)
+        if not status:
+            return f"Could not get status for printer '{printer}'. Ensure it is discovered first."
+
+        result_str = f"Printer: {status.printer}\n"
+        result_str += f"State: {status.state}\n"
+        result_str += f"Progress: {status.progress_percent:.1f}%\n"
+        if status.time_remaining:
+            result_str += f"Time Remaining: {status.time_remaining}\n"
+        if status.time_elapsed:
+            result_str += f"Time Elapsed: {status.time_elapsed}\n"
+        if status.filename:
+            result_str += f"File: {status.filename}\n"
+        if status.temperatures:
+            temps = status.temperatures
+            if "hotend" in temps:
+                result_str += f"Hotend: {temps['hotend']['current']:.0f}°C / {temps['hotend']['target']:.0f}°C\n"
+            if "bed" in temps:
+                result_str += f"Bed: {temps['bed']['current']:.0f}°C / {temps['bed']['target']:.0f}°C"
+        return result_str
+
+    async def _tool_iterate_cad(self, args):
+        prompt = args["prompt"]
+        print(f"[ADA DEBUG] [TOOL] Tool Call: 'iterate_cad' Prompt='{prompt}'")
+
+        # Emit status
+        if self.on_cad_status:
+            self.on_cad_status("generating")
+
+        # Get project cad folder path
+        cad_output_dir = str(self.project_manager.get_current_project_path() / "cad")
+
+        # Call CadAgent to iterate on the design
+        cad_data = await self.cad_agent.iterate_prototype(prompt, output_dir=cad_output_dir)
+
+        if not cad_data:
+            print(f"[ADA DEBUG] [ERR] CadAgent iteration returned None.")
+            return f"Failed to iterate design with prompt: {prompt}"
+
+        print(f"[ADA DEBUG] [OK] CadAgent iteration returned data successfully.")
+
+        # Dispatch to frontend
+        if self.on_cad_data:
+            print(f"[ADA DEBUG] [SEND] Dispatching iterated CAD data to frontend...")
+            self.on_cad_data(cad_data)
+            print(f"[ADA DEBUG] [SENT] Dispatch complete.")
+
+        # Save to Project
+        self.project_manager.save_cad_artifact("output.stl", f"Iteration: {prompt}")
+
+        return f"Successfully iterated design: {prompt}. The updated 3D model is now displayed."
+
+    # ========== COMPUTER CONTROL TOOLS ==========
+
+    def _computer_control_handler(self, tool_name, action):
+        """Handler that forwards the tool's args to ComputerControlAgent.execute_action (which applies defaults)."""
+
+        async def handler(args):
+            print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: '{tool_name}' Args={args}")
+            success, msg = await self.computer_control_agent.execute_action(action, args)
+            return msg
+
+        return handler
+
+    # ========== NITROGEN AI GAMING TOOLS ==========
+
+    async def _tool_start_nitrogen(self, args):
+        game_process = args["game_process"]
+        duration = args.get("duration")
+        controller_type = args.get("controller_type", "xbox")
+        print(f"[NITROGEN] [TOOL] Tool Call: 'start_nitrogen' Game='{game_process}' Duration={duration}")
+
+        if self.nitrogen_agent is None:
+            return "NitroGen not available. Install with: pip install -e ./NitroGen"
+        success, msg = await self.nitrogen_agent.play_game(
+            game_process,
+            duration,
+            controller_type
+        )
+        return msg
+
+    async def _tool_stop_nitrogen(self, args):
+        print(f"[NITROGEN] [TOOL] Tool Call: 'stop_nitrogen'")
+
+        if self.nitrogen_agent is None:
+            return "NitroGen not available"
+        success, msg = await self.nitrogen_agent.stop_playing()
+        return msg
+
+    async def _tool_nitrogen_status(self, args):
+        print(f"[NITROGEN] [TOOL] Tool Call: 'nitrogen_status'")
+
+        if self.nitrogen_agent is None:
+            return "NitroGen not available"
+        status = self.nitrogen_agent.get_status()
+        msg = f"NitroGen Status:\n"
+        msg += f"Server Running: {status['server_running']}\n"
+        msg += f"Currently Playing: {status['is_playing']}\n"
+        if status['game']:
+            msg += f"Game: {status['game']}\n"
+        msg += f"Model: {status['model_path']}\n"
+        msg += f"Port: {status['server_port']}"
+        return msg
+
     async def receive_audio(self):
         "Background task to reads from the websocket and write pcm chunks to the output queue"
         try:
@@ -1267,53 +1706,11 @@ class AudioLoop:
                                             self.chat_buffer["text"] += delta
                                         
                                         # --- ELEVENLABS TTS LOGIC ---
+                                        # Speak completed sentences in order as they stream in
                                         if self.elevenlabs_voice_id:
-                                            self.tts_buffer += delta
-                                            # Simple heuristic: Speak on sentence boundaries
-                                            # Check for [. ? !] followed by space or end
-                                            import re
-                                            # Using a regex to find sentence endings. 
-                                            # Be careful not to split "Mr." or "Dr." etc (complex, so we keep it simple)
-                                            if re.search(r'[.?!](?:\s|$)', self.tts_buffer):
-                                                # Find the split point (last punctuation)
-                                                # Actually, let's just speak the whole buffer if it ends with punctuation
-                                                # to ensure we don't cut off mid-sentence words that haven't arrived yet?
-                                                # But we might have minimal lookahead.
-                                                
-                                                # Better: split by punctuation, speak completed sentences, keep remainder
-                                                parts = re.split(r'([.?!])', self.tts_buffer)
-                                                # parts will be ["sentence", ".", " sentence", "?", " remainder"]
-                                                
-                                                # If we have at least one sentence + punctuation
-                                                if len(parts) > 1:
-                                                    to_speak = ""
-                                                    remainder = ""
-                                                    
-                                                    # Reassemble
-                                                    # We want pairs (sentence + punct)
-                                                    # Loop 0..len-2
-                                                    
-                                                    # If last part is empty (ended with punct), then everything is speakable
-                                                    # If last part is not empty, it's remainder
-                                                    
-                                                    cutoff_index = len(parts) - 1
-                                                    if parts[-1].strip() == "":
-                                                        # Ends with empty string after split, so entire buffer is sentence(s)
-                                                        to_speak = self.tts_buffer
-                                                        remainder = ""
-                                                    else:
-                                                        # Last part is incomplete sentence
-                                                        # Determine cutoff. 
-                                                        # parts = ["Hello", ".", " How", "?", " I am"] -> len 5
-                                                        # We want to keep " I am" (index 4)
-                                                        # Speak 0..3
-                                                        remainder = parts[-1]
-                                                        to_speak = "".join(parts[:-1])
-                                                    
-                                                    if to_speak.strip():
-                                                        asyncio.create_task(asyncio.to_thread(self.speak_with_elevenlabs, to_speak))
-                                                        self.tts_buffer = remainder
-                        
+                                            for sentence in self.tts_segmenter.feed(delta):
+                                                self.tts_worker.submit(sentence)
+
                         # Flush buffer on turn completion if needed, 
                         # but usually better to wait for sender switch or explicit end.
                         # We can also check turn_complete signal if available in response.server_content.model_turn etc
@@ -1321,623 +1718,47 @@ class AudioLoop:
                     # 3. Handle Tool Calls
                     if response.tool_call:
                         print("The tool was called")
-                        function_responses = []
-                        for fc in response.tool_call.function_calls:
-                            if fc.name in ["generate_cad", "run_web_agent", "write_file", "read_directory", "read_file", "create_project", "switch_project", "list_projects", "list_smart_devices", "control_light", "discover_printers", "print_stl", "get_print_status", "iterate_cad", "type_text", "press_key", "click_mouse", "double_click", "move_mouse", "scroll", "open_app", "close_app", "list_windows", "focus_window", "minimize_window", "maximize_window", "start_nitrogen", "stop_nitrogen", "nitrogen_status"]:
-                                prompt = fc.args.get("prompt", "") # Prompt is not present for all tools
-                                
-                                # Check Permissions (Default to True if not set)
-                                confirmation_required = self.permissions.get(fc.name, True)
-                                
-                                if not confirmation_required:
-                                    print(f"[ADA DEBUG] [TOOL] Permission check: '{fc.name}' -> AUTO-ALLOW")
-                                    # Skip confirmation block and jump to execution
-                                    pass
-                                else:
-                                    # Confirmation Logic
-                                    if self.on_tool_confirmation:
-                                        import uuid
-                                        request_id = str(uuid.uuid4())
-                                    print(f"[ADA DEBUG] [STOP] Requesting confirmation for '{fc.name}' (ID: {request_id})")
-                                    
-                                    future = asyncio.Future()
-                                    self._pending_confirmations[request_id] = future
-                                    
-                                    self.on_tool_confirmation({
-                                        "id": request_id, 
-                                        "tool": fc.name, 
-                                        "args": fc.args
-                                    })
-                                    
-                                    try:
-                                        # Wait for user response
-                                        confirmed = await future
-
-                                    finally:
-                                        self._pending_confirmations.pop(request_id, None)
-
-                                    print(f"[ADA DEBUG] [CONFIRM] Request {request_id} resolved. Confirmed: {confirmed}")
-
-                                    if not confirmed:
-                                        print(f"[ADA DEBUG] [DENY] Tool call '{fc.name}' denied by user.")
-                                        function_response = types.FunctionResponse(
-                                            id=fc.id,
-                                            name=fc.name,
-                                            response={
-                                                "result": "User denied the request to use this tool.",
-                                            }
-                                        )
-                                        function_responses.append(function_response)
-                                        continue
-
-                                    if not confirmed:
-                                        print(f"[ADA DEBUG] [DENY] Tool call '{fc.name}' denied by user.")
-                                        function_response = types.FunctionResponse(
-                                            id=fc.id,
-                                            name=fc.name,
-                                            response={
-                                                "result": "User denied the request to use this tool.",
-                                            }
-                                        )
-                                        function_responses.append(function_response)
-                                        continue
-
-                                # If confirmed (or no callback configured, or auto-allowed), proceed
-                                if fc.name == "generate_cad":
-                                    print(f"\n[ADA DEBUG] --------------------------------------------------")
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call Detected: 'generate_cad'")
-                                    print(f"[ADA DEBUG] [IN] Arguments: prompt='{prompt}'")
-                                    
-                                    asyncio.create_task(self.handle_cad_request(prompt))
-                                    # No function response needed - model already acknowledged when user asked
-                                
-                                elif fc.name == "run_web_agent":
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'run_web_agent' with prompt='{prompt}'")
-                                    asyncio.create_task(self.handle_web_agent_request(prompt))
-                                    
-                                    result_text = "Web Navigation started. Do not reply to this message."
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id,
-                                        name=fc.name,
-                                        response={
-                                            "result": result_text,
-                                        }
-                                    )
-                                    print(f"[ADA DEBUG] [RESPONSE] Sending function response: {function_response}")
-                                    function_responses.append(function_response)
-
-
-
-                                elif fc.name == "write_file":
-                                    path = fc.args["path"]
-                                    content = fc.args["content"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'write_file' path='{path}'")
-                                    asyncio.create_task(self.handle_write_file(path, content))
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": "Writing file..."}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "read_directory":
-                                    path = fc.args["path"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'read_directory' path='{path}'")
-                                    asyncio.create_task(self.handle_read_directory(path))
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": "Reading directory..."}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "read_file":
-                                    path = fc.args["path"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'read_file' path='{path}'")
-                                    asyncio.create_task(self.handle_read_file(path))
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": "Reading file..."}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "create_project":
-                                    name = fc.args["name"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'create_project' name='{name}'")
-                                    success, msg = self.project_manager.create_project(name)
-                                    if success:
-                                        # Auto-switch to the newly created project
-                                        self.project_manager.switch_project(name)
-                                        msg += f" Switched to '{name}'."
-                                        if self.on_project_update:
-                                            self.on_project_update(name)
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "switch_project":
-                                    name = fc.args["name"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'switch_project' name='{name}'")
-                                    success, msg = self.project_manager.switch_project(name)
-                                    if success:
-                                        if self.on_project_update:
-                                            self.on_project_update(name)
-                                        # Gather project context and send to AI (silently, no response expected)
-                                        context = self.project_manager.get_project_context()
-                                        print(f"[ADA DEBUG] [PROJECT] Sending project context to AI ({len(context)} chars)")
-                                        try:
-                                            await self.session.send(input=f"System Notification: {msg}\n\n{context}", end_of_turn=False)
-                                        except Exception as e:
-                                            print(f"[ADA DEBUG] [ERR] Failed to send project context: {e}")
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "list_projects":
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'list_projects'")
-                                    projects = self.project_manager.list_projects()
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": f"Available projects: {', '.join(projects)}"}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "list_smart_devices":
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'list_smart_devices'")
-                                    # Use cached devices directly for speed
-                                    # devices_dict is {ip: SmartDevice}
-                                    
-                                    dev_summaries = []
-                                    frontend_list = []
-                                    
-                                    for ip, d in self.kasa_agent.devices.items():
-                                        dev_type = "unknown"
-                                        if d.is_bulb: dev_type = "bulb"
-                                        elif d.is_plug: dev_type = "plug"
-                                        elif d.is_strip: dev_type = "strip"
-                                        elif d.is_dimmer: dev_type = "dimmer"
-                                        
-                                        # Format for Model
-                                        info = f"{d.alias} (IP: {ip}, Type: {dev_type})"
-                                        if d.is_on:
-                                            info += " [ON]"
-                                        else:
-                                            info += " [OFF]"
-                                        dev_summaries.append(info)
-                                        
-                                        # Format for Frontend
-                                        frontend_list.append({
-                                            "ip": ip,
-                                            "alias": d.alias,
-                                            "model": d.model,
-                                            "type": dev_type,
-                                            "is_on": d.is_on,
-                                            "brightness": d.brightness if d.is_bulb or d.is_dimmer else None,
-                                            "hsv": d.hsv if d.is_bulb and d.is_color else None,
-                                            "has_color": d.is_color if d.is_bulb else False,
-                                            "has_brightness": d.is_dimmable if d.is_bulb or d.is_dimmer else False
-                                        })
-                                    
-                                    result_str = "No devices found in cache."
-                                    if dev_summaries:
-                                        result_str = "Found Devices (Cached):\n" + "\n".join(dev_summaries)
-                                    
-                                    # Trigger frontend update
-                                    if self.on_device_update:
-                                        self.on_device_update(frontend_list)
-
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "control_light":
-                                    target = fc.args["target"]
-                                    action = fc.args["action"]
-                                    brightness = fc.args.get("brightness")
-                                    color = fc.args.get("color")
-                                    
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'control_light' Target='{target}' Action='{action}'")
-                                    
-                                    result_msg = f"Action '{action}' on '{target}' failed."
-                                    success = False
-                                    
-                                    if action == "turn_on":
-                                        success = await self.kasa_agent.turn_on(target)
-                                        if success:
-                                            result_msg = f"Turned ON '{target}'."
-                                    elif action == "turn_off":
-                                        success = await self.kasa_agent.turn_off(target)
-                                        if success:
-                                            result_msg = f"Turned OFF '{target}'."
-                                    elif action == "set":
-                                        success = True
-                                        result_msg = f"Updated '{target}':"
-                                    
-                                    # Apply extra attributes if 'set' or if we just turned it on and want to set them too
-                                    if success or action == "set":
-                                        if brightness is not None:
-                                            sb = await self.kasa_agent.set_brightness(target, brightness)
-                                            if sb:
-                                                result_msg += f" Set brightness to {brightness}."
-                                        if color is not None:
-                                            sc = await self.kasa_agent.set_color(target, color)
-                                            if sc:
-                                                result_msg += f" Set color to {color}."
-
-                                    # Notify Frontend of State Change
-                                    if success:
-                                        # We don't need full discovery, just refresh known state or push update
-                                        # But for simplicity, let's get the standard list representation
-                                        # KasaAgent updates its internal state on control, so we can rebuild the list
-                                        
-                                        # Quick rebuild of list from internal dict
-                                        updated_list = []
-                                        for ip, dev in self.kasa_agent.devices.items():
-                                            # We need to ensure we have the correct dict structure expected by frontend
-                                            # We duplicate logic from KasaAgent.discover_devices a bit, but that's okay for now or we can add a helper
-                                            # Ideally KasaAgent has a 'get_devices_list()' method.
-                                            # Use the cached objects in self.kasa_agent.devices
-                                            
-                                            dev_type = "unknown"
-                                            if dev.is_bulb: dev_type = "bulb"
-                                            elif dev.is_plug: dev_type = "plug"
-                                            elif dev.is_strip: dev_type = "strip"
-                                            elif dev.is_dimmer: dev_type = "dimmer"
-
-                                            d_info = {
-                                                "ip": ip,
-                                                "alias": dev.alias,
-                                                "model": dev.model,
-                                                "type": dev_type,
-                                                "is_on": dev.is_on,
-                                                "brightness": dev.brightness if dev.is_bulb or dev.is_dimmer else None,
-                                                "hsv": dev.hsv if dev.is_bulb and dev.is_color else None,
-                                                "has_color": dev.is_color if dev.is_bulb else False,
-                                                "has_brightness": dev.is_dimmable if dev.is_bulb or dev.is_dimmer else False
-                                            }
-                                            updated_list.append(d_info)
-                                            
-                                        if self.on_device_update:
-                                            self.on_device_update(updated_list)
-                                    else:
-                                        # Report Error
-                                        if self.on_error:
-                                            self.on_error(result_msg)
-
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_msg}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "discover_printers":
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'discover_printers'")
-                                    printers = await self.printer_agent.discover_printers()
-                                    # Format for model
-                                    if printers:
-                                        printer_list = []
-                                        for p in printers:
-                                            printer_list.append(f"{p['name']} ({p['host']}:{p['port']}, type: {p['printer_type']})")
-                                        result_str = "Found Printers:\n" + "\n".join(printer_list)
-                                    else:
-                                        result_str = "No printers found on network. Ensure printers are on and running OctoPrint/Moonraker."
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "print_stl":
-                                    stl_path = fc.args["stl_path"]
-                                    printer = fc.args["printer"]
-                                    profile = fc.args.get("profile")
-                                    
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'print_stl' STL='{stl_path}' Printer='{printer}'")
-                                    
-                                    # Resolve 'current' to project STL
-                                    if stl_path.lower() == "current":
-                                        stl_path = "output.stl" # Let printer agent resolve it in root_path
-
-                                    # Get current project path
-                                    project_path = str(self.project_manager.get_current_project_path())
-                                    
-                                    result = await self.printer_agent.print_stl(
-                                        stl_path, 
-                                        printer, 
-                                        profile, 
-                                        root_path=project_path
-                                    )
-                                    result_str = result.get("message", "Unknown result")
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "get_print_status":
-                                    printer = fc.args["printer"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'get_print_status' Printer='{printer}'")
-                                    
-                                    status = await self.printer_agent.get_print_status(printer)
-                                    if status:
-                                        result_str = f"Printer: {status.printer}\n"
-                                        result_str += f"State: {status.state}\n"
-                                        result_str += f"Progress: {status.progress_percent:.1f}%\n"
-                                        if status.time_remaining:
-                                            result_str += f"Time Remaining: {status.time_remaining}\n"
-                                        if status.time_elapsed:
-                                            result_str += f"Time Elapsed: {status.time_elapsed}\n"
-                                        if status.filename:
-                                            result_str += f"File: {status.filename}\n"
-                                        if status.temperatures:
-                                            temps = status.temperatures
-                                            if "hotend" in temps:
-                                                result_str += f"Hotend: {temps['hotend']['current']:.0f}°C / {temps['hotend']['target']:.0f}°C\n"
-                                            if "bed" in temps:
-                                                result_str += f"Bed: {temps['bed']['current']:.0f}°C / {temps['bed']['target']:.0f}°C"
-                                    else:
-                                        result_str = f"Could not get status for printer '{printer}'. Ensure it is discovered first."
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "iterate_cad":
-                                    prompt = fc.args["prompt"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'iterate_cad' Prompt='{prompt}'")
-                                    
-                                    # Emit status
-                                    if self.on_cad_status:
-                                        self.on_cad_status("generating")
-                                    
-                                    # Get project cad folder path
-                                    cad_output_dir = str(self.project_manager.get_current_project_path() / "cad")
-                                    
-                                    # Call CadAgent to iterate on the design
-                                    cad_data = await self.cad_agent.iterate_prototype(prompt, output_dir=cad_output_dir)
-                                    
-                                    if cad_data:
-                                        print(f"[ADA DEBUG] [OK] CadAgent iteration returned data successfully.")
-                                        
-                                        # Dispatch to frontend
-                                        if self.on_cad_data:
-                                            print(f"[ADA DEBUG] [SEND] Dispatching iterated CAD data to frontend...")
-                                            self.on_cad_data(cad_data)
-                                            print(f"[ADA DEBUG] [SENT] Dispatch complete.")
-                                        
-                                        # Save to Project
-                                        self.project_manager.save_cad_artifact("output.stl", f"Iteration: {prompt}")
-                                        
-                                        result_str = f"Successfully iterated design: {prompt}. The updated 3D model is now displayed."
-                                    else:
-                                        print(f"[ADA DEBUG] [ERR] CadAgent iteration returned None.")
-                                        result_str = f"Failed to iterate design with prompt: {prompt}"
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                # ========== COMPUTER CONTROL TOOLS ==========
-                                
-                                elif fc.name == "type_text":
-                                    text = fc.args["text"]
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'type_text' Text='{text}'")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("type", {"text": text})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "press_key":
-                                    key = fc.args["key"]
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'press_key' Key='{key}'")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("press_key", {"key": key})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "click_mouse":
-                                    button = fc.args.get("button", "left")
-                                    x = fc.args.get("x")
-                                    y = fc.args.get("y")
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'click_mouse' Button='{button}' X={x} Y={y}")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("click", {"button": button, "x": x, "y": y})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "double_click":
-                                    x = fc.args.get("x")
-                                    y = fc.args.get("y")
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'double_click' X={x} Y={y}")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("double_click", {"x": x, "y": y})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "move_mouse":
-                                    x = fc.args["x"]
-                                    y = fc.args["y"]
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'move_mouse' X={x} Y={y}")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("move_mouse", {"x": x, "y": y})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "scroll":
-                                    direction = fc.args["direction"]
-                                    clicks = fc.args.get("clicks", 3)
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'scroll' Direction='{direction}' Clicks={clicks}")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("scroll", {"direction": direction, "clicks": clicks})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "open_app":
-                                    app_name = fc.args["app_name"]
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'open_app' App='{app_name}'")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("open_app", {"app_name": app_name})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "close_app":
-                                    app_name = fc.args["app_name"]
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'close_app' App='{app_name}'")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("close_app", {"app_name": app_name})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "list_windows":
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'list_windows'")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("list_windows", {})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "focus_window":
-                                    window_title = fc.args["window_title"]
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'focus_window' Title='{window_title}'")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("focus_window", {"window_title": window_title})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "minimize_window":
-                                    window_title = fc.args["window_title"]
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'minimize_window' Title='{window_title}'")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("minimize_window", {"window_title": window_title})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "maximize_window":
-                                    window_title = fc.args["window_title"]
-                                    print(f"[COMPUTER_CONTROL] [TOOL] Tool Call: 'maximize_window' Title='{window_title}'")
-                                    
-                                    success, msg = await self.computer_control_agent.execute_action("maximize_window", {"window_title": window_title})
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                # ========== NITROGEN AI GAMING TOOLS ==========
-                                
-                                elif fc.name == "start_nitrogen":
-                                    game_process = fc.args["game_process"]
-                                    duration = fc.args.get("duration")
-                                    controller_type = fc.args.get("controller_type", "xbox")
-                                    print(f"[NITROGEN] [TOOL] Tool Call: 'start_nitrogen' Game='{game_process}' Duration={duration}")
-                                    
-                                    if self.nitrogen_agent is None:
-                                        msg = "NitroGen not available. Install with: pip install -e ./NitroGen"
-                                        success = False
-                                    else:
-                                        success, msg = await self.nitrogen_agent.play_game(
-                                            game_process, 
-                                            duration, 
-                                            controller_type
-                                        )
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "stop_nitrogen":
-                                    print(f"[NITROGEN] [TOOL] Tool Call: 'stop_nitrogen'")
-                                    
-                                    if self.nitrogen_agent is None:
-                                        msg = "NitroGen not available"
-                                        success = False
-                                    else:
-                                        success, msg = await self.nitrogen_agent.stop_playing()
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "nitrogen_status":
-                                    print(f"[NITROGEN] [TOOL] Tool Call: 'nitrogen_status'")
-                                    
-                                    if self.nitrogen_agent is None:
-                                        msg = "NitroGen not available"
-                                    else:
-                                        status = self.nitrogen_agent.get_status()
-                                        msg = f"NitroGen Status:\n"
-                                        msg += f"Server Running: {status['server_running']}\n"
-                                        msg += f"Currently Playing: {status['is_playing']}\n"
-                                        if status['game']:
-                                            msg += f"Game: {status['game']}\n"
-                                        msg += f"Model: {status['model_path']}\n"
-                                        msg += f"Port: {status['server_port']}"
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                        if function_responses:
-                            await self.session.send_tool_response(function_responses=function_responses)
+                        # Runs (and waits for any confirmation) in the background so audio keeps flowing
+                        self.tool_registry.submit(
+                            response.tool_call.function_calls, self._send_tool_responses, confirm=self._confirm_tool
+                        )
                 
                 # Turn/Response Loop Finished
                 self.flush_chat()
 
-                while not self.audio_in_queue.empty():
-                    self.audio_in_queue.get_nowait()
+                # Speak any trailing text that never got sentence punctuation
+                remainder = self.tts_segmenter.flush()
+                if remainder and self.elevenlabs_voice_id:
+                    self.tts_worker.submit(remainder)
+
+                self.audio_in_queue.flush()
         except Exception as e:
+            # Connection drops end the turn inside LiveConnection; this is a local failure
             print(f"Error in receive_audio: {e}")
             traceback.print_exc()
-            # CRITICAL: Re-raise to crash the TaskGroup and trigger outer loop reconnect
             raise e
 
     async def play_audio(self):
-        stream = await asyncio.to_thread(
-            pya.open,
-            format=FORMAT,
-            channels=CHANNELS,
+        stream = PlaybackStream(
+            pya,
             rate=RECEIVE_SAMPLE_RATE,
-            output=True,
+            chunk_size=CHUNK_SIZE,
+            channels=CHANNELS,
+            fmt=FORMAT,
             output_device_index=self.output_device_index,
         )
-        while True:
-            bytestream = await self.audio_in_queue.get()
-            if self.on_audio_data:
-                self.on_audio_data(bytestream)
-            await asyncio.to_thread(stream.write, bytestream)
+        stream.bind_loop()
+        await asyncio.to_thread(stream.open)
+        self.playback_stream = stream
+        try:
+            while True:
+                bytestream = await self.audio_in_queue.get()
+                if self.on_audio_data:
+                    self.on_audio_data(bytestream)
+                await stream.write(bytestream)
+        finally:
+            self.playback_stream = None
+            stream.close()
 
     async def get_frames(self):
         cap = await asyncio.to_thread(cv2.VideoCapture, 0, cv2.CAP_AVFOUNDATION)
@@ -1945,26 +1766,23 @@ class AudioLoop:
             if self.paused:
                 await asyncio.sleep(0.1)
                 continue
-            frame = await asyncio.to_thread(self._get_frame, cap)
-            if frame is None:
+            ok, frame = await asyncio.to_thread(self._get_frame, cap)
+            if not ok:
                 break
-            await asyncio.sleep(1.0)
-            if self.out_queue:
+            await asyncio.sleep(CAMERA_FRAME_INTERVAL)
+            if frame is not None and self.out_queue:
                 await self.out_queue.put(frame)
         cap.release()
 
     def _get_frame(self, cap):
+        """Returns (ok, payload); payload is None when the view has not changed since the last frame sent."""
         ret, frame = cap.read()
         if not ret:
-            return None
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = PIL.Image.fromarray(frame_rgb)
-        img.thumbnail([1024, 1024])
-        image_io = io.BytesIO()
-        img.save(image_io, format="jpeg")
-        image_io.seek(0)
-        image_bytes = image_io.read()
-        return {"mime_type": "image/jpeg", "data": base64.b64encode(image_bytes).decode()}
+            return False, None
+        jpeg = self.frame_pipeline.process(frame)
+        if jpeg is None:
+            return True, None
+        return True, {"mime_type": "image/jpeg", "data": jpeg}
 
     async def _get_screen(self):
         pass 
@@ -1972,80 +1790,94 @@ class AudioLoop:
          pass
 
     async def run(self, start_message=None):
-        if ai_provider == "LOCAL":
-            print(f"[BRAIN] Starting in LOCAL MODE (Provider: LM Studio at {lm_studio_url})")
-            
-            # Local Mode Loop
-            self.session = None # No Gemini session
-            self.audio_in_queue = asyncio.Queue()
-            self.out_queue = asyncio.Queue(maxsize=10)
-            
-            # Start Camera if needed (Local Vision not yet implemented, but keep structure)
-            if self.video_mode == "camera":
-                pass # Local vision to be added
-            
-            # Send initial update
-            if self.on_project_update and self.project_manager:
-                self.on_project_update(self.project_manager.current_project)
+        # Warm the CAD workers now so build123d is already imported when a design is requested
+        self.cad_agent.start_workers()
+        try:
+            if ai_provider == "LOCAL":
+                await self._run_local()
+            else:
+                await self._run_live(start_message)
+        finally:
+            # Also runs when stop_audio cancels the loop task
+            await self.http.close()
+            await asyncio.to_thread(self.cad_agent.close)
+
+    async def _run_local(self):
+        print(f"[BRAIN] Starting in LOCAL MODE (Provider: LM Studio at {lm_studio_url})")
+        
+        # Local Mode Loop
+        self.session = None # No Gemini session
+        self.audio_in_queue = self._create_playback_buffer()
+        self.out_queue = asyncio.Queue(maxsize=10)
+
+        # TTS replies need the speaker and the ordered TTS worker
+        local_tasks = [
+            asyncio.create_task(self.play_audio()),
+            asyncio.create_task(self.tts_worker.run()),
+        ]
+        
+        # Start Camera if needed (Local Vision not yet implemented, but keep structure)
+        if self.video_mode == "camera":
+            pass # Local vision to be added
+        
+        # Send initial update
+        if self.on_project_update and self.project_manager:
+            self.on_project_update(self.project_manager.current_project)
 
+        try:
             while not self.stop_event.is_set():
                 try:
                     # Wait for user input (Text only for now in Local Mode)
                     msg_content = await self.out_queue.get()
-                    
+                
                     # Log User Message
                     if isinstance(msg_content, str):
                         print(f"[BRAIN] [LOCAL] User Input: {msg_content}")
                         # Update Chat UI
                         if self.on_transcription:
                             self.on_transcription({"sender": "User", "text": msg_content})
+                    
+                        # Query Local LLM (streams tokens to the UI and sentences to TTS)
+                        response_text = await self.ask_local_llm(msg_content)
                         
-                        # Query Local LLM
-                        response_text = await asyncio.to_thread(self.ask_local_llm, msg_content)
-                        
-                        # Update Chat UI with AI Response
-                        if self.on_transcription:
-                            self.on_transcription({"sender": "Multivac", "text": response_text})
-                            
                         # Log to History
                         self.project_manager.log_chat("User", msg_content)
                         self.project_manager.log_chat("Multivac", response_text)
-                        
-                        # Try TTS if configured (and quota available)
-                        # We use the same speak method, which checks keys etc.
-                        if self.elevenlabs_api_key:
-                             asyncio.create_task(asyncio.to_thread(self.speak_with_elevenlabs, response_text))
 
                     elif isinstance(msg_content, dict):
                         # Handle other types if any (e.g. image payloads?)
                         pass
-                        
+                    
                 except Exception as e:
                     print(f"[BRAIN] [ERR] Local Loop Error: {e}")
                     await asyncio.sleep(1)
-            
-            print("[BRAIN] Local Mode Ended")
-            return
-
-        # GEMINI MODE (Original Logic)
+        finally:
+            for task in local_tasks:
+                task.cancel()
+        print("[BRAIN] Local Mode Ended")
+
+    async def _run_live(self, start_message):
+        # GEMINI MODE
+        # The connection reconnects, resumes and swaps on its own; the local
+        # audio/video tasks stay up across that and are only restarted if one of them fails
+        self._start_message = start_message
+        self._live_started = False
+        self.session = LiveConnection(
+            live_connect,
+            on_connected=self._on_live_connected,
+            session_lifetime=LIVE_SESSION_LIFETIME,
+            standby_lead=LIVE_STANDBY_LEAD,
+        )
+        self.audio_in_queue = self._create_playback_buffer()
+        self.out_queue = asyncio.Queue(maxsize=10)
         retry_delay = 1
-        is_reconnect = False
-        
+
         while not self.stop_event.is_set():
             try:
-                print(f"[ADA DEBUG] [CONNECT] Connecting to Gemini Live API...")
-                async with (
-                    client.aio.live.connect(model=MODEL, config=config) as session,
-                    asyncio.TaskGroup() as tg,
-                ):
-                    self.session = session
-
-                    self.audio_in_queue = asyncio.Queue()
-                    self.out_queue = asyncio.Queue(maxsize=10)
-
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(self.session.run())
                     tg.create_task(self.send_realtime())
                     tg.create_task(self.listen_audio())
-                    # tg.create_task(self._process_video_queue()) # Removed in favor of VAD
 
                     if self.video_mode == "camera":
                         tg.create_task(self.get_frames())
@@ -2054,68 +1886,30 @@ class AudioLoop:
 
                     tg.create_task(self.receive_audio())
                     tg.create_task(self.play_audio())
+                    tg.create_task(self.tts_worker.run())
 
-                    # Handle Startup vs Reconnect Logic
-                    if not is_reconnect:
-                        if start_message:
-                            print(f"[ADA DEBUG] [INFO] Sending start message: {start_message}")
-                            await self.session.send(input=start_message, end_of_turn=True)
-                        
-                        # Sync Project State
-                        if self.on_project_update and self.project_manager:
-                            self.on_project_update(self.project_manager.current_project)
-                    
-                    else:
-                        print(f"[ADA DEBUG] [RECONNECT] Connection restored.")
-                        # Restore Context
-                        print(f"[ADA DEBUG] [RECONNECT] Fetching recent chat history to restore context...")
-                        history = self.project_manager.get_recent_chat_history(limit=10)
-                        
-                        context_msg = "System Notification: Connection was lost and just re-established. Here is the recent chat history to help you resume seamlessly:\n\n"
-                        for entry in history:
-                            sender = entry.get('sender', 'Unknown')
-                            text = entry.get('text', '')
-                            context_msg += f"[{sender}]: {text}\n"
-                        
-                        context_msg += "\nPlease acknowledge the reconnection to the user (e.g. 'I lost connection for a moment, but I'm back...') and resume what you were doing."
-                        
-                        print(f"[ADA DEBUG] [RECONNECT] Sending restoration context to model...")
-                        await self.session.send(input=context_msg, end_of_turn=True)
-
-                    # Reset retry delay on successful connection
-                    retry_delay = 1
-                    
                     # Keep the loop alive
                     while not self.stop_event.is_set():
-                         await asyncio.sleep(0.5)
+                        await asyncio.sleep(0.5)
+                        if self.session.connected:
+                            retry_delay = 1
+                    self.session.close()
 
-            except Exception as e:
-                print(f"Error in main loop: {e}")
-                traceback.print_exc()
-                is_reconnect = True 
-                retry_delay = min(retry_delay * 2, 30)
-                print(f"Reconnecting in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)                  # However, since receive_audio is a task in the group, if it crashes (connection closed), 
-                    # the group will cancel others and exit. We catch that exit below.
-                    
-                    # We can await stop_event, but if the connection dies, receive_audio crashes -> group closes -> we exit `async with` -> restart loop.
-                    # To ensure we don't block indefinitely if connection dies silently (unlikely with receive_audio), we just wait.
             except asyncio.CancelledError:
                 print(f"[ADA DEBUG] [STOP] Main loop cancelled.")
                 break
-                
+
             except Exception as e:
                 # This catches the ExceptionGroup from TaskGroup or direct exceptions
-                print(f"[ADA DEBUG] [ERR] Connection Error: {e}")
-                
+                print(f"[ADA DEBUG] [ERR] Audio loop error: {e}")
+
                 if self.stop_event.is_set():
                     break
-                
-                print(f"[ADA DEBUG] [RETRY] Reconnecting in {retry_delay} seconds...")
+
+                print(f"[ADA DEBUG] [RETRY] Restarting in {retry_delay} seconds...")
                 await asyncio.sleep(retry_delay)
                 retry_delay = min(retry_delay * 2, 10) # Exponential backoff capped at 10s
-                is_reconnect = True # Next loop will be a reconnect
-                
+
             finally:
                 # Cleanup before retry
                 if hasattr(self, 'audio_stream') and self.audio_stream:
@@ -2124,6 +1918,34 @@ class AudioLoop:
                     except: 
                         pass
 
+    async def _on_live_connected(self, resumed, reason):
+        """Called by LiveConnection whenever a new connection takes over."""
+        if not self._live_started:
+            self._live_started = True
+            if self._start_message:
+                print(f"[ADA DEBUG] [INFO] Sending start message: {self._start_message}")
+                await self.session.send(input=self._start_message, end_of_turn=True)
+
+            # Sync Project State
+            if self.on_project_update and self.project_manager:
+                self.on_project_update(self.project_manager.current_project)
+            return
+
+        if resumed:
+            print(f"[ADA DEBUG] [RECONNECT] Session resumed ({reason}).")
+            return
+
+        print(f"[ADA DEBUG] [RECONNECT] Connection restored with a new session ({reason}).")
+        # Tool calls from the old session can't be answered any more
+        self.tool_registry.cancel_pending()
+        self.confirmations.deny_all()
+        # Restore context from the project's rolling summary, as silent context
+        try:
+            sent = await send_reconnect_context(self.session, self.project_manager)
+            print(f"[ADA DEBUG] [RECONNECT] Sent conversation summary ({sent} chars)")
+        except Exception as e:
+            print(f"[ADA DEBUG] [ERR] Failed to restore context: {e}")
+
 def get_input_devices():
     p = pyaudio.PyAudio()
     info = p.get_host_api_info_by_index(0)
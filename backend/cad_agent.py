@@ -1,6 +1,8 @@
 import os
 import json
 import asyncio
+import random
+import time
 from datetime import datetime
 from google import genai
 from google.genai import types
@@ -8,15 +10,41 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
+from cad_cache import CadCache, sha256
+from cad_worker import CadWorkerPool, ScriptResult
+
 load_dotenv()
 
+# Speculative candidates: temperature per candidate slot (the first matches the serial mode)
+CANDIDATE_TEMPERATURES = (1.0, 0.6, 1.3, 0.3)
+MAX_CANDIDATES = len(CANDIDATE_TEMPERATURES)
+
+# Shared by all projects, next to the projects/ folder
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cad_cache")
+
 class CadAgent:
-    def __init__(self, on_thought=None, on_status=None):
+    def __init__(self, on_thought=None, on_status=None, on_candidate=None):
         self.client = genai.Client(http_options={"api_version": "v1beta"}, api_key=os.getenv("GEMINI_API_KEY"))
         # Using Gemini 2.5 Pro for thinking/streaming support
         self.model = "gemini-3-pro-preview"
         self.on_thought = on_thought  # Callback for streaming thoughts 
         self.on_status = on_status  # Callback for retry status info
+        self.on_candidate = on_candidate  # Callback for per-candidate progress and timings
+        # Scripts requested in parallel per attempt (1 = serial generate/fix retries)
+        self.candidates = 1
+
+        # Generated scripts run on warm worker processes that already imported build123d
+        self.workers = CadWorkerPool(
+            size=int(os.getenv("CAD_WORKERS", "2")),
+            timeout=float(os.getenv("CAD_SCRIPT_TIMEOUT", "120")),
+            memory_limit_mb=int(os.getenv("CAD_WORKER_MEMORY_MB", "8192")),
+        )
+        # Repeated requests and re-run scripts reuse earlier results instead of the model/workers
+        self.cache_enabled = os.getenv("CAD_CACHE", "1").lower() not in ("0", "false", "no")
+        self.cache = CadCache(
+            os.getenv("CAD_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(os.getenv("CAD_CACHE_MB", "256")) * 1024 * 1024,
+        )
         
         self.system_instruction = """
 You are a Python-based 3D CAD Engineer using the `build123d` library.
@@ -60,6 +88,231 @@ export_stl(result_part, 'output.stl')
 ```
 """
 
+    def start_workers(self):
+        """Starts the CAD workers so build123d is imported before the first request."""
+        self.workers.start()
+
+    def set_candidates(self, count: int):
+        """Sets how many candidate scripts are raced per attempt; the worker pool grows to match."""
+        self.candidates = max(1, min(int(count), MAX_CANDIDATES))
+        if self.candidates > self.workers.size:
+            self.workers.resize(self.candidates)
+
+    def close(self):
+        self.workers.close()
+        self.cache.close()
+
+    def get_stats(self) -> dict:
+        return {"workers": self.workers.get_stats(), "cache": self.cache.get_stats()}
+
+    def _emit_status(self, status_info):
+        """Sends a cad_status update, with the cache hit/miss counters attached."""
+        if self.on_status:
+            status_info["cache"] = self.cache.get_stats()
+            self.on_status(status_info)
+
+    def _emit_candidate(self, report):
+        """Sends a per-candidate report, separate from cad_status so it never replaces the attempt status."""
+        if self.on_candidate:
+            self.on_candidate(report)
+
+    @staticmethod
+    def _stl_result(stl_data, output_stl):
+        """
+        Result of a generation: where the STL was written plus its sha256, which the
+        server uses as the ETag when it serves the file (the STL is not sent inline).
+        """
+        return {
+            "format": "stl",
+            "file_path": output_stl,
+            "size": len(stl_data),
+            "etag": sha256(stl_data),
+        }
+
+    async def _lookup(self, cache_key, script_path, output_stl):
+        """Result of an earlier identical request (any project), written out as if just generated."""
+        if not self.cache_enabled:
+            return None
+        cached = await asyncio.to_thread(self.cache.lookup, cache_key)
+        if not cached:
+            return None
+        code, stl_data = cached
+        print(f"[CadAgent DEBUG] [CACHE] Same request seen before, reusing its script and STL.")
+        with open(script_path, "w") as f:
+            f.write(code.replace("output.stl", output_stl.replace("\\", "\\\\")))
+        with open(output_stl, "wb") as f:
+            f.write(stl_data)
+        self._emit_status({"status": "cached", "error": None})
+        return self._stl_result(stl_data, output_stl)
+
+    async def _execute(self, code, code_with_path, output_stl, work_dir, script_path):
+        """Runs a script on a worker, unless an identical script ran before; then its STL is reused."""
+        if self.cache_enabled:
+            stl_data = await asyncio.to_thread(self.cache.get_stl, code)
+            if stl_data is not None:
+                print(f"[CadAgent DEBUG] [CACHE] Identical script ran before, reusing its STL.")
+                with open(output_stl, "wb") as f:
+                    f.write(stl_data)
+                return ScriptResult(True, stl_data, None, "", 0.0)
+        return await self.workers.run(code_with_path, output_stl, cwd=work_dir, filename=script_path)
+
+    async def _ask_model(self, contents, temperature=1.0, seed=None, stream_thoughts=True):
+        """Streams a script request to the model; thoughts go to on_thought, the answer text is returned."""
+        raw_content = ""
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=types.GenerateContentConfig(
+                system_instruction=self.system_instruction,
+                temperature=temperature,
+                seed=seed,
+                thinking_config=types.ThinkingConfig(include_thoughts=True)
+            )
+        )
+        async for chunk in stream:
+            if chunk.candidates and chunk.candidates[0].content and chunk.candidates[0].content.parts:
+                for part in chunk.candidates[0].content.parts:
+                    if not part.text:
+                        continue
+                    elif part.thought:
+                        # Stream thought to callback
+                        if self.on_thought and stream_thoughts:
+                            self.on_thought(part.text)
+                    else:
+                        # Accumulate answer text
+                        raw_content += part.text
+        return raw_content
+
+    @staticmethod
+    def _extract_code(raw_content):
+        """The python code block of a model answer, or None."""
+        import re
+        code_match = re.search(r'```python(.*?)```', raw_content, re.DOTALL)
+        if code_match:
+            return code_match.group(1).strip()
+        # Fallback: assume entire text is code if no blocks, or fail
+        print("[CadAgent DEBUG] [WARN] No ```python block found. Trying heuristic...")
+        if "import build123d" in raw_content:
+            return raw_content
+        print("[CadAgent DEBUG] [ERR] Could not extract python code.")
+        return None
+
+    async def _candidate(self, index, contents, attempt, max_retries, tmp_dir):
+        """Generates and runs one candidate script. Returns (code, result, error)."""
+        report = {
+            "candidate": index + 1,
+            "candidates": self.candidates,
+            "attempt": attempt + 1,
+            "max_attempts": max_retries,
+        }
+        start = time.monotonic()
+        model_time = None
+        try:
+            # Only the first candidate streams its thoughts, so the UI does not interleave them
+            raw_content = await self._ask_model(contents, temperature=CANDIDATE_TEMPERATURES[index],
+                                                seed=random.randrange(2 ** 31), stream_thoughts=index == 0)
+            model_time = time.monotonic() - start
+            code = self._extract_code(raw_content) if raw_content else None
+            if code is None:
+                error = "The response did not contain a python script."
+                self._emit_candidate({**report, "phase": "failed", "model_s": round(model_time, 2), "error": error})
+                return None, None, error
+
+            output = os.path.join(tmp_dir, f"candidate_{index + 1}.stl")
+            script = os.path.join(tmp_dir, f"candidate_{index + 1}.py")
+            code_with_path = code.replace("output.stl", output.replace("\\", "\\\\"))
+            with open(script, "w") as f:
+                f.write(code_with_path)
+            result = await self._execute(code, code_with_path, output, tmp_dir, script)
+
+            if result.ok and result.stl is not None:
+                error = None
+            elif result.ok:
+                error = "The script executed successfully but 'output.stl' was not found. Ensure you call `export_stl(result_part, 'output.stl')` at the end."
+            else:
+                error = result.error
+            self._emit_candidate({
+                **report,
+                "phase": "succeeded" if error is None else "failed",
+                "model_s": round(model_time, 2),
+                "exec_s": round(result.elapsed, 2),
+                "error": error.strip().split('\n')[-1][:100] if error else None,
+            })
+            return code, result, error
+        except asyncio.CancelledError:
+            self._emit_candidate({**report, "phase": "cancelled", "elapsed_s": round(time.monotonic() - start, 2)})
+            raise
+        except Exception as e:
+            print(f"[CadAgent DEBUG] [ERR] Candidate {index + 1} failed: {e}")
+            self._emit_candidate({**report, "phase": "failed", "error": str(e)[:100]})
+            return None, None, str(e)
+
+    async def _race(self, contents, attempt, max_retries, tmp_dir):
+        """Runs `candidates` candidates concurrently; returns the first (code, result) with an STL, cancelling the rest."""
+        tasks = [
+            asyncio.create_task(self._candidate(i, contents, attempt, max_retries, tmp_dir))
+            for i in range(self.candidates)
+        ]
+        errors = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                code, result, error = await next_done
+                if error is None:
+                    return code, result, errors
+                errors.append(error)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let cancelled candidates stop their model streams and workers before returning
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return None, None, errors
+
+    async def _generate_candidates(self, current_prompt, fix_prompt, max_retries, cache_key, script_path, output_stl):
+        """Speculative mode: each attempt races several candidate scripts; the first valid STL wins."""
+        import tempfile
+
+        with tempfile.TemporaryDirectory(prefix="cad_candidates_", ignore_cleanup_errors=True) as tmp_dir:
+            for attempt in range(max_retries):
+                print(f"[CadAgent DEBUG] Attempt {attempt + 1}/{max_retries} with {self.candidates} candidates")
+                self._emit_status({
+                    "status": "generating" if attempt == 0 else "retrying",
+                    "attempt": attempt + 1,
+                    "max_attempts": max_retries,
+                    "error": None,
+                    "candidates": self.candidates,
+                })
+
+                code, result, errors = await self._race(current_prompt, attempt, max_retries, tmp_dir)
+                if code is not None:
+                    print(f"[CadAgent DEBUG] [OK] Candidate script executed successfully.")
+                    with open(script_path, "w") as f:
+                        f.write(code.replace("output.stl", output_stl.replace("\\", "\\\\")))
+                    with open(output_stl, "wb") as f:
+                        f.write(result.stl)
+                    if self.cache_enabled:
+                        await asyncio.to_thread(self.cache.put, code, result.stl, cache_key)
+                    return self._stl_result(result.stl, output_stl)
+
+                # Every candidate failed: ask for a fix of the first failure
+                error_msg = errors[0] if errors else "Unknown error"
+                print(f"[CadAgent DEBUG] [ERR] All {self.candidates} candidates failed:\n{error_msg}")
+                self._emit_status({
+                    "status": "retrying",
+                    "attempt": attempt + 1,
+                    "max_attempts": max_retries,
+                    "error": error_msg.strip().split('\n')[-1][:100],
+                })
+                current_prompt = fix_prompt(error_msg)
+
+        print("[CadAgent DEBUG] [ERR] All attempts failed.")
+        self._emit_status({
+            "status": "failed",
+            "attempt": max_retries,
+            "max_attempts": max_retries,
+            "error": "All generation attempts failed"
+        })
+        return None
+
     async def generate_prototype(self, prompt: str, output_dir: Optional[str] = None):
         """
         Generates 3D geometry by asking Gemini for a script, then running it LOCALLY.
@@ -83,8 +336,27 @@ export_stl(result_part, 'output.stl')
             output_stl = os.path.join(work_dir, f"output_{timestamp}.stl")
             script_path = os.path.join(work_dir, "current_design.py")
 
+            cache_key = CadCache.prompt_key(prompt, self.model, self.system_instruction)
+            cached = await self._lookup(cache_key, script_path, output_stl)
+            if cached:
+                return cached
+
             max_retries = 3
             current_prompt = f"You are a build123d expert. Write a generic python script to create a 3D model of: {prompt}. Ensure you export to 'output.stl'. Unscaled."
+
+            def fix_prompt(error_msg):
+                return f"""
+The Python script you generated failed to execute with the following error:
+{error_msg}
+
+Please fix the code to resolve this error. Return the full corrected script. 
+Ensure you still export to 'output.stl'.
+Original request: {prompt}
+"""
+
+            if self.candidates > 1:
+                return await self._generate_candidates(current_prompt, fix_prompt, max_retries, cache_key,
+                                                       script_path, output_stl)
             
             for attempt in range(max_retries):
                 print(f"[CadAgent DEBUG] Attempt {attempt + 1}/{max_retries}")
@@ -97,49 +369,19 @@ export_stl(result_part, 'output.stl')
                         "max_attempts": max_retries,
                         "error": None
                     }
-                    self.on_status(status_info)
+                    self._emit_status(status_info)
                 
                 # 1. Ask Gemini for the code with streaming and thinking
-                raw_content = ""
-                stream = await self.client.aio.models.generate_content_stream(
-                    model=self.model,
-                    contents=current_prompt,
-                    config=types.GenerateContentConfig(
-                        system_instruction=self.system_instruction,
-                        temperature=1.0,
-                        thinking_config=types.ThinkingConfig(include_thoughts=True)
-                    )
-                )
-                async for chunk in stream:
-                    if chunk.candidates and chunk.candidates[0].content and chunk.candidates[0].content.parts:
-                        for part in chunk.candidates[0].content.parts:
-                            if not part.text:
-                                continue
-                            elif part.thought:
-                                # Stream thought to callback
-                                if self.on_thought:
-                                    self.on_thought(part.text)
-                            else:
-                                # Accumulate answer text
-                                raw_content += part.text
+                raw_content = await self._ask_model(current_prompt)
                 
                 if not raw_content:
                     print("[CadAgent DEBUG] [ERR] Empty response from model.")
                     return None
 
                 # 2. Extract Code Block
-                import re
-                code_match = re.search(r'```python(.*?)```', raw_content, re.DOTALL)
-                if code_match:
-                    code = code_match.group(1).strip()
-                else:
-                    # Fallback: assume entire text is code if no blocks, or fail
-                    print("[CadAgent DEBUG] [WARN] No ```python block found. Trying heuristic...")
-                    if "import build123d" in raw_content:
-                        code = raw_content
-                    else:
-                        print("[CadAgent DEBUG] [ERR] Could not extract python code.")
-                        return None
+                code = self._extract_code(raw_content)
+                if code is None:
+                    return None
                 
                 # 3. Save to Local File in cad_outputs folder
                 # Fix for Windows paths in python strings: escape backslashes
@@ -152,27 +394,12 @@ export_stl(result_part, 'output.stl')
                     
                 print(f"[CadAgent DEBUG] [EXEC] Running local script: {script_path}")
                 
-                # 4. Execute Locally
-                import subprocess
-                import sys
-                
-                # Use the current Python interpreter (unified environment with build123d + mediapipe)
-                try:
-                    proc = await asyncio.to_thread(
-                        subprocess.run,
-                        [sys.executable, script_path],
-                        capture_output=True,
-                        text=True
-                    )
-                    stdout, stderr = proc.stdout, proc.stderr
-                except Exception as e:
-                     print(f"[CadAgent DEBUG] [ERR] Subprocess run failed: {e}")
-                     proc = type('obj', (object,), {'returncode': 1})
-                     stdout = ""
-                     stderr = str(e)
+                # 4. Execute Locally, on a warm worker (no interpreter start or build123d import)
+                result = await self._execute(code, code_with_path, output_stl, work_dir, script_path)
+                print(f"[CadAgent DEBUG] [EXEC] Script finished in {result.elapsed:.2f}s")
                 
-                if proc.returncode != 0:
-                    error_msg = stderr
+                if not result.ok:
+                    error_msg = result.error
                     # Extract a concise error message for display
                     error_lines = error_msg.strip().split('\n')
                     short_error = error_lines[-1][:100] if error_lines else "Unknown error"
@@ -180,7 +407,7 @@ export_stl(result_part, 'output.stl')
                     
                     # Emit retry status with error
                     if self.on_status:
-                        self.on_status({
+                        self._emit_status({
                             "status": "retrying",
                             "attempt": attempt + 1,
                             "max_attempts": max_retries,
@@ -188,32 +415,19 @@ export_stl(result_part, 'output.stl')
                         })
                     
                     # Preparing feedback for next attempt
-                    current_prompt = f"""
-The Python script you generated failed to execute with the following error:
-{error_msg}
-
-Please fix the code to resolve this error. Return the full corrected script. 
-Ensure you still export to 'output.stl'.
-Original request: {prompt}
-"""
+                    current_prompt = fix_prompt(error_msg)
                     continue # Retry loop
                 
                 print(f"[CadAgent DEBUG] [OK] Script executed successfully.")
                 
                 # 5. Read Output
-                if os.path.exists(output_stl):
+                if result.stl is not None:
                     print(f"[CadAgent DEBUG] [file] '{output_stl}' found.")
-                    with open(output_stl, "rb") as f:
-                        stl_data = f.read()
-                        
-                    import base64
-                    b64_stl = base64.b64encode(stl_data).decode('utf-8')
-                    
-                    return {
-                        "format": "stl",
-                        "data": b64_stl,
-                        "file_path": output_stl
-                    }
+                    stl_data = result.stl
+                    if self.cache_enabled:
+                        await asyncio.to_thread(self.cache.put, code, stl_data, cache_key)
+
+                    return self._stl_result(stl_data, output_stl)
                 else:
                      print(f"[CadAgent DEBUG] [ERR] '{output_stl}' was not generated.")
                      # If script ran but no output, treat as failure and retry?
@@ -224,7 +438,7 @@ Original request: {prompt}
             # If loop finishes without success
             print("[CadAgent DEBUG] [ERR] All attempts failed.")
             if self.on_status:
-                self.on_status({
+                self._emit_status({
                     "status": "failed",
                     "attempt": max_retries,
                     "max_attempts": max_retries,
@@ -286,6 +500,10 @@ Original request: {prompt}
              return await self.generate_prototype(prompt)
 
         try:
+            cache_key = CadCache.prompt_key(prompt, self.model, self.system_instruction, context=existing_code)
+            cached = await self._lookup(cache_key, script_path, output_stl)
+            if cached:
+                return cached
 
             max_retries = 3
             current_prompt = f"""
@@ -301,6 +519,19 @@ User Request: {prompt}
 Task: Rewrite the code to satisfy the user's request while maintaining the rest of the model structure.
 Ensure you still export to 'output.stl'.
 """
+
+            def fix_prompt(error_msg):
+                return f"""
+The updated Python script you generated failed to execute with the following error:
+{error_msg}
+
+Please fix the code to resolve this error. Return the full corrected script. 
+Ensure you still export to 'output.stl'.
+"""
+
+            if self.candidates > 1:
+                return await self._generate_candidates(current_prompt, fix_prompt, max_retries, cache_key,
+                                                       script_path, output_stl)
             
             for attempt in range(max_retries):
                 print(f"[CadAgent DEBUG] Iteration Attempt {attempt + 1}/{max_retries}")
@@ -313,49 +544,19 @@ Ensure you still export to 'output.stl'.
                         "max_attempts": max_retries,
                         "error": None
                     }
-                    self.on_status(status_info)
+                    self._emit_status(status_info)
                 
                 # 1. Ask Gemini for the code with streaming and thinking
-                raw_content = ""
-                stream = await self.client.aio.models.generate_content_stream(
-                    model=self.model,
-                    contents=current_prompt,
-                    config=types.GenerateContentConfig(
-                        system_instruction=self.system_instruction,
-                        temperature=1.0,
-                        thinking_config=types.ThinkingConfig(include_thoughts=True)
-                    )
-                )
-                async for chunk in stream:
-                    if chunk.candidates and chunk.candidates[0].content and chunk.candidates[0].content.parts:
-                        for part in chunk.candidates[0].content.parts:
-                            if not part.text:
-                                continue
-                            elif part.thought:
-                                # Stream thought to callback
-                                if self.on_thought:
-                                    self.on_thought(part.text)
-                            else:
-                                # Accumulate answer text
-                                raw_content += part.text
+                raw_content = await self._ask_model(current_prompt)
                 
                 if not raw_content:
                     print("[CadAgent DEBUG] [ERR] Empty response from model.")
                     return None
 
                 # 2. Extract Code Block
-                import re
-                code_match = re.search(r'```python(.*?)```', raw_content, re.DOTALL)
-                if code_match:
-                    code = code_match.group(1).strip()
-                else:
-                    # Fallback: assume entire text is code if no blocks, or fail
-                    print("[CadAgent DEBUG] [WARN] No ```python block found. Trying heuristic...")
-                    if "import build123d" in raw_content:
-                        code = raw_content
-                    else:
-                        print("[CadAgent DEBUG] [ERR] Could not extract python code.")
-                        return None
+                code = self._extract_code(raw_content)
+                if code is None:
+                    return None
                 
                 # 3. Save to Local File in cad_outputs folder
                 # Overwrite the script so the next iteration builds on this one
@@ -370,56 +571,28 @@ Ensure you still export to 'output.stl'.
                     
                 print(f"[CadAgent DEBUG] [EXEC] Running local script: {script_path}")
                 
-                # 4. Execute Locally
-                import subprocess
-                import sys
+                # 4. Execute Locally, on a warm worker (no interpreter start or build123d import)
+                result = await self._execute(code, code_with_path, output_stl, work_dir, script_path)
+                print(f"[CadAgent DEBUG] [EXEC] Script finished in {result.elapsed:.2f}s")
                 
-                # Use asyncio.to_thread for Windows compatibility (asyncio.create_subprocess_exec
-                # throws NotImplementedError on Windows with certain event loop policies)
-                try:
-                    proc = await asyncio.to_thread(
-                        subprocess.run,
-                        [sys.executable, script_path],
-                        capture_output=True,
-                        text=True
-                    )
-                    stdout, stderr = proc.stdout, proc.stderr
-                except Exception as e:
-                    print(f"[CadAgent DEBUG] [ERR] Subprocess run failed: {e}")
-                    proc = type('obj', (object,), {'returncode': 1})()
-                    stdout = ""
-                    stderr = str(e)
-                
-                if proc.returncode != 0:
-                    error_msg = stderr
+                if not result.ok:
+                    error_msg = result.error
                     print(f"[CadAgent DEBUG] [ERR] Script Execution Failed:\n{error_msg}")
                     
                     # Preparing feedback for next attempt
-                    current_prompt = f"""
-The updated Python script you generated failed to execute with the following error:
-{error_msg}
-
-Please fix the code to resolve this error. Return the full corrected script. 
-Ensure you still export to 'output.stl'.
-"""
+                    current_prompt = fix_prompt(error_msg)
                     continue # Retry loop
                 
                 print(f"[CadAgent DEBUG] [OK] Script executed successfully.")
                 
                 # 5. Read Output
-                if os.path.exists(output_stl):
+                if result.stl is not None:
                     print(f"[CadAgent DEBUG] [file] '{output_stl}' found.")
-                    with open(output_stl, "rb") as f:
-                        stl_data = f.read()
-                        
-                    import base64
-                    b64_stl = base64.b64encode(stl_data).decode('utf-8')
-                    
-                    return {
-                        "format": "stl",
-                        "data": b64_stl,
-                        "file_path": output_stl
-                    }
+                    stl_data = result.stl
+                    if self.cache_enabled:
+                        await asyncio.to_thread(self.cache.put, code, stl_data, cache_key)
+
+                    return self._stl_result(stl_data, output_stl)
                 else:
                      print(f"[CadAgent DEBUG] [ERR] '{output_stl}' was not generated.")
                      current_prompt = f"The script executed successfully but '{output_stl}' was not found. Ensure you call `export_stl(result_part, 'output.stl')` at the end."
@@ -428,7 +601,7 @@ Ensure you still export to 'output.stl'.
             # If loop finishes without success
             print("[CadAgent DEBUG] [ERR] All attempts failed.")
             if self.on_status:
-                self.on_status({
+                self._emit_status({
                     "status": "failed",
                     "attempt": max_retries,
                     "max_attempts": max_retries,
@@ -0,0 +1,189 @@
+"""
+CadCache - Content-addressed cache of generated CAD scripts and their STLs.
+
+An identical or repeated CAD request always went back to the model and
+re-executed the script, even when the same design had already been built
+in this or another project. The cache has two levels:
+
+- prompt level: sha256 of (model, system instruction hash, normalized prompt
+  and, for iterations, the script being changed) -> the script that worked
+- script level: sha256 of the script source -> the STL it produced, so the
+  same code is never re-tessellated, whichever prompt produced it
+
+STLs are stored once per content hash under `blobs/`; metadata lives in a
+small SQLite database. The store is shared by all projects and bounded by
+`max_bytes`, evicting least recently used scripts (and blobs no longer
+referenced) first.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    script_hash TEXT PRIMARY KEY,
+    script TEXT NOT NULL,
+    stl_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scripts_lru ON scripts (last_used);
+CREATE TABLE IF NOT EXISTS prompts (
+    key TEXT PRIMARY KEY,
+    script_hash TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+def sha256(text) -> str:
+    if isinstance(text, str):
+        text = text.encode("utf-8")
+    return hashlib.sha256(text).hexdigest()
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, whitespace and trailing punctuation do not make a different request."""
+    return " ".join(prompt.lower().split()).rstrip(".!?")
+
+
+def normalize_script(script: str) -> str:
+    return "\n".join(line.rstrip() for line in script.strip().splitlines())
+
+
+class CadCache:
+    """Two-level CAD result cache; thread-safe, called through asyncio.to_thread."""
+
+    def __init__(self, root, max_bytes: int = 256 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        # Metrics
+        self.prompt_hits = 0
+        self.prompt_misses = 0
+        self.script_hits = 0
+        self.script_misses = 0
+        self.evictions = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            (self.root / "blobs").mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.root / "cache.sqlite", check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _blob_path(self, stl_hash: str) -> Path:
+        return self.root / "blobs" / f"{stl_hash}.stl"
+
+    def _read_blob(self, stl_hash: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(stl_hash), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def prompt_key(prompt: str, model: str, system_instruction: str, context: str = "") -> str:
+        """Cache key of a request; `context` is the existing script for iterations."""
+        parts = [model, sha256(system_instruction), normalize_prompt(prompt), sha256(normalize_script(context))]
+        return sha256("\0".join(parts))
+
+    def lookup(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """(script, STL) of an earlier request with the same key, or None."""
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT s.script_hash, s.script, s.stl_hash FROM prompts p "
+                "JOIN scripts s ON s.script_hash = p.script_hash WHERE p.key = ?", (key,)).fetchone()
+            stl = self._read_blob(row[2]) if row else None
+            if stl is None:
+                self.prompt_misses += 1
+                return None
+            self.prompt_hits += 1
+            now = time.time()
+            with db:
+                db.execute("UPDATE prompts SET last_used = ? WHERE key = ?", (now, key))
+                db.execute("UPDATE scripts SET last_used = ? WHERE script_hash = ?", (now, row[0]))
+            return row[1], stl
+
+    def get_stl(self, script: str) -> Optional[bytes]:
+        """The STL an identical script produced before, or None."""
+        script_hash = sha256(normalize_script(script))
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT stl_hash FROM scripts WHERE script_hash = ?", (script_hash,)).fetchone()
+            stl = self._read_blob(row[0]) if row else None
+            if stl is None:
+                self.script_misses += 1
+                return None
+            self.script_hits += 1
+            with db:
+                db.execute("UPDATE scripts SET last_used = ? WHERE script_hash = ?", (time.time(), script_hash))
+            return stl
+
+    def put(self, script: str, stl: bytes, key: Optional[str] = None):
+        """Stores a script's STL and, with a request key, maps the request to the script."""
+        if len(stl) > self.max_bytes:
+            return
+        script_hash = sha256(normalize_script(script))
+        stl_hash = sha256(stl)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            blob = self._blob_path(stl_hash)
+            if not blob.exists():
+                tmp = blob.with_name(blob.name + ".tmp")
+                with open(tmp, "wb") as f:
+                    f.write(stl)
+                os.replace(tmp, blob)
+            with db:
+                db.execute("INSERT OR REPLACE INTO scripts (script_hash, script, stl_hash, size, last_used) "
+                           "VALUES (?, ?, ?, ?, ?)", (script_hash, script, stl_hash, len(stl), now))
+                if key:
+                    db.execute("INSERT OR REPLACE INTO prompts (key, script_hash, last_used) VALUES (?, ?, ?)",
+                               (key, script_hash, now))
+            self._evict(db)
+
+    def _total_bytes(self, db) -> int:
+        return db.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT stl_hash, size FROM scripts)").fetchone()[0]
+
+    def _evict(self, db):
+        total = self._total_bytes(db)
+        if total <= self.max_bytes:
+            return
+        with db:
+            for script_hash, stl_hash in db.execute(
+                    "SELECT script_hash, stl_hash FROM scripts ORDER BY last_used").fetchall():
+                db.execute("DELETE FROM scripts WHERE script_hash = ?", (script_hash,))
+                db.execute("DELETE FROM prompts WHERE script_hash = ?", (script_hash,))
+                self.evictions += 1
+                if not db.execute("SELECT 1 FROM scripts WHERE stl_hash = ? LIMIT 1", (stl_hash,)).fetchone():
+                    try:
+                        self._blob_path(stl_hash).unlink()
+                    except OSError:
+                        pass
+                total = self._total_bytes(db)
+                if total <= self.max_bytes:
+                    break
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> dict:
+        return {
+            "prompt_hits": self.prompt_hits,
+            "prompt_misses": self.prompt_misses,
+            "script_hits": self.script_hits,
+            "script_misses": self.script_misses,
+            "evictions": self.evictions,
+        }
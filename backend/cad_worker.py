@@ -0,0 +1,330 @@
+"""
+CadWorkerPool - Pre-warmed worker processes for running generated CAD scripts.
+
+Workers are plain subprocesses that have already imported build123d. Each
+receives script source on stdin, runs it in a fresh namespace and answers
+with the STL bytes or the traceback on stdout:
+
+- timeout: a run longer than `timeout` seconds kills the worker
+- memory limit: RLIMIT_AS of `memory_limit_mb` (POSIX only)
+- isolation: a worker is replaced after `max_tasks` runs, a crash, a
+  timeout or a cancelled run
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from typing import List, NamedTuple, Optional
+
+DEFAULT_PRELOAD = ("build123d", "numpy")
+WORKER_SCRIPT = os.path.abspath(__file__)
+# How long a new worker may take to import the preloaded modules
+READY_TIMEOUT = 120.0
+
+_HEADER = struct.Struct("!I")
+
+
+def _send(stream, obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(_HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def _read_exact(stream, n: int) -> bytes:
+    chunks = []
+    while n:
+        chunk = stream.read(n)
+        if not chunk:
+            raise EOFError("worker pipe closed")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(stream):
+    (size,) = _HEADER.unpack(_read_exact(stream, _HEADER.size))
+    return pickle.loads(_read_exact(stream, size))
+
+
+class ScriptResult(NamedTuple):
+    ok: bool
+    stl: Optional[bytes]  # contents of output_path, if the script wrote it
+    error: Optional[str]  # traceback (or worker failure) if not ok
+    stdout: str
+    elapsed: float  # seconds spent executing the script
+
+
+# ---- worker process ----
+
+def _limit_memory(memory_limit_mb: int):
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return  # not available on Windows
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        print(f"[CadWorker] [WARN] Could not set memory limit: {e}", file=sys.stderr)
+
+
+def _run_script(request: dict) -> dict:
+    source = request["source"]
+    output_path = request.get("output_path")
+    filename = request.get("filename") or "<cad_script>"
+    namespace = {"__name__": "__main__", "__file__": filename}
+    out = io.StringIO()
+    previous_cwd = os.getcwd()
+    error = None
+    start = time.perf_counter()
+    try:
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        code = compile(source, filename, "exec")
+        with contextlib.redirect_stdout(out):
+            exec(code, namespace)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            error = f"SystemExit: {e.code}"
+    except BaseException as e:
+        # Drop this frame so the traceback starts in the script, like a subprocess run
+        error = "".join(traceback.format_exception(type(e), e, e.__traceback__.tb_next))
+    finally:
+        os.chdir(previous_cwd)
+    elapsed = time.perf_counter() - start
+
+    stl = None
+    if error is None and output_path and os.path.exists(output_path):
+        with open(output_path, "rb") as f:
+            stl = f.read()
+    return {"ok": error is None, "stl": stl, "error": error, "stdout": out.getvalue()[-10000:], "elapsed": elapsed}
+
+
+def worker_main(argv=None):
+    parser = argparse.ArgumentParser(description="CAD script worker (started by CadWorkerPool)")
+    parser.add_argument("--preload", default="")
+    parser.add_argument("--memory-mb", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Keep the real stdout for the protocol; anything printed (Python or OCCT) goes to stderr
+    proto_out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    proto_in = sys.stdin.buffer
+
+    _limit_memory(args.memory_mb)
+    errors = {}
+    for name in filter(None, args.preload.split(",")):
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            errors[name] = repr(e)
+    _send(proto_out, {"ready": True, "pid": os.getpid(), "errors": errors})
+
+    while True:
+        try:
+            request = _recv(proto_in)
+        except EOFError:
+            break
+        _send(proto_out, _run_script(request))
+
+
+# ---- pool ----
+
+class _Worker:
+    def __init__(self, preload, memory_limit_mb: int):
+        cmd = [sys.executable, WORKER_SCRIPT, "--preload", ",".join(preload), "--memory-mb", str(memory_limit_mb)]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.started_at = time.monotonic()
+        self.ready: Optional[dict] = None
+        self.tasks = 0
+        self.broken = False
+        self.timed_out = False
+        self.cancelled = False
+
+    def wait_ready(self, timeout: float) -> dict:
+        if self.ready is None:
+            timer = threading.Timer(timeout, self.kill)
+            timer.start()
+            try:
+                self.ready = _recv(self.proc.stdout)
+            finally:
+                timer.cancel()
+            for name, error in self.ready["errors"].items():
+                print(f"[CadWorker] [WARN] Could not preload {name}: {error}")
+        return self.ready
+
+    def _expire(self):
+        self.timed_out = True
+        self.kill()
+
+    def call(self, request: dict, timeout: float) -> dict:
+        self.tasks += 1
+        timer = threading.Timer(timeout, self._expire)
+        timer.start()
+        try:
+            _send(self.proc.stdin, request)
+            return _recv(self.proc.stdout)
+        finally:
+            timer.cancel()
+
+    def kill(self):
+        self.broken = True
+        with contextlib.suppress(Exception):
+            self.proc.kill()
+
+    def close(self):
+        with contextlib.suppress(Exception):
+            self.proc.stdin.close()  # worker exits on EOF
+        try:
+            self.proc.wait(timeout=2)
+        except Exception:
+            self.kill()
+
+
+class CadWorkerPool:
+    """Runs CAD scripts on warm worker processes, at most `size` at a time."""
+
+    def __init__(self, size: int = 2, preload=DEFAULT_PRELOAD, timeout: float = 120.0,
+                 memory_limit_mb: int = 0, max_tasks: int = 25):
+        self.size = max(1, size)
+        self.preload = tuple(preload)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks = max_tasks
+        self._idle: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+        self._closed = False
+
+        # Metrics
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.spawned = 0
+        self.wait_time = 0.0  # seconds spent waiting for a warm worker
+
+    def _spawn(self) -> _Worker:
+        self.spawned += 1
+        return _Worker(self.preload, self.memory_limit_mb)
+
+    def start(self):
+        """Starts the idle workers now, so the imports happen before the first script."""
+        with self._lock:
+            while not self._closed and len(self._idle) < self.size:
+                self._idle.append(self._spawn())
+
+    def resize(self, size: int):
+        """Changes how many scripts may run at once, for runs started from now on."""
+        with self._lock:
+            self.size = max(1, size)
+            self._slots = None  # recreated with the new size on the next run
+            excess, self._idle = self._idle[self.size:], self._idle[:self.size]
+        for worker in excess:
+            worker.close()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.size)
+            self._slots_loop = loop
+        return self._slots
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if not worker.broken and worker.proc.poll() is None:
+                    return worker
+            return self._spawn()
+
+    def _release(self, worker: _Worker):
+        retire = worker.broken or worker.proc.poll() is not None or worker.tasks >= self.max_tasks
+        with self._lock:
+            if retire or self._closed:
+                threading.Thread(target=worker.close, daemon=True).start()
+                if not self._closed:
+                    self._idle.append(self._spawn())  # warm the replacement right away
+            else:
+                self._idle.append(worker)
+
+    def _execute(self, worker: _Worker, request: dict, timeout: float) -> ScriptResult:
+        start = time.monotonic()
+        try:
+            worker.wait_ready(READY_TIMEOUT)
+            self.wait_time += time.monotonic() - start
+            return ScriptResult(**worker.call(request, timeout))
+        except (EOFError, OSError, pickle.UnpicklingError) as e:
+            worker.broken = True
+            if worker.cancelled:
+                error = "CancelledError: run was cancelled"
+            elif worker.timed_out:
+                self.timeouts += 1
+                error = f"TimeoutError: script did not finish within {timeout:.0f} seconds"
+            else:
+                self.crashes += 1
+                with contextlib.suppress(subprocess.TimeoutExpired):
+                    worker.proc.wait(timeout=1)  # the pipe closes just before the exit code is available
+                error = f"WorkerError: CAD worker exited unexpectedly (exit code {worker.proc.poll()}): {e}"
+            return ScriptResult(False, None, error, "", time.monotonic() - start)
+
+    async def run(self, source: str, output_path: Optional[str] = None, cwd: Optional[str] = None,
+                  filename: Optional[str] = None, timeout: Optional[float] = None) -> ScriptResult:
+        """
+        Executes script source on a warm worker. `output_path` is read back as the STL;
+        `filename` (e.g. the saved script) is used for tracebacks.
+        Cancelling the call kills the worker running it.
+        """
+        if self._closed:
+            raise RuntimeError("CadWorkerPool is closed")
+        request = {"source": source, "output_path": output_path, "cwd": cwd, "filename": filename}
+        async with self._semaphore():
+            worker = self._acquire()
+            try:
+                result = await asyncio.to_thread(self._execute, worker, request, timeout or self.timeout)
+            except asyncio.CancelledError:
+                worker.cancelled = True
+                worker.kill()
+                raise
+            finally:
+                self._release(worker)
+        self.runs += 1
+        if not result.ok:
+            self.failures += 1
+        return result
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "spawned": self.spawned,
+            "avg_wait_ms": round(self.wait_time / self.runs * 1000, 1) if self.runs else 0,
+        }
+
+
+if __name__ == "__main__":
+    worker_main()
@@ -0,0 +1,499 @@
+"""
+ChatLogWriter - Buffered, batched JSONL appends on a background thread.
+
+`write` queues the serialized line and returns. A daemon thread writes the
+queue out every `flush_interval` seconds, or as soon as `max_pending` lines
+are waiting, grouping lines per file into one open/write.
+
+fsync policy:
+
+- "never": leave durability to the OS page cache (default)
+- "batch": fsync each file once per flushed batch
+- "always": fsync after every line (slowest)
+
+`flush()` blocks until everything queued so far is on disk (used before the
+log is read back), and `close()` flushes and stops the thread. After close,
+writes fall back to synchronous appends so late messages are never lost.
+
+Reading: `read_tail` returns the last N entries by reading backwards from the
+end of the file, and ChatLogIndex keeps a sparse sidecar index for reading
+from a timestamp onwards.
+
+Segments: ChatLogStore treats `chat_history.jsonl` as the active segment of a
+segmented log. The compaction pass (`compact`, run offline) rotates an active
+file past `segment_bytes` into `chat_segments/`, merges consecutive
+same-sender entries and gzips it; `chat_segments/index.json` holds a small
+header per segment (time range, entry count, sizes) so readers only open the
+segments they need.
+"""
+
+import bisect
+import gzip
+import json
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+FSYNC_POLICIES = ("never", "batch", "always")
+
+
+class ChatLogWriter:
+    """Background JSONL appender with size/time-triggered flushes."""
+
+    def __init__(self, flush_interval: float = 0.5, max_pending: int = 64, fsync: str = "never"):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.fsync = fsync
+
+        self._pending: List[Tuple[str, str]] = []
+        self._cond = threading.Condition()
+        # Sequence numbers: lines queued so far vs. lines on disk
+        self._queued = 0
+        self._written = 0
+        self._closed = False
+        self._flush_requested = False
+        # Monotonic time the oldest pending line was queued
+        self._oldest = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self.lines = 0
+        self.batches = 0
+        self.errors = 0
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ChatLogWriter", daemon=True)
+            self._thread.start()
+
+    def write(self, path, entry: dict):
+        """Queues one JSON entry for `path`. Never blocks on disk I/O (until closed)."""
+        line = json.dumps(entry) + "\n"
+        with self._cond:
+            if not self._closed:
+                if not self._pending:
+                    self._oldest = time.monotonic()
+                self._pending.append((str(path), line))
+                self._queued += 1
+                self._ensure_thread()
+                if len(self._pending) >= self.max_pending:
+                    self._cond.notify_all()
+                return
+        self._write_batch([(str(path), line)])
+
+    def _write_batch(self, batch: List[Tuple[str, str]]):
+        by_path: Dict[str, List[str]] = {}
+        for path, line in batch:
+            by_path.setdefault(path, []).append(line)
+        for path, lines in by_path.items():
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    if self.fsync == "always":
+                        for line in lines:
+                            f.write(line)
+                            f.flush()
+                            os.fsync(f.fileno())
+                    else:
+                        f.write("".join(lines))
+                        if self.fsync == "batch":
+                            f.flush()
+                            os.fsync(f.fileno())
+                self.lines += len(lines)
+            except Exception as e:
+                self.errors += 1
+                print(f"[ProjectManager] [ERR] Failed to write chat log {path}: {e}")
+        self.batches += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Let the batch grow until the interval, size, flush or close trigger
+                while not (self._closed or self._flush_requested or len(self._pending) >= self.max_pending):
+                    if not self._pending:
+                        self._cond.wait()
+                        continue
+                    remaining = self._oldest + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._flush_requested = False
+                batch, self._pending = self._pending, []
+                target = self._queued
+                closed = self._closed
+            if batch:
+                self._write_batch(batch)
+            with self._cond:
+                self._written = max(self._written, target)
+                self._cond.notify_all()
+                if closed and not self._pending:
+                    return
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Blocks until every line queued before this call is written."""
+        with self._cond:
+            if self._thread is None:
+                return True
+            target = self._queued
+            if self._written >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def get_stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "lines": self.lines,
+            "batches": self.batches,
+            "errors": self.errors,
+            "fsync": self.fsync,
+        }
+
+
+def _parse_lines(lines: List[bytes]) -> List[dict]:
+    entries = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+    return entries
+
+
+def read_tail(path, limit: int, block_size: int = 64 * 1024) -> List[dict]:
+    """
+    Returns the last `limit` entries of a JSONL log, reading backwards from the
+    end in blocks so the cost depends on `limit`, not on the file size.
+    Malformed lines are skipped.
+    """
+    if limit <= 0:
+        return []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    with f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        entries: List[dict] = []
+        carry = b""
+        while pos > 0 and len(entries) < limit:
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            chunk = f.read(size) + carry
+            lines = chunk.split(b"\n")
+            # The first piece may be the tail of a line that starts in an earlier block
+            carry = lines.pop(0) if pos > 0 else b""
+            entries = _parse_lines(lines) + entries
+        if carry and len(entries) < limit:
+            entries = _parse_lines([carry]) + entries
+    return entries[-limit:]
+
+
+class ChatLogIndex:
+    """
+    Sparse sidecar index (`<log>.idx`) of (timestamp, byte offset) pairs, one per
+    `stride` lines, for reading a log from a point in time without a full scan.
+
+    The index covers the log up to a recorded size and is extended incrementally
+    from there on each lookup; a log that shrank (rotated/truncated) is re-indexed.
+    Timestamps are assumed non-decreasing, as appended by ProjectManager.log_chat.
+    """
+
+    HEADER = struct.Struct("<QQ")  # covered bytes, lines since last index point
+    RECORD = struct.Struct("<dQ")  # timestamp, offset
+
+    def __init__(self, log_path, stride: int = 256):
+        self.log_path = Path(log_path)
+        self.index_path = self.log_path.with_name(self.log_path.name + ".idx")
+        self.stride = stride
+        self._covered = 0
+        self._since_point = 0
+        self._points: List[Tuple[float, int]] = []
+        self._loaded = False
+
+    def _load(self):
+        self._loaded = True
+        try:
+            data = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return
+        if len(data) < self.HEADER.size or (len(data) - self.HEADER.size) % self.RECORD.size:
+            return  # corrupt; rebuilt on refresh
+        self._covered, self._since_point = self.HEADER.unpack_from(data)
+        self._points = [self.RECORD.unpack_from(data, off)
+                        for off in range(self.HEADER.size, len(data), self.RECORD.size)]
+
+    def _save(self):
+        body = b"".join(self.RECORD.pack(ts, off) for ts, off in self._points)
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_bytes(self.HEADER.pack(self._covered, self._since_point) + body)
+        os.replace(tmp, self.index_path)
+
+    def refresh(self) -> int:
+        """Indexes lines appended since the last refresh. Returns the number of index points."""
+        if not self._loaded:
+            self._load()
+        try:
+            size = self.log_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+        if size < self._covered:
+            self._covered, self._since_point, self._points = 0, 0, []
+        if size == self._covered:
+            return len(self._points)
+
+        with open(self.log_path, "rb") as f:
+            f.seek(self._covered)
+            offset = self._covered
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial line still being written
+                if self._since_point == 0:
+                    try:
+                        timestamp = float(json.loads(line).get("timestamp", 0))
+                    except (json.JSONDecodeError, UnicodeDecodeError, AttributeError, TypeError, ValueError):
+                        timestamp = None
+                    if timestamp is not None:
+                        self._points.append((timestamp, offset))
+                        self._since_point = self.stride
+                if self._since_point:
+                    self._since_point -= 1
+                offset += len(line)
+            self._covered = offset
+        self._save()
+        return len(self._points)
+
+    def offset_before(self, timestamp: float) -> int:
+        """Byte offset of the last index point strictly before `timestamp` (0 if none)."""
+        self.refresh()
+        i = bisect.bisect_left(self._points, (timestamp, -1)) - 1
+        return self._points[i][1] if i >= 0 else 0
+
+    def read_since(self, timestamp: float, limit: Optional[int] = None) -> List[dict]:
+        """Entries with `timestamp >= timestamp`, oldest first, up to `limit`."""
+        offset = self.offset_before(timestamp)
+        entries: List[dict] = []
+        try:
+            f = open(self.log_path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            f.seek(offset)
+            for line in f:
+                parsed = _parse_lines([line])
+                if not parsed or parsed[0].get("timestamp", 0) < timestamp:
+                    continue
+                entries.append(parsed[0])
+                if limit is not None and len(entries) >= limit:
+                    break
+        return entries
+
+
+CHAT_LOG_NAME = "chat_history.jsonl"
+SEGMENT_DIR = "chat_segments"
+SEGMENT_INDEX = "index.json"
+
+
+def merge_entries(entries: List[dict], merge_gap: float = 60.0) -> List[dict]:
+    """
+    Merges runs of consecutive entries from the same sender (e.g. one spoken
+    reply logged over several turn completions) into one entry. Entries further
+    apart than `merge_gap` seconds stay separate. A merged entry keeps the first
+    timestamp and records the last one as `timestamp_end`.
+    """
+    merged: List[dict] = []
+    for entry in entries:
+        prev = merged[-1] if merged else None
+        if (prev is not None and prev.get("sender") == entry.get("sender")
+                and entry.get("timestamp", 0) - prev.get("timestamp_end", prev.get("timestamp", 0)) <= merge_gap):
+            prev["text"] = f"{prev.get('text', '').rstrip()} {entry.get('text', '').lstrip()}"
+            prev["timestamp_end"] = entry.get("timestamp", 0)
+        else:
+            merged.append(dict(entry))
+    return merged
+
+
+class ChatLogStore:
+    """
+    A project's chat history as compacted segments plus the active log.
+
+    Layout in the project directory:
+
+        chat_history.jsonl            active segment, appended by ChatLogWriter
+        chat_segments/index.json      segment headers, oldest first
+        chat_segments/000001.jsonl.gz compacted (merged + gzipped) segments
+
+    Readers are transparent over the layout: `read_recent` and `read_since`
+    return the same entries whether or not the log has been compacted (apart
+    from merged runs). `compact` must not run while the active log is being
+    written; ProjectManager only compacts projects that are not current.
+    """
+
+    def __init__(self, project_dir, segment_bytes: int = 1024 * 1024, merge_gap: float = 60.0):
+        self.project_dir = Path(project_dir)
+        self.log_path = self.project_dir / CHAT_LOG_NAME
+        self.segment_dir = self.project_dir / SEGMENT_DIR
+        self.index_path = self.segment_dir / SEGMENT_INDEX
+        self.segment_bytes = segment_bytes
+        self.merge_gap = merge_gap
+
+    def segments(self) -> List[dict]:
+        """Segment headers, oldest first."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("segments", [])
+        except FileNotFoundError:
+            return []
+        except (json.JSONDecodeError, AttributeError):
+            print(f"[ProjectManager] [ERR] Corrupt chat segment index {self.index_path}, rebuilding")
+            return self._rebuild_index()
+
+    def _save_index(self, segments: List[dict]):
+        self.segment_dir.mkdir(exist_ok=True)
+        tmp = self.index_path.with_name(SEGMENT_INDEX + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "segments": segments}, f)
+        os.replace(tmp, self.index_path)
+
+    def _rebuild_index(self) -> List[dict]:
+        segments = []
+        for path in sorted(self.segment_dir.glob("*.jsonl*")):
+            segments.append(self._header(path.name, self._load(path.name), path.stat().st_size))
+        self._save_index(segments)
+        return segments
+
+    @staticmethod
+    def _header(name: str, entries: List[dict], size: int, raw_bytes: Optional[int] = None) -> dict:
+        return {
+            "name": name,
+            "first_ts": entries[0].get("timestamp", 0) if entries else 0,
+            "last_ts": max((e.get("timestamp_end", e.get("timestamp", 0)) for e in entries), default=0),
+            "entries": len(entries),
+            "bytes": size,
+            "raw_bytes": raw_bytes if raw_bytes is not None else size,
+            "compressed": name.endswith(".gz"),
+        }
+
+    def _load(self, name: str) -> List[dict]:
+        path = self.segment_dir / name
+        opener = gzip.open if name.endswith(".gz") else open
+        try:
+            with opener(path, "rb") as f:
+                return _parse_lines(f.read().split(b"\n"))
+        except FileNotFoundError:
+            return []
+
+    def rotate(self, force: bool = False) -> Optional[str]:
+        """Moves the active log into a new (uncompressed) segment once it reaches `segment_bytes`."""
+        try:
+            size = self.log_path.stat().st_size
+        except FileNotFoundError:
+            return None
+        if size == 0 or (size < self.segment_bytes and not force):
+            return None
+        segments = self.segments()
+        number = int(segments[-1]["name"].split(".")[0]) + 1 if segments else 1
+        name = f"{number:06d}.jsonl"
+        self.segment_dir.mkdir(exist_ok=True)
+        os.replace(self.log_path, self.segment_dir / name)
+        # The sidecar index describes the old file; a new active log starts from scratch
+        ChatLogIndex(self.log_path).index_path.unlink(missing_ok=True)
+        segments.append(self._header(name, self._load(name), size))
+        self._save_index(segments)
+        return name
+
+    def compact(self, force_rotate: bool = False) -> dict:
+        """Rotates the active log if due, then merges and gzips every uncompressed segment."""
+        rotated = self.rotate(force=force_rotate)
+        segments = self.segments()
+        compacted = 0
+        for i, header in enumerate(segments):
+            if header["compressed"]:
+                continue
+            entries = merge_entries(self._load(header["name"]), self.merge_gap)
+            data = "".join(json.dumps(e) + "\n" for e in entries).encode("utf-8")
+            name = header["name"] + ".gz"
+            tmp = self.segment_dir / (name + ".tmp")
+            with gzip.open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.segment_dir / name)
+            segments[i] = self._header(name, entries, (self.segment_dir / name).stat().st_size, header["raw_bytes"])
+            self._save_index(segments)
+            (self.segment_dir / header["name"]).unlink(missing_ok=True)
+            compacted += 1
+        return {"rotated": rotated, "compacted": compacted, "segments": len(segments)}
+
+    def read_recent(self, limit: int) -> List[dict]:
+        """The last `limit` entries, from the active log first and then older segments."""
+        entries = read_tail(self.log_path, limit)
+        if len(entries) < limit:
+            for header in reversed(self.segments()):
+                entries = self._load(header["name"]) + entries
+                if len(entries) >= limit:
+                    break
+        return entries[-limit:] if limit > 0 else []
+
+    def read_since(self, timestamp: float, limit: Optional[int] = None) -> List[dict]:
+        """Entries (or merged runs) ending at or after `timestamp`, oldest first, up to `limit`."""
+        entries: List[dict] = []
+        for header in self.segments():
+            if header["last_ts"] < timestamp:
+                continue
+            for entry in self._load(header["name"]):
+                if entry.get("timestamp_end", entry.get("timestamp", 0)) >= timestamp:
+                    entries.append(entry)
+                    if limit is not None and len(entries) >= limit:
+                        return entries
+        remaining = None if limit is None else limit - len(entries)
+        return entries + ChatLogIndex(self.log_path).read_since(timestamp, remaining)
+
+    def get_stats(self) -> dict:
+        segments = self.segments()
+        try:
+            active = self.log_path.stat().st_size
+        except FileNotFoundError:
+            active = 0
+        return {
+            "active_bytes": active,
+            "segments": len(segments),
+            "segment_bytes": sum(s["bytes"] for s in segments),
+            "segment_raw_bytes": sum(s["raw_bytes"] for s in segments),
+            "entries": sum(s["entries"] for s in segments),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact chat history logs (run while the backend is stopped)")
+    parser.add_argument("projects_dir", help="Directory containing the project folders")
+    parser.add_argument("--force", action="store_true", help="Rotate active logs regardless of size")
+    parser.add_argument("--segment-bytes", type=int, default=1024 * 1024)
+    args = parser.parse_args()
+    for project in sorted(Path(args.projects_dir).iterdir()):
+        if project.is_dir():
+            result = ChatLogStore(project, segment_bytes=args.segment_bytes).compact(force_rotate=args.force)
+            print(f"{project.name}: {result}")
@@ -0,0 +1,247 @@
+"""
+RollingSummary - Bounded, incrementally maintained chat summary per project.
+
+The summary is extractive and updated in O(1) per logged turn: turn count and
+time span, decayed topic keywords, and the last few turns, truncated. It is
+sent as silent context when the Live session reconnects.
+
+SummaryCache keeps one summary per project in memory and persists it to
+`chat_summary.json`. A loaded summary catches up on entries logged after it
+was saved; a project without one is seeded from the log tail.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from chat_log import ChatLogStore
+
+SUMMARY_NAME = "chat_summary.json"
+
+STOPWORDS = set("""
+about above after again also because been before being below between both could does doing down during each
+from further have having here into just like make more most much need only other over really same should some
+such than that their them then there these they thing think this those through under until very want were what
+when where which while will with would your yours okay yeah sure right well going know good great thanks please
+""".split())
+
+RECONNECT_HEADER = ("System Notification: Connection was lost and just re-established. "
+                    "Here is a summary of the conversation so far to help you resume seamlessly "
+                    "(call search_history for anything not covered):\n\n")
+
+
+class RollingSummary:
+    """Extractive summary of a chat log, updated one turn at a time."""
+
+    def __init__(self, recent_turns: int = 6, turn_chars: int = 300, topic_count: int = 12,
+                 max_chars: int = 2000, decay: float = 0.98, max_terms: int = 200):
+        self.recent_turns = recent_turns
+        self.turn_chars = turn_chars
+        self.topic_count = topic_count
+        self.max_chars = max_chars
+        self.decay = decay
+        self.max_terms = max_terms
+
+        self.turns = 0
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        # Topic scores are relative to turn `_epoch`; newer turns add larger increments
+        # so older ones decay without rescaling every term on each turn
+        self.topics: Dict[str, float] = {}
+        self._epoch = 0
+        self.recent = deque(maxlen=recent_turns)
+
+    def add(self, sender: str, text: str, timestamp: float):
+        text = " ".join(text.split())
+        if not text:
+            return
+        self.turns += 1
+        if self.first_ts is None:
+            self.first_ts = timestamp
+        self.last_ts = timestamp
+
+        weight = self.decay ** -(self.turns - self._epoch)
+        for word in re.findall(r"[a-z0-9][a-z0-9\-]{3,}", text.lower()):
+            if word not in STOPWORDS:
+                self.topics[word] = self.topics.get(word, 0.0) + weight
+        if len(self.topics) > 2 * self.max_terms or weight > 1e6:
+            self._normalize()
+
+        if len(text) > self.turn_chars:
+            text = text[:self.turn_chars - 3].rstrip() + "..."
+        self.recent.append((sender, text))
+
+    def _normalize(self) -> Dict[str, float]:
+        """Keeps the top `max_terms` topics and rescales them to the current turn."""
+        scale = self.decay ** (self.turns - self._epoch)
+        self.topics = {word: score * scale for word, score in Counter(self.topics).most_common(self.max_terms)}
+        self._epoch = self.turns
+        return self.topics
+
+    def top_topics(self):
+        return [word for word, _ in Counter(self.topics).most_common(self.topic_count)]
+
+    def render(self) -> str:
+        """The summary text, at most `max_chars` characters."""
+        lines = []
+        if self.first_ts is not None:
+            since = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.first_ts))
+            lines.append(f"Turns summarized: {self.turns} (since {since})")
+        topics = self.top_topics()
+        if topics:
+            lines.append(f"Topics: {', '.join(topics)}")
+        head = "\n".join(lines)
+        recent = [f"[{sender}]: {text}" for sender, text in self.recent]
+        while recent:
+            body = head + "\nRecent turns:\n" + "\n".join(recent)
+            if len(body) <= self.max_chars:
+                return body
+            recent.pop(0)  # drop the oldest turn first
+        return head[:self.max_chars]
+
+    def to_dict(self) -> dict:
+        return {
+            "version": 1,
+            "turns": self.turns,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "topics": dict(self._normalize()),
+            "recent": list(self.recent),
+        }
+
+    def load_dict(self, data: dict):
+        self.turns = data.get("turns", 0)
+        self.first_ts = data.get("first_ts")
+        self.last_ts = data.get("last_ts")
+        self.topics = dict(data.get("topics", {}))
+        self._epoch = self.turns
+        self.recent = deque((tuple(turn) for turn in data.get("recent", [])), maxlen=self.recent_turns)
+
+
+class SummaryCache:
+    """
+    Per-project RollingSummary, kept in memory and persisted next to the chat log.
+    Thread-safe: turns are added from the event loop while summaries are loaded,
+    rendered and saved in worker threads.
+    """
+
+    def __init__(self, max_chars: int = 2000, seed_turns: int = 50, **summary_options):
+        self.max_chars = max_chars
+        self.seed_turns = seed_turns
+        self.summary_options = summary_options
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._summaries: Dict[str, RollingSummary] = {}
+        self._loading: Dict[str, List[dict]] = {}  # turns logged while a summary is caught up
+
+    def _new(self) -> RollingSummary:
+        return RollingSummary(max_chars=self.max_chars, **self.summary_options)
+
+    @staticmethod
+    def _fold(summary: RollingSummary, entry: dict):
+        summary.add(entry.get("sender", "Unknown"), entry.get("text", ""), entry.get("timestamp", 0))
+
+    def add(self, project_dir, entry: dict):
+        """Folds a logged turn into the project's summary, if it is loaded (otherwise it is caught up on load)."""
+        key = str(project_dir)
+        with self._lock:
+            if key in self._loading:
+                self._loading[key].append(entry)
+                return
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._fold(summary, entry)
+
+    def _load(self, project_dir, store: ChatLogStore):
+        """A summary loaded from disk (or empty) and the log entries it still has to catch up on."""
+        summary = self._new()
+        path = Path(project_dir) / SUMMARY_NAME
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                summary.load_dict(json.load(f))
+            entries = store.read_since(summary.last_ts) if summary.last_ts is not None else []
+            entries = [e for e in entries if e.get("timestamp", 0) > summary.last_ts]
+        except FileNotFoundError:
+            entries = store.read_recent(self.seed_turns)
+        except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+            print(f"[ProjectManager] [ERR] Corrupt chat summary {path}, reseeding from the log")
+            summary = self._new()
+            entries = store.read_recent(self.seed_turns)
+        return summary, entries
+
+    def get(self, project_dir, store: ChatLogStore, flush: Optional[Callable[[], None]] = None) -> RollingSummary:
+        """
+        The project's summary. Loaded from disk and caught up with entries logged
+        after it was saved, or seeded from the last `seed_turns` log entries.
+        `flush` writes queued chat messages to disk; it is called once turns
+        logged from then on are buffered, so none falls between the log and add().
+        """
+        key = str(project_dir)
+        with self._load_lock:
+            with self._lock:
+                summary = self._summaries.get(key)
+                if summary is not None:
+                    return summary
+                self._loading[key] = []
+            try:
+                if flush is not None:
+                    flush()
+                summary, entries = self._load(project_dir, store)
+            except BaseException:
+                with self._lock:
+                    del self._loading[key]
+                raise
+            with self._lock:
+                # A buffered turn may also have reached the log before it was read
+                seen = {(e.get("timestamp"), e.get("sender"), e.get("text")) for e in entries}
+                for entry in entries + [e for e in self._loading.pop(key)
+                                        if (e.get("timestamp"), e.get("sender"), e.get("text")) not in seen]:
+                    self._fold(summary, entry)
+                self._summaries[key] = summary
+            return summary
+
+    def render(self, project_dir, store: ChatLogStore, flush: Optional[Callable[[], None]] = None) -> str:
+        """The project's summary text (see get); empty if nothing was logged yet."""
+        summary = self.get(project_dir, store, flush)
+        with self._lock:
+            return summary.render() if summary.turns else ""
+
+    def save(self, project_dir):
+        with self._lock:
+            summary = self._summaries.get(str(project_dir))
+            if summary is None or not summary.turns:
+                return
+            data = summary.to_dict()
+        path = Path(project_dir) / SUMMARY_NAME
+        if not path.parent.exists():
+            return  # project was deleted
+        tmp = path.with_name(SUMMARY_NAME + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"[ProjectManager] [ERR] Failed to save chat summary: {e}")
+
+    def save_all(self):
+        with self._lock:
+            keys = list(self._summaries)
+        for key in keys:
+            self.save(key)
+
+
+async def send_reconnect_context(session, project_manager) -> int:
+    """
+    Restores conversation context after a reconnect. Sent as silent context
+    (end_of_turn=False) so it does not trigger a full model reply.
+    Returns the number of characters sent.
+    """
+    message = RECONNECT_HEADER + await asyncio.to_thread(project_manager.get_reconnect_context)
+    await session.send(input=message, end_of_turn=False)
+    return len(message)
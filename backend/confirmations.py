@@ -0,0 +1,138 @@
+"""
+ConfirmationScheduler - Pending tool confirmations, off the receive loop.
+
+Tool calls that need the user's approval register a request here and await
+it from their own task, so the Live session keeps being drained while the
+prompt is open. Requests made within `batch_window` of each other (e.g. all
+calls of one tool_call message) are shown as one prompt:
+
+    {"id": batch_id, "tool": ..., "args": ..., "expires_in": seconds,
+     "requests": [{"id", "tool", "args"}, ...]}
+
+`tool`/`args` mirror the first request so single-tool prompts look as before;
+a single request's batch id is its own id. Resolving the batch id answers
+every request in it, resolving a request id answers just that one. Anything
+still unanswered after `timeout` seconds is denied.
+"""
+
+import asyncio
+import uuid
+from typing import Callable, Dict, List, Optional
+
+
+class ConfirmationScheduler:
+    """Batches confirmation prompts and resolves them by id, with auto-deny on expiry."""
+
+    def __init__(self, prompt: Callable[[dict], None], timeout: float = 60.0, batch_window: float = 0.05):
+        self.prompt = prompt
+        self.timeout = timeout
+        self.batch_window = batch_window
+
+        # request id -> future; batch id -> request ids
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._batches: Dict[str, List[str]] = {}
+        self._queued: List[dict] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self.prompts = 0
+        self.confirmed = 0
+        self.denied = 0
+        self.expired = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._futures)
+
+    async def request(self, tool: str, args: Optional[dict] = None) -> bool:
+        """Asks the user to approve one tool call. Returns False if denied or expired."""
+        loop = asyncio.get_running_loop()
+        request_id = str(uuid.uuid4())
+        future = loop.create_future()
+        self._futures[request_id] = future
+        self._queued.append({"id": request_id, "tool": tool, "args": dict(args or {})})
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+        print(f"[ADA DEBUG] [STOP] Requesting confirmation for '{tool}' (ID: {request_id})")
+        try:
+            return await future
+        finally:
+            self._futures.pop(request_id, None)
+
+    def _flush(self):
+        self._flush_handle = None
+        requests, self._queued = self._queued, []
+        if not requests:
+            return
+        batch_id = requests[0]["id"] if len(requests) == 1 else str(uuid.uuid4())
+        self._batches[batch_id] = [r["id"] for r in requests]
+        asyncio.get_running_loop().call_later(self.timeout, self._expire, batch_id)
+
+        self.prompts += 1
+        payload = {"id": batch_id, "tool": requests[0]["tool"], "args": requests[0]["args"],
+                   "expires_in": self.timeout, "requests": requests}
+        try:
+            self.prompt(payload)
+        except Exception as e:
+            print(f"[ADA DEBUG] [ERR] Failed to send confirmation prompt: {e}")
+            self._settle(batch_id, False)
+
+    def _settle(self, batch_id: str, confirmed: bool, request_ids: Optional[List[str]] = None) -> int:
+        ids = self._batches.get(batch_id, [])
+        targets = ids if request_ids is None else [i for i in ids if i in request_ids]
+        settled = 0
+        for request_id in targets:
+            future = self._futures.get(request_id)
+            if future is not None and not future.done():
+                future.set_result(confirmed)
+                settled += 1
+        remaining = [i for i in ids if i not in targets]
+        if remaining:
+            self._batches[batch_id] = remaining
+        else:
+            self._batches.pop(batch_id, None)
+        return settled
+
+    def _expire(self, batch_id: str):
+        expired = self._settle(batch_id, False)
+        if expired:
+            self.expired += expired
+            print(f"[ADA DEBUG] [DENY] Confirmation {batch_id} expired; auto-denied {expired} request(s).")
+
+    def resolve(self, request_id: str, confirmed: bool) -> bool:
+        """Answers a batch (all of its requests) or a single request. Returns False if nothing was pending."""
+        if request_id in self._batches:
+            settled = self._settle(request_id, confirmed)
+        else:
+            batch_id = next((b for b, ids in self._batches.items() if request_id in ids), None)
+            settled = self._settle(batch_id, confirmed, [request_id]) if batch_id else 0
+        if settled:
+            if confirmed:
+                self.confirmed += settled
+            else:
+                self.denied += settled
+            print(f"[ADA DEBUG] [CONFIRM] Request {request_id} resolved. Confirmed: {confirmed}")
+        else:
+            print(f"[ADA DEBUG] [WARN] Confirmation Request {request_id} not found or already resolved.")
+        return bool(settled)
+
+    def deny_all(self):
+        """Denies everything pending (session teardown)."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._queued = []
+        for future in self._futures.values():
+            if not future.done():
+                future.set_result(False)
+        self._batches.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "prompts": self.prompts,
+            "confirmed": self.confirmed,
+            "denied": self.denied,
+            "expired": self.expired,
+        }
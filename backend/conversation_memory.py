@@ -0,0 +1,126 @@
+"""
+ConversationMemory - Rolling, token-budgeted chat history for the LOCAL provider.
+
+Messages are built as [system prompt] + history window + new user message.
+Local servers (LM Studio / llama.cpp) reuse their KV cache for the longest
+prefix shared with the previous prompt, so the window is trimmed with
+hysteresis: while it fits, turns are only appended and the whole previous
+prompt stays a cache hit. When it overflows, the oldest messages are dropped
+down to `low_water` of the budget in one step, rather than one message per
+turn (which would change the prefix right after the system prompt every turn).
+"""
+
+from typing import Iterable, List, Optional
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def sender_role(sender: str) -> str:
+    return "user" if (sender or "").lower() == "user" else "assistant"
+
+
+class ConversationMemory:
+    """Token-budgeted message window with a stable, cache-friendly prefix."""
+
+    def __init__(self, system_prompt: str, max_tokens: int = 8192, reserve_tokens: int = 1024,
+                 low_water: float = 0.5):
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        # Room left for the new user message and the reply
+        self.reserve_tokens = reserve_tokens
+        self.low_water = low_water
+
+        self._messages: List[dict] = []
+        self._tokens: List[int] = []
+        self._window_tokens = 0
+        # Window messages before this index are unchanged since the last build()
+        self._stable = 0
+        self.prefix_messages = 0
+        self.trims = 0
+
+    @property
+    def system_tokens(self) -> int:
+        return estimate_tokens(self.system_prompt) + MESSAGE_OVERHEAD_TOKENS
+
+    @property
+    def history_budget(self) -> int:
+        return max(0, self.max_tokens - self.reserve_tokens - self.system_tokens)
+
+    @property
+    def window(self) -> List[dict]:
+        return self._messages
+
+    def clear(self):
+        self._messages = []
+        self._tokens = []
+        self._window_tokens = 0
+        self._stable = 0
+
+    def load_history(self, entries: Iterable[dict]):
+        """Replaces the history with ProjectManager chat log entries ({sender, text})."""
+        self.clear()
+        for entry in entries:
+            self.add(sender_role(entry.get("sender", "")), entry.get("text", ""))
+
+    def add(self, role: str, content: str):
+        if not content or not content.strip():
+            return
+        cost = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        if self._messages and self._messages[-1]["role"] == role:
+            # Keep roles alternating; many local chat templates require it
+            last = self._messages[-1]
+            last["content"] += "\n" + content
+            self._tokens[-1] += cost - MESSAGE_OVERHEAD_TOKENS
+            self._stable = min(self._stable, len(self._messages) - 1)
+        else:
+            self._messages.append({"role": role, "content": content})
+            self._tokens.append(cost)
+        self._window_tokens += cost
+        self._trim(self.history_budget)
+
+    def _trim(self, budget: int):
+        if self._window_tokens <= budget:
+            return
+        target = int(budget * self.low_water)
+        drop = 0
+        while drop < len(self._messages) and self._window_tokens > target:
+            self._window_tokens -= self._tokens[drop]
+            drop += 1
+        # Start on a user turn so the window never opens with an orphaned reply
+        while drop < len(self._messages) and self._messages[drop]["role"] != "user":
+            self._window_tokens -= self._tokens[drop]
+            drop += 1
+        del self._messages[:drop]
+        del self._tokens[:drop]
+        self._stable = 0
+        self.trims += 1
+
+    def build(self, user_text: Optional[str] = None) -> List[dict]:
+        """Returns the messages for the next request; the prefix is identical to the last call until a trim."""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        messages.extend(dict(m) for m in self.window)
+        # System prompt + untouched history: the part the server can serve from its prompt cache
+        self.prefix_messages = 1 + self._stable
+        self._stable = len(self.window)
+        if user_text:
+            if messages[-1]["role"] == "user":
+                messages[-1]["content"] += "\n" + user_text
+            else:
+                messages.append({"role": "user", "content": user_text})
+        return messages
+
+    def get_stats(self) -> dict:
+        return {
+            "messages": len(self.window),
+            "history_tokens": self._window_tokens,
+            "system_tokens": self.system_tokens,
+            "history_budget": self.history_budget,
+            "prefix_messages": self.prefix_messages,
+            "trims": self.trims,
+        }
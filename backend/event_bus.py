@@ -0,0 +1,168 @@
+"""
+EventBus - Single outbound channel from AudioLoop callbacks to Socket.IO.
+
+Callbacks may fire on the event loop or on worker threads (ElevenLabs TTS,
+to_thread tool calls). `publish` is safe from either: off-loop submissions are
+handed over with `call_soon_threadsafe`. One sender task drains the bounded
+pending list once per `tick`, so a burst of callbacks becomes one batch of emits
+instead of one task per event.
+
+Within a batch, events are coalesced:
+
+- "replace" events (e.g. cad_status) keep only the latest payload
+- "append" events (e.g. cad_thought, transcription) merge consecutive text
+  deltas for the same sender into one payload
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Event name -> coalescing policy
+DEFAULT_COALESCE = {
+    "cad_status": "replace",
+    "kasa_devices": "replace",
+    "project_update": "replace",
+    "cad_thought": "append",
+    "transcription": "append",
+}
+
+
+class EventBus:
+    """Bounded, batching, coalescing event queue with a single sender task."""
+
+    def __init__(self, emit: Callable[..., Awaitable], max_size: int = 1000, tick: float = 0.02,
+                 coalesce: Optional[Dict[str, str]] = None):
+        self.emit = emit
+        self.max_size = max_size
+        self.tick = tick
+        self.coalesce = dict(DEFAULT_COALESCE if coalesce is None else coalesce)
+
+        # [event, payload] pairs, in submission order. Only touched on the loop thread.
+        self._pending: List[list] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.emitted = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.dropped_by_event: Dict[str, int] = {}
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+
+    def publish(self, event: str, data=None):
+        """Queues an event for the frontend. Safe to call from any thread."""
+        if self._loop is None:
+            self.bind_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._enqueue(event, data)
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._enqueue, event, data)
+            except RuntimeError:
+                # Loop closed during shutdown
+                self._count_drop(event)
+
+    def _count_drop(self, event: str):
+        self.dropped += 1
+        self.dropped_by_event[event] = self.dropped_by_event.get(event, 0) + 1
+
+    def _merge(self, event: str, data) -> bool:
+        policy = self.coalesce.get(event)
+        if policy == "replace":
+            for i, (queued, _) in enumerate(self._pending):
+                if queued == event:
+                    # Move to the end so it keeps its place relative to newer events
+                    del self._pending[i]
+                    self._pending.append([event, data])
+                    return True
+        elif policy == "append" and self._pending:
+            last = self._pending[-1]
+            prev = last[1]
+            if (last[0] == event and isinstance(prev, dict) and isinstance(data, dict)
+                    and prev.get("sender") == data.get("sender")
+                    and isinstance(prev.get("text"), str) and isinstance(data.get("text"), str)):
+                last[1] = {**prev, "text": prev["text"] + data["text"]}
+                return True
+        return False
+
+    def _enqueue(self, event: str, data):
+        self.published += 1
+        if self._merge(event, data):
+            self.coalesced += 1
+        elif len(self._pending) >= self.max_size:
+            self._count_drop(event)
+            return
+        else:
+            self._pending.append([event, data])
+            if len(self._pending) > self.max_depth:
+                self.max_depth = len(self._pending)
+        self._wakeup.set()
+
+    async def flush(self):
+        """Emits everything pending as one batch, in order."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self.batches += 1
+        for event, data in batch:
+            try:
+                await self.emit(event, data)
+                self.emitted += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"[EVENT BUS] [ERR] Emit '{event}' failed: {e}")
+
+    async def run(self):
+        while True:
+            await self._wakeup.wait()
+            # Let the rest of the tick's events arrive before sending
+            await asyncio.sleep(self.tick)
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._loop is None:
+            self.bind_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Cancels the sender after delivering whatever is still pending."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+    def get_stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "dropped_by_event": dict(self.dropped_by_event),
+            "emitted": self.emitted,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
@@ -0,0 +1,61 @@
+"""
+LatestFrame - Holds the most recent camera/screen frame without re-encoding it.
+
+A newer frame replaces the pending one. The payload for the model is built
+only at dispatch: binary frames are sent as raw bytes and base64 strings
+are passed through unchanged.
+"""
+
+from typing import Optional, Union
+
+FrameData = Union[bytes, bytearray, memoryview, str]
+
+
+class LatestFrame:
+    """Single-slot frame buffer; set() is O(1) and never copies or encodes."""
+
+    def __init__(self, mime_type: str = "image/jpeg"):
+        self.mime_type = mime_type
+        self._data: Optional[FrameData] = None
+        self._sent = True  # whether the held frame has been dispatched
+
+        # Metrics
+        self.received = 0
+        self.replaced = 0  # frames overwritten before they were ever sent
+        self.dispatched = 0
+
+    def __bool__(self):
+        return self._data is not None
+
+    def set(self, data: FrameData):
+        """Stores a frame (bytes, bytearray, memoryview or base64 str), replacing the pending one."""
+        if not data:
+            return
+        self.received += 1
+        if not self._sent:
+            self.replaced += 1
+        self._data = data
+        self._sent = False
+
+    def payload(self) -> Optional[dict]:
+        """The realtime-input payload for the latest frame, or None if there is none."""
+        data = self._data
+        if data is None:
+            return None
+        if isinstance(data, (bytearray, memoryview)):
+            # The SDK's Blob only accepts bytes; copy once and keep the copy for re-sends
+            data = self._data = bytes(data)
+        self._sent = True
+        self.dispatched += 1
+        return {"mime_type": self.mime_type, "data": data}
+
+    def clear(self):
+        self._data = None
+        self._sent = True
+
+    def get_stats(self) -> dict:
+        return {
+            "received": self.received,
+            "replaced": self.replaced,
+            "dispatched": self.dispatched,
+        }
@@ -0,0 +1,112 @@
+"""
+FramePipeline - Camera frames to JPEG, skipping frames where nothing changed.
+
+- change detection: dHash of a tiny grayscale copy against the last frame
+  sent, with a refresh at least every `max_interval` seconds
+- downsampling with cv2.resize (INTER_AREA) to fit `max_size`
+- cv2.imencode at `quality`, lowered (then the image scaled down) until
+  the JPEG fits `max_bytes`
+"""
+
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """Difference hash of a BGR or grayscale frame, as a hash_size*hash_size bit integer."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class FramePipeline:
+    """Decides which camera frames are worth sending and encodes them."""
+
+    def __init__(self, max_size: int = 1024, quality: int = 80, max_bytes: int = 0,
+                 change_threshold: int = 5, max_interval: float = 10.0, hash_size: int = 8,
+                 min_quality: int = 40):
+        self.max_size = max_size
+        self.quality = quality
+        self.max_bytes = max_bytes  # 0 = no budget
+        self.change_threshold = change_threshold
+        self.max_interval = max_interval
+        self.hash_size = hash_size
+        self.min_quality = min(min_quality, quality)
+
+        self._last_hash: Optional[int] = None
+        self._last_sent = 0.0
+
+        # Metrics
+        self.frames = 0
+        self.skipped = 0
+        self.encoded = 0
+        self.bytes_out = 0
+
+    def changed(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        """Whether the frame differs enough from the last one sent (or a refresh is due)."""
+        now = time.monotonic() if now is None else now
+        frame_hash = dhash(frame, self.hash_size)
+        if (self._last_hash is not None and hamming(frame_hash, self._last_hash) < self.change_threshold
+                and now - self._last_sent < self.max_interval):
+            return False
+        self._last_hash = frame_hash
+        self._last_sent = now
+        return True
+
+    def downsample(self, frame: np.ndarray, max_size: Optional[int] = None) -> np.ndarray:
+        max_size = max_size or self.max_size
+        height, width = frame.shape[:2]
+        scale = max_size / max(height, width)
+        if scale >= 1:
+            return frame
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    def encode(self, frame: np.ndarray) -> bytes:
+        """JPEG-encodes a BGR frame within `max_size` and, if set, the `max_bytes` budget."""
+        image = self.downsample(frame)
+        quality = self.quality
+        while True:
+            ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                raise ValueError("JPEG encoding failed")
+            if not self.max_bytes or len(buffer) <= self.max_bytes:
+                break
+            if quality > self.min_quality:
+                quality = max(self.min_quality, quality - 10)
+            elif max(image.shape[:2]) > 64:
+                image = self.downsample(image, int(max(image.shape[:2]) * 0.75))
+            else:
+                break  # smallest we go; send it over budget rather than not at all
+        return buffer.tobytes()
+
+    def process(self, frame: np.ndarray, now: Optional[float] = None) -> Optional[bytes]:
+        """JPEG bytes for the frame, or None if it is skipped as unchanged."""
+        self.frames += 1
+        if not self.changed(frame, now):
+            self.skipped += 1
+            return None
+        jpeg = self.encode(frame)
+        self.encoded += 1
+        self.bytes_out += len(jpeg)
+        return jpeg
+
+    def reset(self):
+        """Forgets the last frame sent, so the next one is always sent."""
+        self._last_hash = None
+
+    def get_stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "encoded": self.encoded,
+            "avg_bytes": round(self.bytes_out / self.encoded) if self.encoded else 0,
+        }
@@ -0,0 +1,183 @@
+"""
+HttpClient - Shared keep-alive aiohttp client for ElevenLabs and LM Studio.
+
+One ClientSession (and so one connection pool) is reused for every call, so
+sentence-by-sentence TTS and chat requests skip the TCP/TLS handshake after the
+first request. Per-host concurrency is capped by the connector; connection,
+read and total timeouts are set per client with per-call overrides.
+
+Transient failures (connection errors, timeouts, 429/502/503/504) are retried
+with exponential backoff, bounded both per call (`retries`) and globally by a
+RetryBudget so a dead upstream is not hammered with retries.
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+async def iter_sse(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+    """Yields the `data` payload of each Server-Sent Event in a streamed response."""
+    data_lines = []
+    async for raw in response.content:
+        line = raw.decode("utf-8").rstrip("\r\n")
+        if not line:
+            # Blank line ends the event
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith(":"):
+            continue  # comment / keep-alive
+        field, _, value = line.partition(":")
+        if field == "data":
+            data_lines.append(value[1:] if value.startswith(" ") else value)
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
+class HttpError(Exception):
+    """Non-2xx response from an upstream API."""
+
+    def __init__(self, status: int, body: str = ""):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+
+class RetryBudget:
+    """
+    Token bucket for retries: every request earns `ratio` of a retry, every
+    retry spends one. Starts with `min_tokens` so a quiet client can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 3.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class HttpClient:
+    """Lazily-created pooled aiohttp session with timeouts and budgeted retries."""
+
+    def __init__(self, limit: int = 32, limit_per_host: int = 4, keepalive_timeout: float = 30.0,
+                 connect_timeout: float = 5.0, read_timeout: float = 30.0, total_timeout: Optional[float] = 60.0,
+                 retries: int = 2, backoff: float = 0.25, retry_budget: Optional[RetryBudget] = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout, sock_read=read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_budget = retry_budget or RetryBudget()
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics
+        self.requests = 0
+        self.retried = 0
+        self.retries_denied = 0
+        self.failures = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.last_latency_ms = 0.0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_create(session, ctx, params):
+            self.connections_opened += 1
+
+        async def on_reuse(session, ctx, params):
+            self.connections_reused += 1
+
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, trace_configs=[self._trace_config()]
+            )
+            self._loop = loop
+        return self._session
+
+    async def request(self, method: str, url: str, *, timeout: Optional[aiohttp.ClientTimeout] = None,
+                      retries: Optional[int] = None, **kwargs) -> aiohttp.ClientResponse:
+        """
+        Sends a request, retrying transient failures. Returns the open response;
+        the caller must read it or use it as an async context manager.
+        """
+        retries = self.retries if retries is None else retries
+        self.requests += 1
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = await self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+                if response.status not in RETRY_STATUSES:
+                    self.last_latency_ms = (time.perf_counter() - start) * 1000
+                    return response
+                error = HttpError(response.status, await response.text())
+                response.release()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+
+            if attempt >= retries:
+                self.failures += 1
+                raise error
+            if not self.retry_budget.withdraw():
+                self.retries_denied += 1
+                self.failures += 1
+                raise error
+            attempt += 1
+            self.retried += 1
+            print(f"[HTTP] Retrying {method} {url} ({attempt}/{retries}) after: {error}")
+            await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+
+    async def post_json(self, url: str, payload: dict, headers: Optional[dict] = None,
+                        timeout: Optional[aiohttp.ClientTimeout] = None) -> dict:
+        """POSTs JSON and returns the decoded JSON body. Raises HttpError on non-2xx."""
+        async with await self.request("POST", url, json=payload, headers=headers, timeout=timeout) as response:
+            if response.status >= 300:
+                raise HttpError(response.status, await response.text())
+            return await response.json(content_type=None)
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retried": self.retried,
+            "retries_denied": self.retries_denied,
+            "failures": self.failures,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "last_latency_ms": round(self.last_latency_ms, 1),
+        }
@@ -0,0 +1,344 @@
+"""
+LiveConnection - Gemini Live session with resumption, warm standby and buffered replay.
+
+Owns the connection and presents a session-like facade (`send`,
+`send_tool_response`, `receive`) that stays valid across reconnects:
+
+- Session resumption: new connections reuse the latest resumption handle;
+  a rejected handle starts a fresh session
+- Warm standby: before `session_lifetime` or a `go_away` deadline, the next
+  connection is opened and swapped in at a turn boundary
+- Buffered replay: realtime input since the last resumption checkpoint is
+  replayed, and input sent while disconnected is queued (bounded)
+
+`connect(handle)` must return an async context manager yielding a session,
+e.g. `client.aio.live.connect(model=..., config=...)` with the handle set in
+`session_resumption`.
+"""
+
+import asyncio
+import contextlib
+import re
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+# Close a connection this long before its hard deadline at the latest
+SWAP_MARGIN = 2.0
+
+
+def parse_duration(value) -> Optional[float]:
+    """Parses a protobuf duration string such as '12s' or '0.5s' (or a number) into seconds."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"\s*([0-9.]+)\s*s?\s*", str(value))
+    return float(match.group(1)) if match else None
+
+
+class _Connection:
+    """One underlying Live connection."""
+
+    def __init__(self, session, stack: contextlib.AsyncExitStack, handle: Optional[str]):
+        self.session = session
+        self.stack = stack
+        self.handle = handle
+        self.opened_at = time.monotonic()
+        self.go_away_at: Optional[float] = None
+        self.sent = 0  # client messages sent on this connection
+        self.consumed = -1  # index of the last client message covered by the latest handle
+        self.received = False
+        self.lost = False
+
+
+class LiveConnection:
+    """Keeps a Live session available across drops and lifetime limits."""
+
+    def __init__(self, connect: Callable, on_connected: Optional[Callable[[bool, str], Awaitable]] = None,
+                 session_lifetime: float = 540.0, standby_lead: float = 30.0,
+                 replay_limit: int = 300, pending_limit: int = 500, max_retry_delay: float = 10.0):
+        self._connect = connect
+        self.on_connected = on_connected
+        self.session_lifetime = session_lifetime
+        self.standby_lead = standby_lead
+        self.max_retry_delay = max_retry_delay
+
+        self.handle: Optional[str] = None
+        self._current: Optional[_Connection] = None
+        self._ready = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._in_turn = False
+        self._closed = False
+        # (index, message) of realtime input on the current connection not yet covered by a handle
+        self._replay = deque(maxlen=replay_limit)
+        # Realtime input captured while no connection was ready
+        self._pending = deque(maxlen=pending_limit)
+
+        # Metrics
+        self.connects = 0
+        self.resumes = 0
+        self.swaps = 0
+        self.reconnects = 0
+        self.replayed = 0
+        self.dropped = 0
+
+    # ---- session facade ----
+
+    def __bool__(self):
+        return True
+
+    @property
+    def connected(self) -> bool:
+        return self._ready.is_set()
+
+    async def send_realtime(self, message: dict):
+        """Sends realtime input (audio/video); buffered while disconnected and replayed after a swap."""
+        conn = self._current
+        if conn is None or not self._ready.is_set():
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(message)
+            return
+        await self._send_on(conn, message)
+
+    async def send(self, input=None, end_of_turn: bool = False):
+        """Sends text/content; waits for a connection if there is none."""
+        await self._ready.wait()
+        conn = self._current
+        conn.sent += 1
+        try:
+            await conn.session.send(input=input, end_of_turn=end_of_turn)
+        except Exception as e:
+            self._mark_lost(conn, e)
+            raise
+
+    async def send_tool_response(self, function_responses=None):
+        await self._ready.wait()
+        conn = self._current
+        conn.sent += 1
+        try:
+            await conn.session.send_tool_response(function_responses=function_responses)
+        except Exception as e:
+            self._mark_lost(conn, e)
+            raise
+
+    async def receive(self):
+        """
+        Yields one model turn from the current connection. Ends early (without
+        raising) when the connection is lost or swapped out; the next call
+        waits for the replacement.
+        """
+        await self._ready.wait()
+        conn = self._current
+        got = False
+        try:
+            async for response in conn.session.receive():
+                got = True
+                conn.received = True
+                self._observe(conn, response)
+                yield response
+        except Exception as e:
+            self._mark_lost(conn, e)
+            return
+        if not got:
+            self._mark_lost(conn, "stream ended")
+
+    # ---- internals ----
+
+    async def _send_on(self, conn: _Connection, message: dict):
+        index = conn.sent
+        conn.sent += 1
+        self._replay.append((index, message))
+        try:
+            await conn.session.send(input=message, end_of_turn=False)
+        except Exception as e:
+            # Still in the replay buffer, so it is resent on the next connection
+            self._mark_lost(conn, e)
+
+    def _observe(self, conn: _Connection, response):
+        if conn is not self._current:
+            return  # late message from a connection that was swapped out
+        update = getattr(response, "session_resumption_update", None)
+        if update is not None and update.resumable and update.new_handle:
+            self.handle = update.new_handle
+            consumed = update.last_consumed_client_message_index
+            # Without an index (non-transparent mode) the handle covers what was sent before it
+            conn.consumed = consumed if consumed is not None else conn.sent - 1
+            while self._replay and self._replay[0][0] <= conn.consumed:
+                self._replay.popleft()
+
+        go_away = getattr(response, "go_away", None)
+        if go_away is not None:
+            time_left = parse_duration(go_away.time_left)
+            conn.go_away_at = time.monotonic() + (time_left if time_left is not None else SWAP_MARGIN)
+            print(f"[ADA DEBUG] [CONNECT] Server going away in {time_left}s, preparing standby connection")
+            self._wake.set()
+
+        content = getattr(response, "server_content", None)
+        if content is not None:
+            if content.turn_complete or content.interrupted:
+                self._in_turn = False
+                self._wake.set()
+            elif content.model_turn:
+                self._in_turn = True
+
+    def _mark_lost(self, conn: _Connection, reason):
+        if conn is not self._current or conn.lost:
+            return  # already swapped out or handled
+        conn.lost = True
+        self._ready.clear()
+        self._in_turn = False
+        if conn.handle and not conn.received:
+            # Closed before sending anything: most likely the handle was rejected
+            self.handle = None
+        print(f"[ADA DEBUG] [CONNECT] Connection lost: {reason}")
+        self._wake.set()
+
+    async def _open(self):
+        """Opens a connection, resuming with the current handle if there is one."""
+        if self.handle:
+            try:
+                return await self._enter(self.handle), True
+            except Exception as e:
+                print(f"[ADA DEBUG] [CONNECT] Resuming failed ({e}), starting a fresh session")
+                self.handle = None
+        return await self._enter(None), False
+
+    async def _enter(self, handle):
+        stack = contextlib.AsyncExitStack()
+        try:
+            session = await stack.enter_async_context(self._connect(handle))
+        except BaseException:
+            await stack.aclose()
+            raise
+        return _Connection(session, stack, handle)
+
+    async def _close(self, conn: _Connection):
+        try:
+            await asyncio.wait_for(conn.stack.aclose(), timeout=5)
+        except Exception as e:
+            print(f"[ADA DEBUG] [CONNECT] Error closing connection: {e}")
+
+    async def _activate(self, conn: _Connection, resumed: bool, reason: str):
+        old = self._current
+        self._ready.clear()
+        backlog = [message for index, message in self._replay if old is None or index > old.consumed]
+        self._replay.clear()
+        self._current = conn
+        self.connects += 1
+        if resumed:
+            self.resumes += 1
+
+        # Unconsumed input from the old connection, then whatever was captured meanwhile
+        for message in backlog:
+            await self._send_on(conn, message)
+            self.replayed += 1
+        while self._pending and not conn.lost:
+            await self._send_on(conn, self._pending.popleft())
+            self.replayed += 1
+        if not conn.lost:
+            self._ready.set()
+
+        if old is not None and old is not conn:
+            await self._close(old)
+        print(f"[ADA DEBUG] [CONNECT] Connected ({reason}, {'resumed' if resumed else 'new session'}, "
+              f"replayed {len(backlog)} buffered inputs)")
+        if self.on_connected:
+            try:
+                await self.on_connected(resumed, reason)
+            except Exception as e:
+                print(f"[ADA DEBUG] [ERR] on_connected failed: {e}")
+
+    async def _wait_wake(self, timeout: float):
+        # Cleared after waking so a wake-up between the caller's checks and here is not lost
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    def _deadline(self, conn: _Connection) -> float:
+        deadline = conn.opened_at + self.session_lifetime
+        return min(deadline, conn.go_away_at) if conn.go_away_at else deadline
+
+    async def _swap(self, conn: _Connection):
+        """Opens the next connection at a turn boundary (or at the deadline) and swaps it in."""
+        deadline = self._deadline(conn)
+        while self._in_turn and not conn.lost and time.monotonic() < deadline - SWAP_MARGIN:
+            await self._wait_wake(deadline - SWAP_MARGIN - time.monotonic())
+        if conn.lost:
+            return
+        try:
+            standby, resumed = await self._open()
+        except Exception as e:
+            print(f"[ADA DEBUG] [CONNECT] Could not open standby connection: {e}")
+            # Keep using the current one until it is really gone, then reconnect
+            if time.monotonic() >= deadline:
+                self._mark_lost(conn, "lifetime reached")
+            else:
+                await self._wait_wake(min(2.0, deadline - time.monotonic()))
+            return
+        if conn.lost:
+            await self._activate(standby, resumed, "reconnect")
+            return
+        self.swaps += 1
+        await self._activate(standby, resumed, "swap")
+
+    async def run(self):
+        """Connects and keeps a connection up until close(). Run as a task."""
+        initial_delay = min(0.5, self.max_retry_delay)
+        delay = initial_delay
+        reason = "start"
+        try:
+            while not self._closed:
+                try:
+                    conn, resumed = await self._open()
+                except Exception as e:
+                    print(f"[ADA DEBUG] [CONNECT] Connect failed: {e}. Retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_retry_delay)
+                    continue
+                delay = initial_delay
+                await self._activate(conn, resumed, reason)
+
+                # Supervise until the current connection is lost
+                while not self._closed:
+                    conn = self._current
+                    if conn.lost:
+                        break
+                    standby_at = self._deadline(conn) - self.standby_lead
+                    if conn.go_away_at or time.monotonic() >= standby_at:
+                        await self._swap(conn)
+                        continue
+                    await self._wait_wake(standby_at - time.monotonic())
+
+                if self._closed:
+                    break
+                lost = self._current
+                await self._close(lost)
+                self.reconnects += 1
+                reason = "reconnect"
+        finally:
+            if self._current is not None:
+                self._ready.clear()
+                await self._close(self._current)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+
+    def get_stats(self) -> dict:
+        conn = self._current
+        return {
+            "connected": self.connected,
+            "resumable": self.handle is not None,
+            "connection_age": round(time.monotonic() - conn.opened_at, 1) if conn else None,
+            "connects": self.connects,
+            "resumes": self.resumes,
+            "swaps": self.swaps,
+            "reconnects": self.reconnects,
+            "replayed": self.replayed,
+            "pending": len(self._pending),
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,114 @@
+"""
+Local LLM client - OpenAI-compatible chat completions (LM Studio).
+
+`stream_chat_completion` requests `stream: true` and yields content deltas as
+the server sends them, so the caller can push tokens to the UI and hand
+finished sentences to TTS before the reply is complete. Servers that ignore
+`stream` and answer with a single JSON body are handled transparently.
+
+When `tools` are offered, streamed tool-call fragments are assembled into
+ToolCall objects and appended to the caller's `tool_calls` list.
+"""
+
+import json
+from typing import AsyncIterator, List, Optional
+
+import aiohttp
+
+from http_client import HttpClient, HttpError, iter_sse
+
+# Streamed replies have no overall deadline; a stalled token stream still times out
+STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=5, sock_read=30)
+
+
+class ToolCall:
+    """A tool call requested by the model; `arguments` is streamed in as JSON text."""
+
+    def __init__(self, id: str = "", name: str = "", arguments: str = ""):
+        self.id = id
+        self.name = name
+        self.arguments = arguments
+
+    @property
+    def args(self) -> dict:
+        try:
+            args = json.loads(self.arguments or "{}")
+        except json.JSONDecodeError:
+            print(f"[BRAIN] [WARN] Malformed tool arguments for '{self.name}': {self.arguments[:80]}")
+            return {}
+        return args if isinstance(args, dict) else {}
+
+    def to_message(self) -> dict:
+        return {"id": self.id, "type": "function", "function": {"name": self.name, "arguments": self.arguments}}
+
+
+def _merge_tool_call_deltas(tool_calls: List[ToolCall], deltas: List[dict]):
+    for delta in deltas:
+        index = delta.get("index", len(tool_calls))
+        while len(tool_calls) <= index:
+            tool_calls.append(ToolCall(id=f"call_{len(tool_calls)}"))
+        call = tool_calls[index]
+        if delta.get("id"):
+            call.id = delta["id"]
+        function = delta.get("function") or {}
+        if function.get("name"):
+            call.name = function["name"]
+        call.arguments += function.get("arguments") or ""
+
+
+def _message(body: dict) -> dict:
+    choices = body.get("choices") or []
+    if not choices:
+        return {}
+    return choices[0].get("message") or {}
+
+
+async def stream_chat_completion(client: HttpClient, base_url: str, messages: List[dict], model: str,
+                                 temperature: float = 0.7,
+                                 timeout: Optional[aiohttp.ClientTimeout] = None,
+                                 tools: Optional[List[dict]] = None,
+                                 tool_calls: Optional[List[ToolCall]] = None) -> AsyncIterator[str]:
+    """Yields reply text deltas from an OpenAI-compatible /v1/chat/completions endpoint."""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "stream": True,
+    }
+    if tools:
+        payload["tools"] = tools
+    if tool_calls is None:
+        tool_calls = []
+    response = await client.request(
+        "POST", f"{base_url}/v1/chat/completions", json=payload,
+        headers={"Content-Type": "application/json"}, timeout=timeout or STREAM_TIMEOUT
+    )
+    async with response:
+        if response.status >= 300:
+            raise HttpError(response.status, await response.text())
+
+        if "text/event-stream" not in response.headers.get("Content-Type", ""):
+            # Server ignored stream=true
+            message = _message(await response.json(content_type=None))
+            _merge_tool_call_deltas(tool_calls, [dict(c, index=i) for i, c in enumerate(message.get("tool_calls") or [])])
+            content = message.get("content")
+            if content:
+                yield content
+            return
+
+        async for data in iter_sse(response):
+            if data.strip() == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                print(f"[BRAIN] [WARN] Skipping malformed SSE chunk: {data[:80]}")
+                continue
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            delta = choices[0].get("delta") or {}
+            if delta.get("tool_calls"):
+                _merge_tool_call_deltas(tool_calls, delta["tool_calls"])
+            if delta.get("content"):
+                yield delta["content"]
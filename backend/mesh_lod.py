@@ -0,0 +1,249 @@
+"""
+MeshLods - Level-of-detail previews of CAD STLs in a compact indexed format.
+
+Previews are derived from the STL on demand: coincident corners are welded
+into indexed vertices, then decimated by quadric-error vertex clustering on
+a grid refined until the face budget is met. Level 0 is the coarsest; the
+last level is the full-resolution welded mesh.
+
+Format (little-endian): magic "MVM1", uint32 vertex count, uint32 face
+count, uint32 flags (bit 0: 32-bit indices), float32[3] origin, float32[3]
+step; uint16[3] per vertex (position = origin + q * step); zero padding to
+a multiple of 4 bytes; uint16 or uint32[3] per face.
+"""
+
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Face budgets of the preview levels, coarsest first; the full mesh follows
+LOD_TARGETS = (5_000, 50_000)
+
+MAGIC = b"MVM1"
+HEADER = struct.Struct("<4sIII3f3f")
+FLAG_WIDE_INDICES = 1
+
+_STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attr", "<u2")])
+
+
+def read_stl(data: bytes) -> np.ndarray:
+    """Triangles of a binary or ASCII STL as a (N, 3, 3) float32 array."""
+    if len(data) >= 84:
+        (count,) = struct.unpack_from("<I", data, 80)
+        if len(data) == 84 + count * _STL_RECORD.itemsize:
+            return np.frombuffer(data, dtype=_STL_RECORD, count=count, offset=84)["vertices"].astype(np.float32)
+    values = re.findall(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)", data)
+    if not values or len(values) % 3:
+        raise ValueError("not an STL file")
+    return np.array(values, dtype=np.float32).reshape(-1, 3, 3)
+
+
+def _unique_rows(rows: np.ndarray, base: int):
+    """np.unique(rows, axis=0) for non-negative int rows < base, via one int64 key per row when it fits."""
+    if base ** rows.shape[1] >= 2 ** 63:
+        return np.unique(rows, axis=0, return_index=True, return_inverse=True)[1:]
+    key = np.zeros(len(rows), np.int64)
+    for column in rows.T:
+        key = key * base + column
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    return first, inverse.reshape(-1)
+
+
+def _drop_degenerate(faces: np.ndarray) -> np.ndarray:
+    keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    return faces[keep]
+
+
+def weld(triangles: np.ndarray, tolerance: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merges corners closer than `tolerance` (default: 1e-6 of the model size) into
+    shared vertices. Returns (vertices float32 (V, 3), faces int64 (F, 3)).
+    """
+    points = triangles.reshape(-1, 3)
+    if not len(points):
+        return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.int64)
+    if tolerance is None:
+        tolerance = (float(np.ptp(points, axis=0).max()) or 1.0) * 1e-6
+    keys = np.round((points - points.min(axis=0)) / tolerance).astype(np.int64)
+    first, inverse = _unique_rows(keys, int(keys.max()) + 1)
+    faces = _drop_degenerate(inverse.reshape(-1, 3))
+    return points[first], faces
+
+
+def vertex_quadrics(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """
+    Sum of the area-weighted plane quadrics of the faces around each vertex, as the
+    10 distinct coefficients of the symmetric 4x4 matrix, shape (10, V).
+    """
+    v0, v1, v2 = (vertices[faces[:, i]].astype(np.float64) for i in range(3))
+    normal = np.cross(v1 - v0, v2 - v0)
+    double_area = np.linalg.norm(normal, axis=1)
+    valid = double_area > 0
+    normal[valid] /= double_area[valid, None]
+    a, b, c = normal.T
+    d = -np.einsum("ij,ij->i", normal, v0)
+    w = double_area / 2
+    per_face = [w * a * a, w * a * b, w * a * c, w * a * d, w * b * b,
+                w * b * c, w * b * d, w * c * c, w * c * d, w * d * d]
+    corners = faces.T.reshape(-1)
+    return np.stack([np.bincount(corners, weights=np.tile(q, 3), minlength=len(vertices)) for q in per_face])
+
+
+def cluster_decimate(vertices: np.ndarray, faces: np.ndarray, cells: int,
+                     quadrics: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simplifies a welded mesh on a grid with `cells` cells along its longest side.
+    `quadrics` are the vertex_quadrics of the mesh, if already computed.
+    """
+    lo = vertices.min(axis=0).astype(np.float64)
+    size = (float(np.ptp(vertices, axis=0).max()) or 1.0) / cells
+    coords = np.minimum(np.floor((vertices - lo) / size).astype(np.int64), cells - 1)
+    dims = coords.max(axis=0) + 1
+    cell_key = (coords[:, 0] * dims[1] + coords[:, 1]) * dims[2] + coords[:, 2]
+    _, first, cluster = np.unique(cell_key, return_index=True, return_inverse=True)
+    cluster = cluster.reshape(-1)
+    k = len(first)
+
+    if quadrics is None:
+        quadrics = vertex_quadrics(vertices, faces)
+    q = np.stack([np.bincount(cluster, weights=quadric, minlength=k) for quadric in quadrics])
+    A = np.stack([q[[0, 1, 2]], q[[1, 4, 5]], q[[2, 5, 7]]], axis=1).transpose(2, 0, 1)
+    b = -q[[3, 6, 8]].T
+
+    # Optimal point relative to the cluster centroid; directions the quadric does not
+    # constrain (flat regions) stay at the centroid
+    counts = np.bincount(cluster, minlength=k)[:, None]
+    centroid = np.stack([np.bincount(cluster, weights=vertices[:, i], minlength=k) for i in range(3)], axis=1) / counts
+    residual = b - np.einsum("kij,kj->ki", A, centroid)
+    points = centroid + np.einsum("kij,kj->ki", np.linalg.pinv(A, rcond=1e-3, hermitian=True), residual)
+    cell_lo = lo + coords[first] * size
+    points = np.clip(points, cell_lo - size / 2, cell_lo + size * 1.5)
+
+    # Re-index faces, dropping collapsed and duplicate ones, then unused clusters
+    new_faces = _drop_degenerate(cluster[faces])
+    unique, _ = _unique_rows(np.sort(new_faces, axis=1), k)
+    new_faces = new_faces[np.sort(unique)]
+    used, new_faces = np.unique(new_faces, return_inverse=True)
+    return points[used].astype(np.float32), new_faces.reshape(-1, 3)
+
+
+def decimate(vertices: np.ndarray, faces: np.ndarray, target_faces: int, max_passes: int = 6):
+    """The finest clustering of the mesh with at most about `target_faces` faces."""
+    if len(faces) <= target_faces:
+        return vertices, faces
+    # A closed surface on an R-cell grid has roughly 12 R^2 faces
+    cells = max(2.0, (target_faces / 12) ** 0.5)
+    quadrics = vertex_quadrics(vertices, faces)
+    best = None
+    for _ in range(max_passes):
+        result = cluster_decimate(vertices, faces, int(cells), quadrics)
+        count = len(result[1])
+        if count <= target_faces:
+            if best is None or count > len(best[1]):
+                best = result
+            if count >= target_faces * 0.7:
+                break
+        cells = min(4096.0, max(2.0, cells * (target_faces / max(count, 1)) ** 0.5 * 0.97))
+    return best if best is not None else result
+
+
+def encode_mesh(vertices: np.ndarray, faces: np.ndarray) -> bytes:
+    """Packs an indexed mesh into the MVM1 format."""
+    points = vertices.astype(np.float64)
+    origin = points.min(axis=0) if len(points) else np.zeros(3)
+    step = np.ptp(points, axis=0) / 65535 if len(points) else np.ones(3)
+    step[step == 0] = 1.0
+    quantized = np.round((points - origin) / step).astype("<u2")
+    wide = len(vertices) > 65536
+    indices = faces.astype("<u4" if wide else "<u2")
+    positions = quantized.tobytes()
+    padding = b"\0" * (-(HEADER.size + len(positions)) % 4)
+    header = HEADER.pack(MAGIC, len(vertices), len(faces), FLAG_WIDE_INDICES if wide else 0, *origin, *step)
+    return header + positions + padding + indices.tobytes()
+
+
+def decode_mesh(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of encode_mesh: (vertices float32 (V, 3), faces (F, 3))."""
+    magic, vertex_count, face_count, flags, *params = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not an MVM1 mesh")
+    origin, step = np.array(params[:3]), np.array(params[3:])
+    quantized = np.frombuffer(data, "<u2", vertex_count * 3, HEADER.size).reshape(-1, 3)
+    offset = HEADER.size + vertex_count * 6
+    offset += -offset % 4
+    index_type = "<u4" if flags & FLAG_WIDE_INDICES else "<u2"
+    faces = np.frombuffer(data, index_type, face_count * 3, offset).reshape(-1, 3)
+    return (origin + quantized * step).astype(np.float32), faces
+
+
+class MeshLods:
+    """Builds and caches the preview levels of STL files; thread-safe, called through asyncio.to_thread."""
+
+    def __init__(self, targets=LOD_TARGETS, max_entries: int = 16):
+        self.targets = tuple(sorted(targets))
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._levels: "OrderedDict[tuple, Tuple[bytes, bool]]" = OrderedDict()
+        self._welded: "OrderedDict[str, tuple]" = OrderedDict()  # etag -> (vertices, faces)
+
+        # Metrics
+        self.built = 0
+        self.hits = 0
+        self.build_time = 0.0
+
+    @property
+    def levels(self) -> int:
+        return len(self.targets) + 1
+
+    def _mesh(self, path: str, etag: str):
+        with self._lock:
+            mesh = self._welded.get(etag)
+        if mesh is None:
+            with open(path, "rb") as f:
+                mesh = weld(read_stl(f.read()))
+            with self._lock:
+                self._welded[etag] = mesh
+                while len(self._welded) > 2:
+                    self._welded.popitem(last=False)
+        return mesh
+
+    def build(self, path: str, etag: str, level: int) -> Tuple[bytes, bool]:
+        """
+        The encoded mesh of a level and whether it is the full-resolution mesh
+        (then finer levels are identical and need not be fetched).
+        """
+        if not 0 <= level < self.levels:
+            raise IndexError(f"level {level} out of range")
+        key = (etag, level)
+        with self._lock:
+            cached = self._levels.get(key)
+            if cached is not None:
+                self._levels.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        start = time.perf_counter()
+        vertices, faces = self._mesh(path, etag)
+        if level < len(self.targets) and len(faces) > self.targets[level]:
+            result = (encode_mesh(*decimate(vertices, faces, self.targets[level])), False)
+        else:
+            result = (encode_mesh(vertices, faces), True)
+        with self._lock:
+            self.built += 1
+            self.build_time += time.perf_counter() - start
+            self._levels[key] = result
+            while len(self._levels) > self.max_entries:
+                self._levels.popitem(last=False)
+        return result
+
+    def get_stats(self) -> dict:
+        return {
+            "built": self.built,
+            "hits": self.hits,
+            "avg_build_ms": round(self.build_time / self.built * 1000, 1) if self.built else 0,
+        }
@@ -0,0 +1,200 @@
+"""
+ProjectContextBuilder - Incremental, budgeted project context for the AI.
+
+The builder keeps a per-project manifest of {relative path: (mtime_ns, size,
+rendered section)} and on each build only stats the tree, re-reading files
+whose (mtime, size) changed.
+
+Output is limited to `budget_bytes` of UTF-8. File contents are added in priority
+order (notes/docs, then code, then data; newest first within a group) until
+the budget is spent; the rest are listed as omitted. Chat logs are never
+inlined: they are summarized as their size plus the last few messages, read
+from the end of the file (and compacted segments, if it is short).
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from chat_log import ChatLogStore, CHAT_LOG_NAME, SEGMENT_DIR, SEGMENT_INDEX
+from chat_summary import SUMMARY_NAME
+
+TEXT_EXTENSIONS = {'.txt', '.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md', '.html', '.css', '.jsonl'}
+# Lower number = inlined first when the budget is tight
+EXTENSION_PRIORITY = {
+    '.md': 0, '.txt': 0,
+    '.py': 1, '.js': 1, '.jsx': 1, '.ts': 1, '.tsx': 1, '.html': 1, '.css': 1,
+    '.json': 2, '.jsonl': 3,
+}
+CHAT_LOG_NAMES = {CHAT_LOG_NAME}
+# Internal sidecar files that are neither listed nor read
+IGNORED_SUFFIXES = (".idx", ".tmp")
+IGNORED_NAMES = {SUMMARY_NAME}
+# Compacted chat segments are only represented by their index, which stands in
+# for the chat log summary when the active log has been rotated away
+SEGMENT_INDEX_PATH = os.path.join(SEGMENT_DIR, SEGMENT_INDEX)
+
+
+def utf8_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+class FileEntry(NamedTuple):
+    mtime_ns: int
+    size: int
+    section: Optional[str]  # rendered content block, None if not a text file
+    priority: int
+    section_bytes: int  # UTF-8 size of the section
+
+
+class ProjectContextBuilder:
+    """Caches rendered file sections per project and rebuilds only what changed."""
+
+    def __init__(self, max_file_size: int = 10000, budget_bytes: int = 60000, chat_log_messages: int = 10,
+                 max_listed: int = 200):
+        self.max_file_size = max_file_size
+        self.budget_bytes = budget_bytes
+        self.chat_log_messages = chat_log_messages
+        self.max_listed = max_listed
+        # project path -> {relative path: FileEntry}
+        self._manifests: Dict[str, Dict[str, FileEntry]] = {}
+
+        # Metrics (last build)
+        self.files_read = 0
+        self.files_cached = 0
+
+    def invalidate(self, project_path=None):
+        if project_path is None:
+            self._manifests.clear()
+        else:
+            self._manifests.pop(str(project_path), None)
+
+    def _scan(self, root: str):
+        """Yields (relative path, stat) for every file under root."""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name == SEGMENT_DIR:
+                                index = os.path.join(entry.path, SEGMENT_INDEX)
+                                if os.path.isfile(index):
+                                    yield os.path.relpath(index, root), os.stat(index)
+                            else:
+                                stack.append(entry.path)
+                        elif (entry.is_file() and not entry.name.endswith(IGNORED_SUFFIXES)
+                              and entry.name not in IGNORED_NAMES):
+                            yield os.path.relpath(entry.path, root), entry.stat()
+            except OSError:
+                continue
+
+    def _render(self, full_path: Path, rel_path: str, size: int) -> Optional[str]:
+        name = os.path.basename(rel_path)
+        ext = os.path.splitext(rel_path)[1].lower()
+        if name in CHAT_LOG_NAMES:
+            return self._summarize_chat_log(full_path, rel_path, size)
+        if rel_path == SEGMENT_INDEX_PATH:
+            return self._summarize_chat_log(full_path.parent.parent / CHAT_LOG_NAME, CHAT_LOG_NAME, 0)
+        if ext not in TEXT_EXTENSIONS:
+            return None
+        if size > self.max_file_size:
+            return f"--- {rel_path} (too large: {size} bytes, skipped) ---"
+        try:
+            with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+        except Exception as e:
+            return f"--- {rel_path} (error reading: {e}) ---"
+        return f"--- {rel_path} ---\n{content}\n"
+
+    def _summarize_chat_log(self, full_path: Path, rel_path: str, size: int) -> str:
+        store = ChatLogStore(full_path.parent)
+        segments = len(store.segments())
+        older = f", {segments} compacted segments" if segments else ""
+        lines = [f"--- {rel_path} ({size} bytes{older}, last {self.chat_log_messages} messages) ---"]
+        try:
+            for entry in store.read_recent(self.chat_log_messages):
+                lines.append(f"[{entry.get('sender', 'Unknown')}]: {entry.get('text', '')}")
+        except Exception as e:
+            lines.append(f"(error reading: {e})")
+        return "\n".join(lines) + "\n"
+
+    def _refresh(self, project_path: Path) -> Dict[str, FileEntry]:
+        key = str(project_path)
+        old = self._manifests.get(key, {})
+        manifest: Dict[str, FileEntry] = {}
+        self.files_read = self.files_cached = 0
+        for rel_path, st in self._scan(key):
+            cached = old.get(rel_path)
+            if cached is not None and cached.mtime_ns == st.st_mtime_ns and cached.size == st.st_size:
+                manifest[rel_path] = cached
+                self.files_cached += 1
+                continue
+            section = self._render(project_path / rel_path, rel_path, st.st_size)
+            if section is not None:
+                self.files_read += 1
+            ext = os.path.splitext(rel_path)[1].lower()
+            is_chat = os.path.basename(rel_path) in CHAT_LOG_NAMES or rel_path == SEGMENT_INDEX_PATH
+            priority = 4 if is_chat else EXTENSION_PRIORITY.get(ext, 3)
+            manifest[rel_path] = FileEntry(st.st_mtime_ns, st.st_size, section, priority,
+                                           utf8_len(section) if section else 0)
+        self._manifests[key] = manifest
+        return manifest
+
+    def set_max_file_size(self, max_file_size: int):
+        """Changes the per-file limit; cached sections were rendered with the old one."""
+        if max_file_size != self.max_file_size:
+            self.max_file_size = max_file_size
+            self.invalidate()
+
+    def get_stats(self) -> dict:
+        return {
+            "projects_cached": len(self._manifests),
+            "files_read": self.files_read,
+            "files_cached": self.files_cached,
+            "budget_bytes": self.budget_bytes,
+        }
+
+    def build(self, project_name: str, project_path) -> str:
+        project_path = Path(project_path)
+        if not project_path.exists():
+            return f"Project '{project_name}' does not exist."
+
+        manifest = self._refresh(project_path)
+        files = sorted(manifest)
+
+        context_lines = [f"=== Project Context: '{project_name}' ==="]
+        context_lines.append(f"Project directory: {project_path}")
+        context_lines.append("")
+
+        if not files:
+            context_lines.append("(No files in project yet)")
+        else:
+            context_lines.append(f"Files ({len(files)} total):")
+            for f in files[:self.max_listed]:
+                context_lines.append(f"  - {f}")
+            if len(files) > self.max_listed:
+                context_lines.append(f"  ... and {len(files) - self.max_listed} more")
+
+        context_lines.append("")
+
+        used = sum(utf8_len(line) + 1 for line in context_lines)
+        sections = [(entry.priority, -entry.mtime_ns, rel_path, entry.section, entry.section_bytes)
+                    for rel_path, entry in manifest.items() if entry.section]
+        if CHAT_LOG_NAME in manifest:
+            # The active log's summary already reaches back into the segments
+            sections = [s for s in sections if s[2] != SEGMENT_INDEX_PATH]
+        omitted: List[str] = []
+        for _, _, rel_path, section, section_bytes in sorted(sections):
+            if used + section_bytes + 1 > self.budget_bytes:
+                omitted.append(rel_path)
+                continue
+            context_lines.append(section)
+            used += section_bytes + 1
+
+        if omitted:
+            context_lines.append(f"(Context budget of {self.budget_bytes} bytes reached; not shown: "
+                                 f"{', '.join(sorted(omitted))})")
+
+        return "\n".join(context_lines)
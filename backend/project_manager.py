@@ -1,14 +1,31 @@
 import os
-import json
 import shutil
+import threading
 import time
 from pathlib import Path
 
+from chat_log import ChatLogWriter, ChatLogStore
+from chat_summary import SummaryCache
+from project_context import ProjectContextBuilder
+from search_index import SearchIndex, format_results
+
 class ProjectManager:
-    def __init__(self, workspace_root: str):
+    def __init__(self, workspace_root: str, chat_log: ChatLogWriter = None):
         self.workspace_root = Path(workspace_root)
         self.projects_dir = self.workspace_root / "projects"
         self.current_project = "temp"
+        # Chat history is appended off the event loop; CHAT_LOG_FSYNC = never | batch | always
+        self.chat_log = chat_log or ChatLogWriter(fsync=os.getenv("CHAT_LOG_FSYNC", "never"))
+        # Cached per-project file manifest; PROJECT_CONTEXT_BUDGET caps the context size in bytes
+        self.context_builder = ProjectContextBuilder(budget_bytes=int(os.getenv("PROJECT_CONTEXT_BUDGET", "60000")))
+        # Active chat logs past CHAT_LOG_SEGMENT_BYTES are rotated into gzipped segments by compaction
+        self.chat_segment_bytes = int(os.getenv("CHAT_LOG_SEGMENT_BYTES", str(1024 * 1024)))
+        # Held while a project's chat segments are read or rewritten
+        self._history_lock = threading.Lock()
+        # Rolling per-project summary sent on reconnect, capped at RECONNECT_SUMMARY_CHARS
+        self.chat_summaries = SummaryCache(max_chars=int(os.getenv("RECONNECT_SUMMARY_CHARS", "2000")))
+        # Full-text index behind the search_history tool, shared by all projects
+        self.search_index = SearchIndex(self.projects_dir / ".search_index.sqlite")
         
         # Ensure projects root exists
         if not self.projects_dir.exists():
@@ -22,6 +39,11 @@ class ProjectManager:
             
         # Ensure temp project receives fresh creation
         self.create_project("temp")
+        self.search_index.drop_project("temp")
+
+        # Compact the other projects' chat logs off the startup path; none of them is being written yet
+        if os.getenv("CHAT_LOG_COMPACT_ON_START", "1") == "1":
+            threading.Thread(target=self.compact_all_chat_history, name="ChatLogCompaction", daemon=True).start()
 
     def create_project(self, name: str):
         """Creates a new project directory with subfolders."""
@@ -38,12 +60,17 @@ class ProjectManager:
         return False, f"Project '{safe_name}' already exists."
 
     def switch_project(self, name: str):
-        """Switches the active project context."""
+        """Switches the active project context. Blocks while the project is being compacted; call it off the event loop."""
         safe_name = "".join([c for c in name if c.isalnum() or c in (' ', '-', '_')]).strip()
         project_path = self.projects_dir / safe_name
         
         if project_path.exists():
-            self.current_project = safe_name
+            # Under the history lock so a switch waits for a compaction in progress, and
+            # the old project's queued messages are on disk before it can be compacted
+            with self._history_lock:
+                self.flush_chat_log()
+                self.chat_summaries.save(self.get_current_project_path())
+                self.current_project = safe_name
             print(f"[ProjectManager] Switched to project: {safe_name}")
             return True, f"Switched to project '{safe_name}'."
         return False, f"Project '{safe_name}' does not exist."
@@ -56,15 +83,25 @@ class ProjectManager:
         return self.projects_dir / self.current_project
 
     def log_chat(self, sender: str, text: str):
-        """Appends a chat message to the current project's history."""
+        """Queues a chat message for the current project's history (written in the background)."""
         log_file = self.get_current_project_path() / "chat_history.jsonl"
         entry = {
             "timestamp": time.time(),
             "sender": sender,
             "text": text
         }
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
+        self.chat_log.write(log_file, entry)
+        self.chat_summaries.add(log_file.parent, entry)
+
+    def flush_chat_log(self):
+        """Blocks until queued chat messages are on disk."""
+        self.chat_log.flush()
+
+    def close(self):
+        """Flushes and stops the chat log writer and the search index, and saves chat summaries."""
+        self.chat_log.close()
+        self.chat_summaries.save_all()
+        self.search_index.close()
 
     def save_cad_artifact(self, source_path: str, prompt: str):
         """Copies a generated CAD file to the project's 'cad' folder."""
@@ -91,76 +128,102 @@ class ProjectManager:
     def get_project_context(self, max_file_size: int = 10000) -> str:
         """
         Gathers context about the current project for the AI.
-        Lists all files and reads text file contents (up to max_file_size bytes).
+        Lists all files and includes text file contents (up to max_file_size bytes each)
+        within the builder's total budget. Only files changed since the last call are re-read.
         """
-        project_path = self.get_current_project_path()
-        if not project_path.exists():
-            return f"Project '{self.current_project}' does not exist."
-
-        context_lines = [f"=== Project Context: '{self.current_project}' ==="]
-        context_lines.append(f"Project directory: {project_path}")
-        context_lines.append("")
-
-        # List all files recursively
-        all_files = []
-        for root, dirs, files in os.walk(project_path):
-            for f in files:
-                rel_path = os.path.relpath(os.path.join(root, f), project_path)
-                all_files.append(rel_path)
-
-        if not all_files:
-            context_lines.append("(No files in project yet)")
-        else:
-            context_lines.append(f"Files ({len(all_files)} total):")
-            for f in all_files:
-                context_lines.append(f"  - {f}")
-
-        context_lines.append("")
-
-        # Read text files (skip binary and large files)
-        text_extensions = {'.txt', '.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md', '.html', '.css', '.jsonl'}
-        for rel_path in all_files:
-            ext = os.path.splitext(rel_path)[1].lower()
-            if ext not in text_extensions:
-                continue
-
-            full_path = project_path / rel_path
-            try:
-                file_size = full_path.stat().st_size
-                if file_size > max_file_size:
-                    context_lines.append(f"--- {rel_path} (too large: {file_size} bytes, skipped) ---")
-                    continue
-
-                with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                context_lines.append(f"--- {rel_path} ---")
-                context_lines.append(content)
-                context_lines.append("")
-            except Exception as e:
-                context_lines.append(f"--- {rel_path} (error reading: {e}) ---")
-
-        return "\n".join(context_lines)
+        self.flush_chat_log()
+        self.context_builder.set_max_file_size(max_file_size)
+        return self.context_builder.build(self.current_project, self.get_current_project_path())
+
+    def _chat_store(self, name: str = None) -> ChatLogStore:
+        project_path = self.projects_dir / name if name else self.get_current_project_path()
+        return ChatLogStore(project_path, segment_bytes=self.chat_segment_bytes)
 
     def get_recent_chat_history(self, limit: int = 10):
         """Returns the last 'limit' chat messages from history."""
-        log_file = self.get_current_project_path() / "chat_history.jsonl"
-        if not log_file.exists():
+        self.flush_chat_log()
+        try:
+            # Reads backwards from the end of the active log, then older segments if needed
+            with self._history_lock:
+                return self._chat_store().read_recent(limit)
+        except Exception as e:
+            print(f"[ProjectManager] [ERR] Failed to read chat history: {e}")
             return []
-            
+
+    def get_chat_history_since(self, timestamp: float, limit: int = None):
+        """Returns chat messages logged at or after 'timestamp', oldest first."""
+        self.flush_chat_log()
         try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                
-            # Parse last N lines
-            history = []
-            for line in lines[-limit:]:
-                try:
-                    entry = json.loads(line)
-                    history.append(entry)
-                except json.JSONDecodeError:
-                    continue
-            return history
+            with self._history_lock:
+                return self._chat_store().read_since(timestamp, limit)
         except Exception as e:
             print(f"[ProjectManager] [ERR] Failed to read chat history: {e}")
             return []
 
+    def get_reconnect_context(self, fallback_limit: int = 10) -> str:
+        """
+        Bounded summary of the current project's conversation for restoring a
+        dropped session. Falls back to the raw log tail if the summary fails.
+        """
+        project_path = self.get_current_project_path()
+        try:
+            with self._history_lock:
+                text = self.chat_summaries.render(project_path, self._chat_store(), self.flush_chat_log)
+            if not text:
+                return f"(No earlier conversation in project '{self.current_project}'.)"
+            return f"Project: {self.current_project}\n" + text
+        except Exception as e:
+            print(f"[ProjectManager] [ERR] Chat summary unavailable, sending raw history: {e}")
+        history = self.get_recent_chat_history(limit=fallback_limit)
+        text = "\n".join(f"[{entry.get('sender', 'Unknown')}]: {entry.get('text', '')}" for entry in history)
+        return text[-self.chat_summaries.max_chars:]
+
+    def search_history(self, query: str, limit: int = 5, source: str = None):
+        """
+        Searches the current project's chat history and files (and uploaded memory).
+        Whatever changed since the last search is indexed first. Returns result dicts.
+        """
+        self.flush_chat_log()
+        try:
+            with self._history_lock:
+                self.search_index.sync_chat(self.current_project, self._chat_store())
+            self.search_index.sync_files(self.current_project, self.get_current_project_path())
+            return self.search_index.search(self.current_project, query, limit=limit, source=source)
+        except Exception as e:
+            print(f"[ProjectManager] [ERR] Search failed: {e}")
+            return []
+
+    def search_history_text(self, query: str, limit: int = 5, source: str = None) -> str:
+        """search_history rendered for the model."""
+        return format_results(query, self.search_history(query, limit=limit, source=source))
+
+    def index_memory(self, text: str, label: str = None) -> int:
+        """Indexes an uploaded memory file for search_history. Returns the number of chunks."""
+        label = label or f"memory upload {time.strftime('%Y-%m-%d %H:%M')}"
+        try:
+            return self.search_index.add_memory(label, text)
+        except Exception as e:
+            print(f"[ProjectManager] [ERR] Failed to index memory: {e}")
+            return 0
+
+    def compact_chat_history(self, name: str):
+        """
+        Rotates a project's chat log into a segment once it is large enough, then
+        merges and gzips its uncompressed segments. Skips the current project,
+        whose log is still being appended to; switch_project waits for it.
+        """
+        try:
+            with self._history_lock:
+                if name == self.current_project:
+                    return None
+                result = self._chat_store(name).compact()
+            if result["rotated"] or result["compacted"]:
+                print(f"[ProjectManager] Compacted chat history for '{name}': {result}")
+            return result
+        except Exception as e:
+            print(f"[ProjectManager] [ERR] Failed to compact chat history for '{name}': {e}")
+            return None
+
+    def compact_all_chat_history(self):
+        for name in self.list_projects():
+            self.compact_chat_history(name)
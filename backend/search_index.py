@@ -0,0 +1,293 @@
+"""
+SearchIndex - Local full-text index over chat history, project files and uploaded memory.
+
+Backs the `search_history` tool so the model can pull a few relevant snippets
+instead of having whole logs or memory files pasted into the Live session.
+
+Storage is one SQLite database for the workspace: a `chunks` table (project,
+source, ref, timestamp, text) with an FTS5 index over it, ranked with BM25.
+Indexing is incremental:
+
+- chat: new log entries are read from the project's ChatLogStore since the
+  last indexed timestamp (O(new entries) via the sidecar index)
+- files: a (mtime, size) manifest per path; only changed files are re-chunked
+- memory: uploaded text is chunked once and searchable from every project
+
+SQLite is only touched from one worker thread; the public methods block on it
+and are called off the event loop.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from chat_log import ChatLogStore, CHAT_LOG_NAME, SEGMENT_DIR
+from project_context import TEXT_EXTENSIONS, IGNORED_SUFFIXES, IGNORED_NAMES
+
+SOURCES = ("chat", "file", "memory")
+# Memory uploads are not tied to a project
+GLOBAL_PROJECT = ""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    source TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    timestamp REAL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_ref ON chunks (project, source, ref);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    content, content='chunks', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+    INSERT INTO docs(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+    INSERT INTO docs(docs, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+CREATE TABLE IF NOT EXISTS files (
+    project TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (project, path)
+);
+CREATE TABLE IF NOT EXISTS chat_state (
+    project TEXT PRIMARY KEY,
+    last_ts REAL NOT NULL,
+    last_count INTEGER NOT NULL
+);
+"""
+
+
+def chunk_text(text: str, chunk_chars: int = 800) -> List[str]:
+    """Splits text on line boundaries into chunks of roughly `chunk_chars`."""
+    chunks, current, size = [], [], 0
+    for line in text.splitlines():
+        while len(line) > chunk_chars:
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(line[:chunk_chars])
+            line = line[chunk_chars:]
+        if size + len(line) > chunk_chars and current:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return [c for c in chunks if c.strip()]
+
+
+def match_query(query: str) -> Optional[str]:
+    """Turns free text into an FTS5 query (any term, BM25 ranks docs matching more terms higher)."""
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+
+
+def format_results(query: str, results: List[dict]) -> str:
+    """Renders search results as the tool response text."""
+    if not results:
+        return f"No matches for '{query}'."
+    lines = [f"Found {len(results)} matches for '{query}':"]
+    for r in results:
+        when = f" ({time.strftime('%Y-%m-%d %H:%M', time.localtime(r['timestamp']))})" if r["timestamp"] else ""
+        snippet = " ".join(r["snippet"].split())
+        lines.append(f"[{r['source']}] {r['ref']}{when}: {snippet}")
+    return "\n".join(lines)
+
+
+class SearchIndex:
+    """Incremental FTS5 index; every method runs on a single worker thread."""
+
+    def __init__(self, db_path, chunk_chars: int = 800, max_file_bytes: int = 1024 * 1024):
+        self.db_path = str(db_path)
+        self.chunk_chars = chunk_chars
+        self.max_file_bytes = max_file_bytes
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SearchIndex")
+        self._conn: Optional[sqlite3.Connection] = None
+
+        # Metrics
+        self.searches = 0
+        self.chunks_indexed = 0
+        self.files_indexed = 0
+
+    def _run(self, fn, *args):
+        return self._executor.submit(fn, *args).result()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _insert(self, db, project: str, source: str, ref: str, timestamp: Optional[float], text: str) -> int:
+        rows = [(project, source, ref, timestamp, chunk) for chunk in chunk_text(text, self.chunk_chars)]
+        db.executemany("INSERT INTO chunks (project, source, ref, timestamp, content) VALUES (?, ?, ?, ?, ?)", rows)
+        self.chunks_indexed += len(rows)
+        return len(rows)
+
+    # ---- chat ----
+
+    def sync_chat(self, project: str, store: ChatLogStore) -> int:
+        """Indexes chat entries logged since the last sync. Returns the number indexed."""
+        return self._run(self._sync_chat, project, store)
+
+    def _sync_chat(self, project: str, store: ChatLogStore) -> int:
+        db = self._db()
+        row = db.execute("SELECT last_ts, last_count FROM chat_state WHERE project = ?", (project,)).fetchone()
+        last_ts, last_count = row if row else (float("-inf"), 0)
+        seen_at_last = 0
+        added = 0
+        with db:
+            for entry in store.read_since(last_ts):
+                # A compacted segment holds merged runs, positioned by their last turn
+                ts = entry.get("timestamp", 0)
+                end = entry.get("timestamp_end", ts)
+                if end < last_ts:
+                    continue
+                if end == last_ts and seen_at_last < last_count:
+                    seen_at_last += 1
+                    continue
+                sender = entry.get("sender", "Unknown")
+                if ts <= last_ts < end:
+                    # Run merged from turns indexed separately plus new ones: replace them with the run
+                    db.execute("DELETE FROM chunks WHERE project = ? AND source = 'chat' AND ref = ? "
+                               "AND timestamp >= ? AND timestamp <= ?", (project, sender, ts, last_ts))
+                self._insert(db, project, "chat", sender, ts, entry.get("text", ""))
+                added += 1
+                if end > last_ts:
+                    last_ts, last_count, seen_at_last = end, 1, 1
+                else:
+                    last_count += 1
+                    seen_at_last += 1
+            if added:
+                db.execute("INSERT OR REPLACE INTO chat_state (project, last_ts, last_count) VALUES (?, ?, ?)",
+                           (project, last_ts, last_count))
+        return added
+
+    # ---- files ----
+
+    def sync_files(self, project: str, project_path) -> int:
+        """Re-indexes text files whose (mtime, size) changed and drops deleted ones."""
+        return self._run(self._sync_files, project, Path(project_path))
+
+    def _scan_files(self, root: Path) -> Iterable[Tuple[str, os.stat_result]]:
+        for directory, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if d != SEGMENT_DIR]
+            for name in files:
+                if name == CHAT_LOG_NAME or name in IGNORED_NAMES or name.endswith(IGNORED_SUFFIXES):
+                    continue
+                if os.path.splitext(name)[1].lower() not in TEXT_EXTENSIONS:
+                    continue
+                full = os.path.join(directory, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                if st.st_size <= self.max_file_bytes:
+                    yield os.path.relpath(full, root).replace(os.sep, "/"), st
+
+    def _sync_files(self, project: str, root: Path) -> int:
+        db = self._db()
+        known: Dict[str, Tuple[int, int]] = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in db.execute("SELECT path, mtime_ns, size FROM files WHERE project = ?", (project,))
+        }
+        changed = 0
+        with db:
+            for rel_path, st in self._scan_files(root):
+                if known.pop(rel_path, None) == (st.st_mtime_ns, st.st_size):
+                    continue
+                try:
+                    with open(root / rel_path, "r", encoding="utf-8", errors="ignore") as f:
+                        text = f.read()
+                except OSError:
+                    continue
+                db.execute("DELETE FROM chunks WHERE project = ? AND source = 'file' AND ref = ?", (project, rel_path))
+                self._insert(db, project, "file", rel_path, st.st_mtime, text)
+                db.execute("INSERT OR REPLACE INTO files (project, path, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                           (project, rel_path, st.st_mtime_ns, st.st_size))
+                changed += 1
+            for rel_path in known:  # deleted since the last sync
+                db.execute("DELETE FROM chunks WHERE project = ? AND source = 'file' AND ref = ?", (project, rel_path))
+                db.execute("DELETE FROM files WHERE project = ? AND path = ?", (project, rel_path))
+                changed += 1
+        self.files_indexed += changed
+        return changed
+
+    # ---- memory / maintenance ----
+
+    def add_memory(self, label: str, text: str) -> int:
+        """Indexes an uploaded memory file (searchable from every project). Returns the chunk count."""
+        return self._run(self._add_memory, label, text)
+
+    def _add_memory(self, label: str, text: str) -> int:
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM chunks WHERE project = ? AND source = 'memory' AND ref = ?", (GLOBAL_PROJECT, label))
+            return self._insert(db, GLOBAL_PROJECT, "memory", label, time.time(), text)
+
+    def drop_project(self, project: str):
+        """Forgets everything indexed for a project (e.g. the temp project, which is wiped on startup)."""
+        self._run(self._drop_project, project)
+
+    def _drop_project(self, project: str):
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM chunks WHERE project = ?", (project,))
+            db.execute("DELETE FROM files WHERE project = ?", (project,))
+            db.execute("DELETE FROM chat_state WHERE project = ?", (project,))
+
+    # ---- search ----
+
+    def search(self, project: str, query: str, limit: int = 5, source: Optional[str] = None) -> List[dict]:
+        """Best BM25 matches in the project (plus uploaded memory), optionally restricted to one source."""
+        return self._run(self._search, project, query, limit, source)
+
+    def _search(self, project: str, query: str, limit: int, source: Optional[str]) -> List[dict]:
+        self.searches += 1
+        match = match_query(query)
+        if match is None:
+            return []
+        sql = ("SELECT c.source, c.ref, c.timestamp, snippet(docs, 0, '[', ']', ' ... ', 24), bm25(docs) "
+               "FROM docs JOIN chunks c ON c.id = docs.rowid "
+               "WHERE docs MATCH ? AND c.project IN (?, ?)")
+        params: list = [match, project, GLOBAL_PROJECT]
+        if source:
+            sql += " AND c.source = ?"
+            params.append(source)
+        sql += " ORDER BY bm25(docs) LIMIT ?"
+        params.append(limit)
+        return [
+            {"source": src, "ref": ref, "timestamp": ts, "snippet": snippet, "score": -score}
+            for src, ref, ts, snippet, score in self._db().execute(sql, params)
+        ]
+
+    def close(self):
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        try:
+            self._run(_close)
+        except RuntimeError:
+            return  # already shut down
+        self._executor.shutdown(wait=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "searches": self.searches,
+            "chunks_indexed": self.chunks_indexed,
+            "files_indexed": self.files_indexed,
+        }
@@ -8,7 +8,7 @@ if sys.platform == 'win32':
 
 import socketio
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
@@ -27,16 +27,47 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import brain
 from authenticator import FaceAuthenticator
+from audio_emitter import AudioDataEmitter
+from event_bus import EventBus
+from stl_store import StlStore, URL_PREFIX as STL_URL_PREFIX
 # from kasa_agent import KasaAgent  # Temporarily disabled due to conda environment conflict
 
 # Create a Socket.IO server
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
 app = FastAPI()
+# STLs shown in the CAD viewer, fetched by URL instead of sent inline
+stl_store = StlStore()
 
 @app.get("/status")
 @app.get("/api/status")
 async def health_check():
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
+    status = {"status": "ok", "timestamp": datetime.now().isoformat()}
+    if event_bus:
+        status["event_bus"] = event_bus.get_stats()
+    if audio_loop:
+        status["tool_confirmations"] = audio_loop.confirmations.get_stats()
+        status["video_frames"] = audio_loop.latest_frame.get_stats()
+        status["camera_frames"] = audio_loop.frame_pipeline.get_stats()
+        status["cad"] = audio_loop.cad_agent.get_stats()
+        if audio_loop.session:
+            status["live_connection"] = audio_loop.session.get_stats()
+    status["stl_store"] = stl_store.get_stats()
+    return status
+
+# Registered before the static mount below, which would otherwise catch the path
+@app.get(STL_URL_PREFIX + "/{etag}")
+async def cad_stl(etag: str, request: Request):
+    return stl_store.response(etag, request.headers.get("if-none-match"))
+
+@app.get(STL_URL_PREFIX + "/{etag}/lod/{level}")
+async def cad_stl_lod(etag: str, level: int, request: Request):
+    return await stl_store.lod_response(etag, level, request.headers.get("if-none-match"))
+
+def cad_payload(result):
+    """The cad_data event for a CadAgent result: where to fetch the STL, not the STL itself."""
+    if result.get('format') != 'stl' or 'file_path' not in result:
+        return result
+    return {**result, **stl_store.publish(result['file_path'], etag=result.get('etag'))}
 
 # --- STATIC FILE SERVING ---
 # Resolve project root (one level up from backend/)
@@ -74,6 +105,8 @@ signal.signal(signal.SIGTERM, signal_handler)
 # Global state
 audio_loop = None
 loop_task = None
+audio_emitter = None
+event_bus = None
 authenticator = None
 # kasa_agent = KasaAgent()  # Temporarily disabled
 kasa_agent = None  # Placeholder
@@ -89,11 +122,18 @@ DEFAULT_SETTINGS = {
         "read_file": True,
         "create_project": True,
         "switch_project": True,
-        "list_projects": True
+        "list_projects": True,
+        "search_history": False # Read-only lookup in the local index
     },
     "printers": [], # List of {host, port, name, type}
     "kasa_devices": [], # List of {ip, alias, model}
     "camera_flipped": False, # Invert cursor horizontal direction
+    "cad_candidates": 1, # CAD scripts generated and run in parallel per attempt (1 = serial retries)
+    "audio_stream": {
+        "mode": "envelope", # "envelope" (visualizer levels) or "pcm" (raw int16 bytes)
+        "interval_ms": 50, # Coalescing window for audio_data emits
+        "bins": 64
+    },
     "assistant_config": {
         "name": "Multivac",
         "voice": "Kore",
@@ -204,7 +244,7 @@ async def disconnect(sid):
 
 @sio.event
 async def start_audio(sid, data=None):
-    global audio_loop, loop_task
+    global audio_loop, loop_task, audio_emitter, event_bus
     
     # Optional: Block if not authenticated
     # Only block if auth is ENABLED and not authenticated
@@ -237,33 +277,51 @@ async def start_audio(sid, data=None):
              return
 
 
+    # Binary audio channel: chunks are coalesced per interval and sent as raw bytes / RMS envelope
+    stream_cfg = SETTINGS.get("audio_stream", {})
+    if audio_emitter:
+        audio_emitter.stop()
+    audio_emitter = AudioDataEmitter(
+        sio.emit,
+        mode=stream_cfg.get("mode", "envelope"),
+        interval=stream_cfg.get("interval_ms", 50) / 1000,
+        bins=stream_cfg.get("bins", 64),
+        sample_rate=brain.RECEIVE_SAMPLE_RATE
+    )
+    audio_emitter.start()
+
+    # Outbound events from AudioLoop callbacks (may fire on worker threads) go through one bus
+    if event_bus is None:
+        event_bus = EventBus(sio.emit)
+    event_bus.start()
+
     # Callback to send audio data to frontend
     def on_audio_data(data_bytes):
-        # We need to schedule this on the event loop
-        # This is high frequency, so we might want to downsample or batch if it's too much
-        asyncio.create_task(sio.emit('audio_data', {'data': list(data_bytes)}))
+        audio_emitter.push(data_bytes)
 
     # Callback to send CAL data to frontend
     def on_cad_data(data):
-        info = f"{len(data.get('vertices', []))} vertices" if 'vertices' in data else f"{len(data.get('data', ''))} bytes (STL)"
+        data = cad_payload(data)
+        info = f"{len(data.get('vertices', []))} vertices" if 'vertices' in data else f"{data.get('size', 0)} bytes (STL)"
         print(f"Sending CAD data to frontend: {info}")
-        asyncio.create_task(sio.emit('cad_data', data))
+        event_bus.publish('cad_data', data)
 
     # Callback to send Browser data to frontend
     def on_web_data(data):
         print(f"Sending Browser data to frontend: {len(data.get('log', ''))} chars logs")
-        asyncio.create_task(sio.emit('browser_frame', data))
+        event_bus.publish('browser_frame', data)
         
     # Callback to send Transcription data to frontend
     def on_transcription(data):
         # data = {"sender": "User"|"Multivac", "text": "..."}
-        asyncio.create_task(sio.emit('transcription', data))
+        event_bus.publish('transcription', data)
 
     # Callback to send Confirmation Request to frontend
     def on_tool_confirmation(data):
-        # data = {"id": "uuid", "tool": "tool_name", "args": {...}}
+        # data = {"id": "uuid", "tool": "tool_name", "args": {...}, "expires_in": seconds,
+        #         "requests": [{"id", "tool", "args"}, ...]}  (several calls share one prompt)
         print(f"Requesting confirmation for tool: {data.get('tool')}")
-        asyncio.create_task(sio.emit('tool_confirmation_request', data))
+        event_bus.publish('tool_confirmation_request', data)
 
     # Callback to send CAD status to frontend
     def on_cad_status(status):
@@ -272,31 +330,41 @@ async def start_audio(sid, data=None):
         # - a dict with {status, attempt, max_attempts, error} (from CadAgent)
         if isinstance(status, dict):
             print(f"Sending CAD Status: {status.get('status')} (attempt {status.get('attempt')}/{status.get('max_attempts')})")
-            asyncio.create_task(sio.emit('cad_status', status))
+            event_bus.publish('cad_status', status)
         else:
             # Legacy: simple string
             print(f"Sending CAD Status: {status}")
-            asyncio.create_task(sio.emit('cad_status', {'status': status}))
+            event_bus.publish('cad_status', {'status': status})
 
     # Callback to send CAD thoughts to frontend (streaming)
     def on_cad_thought(thought_text):
-        asyncio.create_task(sio.emit('cad_thought', {'text': thought_text}))
+        event_bus.publish('cad_thought', {'text': thought_text})
+
+    # Callback to send per-candidate progress of a speculative CAD attempt to frontend
+    def on_cad_candidate(report):
+        # report = {candidate, candidates, attempt, max_attempts, phase, model_s?, exec_s?, elapsed_s?, error?}
+        event_bus.publish('cad_candidate', report)
 
     # Callback to send Project Update to frontend
     def on_project_update(project_name):
         print(f"Sending Project Update: {project_name}")
-        asyncio.create_task(sio.emit('project_update', {'project': project_name}))
+        event_bus.publish('project_update', {'project': project_name})
 
     # Callback to send Device Update to frontend
     def on_device_update(devices):
         # devices is a list of dicts
         print(f"Sending Kasa Device Update: {len(devices)} devices")
-        asyncio.create_task(sio.emit('kasa_devices', devices))
+        event_bus.publish('kasa_devices', devices)
+
+    # Callback to send VAD decisions to frontend
+    def on_vad_event(event):
+        # event = {"type": "speech_start"|"speech_end", "rms": ..., "stream_time": ..., "noise_floor": ...}
+        event_bus.publish('vad_event', event)
 
     # Callback to send Error to frontend
     def on_error(msg):
         print(f"Sending Error to frontend: {msg}")
-        asyncio.create_task(sio.emit('error', {'msg': msg}))
+        event_bus.publish('error', {'msg': msg})
 
     # Initialize Brain
     try:
@@ -310,9 +378,11 @@ async def start_audio(sid, data=None):
             on_tool_confirmation=on_tool_confirmation,
             on_cad_status=on_cad_status,
             on_cad_thought=on_cad_thought,
+            on_cad_candidate=on_cad_candidate,
             on_project_update=on_project_update,
             on_device_update=on_device_update,
             on_error=on_error,
+            on_vad_event=on_vad_event,
 
             input_device_index=device_index,
             input_device_name=device_name,
@@ -322,6 +392,7 @@ async def start_audio(sid, data=None):
 
         # Apply current permissions
         audio_loop.update_permissions(SETTINGS["tool_permissions"])
+        audio_loop.cad_agent.set_candidates(SETTINGS.get("cad_candidates", 1))
         
         # Check initial mute state
         if data and data.get('muted', False):
@@ -368,6 +439,9 @@ async def start_audio(sid, data=None):
         traceback.print_exc()
         await sio.emit('error', {'msg': f"Failed to start: {str(e)}"})
         audio_loop = None # Ensure we can try again
+        if audio_emitter:
+            audio_emitter.stop()
+            audio_emitter = None
 
 
 async def monitor_printers_loop():
@@ -404,11 +478,20 @@ async def monitor_printers_loop():
 
 @sio.event
 async def stop_audio(sid):
-    global audio_loop
+    global audio_loop, audio_emitter, loop_task
     if audio_loop:
         audio_loop.stop() 
         print("Stopping Audio Loop")
         audio_loop = None
+        # The mic/send tasks never see the stop event; cancelling runs AudioLoop.run's
+        # cleanup (CAD workers, HTTP client) before a new loop can start
+        if loop_task:
+            loop_task.cancel()
+            await asyncio.wait({loop_task}, timeout=10)
+            loop_task = None
+        if audio_emitter:
+            audio_emitter.stop()
+            audio_emitter = None
         await sio.emit('status', {'msg': 'Multivac System Stopped'})
 
 @sio.event
@@ -429,7 +512,7 @@ async def resume_audio(sid):
 
 @sio.event
 async def confirm_tool(sid, data):
-    # data: { "id": "...", "confirmed": True/False }
+    # data: { "id": "...", "confirmed": True/False }  (a prompt id answers every request in it)
     request_id = data.get('id')
     confirmed = data.get('confirmed', False)
     
@@ -443,7 +526,7 @@ async def confirm_tool(sid, data):
 @sio.event
 async def shutdown(sid, data=None):
     """Gracefully shutdown the server when the application closes."""
-    global audio_loop, loop_task, authenticator
+    global audio_loop, loop_task, authenticator, audio_emitter, event_bus
     
     print("[SERVER] ========================================")
     print("[SERVER] SHUTDOWN SIGNAL RECEIVED FROM FRONTEND")
@@ -455,6 +538,14 @@ async def shutdown(sid, data=None):
         audio_loop.stop()
         audio_loop = None
     
+    if audio_emitter:
+        audio_emitter.stop()
+        audio_emitter = None
+
+    if event_bus:
+        await event_bus.stop()
+        event_bus = None
+    
     # Cancel the loop task if running
     if loop_task and not loop_task.done():
         print("[SERVER] Cancelling loop task...")
@@ -493,11 +584,11 @@ async def user_input(sid, data):
             
         # Use the same 'send' method that worked for audio, as 'send_realtime_input' and 'send_client_content' seem unstable in this env
         # INJECT VIDEO FRAME IF AVAILABLE (VAD-style logic for Text Input)
-        if audio_loop and audio_loop._latest_image_payload:
+        if audio_loop and audio_loop.latest_frame:
             print(f"[SERVER DEBUG] Piggybacking video frame with text input.")
             try:
                 # Send frame first
-                await audio_loop.session.send(input=audio_loop._latest_image_payload, end_of_turn=False)
+                await audio_loop.session.send(input=audio_loop.latest_frame.payload(), end_of_turn=False)
             except Exception as e:
                 print(f"[SERVER DEBUG] Failed to send piggyback frame: {e}")
                 
@@ -515,9 +606,8 @@ async def video_frame(sid, data):
     # data should contain 'image' which is binary (blob) or base64 encoded
     image_data = data.get('image')
     if image_data and audio_loop:
-        # We don't await this because we don't want to block the socket handler
-        # But send_frame is async, so we create a task
-        asyncio.create_task(audio_loop.send_frame(image_data))
+        # Stored synchronously, replacing any frame that was not sent yet; no task or encoding per frame
+        audio_loop.latest_frame.set(image_data)
 
 @sio.event
 async def save_memory(sid, data):
@@ -576,10 +666,13 @@ async def upload_memory(sid, data):
              await sio.emit('error', {'msg': "System not ready (No active session)"})
              return
 
-        # Send to model
-        print("Sending memory context to model...")
-        context_msg = f"System Notification: The user has uploaded a long-term memory file. Please load the following context into your understanding. The format is a text log of previous conversations:\n\n{memory_text}"
-        
+        # Index the upload instead of pasting it into the session; the model pulls
+        # the relevant parts with search_history when it needs them
+        chunks = await asyncio.to_thread(audio_loop.project_manager.index_memory, memory_text)
+        print(f"Indexed memory upload ({len(memory_text)} chars, {chunks} chunks)")
+        context_msg = (f"System Notification: The user has uploaded a long-term memory file (a text log of previous "
+                       f"conversations, {len(memory_text)} characters). It has been indexed; call search_history "
+                       f"with source 'memory' to recall details from it when they are relevant.")
         await audio_loop.session.send(input=context_msg, end_of_turn=True)
         print("Memory context sent successfully.")
         await sio.emit('status', {'msg': 'Memory Loaded into Context'})
@@ -638,9 +731,8 @@ async def iterate_cad(sid, data):
         result = await audio_loop.cad_agent.iterate_prototype(prompt, output_dir=cad_output_dir)
         
         if result:
-            info = f"{len(result.get('data', ''))} bytes (STL)"
-            print(f"Sending updated CAD data: {info}")
-            await sio.emit('cad_data', result)
+            print(f"Sending updated CAD data: {result.get('size', 0)} bytes (STL)")
+            await sio.emit('cad_data', cad_payload(result))
             # Save to Project
             if 'file_path' in result:
                 saved_path = audio_loop.project_manager.save_cad_artifact(result['file_path'], prompt)
@@ -674,9 +766,8 @@ async def generate_cad(sid, data):
         result = await audio_loop.cad_agent.generate_prototype(prompt, output_dir=cad_output_dir)
         
         if result:
-            info = f"{len(result.get('data', ''))} bytes (STL)"
-            print(f"Sending newly generated CAD data: {info}")
-            await sio.emit('cad_data', result)
+            print(f"Sending newly generated CAD data: {result.get('size', 0)} bytes (STL)")
+            await sio.emit('cad_data', cad_payload(result))
 
 
             # Save to Project
@@ -867,18 +958,10 @@ async def print_stl(sid, data):
         if resolved_stl and os.path.exists(resolved_stl):
             # Open the STL in the CAD module for preview
             try:
-                import base64
-                with open(resolved_stl, 'rb') as f:
-                    stl_data = f.read()
-                stl_b64 = base64.b64encode(stl_data).decode('utf-8')
-                stl_filename = os.path.basename(resolved_stl)
-                
-                print(f"[SERVER] Opening STL in CAD module: {stl_filename}")
-                await sio.emit('cad_data', {
-                    'format': 'stl',
-                    'data': stl_b64,
-                    'filename': stl_filename
-                })
+                # Hashing reads the file; keep it off the event loop
+                preview = await asyncio.to_thread(stl_store.publish, resolved_stl)
+                print(f"[SERVER] Opening STL in CAD module: {preview['filename']}")
+                await sio.emit('cad_data', preview)
             except Exception as e:
                 print(f"[SERVER] Warning: Could not preview STL: {e}")
         
@@ -987,6 +1070,19 @@ async def update_settings(sid, data):
         SETTINGS["camera_flipped"] = data["camera_flipped"]
         print(f"[SERVER] Camera flip set to: {data['camera_flipped']}")
 
+    if "cad_candidates" in data:
+        SETTINGS["cad_candidates"] = max(1, min(int(data["cad_candidates"]), 4))
+        if audio_loop:
+            audio_loop.cad_agent.set_candidates(SETTINGS["cad_candidates"])
+        print(f"[SERVER] CAD candidates set to: {SETTINGS['cad_candidates']}")
+
+    if "audio_stream" in data and isinstance(data["audio_stream"], dict):
+        SETTINGS["audio_stream"] = {**SETTINGS.get("audio_stream", {}), **data["audio_stream"]}
+        cfg = SETTINGS["audio_stream"]
+        if audio_emitter:
+            audio_emitter.configure(mode=cfg.get("mode"), interval=cfg.get("interval_ms", 50) / 1000, bins=cfg.get("bins"))
+        print(f"[SERVER] Audio stream set to: {cfg}")
+
     save_settings()
     # Broadcast new full settings
     await sio.emit('settings', SETTINGS)
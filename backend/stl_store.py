@@ -0,0 +1,153 @@
+"""
+StlStore - Serves CAD STLs to the viewer over HTTP, addressed by ETag.
+
+`cad_data` carries a small descriptor (URL, ETag, size, preview `lods`)
+for the viewer to fetch. The file is streamed from disk, URLs are
+content-addressed and cached as immutable, `If-None-Match` gets a 304, and
+an entry whose file changed on disk since it was registered answers 404.
+"""
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from starlette.responses import FileResponse, Response
+
+from mesh_lod import MeshLods
+
+URL_PREFIX = "/cad/stl"
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Entry(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+
+
+class StlStore:
+    """Maps STL ETags to files on disk; bounded to the `max_entries` most recent."""
+
+    def __init__(self, max_entries: int = 64, lods: Optional[MeshLods] = None):
+        self.max_entries = max_entries
+        self.lods = lods if lods is not None else MeshLods()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+        # Metrics
+        self.published = 0
+        self.served = 0
+        self.not_modified = 0
+        self.bytes_served = 0
+
+    def publish(self, path: str, etag: Optional[str] = None, filename: Optional[str] = None) -> dict:
+        """
+        Registers an STL file and returns the `cad_data` payload for it.
+        `etag` is the sha256 of the contents if the caller already has it; otherwise the file is hashed.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        etag = etag or file_digest(path)
+        self._entries[etag] = _Entry(path, stat.st_size, stat.st_mtime_ns)
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.published += 1
+        url = f"{URL_PREFIX}/{etag}"
+        return {
+            "format": "stl",
+            "url": url,
+            "etag": etag,
+            "size": stat.st_size,
+            "filename": filename or os.path.basename(path),
+            "lods": [{"level": level, "url": f"{url}/lod/{level}"} for level in range(self.lods.levels)],
+        }
+
+    def get(self, etag: str) -> Optional[str]:
+        """Path of a registered STL, or None if unknown or changed on disk since."""
+        entry = self._entries.get(etag)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(entry.path)
+        except OSError:
+            stat = None
+        if stat is None or (stat.st_size, stat.st_mtime_ns) != (entry.size, entry.mtime_ns):
+            del self._entries[etag]
+            return None
+        return entry.path
+
+    @staticmethod
+    def _headers(tag: str) -> dict:
+        return {
+            "ETag": f'"{tag}"',
+            "Cache-Control": "public, max-age=31536000, immutable",
+            # The dev frontend is served from another origin than the backend
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Expose-Headers": "ETag, Content-Length, X-Mesh-Final",
+        }
+
+    @staticmethod
+    def _matches(tag: str, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        return if_none_match.strip() == "*" or \
+            tag in [t.strip().removeprefix("W/").strip('"') for t in if_none_match.split(",")]
+
+    def response(self, etag: str, if_none_match: Optional[str] = None) -> Response:
+        """HTTP response for GET {URL_PREFIX}/{etag}."""
+        headers = self._headers(etag)
+        path = self.get(etag)
+        if path is None:
+            return Response(status_code=404, headers={"Access-Control-Allow-Origin": "*"})
+        if self._matches(etag, if_none_match):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        self.served += 1
+        self.bytes_served += self._entries[etag].size
+        return FileResponse(path, media_type="model/stl", headers=headers, content_disposition_type="inline",
+                            filename=os.path.basename(path))
+
+    async def lod_response(self, etag: str, level: int, if_none_match: Optional[str] = None) -> Response:
+        """
+        HTTP response for GET {URL_PREFIX}/{etag}/lod/{level}: a preview mesh, built
+        off the event loop on first request. `X-Mesh-Final: 1` marks a level that
+        is already the full-resolution mesh, so finer levels need not be fetched.
+        """
+        path = self.get(etag)
+        if path is None or not 0 <= level < self.lods.levels:
+            return Response(status_code=404, headers={"Access-Control-Allow-Origin": "*"})
+        tag = f"{etag}-lod{level}"
+        headers = self._headers(tag)
+        if self._matches(tag, if_none_match):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        try:
+            data, final = await asyncio.to_thread(self.lods.build, path, etag, level)
+        except (ValueError, OSError) as e:
+            print(f"[SERVER] Could not build preview of {os.path.basename(path)}: {e}")
+            return Response(status_code=422, headers={"Access-Control-Allow-Origin": "*"})
+        headers["X-Mesh-Final"] = "1" if final else "0"
+        self.served += 1
+        self.bytes_served += len(data)
+        return Response(content=data, media_type="application/octet-stream", headers=headers)
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "published": self.published,
+            "served": self.served,
+            "not_modified": self.not_modified,
+            "bytes_served": self.bytes_served,
+            "lods": self.lods.get_stats(),
+        }
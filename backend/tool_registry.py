@@ -0,0 +1,185 @@
+"""
+ToolRegistry - Table-driven dispatch for model function calls.
+
+Each tool is registered once with its handler coroutine, its declaration
+(schema), and how it may be run:
+
+- `blocking=False` tools start their handler as a background task and answer
+  the model immediately with `ack` (or no response at all when `ack` is None)
+- `concurrent=True` tools may run in parallel with the other calls from the
+  same tool_call message; `concurrent=False` tools (keyboard/mouse input,
+  project switches) run alone and in order, as a barrier between parallel runs
+- `permission` is the key looked up in the user's tool permissions
+  (defaults to the tool name); unset permissions require confirmation
+
+Confirmations for all calls of a message are requested together, before any
+of them runs, so the user sees one prompt per message. `submit` runs a
+message's calls in a background task (messages in arrival order) so the
+caller's receive loop is never blocked on a pending confirmation.
+
+Handlers take the call's `args` dict and return the result text for the model.
+Dispatch is provider-agnostic: calls are any objects with `id`, `name` and
+`args`, and results are (call, result) pairs the caller wraps for Gemini
+(FunctionResponse) or OpenAI-style local servers (tool messages).
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+DENIED_RESULT = "User denied the request to use this tool."
+
+# (spec, call) -> True to run the tool
+ConfirmFn = Callable[["ToolSpec", Any], Awaitable[bool]]
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    name: str
+    handler: Callable[[dict], Awaitable[Optional[str]]]
+    schema: Optional[dict] = None
+    blocking: bool = True
+    concurrent: bool = True
+    permission: Optional[str] = None
+    ack: Optional[str] = None
+
+    @property
+    def permission_key(self) -> str:
+        return self.permission or self.name
+
+
+def openai_tool(schema: dict) -> dict:
+    """Converts a Gemini function declaration to an OpenAI-style tool definition."""
+
+    def convert(node):
+        if isinstance(node, dict):
+            return {k: (v.lower() if k == "type" and isinstance(v, str) else convert(v))
+                    for k, v in node.items()}
+        if isinstance(node, list):
+            return [convert(v) for v in node]
+        return node
+
+    function = {"name": schema["name"], "description": schema.get("description", "")}
+    function["parameters"] = convert(schema.get("parameters") or {"type": "OBJECT", "properties": {}})
+    return {"type": "function", "function": function}
+
+
+class ToolRegistry:
+    """Name -> ToolSpec table with permission-aware, partly concurrent dispatch."""
+
+    def __init__(self):
+        self._tools: Dict[str, ToolSpec] = {}
+        self._background: set = set()
+        self._submitted: set = set()
+        self._submit_lock: Optional[asyncio.Lock] = None
+
+    def register(self, name: str, handler, schema: Optional[dict] = None, **options) -> ToolSpec:
+        spec = ToolSpec(name, handler, schema, **options)
+        self._tools[name] = spec
+        return spec
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def declarations(self) -> List[dict]:
+        return [spec.schema for spec in self._tools.values() if spec.schema]
+
+    def openai_tools(self) -> List[dict]:
+        return [openai_tool(spec.schema) for spec in self._tools.values() if spec.schema]
+
+    @staticmethod
+    def _track(coro, tasks: set) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        # Keep a reference so the task is not garbage collected mid-run
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return task
+
+    async def _call(self, spec: ToolSpec, call, approved: bool) -> Optional[str]:
+        if not approved:
+            print(f"[ADA DEBUG] [DENY] Tool call '{spec.name}' denied by user.")
+            return DENIED_RESULT
+
+        args = dict(call.args or {})
+        if not spec.blocking:
+            self._track(spec.handler(args), self._background)
+            return spec.ack
+
+        try:
+            return await spec.handler(args)
+        except Exception as e:
+            print(f"[ADA DEBUG] [ERR] Tool '{spec.name}' failed: {e}")
+            return f"Tool '{spec.name}' failed: {e}"
+
+    async def dispatch(self, calls: Iterable, confirm: Optional[ConfirmFn] = None) -> List[Tuple[Any, str]]:
+        """
+        Runs the calls from one tool_call message and returns (call, result) pairs
+        in call order. Unknown tools and tools without a response are skipped.
+        """
+        calls = [call for call in calls if call.name in self._tools]
+        results: List[Optional[str]] = [None] * len(calls)
+        if confirm is None:
+            approved = [True] * len(calls)
+        else:
+            approved = await asyncio.gather(*(confirm(self._tools[call.name], call) for call in calls))
+
+        # Consecutive concurrent calls form one gather batch; exclusive calls run alone
+        batch: List[int] = []
+
+        async def run_batch():
+            outcomes = await asyncio.gather(
+                *(self._call(self._tools[calls[i].name], calls[i], approved[i]) for i in batch)
+            )
+            for i, outcome in zip(batch, outcomes):
+                results[i] = outcome
+            batch.clear()
+
+        for i, call in enumerate(calls):
+            spec = self._tools[call.name]
+            if spec.concurrent:
+                batch.append(i)
+                continue
+            if batch:
+                await run_batch()
+            results[i] = await self._call(spec, call, approved[i])
+        if batch:
+            await run_batch()
+
+        return [(call, result) for call, result in zip(calls, results) if result is not None]
+
+    def submit(self, calls: Iterable, on_results: Callable[[List[Tuple[Any, str]]], Awaitable],
+               confirm: Optional[ConfirmFn] = None) -> asyncio.Task:
+        """Dispatches a message's calls in the background; `on_results` gets the (call, result) pairs."""
+        calls = list(calls)
+        if self._submit_lock is None:
+            self._submit_lock = asyncio.Lock()
+
+        async def run():
+            # One message at a time, in arrival order
+            async with self._submit_lock:
+                try:
+                    results = await self.dispatch(calls, confirm)
+                    if results:
+                        await on_results(results)
+                except Exception as e:
+                    print(f"[ADA DEBUG] [ERR] Tool call handling failed: {e}")
+
+        return self._track(run(), self._submitted)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._submitted)
+
+    def cancel_pending(self):
+        """Cancels submitted messages that have not answered yet (session teardown). Background tools keep running."""
+        for task in list(self._submitted):
+            task.cancel()
@@ -0,0 +1,225 @@
+"""
+TTS pipeline - Incremental sentence segmentation and an ordered TTS worker.
+
+SentenceSegmenter turns a stream of transcription deltas into complete
+sentences. It only scans characters it has not seen before, so feeding a long
+reply delta-by-delta stays linear. A boundary is a run of [.?!] (plus closing
+quotes/brackets) followed by whitespace, or a line break. Decimals ("3.5") and
+common abbreviations ("Dr.", "e.g.", single initials) are not boundaries.
+
+TTSWorker is the single consumer for those sentences: they are synthesized and
+played strictly in submission order. With `pipeline=True` the request for the
+next sentence is opened while the current one is still streaming, hiding the
+TTS round trip between sentences.
+"""
+
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, List, Optional
+
+TERMINATORS = ".?!"
+CLOSERS = "\"')]}”’"
+ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "approx",
+    "e.g", "i.e", "fig", "inc", "ltd", "co", "dept", "est", "mt",
+})
+
+_TOKEN_BEFORE_DOT = re.compile(r"([A-Za-z][A-Za-z.]*)\.$")
+
+
+class SentenceSegmenter:
+    """Incremental sentence splitter for streamed text."""
+
+    def __init__(self, abbreviations=ABBREVIATIONS, max_chars: int = 400):
+        self.abbreviations = abbreviations
+        # Force a split on long run-ons so TTS never waits on a whole paragraph
+        self.max_chars = max_chars
+        self._text = ""
+        self._pos = 0
+
+    def reset(self):
+        self._text = ""
+        self._pos = 0
+
+    @property
+    def pending(self) -> str:
+        return self._text
+
+    def _is_abbreviation(self, end: int) -> bool:
+        # `end` is the index just past the '.'
+        match = _TOKEN_BEFORE_DOT.search(self._text, max(0, end - 16), end)
+        if not match:
+            return False
+        token = match.group(1).lower()
+        return token in self.abbreviations or (len(token) == 1 and self._text[match.start(1)].isupper())
+
+    def _boundary_before(self, i: int) -> bool:
+        """True if the whitespace at index i ends a sentence."""
+        if self._text[i] == "\n":
+            return True
+        j = i
+        while j > 0 and self._text[j - 1] in CLOSERS:
+            j -= 1
+        if j == 0 or self._text[j - 1] not in TERMINATORS:
+            return False
+        if self._text[j - 1] == "." and (j < 2 or self._text[j - 2] != "."):
+            return not self._is_abbreviation(j)
+        return True
+
+    def feed(self, delta: str) -> List[str]:
+        """Adds a text delta and returns any sentences it completed."""
+        if not delta:
+            return []
+        self._text += delta
+        sentences = []
+        i = self._pos
+        while i < len(self._text):
+            if self._text[i].isspace() and self._boundary_before(i):
+                sentence = self._text[:i].strip()
+                self._text = self._text[i + 1:]
+                i = 0
+                if sentence:
+                    sentences.append(sentence)
+                continue
+            if i >= self.max_chars and self._text[i].isspace():
+                sentences.append(self._text[:i].strip())
+                self._text = self._text[i + 1:]
+                i = 0
+                continue
+            i += 1
+        self._pos = len(self._text)
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Returns whatever is left (end of turn) and resets."""
+        remainder = self._text.strip()
+        self.reset()
+        return remainder or None
+
+
+def _close_handle(handle: Any):
+    close = getattr(handle, "close", None)
+    if close:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def _run(fn: Callable, *args) -> Awaitable:
+    """Awaits coroutine functions directly; runs blocking ones in a worker thread."""
+    if asyncio.iscoroutinefunction(fn):
+        return fn(*args)
+    return asyncio.to_thread(fn, *args)
+
+
+class TTSWorker:
+    """
+    Ordered single-consumer TTS queue.
+
+    `open_stream(text)` starts a synthesis request and returns a handle.
+    `play_stream(handle, is_current)` streams it to the speaker and should stop
+    early once `is_current()` is False. Either may be a coroutine function or a
+    blocking function (run in a worker thread).
+    """
+
+    def __init__(self, open_stream: Callable[[str], Any], play_stream: Callable[[Any, Callable[[], bool]], None],
+                 pipeline: bool = True):
+        self.open_stream = open_stream
+        self.play_stream = play_stream
+        self.pipeline = pipeline
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._generation = 0
+
+        # Metrics
+        self.submitted = 0
+        self.spoken = 0
+        self.skipped = 0
+        self.prefetched = 0
+        self.errors = 0
+
+    def submit(self, text: str):
+        """Queues a sentence. Must be called on the event loop thread."""
+        if text and text.strip():
+            self.submitted += 1
+            self._queue.put_nowait((self._generation, text))
+
+    def clear(self):
+        """Drops queued sentences and stops the one currently playing (barge-in)."""
+        self._generation += 1
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self.skipped += 1
+
+    def _start_open(self, item):
+        gen, text = item
+        return gen, text, asyncio.create_task(_run(self.open_stream, text))
+
+    async def _prefetch_while(self, playing: asyncio.Task):
+        """Waits for playback, opening the next request if a sentence arrives meanwhile."""
+        while not playing.done():
+            getter = asyncio.create_task(self._queue.get())
+            done, _ = await asyncio.wait({playing, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                try:
+                    item = await getter
+                except asyncio.CancelledError:
+                    return None
+            else:
+                item = getter.result()
+            self.prefetched += 1
+            return self._start_open(item)
+        return None
+
+    async def run(self):
+        prefetch = None
+        playing = None
+        try:
+            while True:
+                if prefetch is None:
+                    prefetch = self._start_open(await self._queue.get())
+                gen, text, opening = prefetch
+                prefetch = None
+
+                try:
+                    handle = await opening
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[BRAIN] [ERR] TTS request failed: {e}")
+                    continue
+                if handle is None:
+                    continue
+                if gen != self._generation:
+                    self.skipped += 1
+                    _close_handle(handle)
+                    continue
+
+                playing = asyncio.create_task(
+                    _run(self.play_stream, handle, lambda g=gen: g == self._generation)
+                )
+                if self.pipeline:
+                    prefetch = await self._prefetch_while(playing)
+                try:
+                    await playing
+                    self.spoken += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[BRAIN] [ERR] TTS playback failed: {e}")
+        finally:
+            # Stop any stream still playing and release a prefetched request
+            self._generation += 1
+            if playing is not None and not playing.done():
+                playing.cancel()
+            if prefetch is not None:
+                prefetch[2].cancel()
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "submitted": self.submitted,
+            "spoken": self.spoken,
+            "skipped": self.skipped,
+            "prefetched": self.prefetched,
+            "errors": self.errors,
+        }
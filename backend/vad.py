@@ -0,0 +1,195 @@
+"""
+Voice Activity Detection for the microphone capture path.
+
+Detectors:
+- EnergyVAD: NumPy RMS energy against a fixed threshold (matches the original inline logic)
+- SpectralVAD: energy gated by an adaptive noise floor, zero-crossing rate and spectral flux
+
+Both detectors consume raw 16-bit mono PCM chunks and emit VADEvent objects on
+speech onset/offset. Hangover is measured in audio time (samples), so decisions
+do not depend on how quickly the event loop gets around to processing a chunk.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+
+VAD_MODES = ("energy", "spectral")
+
+
+@dataclass
+class VADEvent:
+    """A speech onset/offset decision."""
+    type: str  # SPEECH_START or SPEECH_END
+    rms: float
+    stream_time: float  # Seconds of audio processed when the decision was made
+    noise_floor: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.type,
+            "rms": self.rms,
+            "stream_time": self.stream_time,
+            "noise_floor": self.noise_floor,
+        }
+
+
+def pcm16_rms(data: bytes) -> float:
+    """RMS of a little-endian int16 PCM buffer (replacement for audioop.rms(data, 2))."""
+    count = len(data) // 2
+    if count == 0:
+        return 0.0
+    samples = np.frombuffer(data, dtype="<i2", count=count).astype(np.float32)
+    return float(np.sqrt(np.dot(samples, samples) / count))
+
+
+class EnergyVAD:
+    """
+    Fixed-threshold energy detector.
+
+    Speech starts on the first chunk whose RMS exceeds `threshold` and ends once
+    `hangover` seconds of consecutive sub-threshold audio have been seen.
+    """
+
+    def __init__(self, threshold: float = 800, hangover: float = 0.5, sample_rate: int = 16000,
+                 on_event: Optional[Callable[[VADEvent], None]] = None):
+        self.threshold = threshold
+        self.hangover = hangover
+        self.sample_rate = sample_rate
+        self._listeners: List[Callable[[VADEvent], None]] = []
+        if on_event:
+            self._listeners.append(on_event)
+
+        self.is_speaking = False
+        self.last_rms = 0.0
+        self._stream_time = 0.0
+        self._silence_time = 0.0
+
+    def add_listener(self, callback: Callable[[VADEvent], None]):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[VADEvent], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def reset(self):
+        """Drops speech state (e.g. after the stream was paused)."""
+        self.is_speaking = False
+        self._silence_time = 0.0
+
+    def _is_speech_frame(self, samples: np.ndarray, rms: float) -> bool:
+        return rms > self.threshold
+
+    def _noise_floor(self) -> Optional[float]:
+        return None
+
+    def process(self, data: bytes) -> Optional[VADEvent]:
+        """Feeds one PCM chunk. Returns a VADEvent when the speech state changes, else None."""
+        count = len(data) // 2
+        if count == 0:
+            return None
+
+        samples = np.frombuffer(data, dtype="<i2", count=count).astype(np.float32)
+        rms = float(np.sqrt(np.dot(samples, samples) / count))
+        self.last_rms = rms
+
+        duration = count / self.sample_rate
+        self._stream_time += duration
+
+        event = None
+        if self._is_speech_frame(samples, rms):
+            self._silence_time = 0.0
+            if not self.is_speaking:
+                self.is_speaking = True
+                event = VADEvent(SPEECH_START, rms, self._stream_time, self._noise_floor())
+        elif self.is_speaking:
+            self._silence_time += duration
+            if self._silence_time > self.hangover:
+                self.is_speaking = False
+                self._silence_time = 0.0
+                event = VADEvent(SPEECH_END, rms, self._stream_time, self._noise_floor())
+
+        if event:
+            for listener in self._listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"[VAD] [ERR] Listener failed: {e}")
+        return event
+
+
+class SpectralVAD(EnergyVAD):
+    """
+    Energy detector with an adaptive noise floor, zero-crossing rate and spectral flux.
+
+    A chunk counts as speech when its energy clears `max(threshold, noise_floor * snr_ratio)`
+    and either its zero-crossing rate falls in the voiced range or its spectrum changed
+    noticeably from the previous chunk (onsets of unvoiced consonants). The noise floor
+    only adapts while no speech is active so talking does not raise it.
+    """
+
+    def __init__(self, threshold: float = 300, hangover: float = 0.5, sample_rate: int = 16000,
+                 snr_ratio: float = 3.0, noise_adapt_rate: float = 0.05,
+                 zcr_range: tuple = (0.02, 0.35), flux_threshold: float = 0.3,
+                 on_event: Optional[Callable[[VADEvent], None]] = None):
+        super().__init__(threshold=threshold, hangover=hangover, sample_rate=sample_rate, on_event=on_event)
+        self.snr_ratio = snr_ratio
+        self.noise_adapt_rate = noise_adapt_rate
+        self.zcr_range = zcr_range
+        self.flux_threshold = flux_threshold
+
+        self.noise_floor: Optional[float] = None
+        self.last_zcr = 0.0
+        self.last_flux = 0.0
+        self._prev_spectrum: Optional[np.ndarray] = None
+        self._window: Optional[np.ndarray] = None
+
+    def _noise_floor(self) -> Optional[float]:
+        return self.noise_floor
+
+    def _spectral_flux(self, samples: np.ndarray) -> float:
+        if self._window is None or len(self._window) != len(samples):
+            self._window = np.hanning(len(samples)).astype(np.float32)
+        spectrum = np.abs(np.fft.rfft(samples * self._window))
+        total = float(spectrum.sum())
+        if total > 0:
+            spectrum /= total
+
+        prev = self._prev_spectrum
+        self._prev_spectrum = spectrum
+        if prev is None or len(prev) != len(spectrum):
+            return 0.0
+        # Half-wave rectified: only rising energy counts as an onset
+        diff = spectrum - prev
+        return float(diff[diff > 0].sum())
+
+    def _is_speech_frame(self, samples: np.ndarray, rms: float) -> bool:
+        if self.noise_floor is None:
+            self.noise_floor = rms
+
+        zcr = float(np.count_nonzero(np.diff(np.signbit(samples)))) / len(samples)
+        flux = self._spectral_flux(samples)
+        self.last_zcr = zcr
+        self.last_flux = flux
+
+        gate = max(self.threshold, self.noise_floor * self.snr_ratio)
+        voiced = self.zcr_range[0] <= zcr <= self.zcr_range[1]
+        speech = rms > gate and (voiced or flux > self.flux_threshold)
+
+        if not speech and not self.is_speaking:
+            self.noise_floor += self.noise_adapt_rate * (rms - self.noise_floor)
+        return speech
+
+
+def create_vad(mode: str = "energy", **kwargs) -> EnergyVAD:
+    """Builds a detector by name ('energy' or 'spectral')."""
+    mode = (mode or "energy").lower()
+    if mode == "spectral":
+        return SpectralVAD(**kwargs)
+    if mode != "energy":
+        print(f"[VAD] [WARN] Unknown VAD mode '{mode}', falling back to 'energy'.")
+    return EnergyVAD(**kwargs)
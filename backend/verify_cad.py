@@ -14,10 +14,10 @@ async def main():
     print(f"Testing CadAgent with prompt: '{prompt}'")
     data = await agent.generate_prototype(prompt)
     
-    if data and data.get('format') == 'stl' and data.get('data'):
+    if data and data.get('format') == 'stl' and data.get('size'):
         print("\n✅ Verification Successful!")
         print(f"Format: {data['format']}")
-        print(f"Data Length: {len(data['data'])} bytes")
+        print(f"STL: {data['file_path']} ({data['size']} bytes)")
     else:
         print("\n❌ Verification Failed!")
         if data:
@@ -0,0 +1,192 @@
+"""
+Benchmark: microphone chunk latency/jitter, per-chunk asyncio.to_thread reads
+vs. the callback-mode CaptureStream ring buffer.
+
+Runs against a fake PyAudio device that produces a chunk every `period` seconds on
+its own clock, so no audio hardware is needed. Each chunk carries its sequence
+number, letting the consumer compute device-to-loop latency per chunk.
+
+Usage:
+    python benchmarks/bench_audio_io.py
+    python benchmarks/bench_audio_io.py --chunks 300 --period-ms 64 --load-ms 3 --stall-ms 200
+"""
+import argparse
+import asyncio
+import statistics
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from audio_io import CaptureStream
+
+RATE = 16000
+CHUNK_SIZE = 1024
+
+
+class FakeInputStream:
+    """Mimics a PyAudio input stream in blocking or callback mode."""
+
+    def __init__(self, frames_per_buffer, period, stream_callback=None, **kwargs):
+        self.frames = frames_per_buffer
+        self.period = period
+        self.callback = stream_callback
+        self.produced_at = {}
+        self._seq = 0
+        self._t0 = time.perf_counter()
+        self._running = True
+        if self.callback:
+            self._thread = threading.Thread(target=self._run_callbacks, daemon=True)
+            self._thread.start()
+
+    def _make_chunk(self):
+        # Stamp with the device clock: a late blocking read() still gets audio captured on time
+        seq = self._seq
+        self._seq += 1
+        self.produced_at[seq] = self._t0 + (seq + 1) * self.period
+        return struct.pack("<Q", seq) + bytes(self.frames * 2 - 8)
+
+    def _wait_for_deadline(self):
+        deadline = self._t0 + (self._seq + 1) * self.period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _run_callbacks(self):
+        while self._running:
+            self._wait_for_deadline()
+            self.callback(self._make_chunk(), self.frames, {}, 0)
+
+    def read(self, frames, exception_on_overflow=True):
+        self._wait_for_deadline()
+        return self._make_chunk()
+
+    def stop_stream(self):
+        self._running = False
+
+    def close(self):
+        self._running = False
+
+
+class FakePyAudio:
+    def __init__(self, period):
+        self.period = period
+        self.last_stream = None
+
+    def open(self, frames_per_buffer=CHUNK_SIZE, stream_callback=None, **kwargs):
+        self.last_stream = FakeInputStream(frames_per_buffer, self.period, stream_callback=stream_callback)
+        return self.last_stream
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def event_loop_load(load_s, stall_s, stop):
+    """Simulates receive_audio/tool work: short bursts plus an occasional long stall each second."""
+    last_stall = time.perf_counter()
+    while not stop.is_set():
+        busy(load_s)
+        if stall_s and time.perf_counter() - last_stall > 1.0:
+            busy(stall_s)
+            last_stall = time.perf_counter()
+        await asyncio.sleep(0.005)
+
+
+def summarize(name, latencies, arrivals, loop_wakeups, thread_dispatches):
+    lat_ms = [l * 1000 for l in latencies]
+    gaps = [(b - a) * 1000 for a, b in zip(arrivals, arrivals[1:])]
+    return {
+        "name": name,
+        "chunks": len(latencies),
+        "lat_mean_ms": statistics.mean(lat_ms),
+        "lat_p99_ms": sorted(lat_ms)[int(len(lat_ms) * 0.99) - 1],
+        "lat_jitter_ms": statistics.pstdev(lat_ms),
+        "gap_jitter_ms": statistics.pstdev(gaps) if len(gaps) > 1 else 0.0,
+        "loop_wakeups": loop_wakeups,
+        "thread_dispatches": thread_dispatches,
+    }
+
+
+async def bench_to_thread(chunks, period, load_s, stall_s):
+    pa = FakePyAudio(period)
+    stream = pa.open(frames_per_buffer=CHUNK_SIZE)
+    stop = asyncio.Event()
+    load = asyncio.create_task(event_loop_load(load_s, stall_s, stop)) if (load_s or stall_s) else None
+
+    latencies, arrivals, wakeups = [], [], 0
+    for _ in range(chunks):
+        data = await asyncio.to_thread(stream.read, CHUNK_SIZE, exception_on_overflow=False)
+        wakeups += 1
+        now = time.perf_counter()
+        seq = struct.unpack_from("<Q", data)[0]
+        latencies.append(now - stream.produced_at[seq])
+        arrivals.append(now)
+
+    stop.set()
+    if load:
+        await load
+    stream.close()
+    return summarize("to_thread per chunk", latencies, arrivals, wakeups, wakeups)
+
+
+async def bench_ring_buffer(chunks, period, load_s, stall_s):
+    pa = FakePyAudio(period)
+    capture = CaptureStream(pa, rate=RATE, chunk_size=CHUNK_SIZE)
+    capture.bind_loop()
+    capture.open()
+    stream = pa.last_stream
+    stop = asyncio.Event()
+    load = asyncio.create_task(event_loop_load(load_s, stall_s, stop)) if (load_s or stall_s) else None
+
+    latencies, arrivals, wakeups = [], [], 0
+    while len(latencies) < chunks:
+        batch = await capture.read_chunks()
+        wakeups += 1
+        now = time.perf_counter()
+        for data in batch:
+            seq = struct.unpack_from("<Q", data)[0]
+            latencies.append(now - stream.produced_at[seq])
+            arrivals.append(now)
+
+    stop.set()
+    if load:
+        await load
+    capture.close()
+    return summarize("callback + ring buffer", latencies[:chunks], arrivals[:chunks], wakeups, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audio capture latency/jitter benchmark")
+    parser.add_argument("--chunks", type=int, default=150)
+    parser.add_argument("--period-ms", type=float, default=CHUNK_SIZE / RATE * 1000)
+    parser.add_argument("--load-ms", type=float, default=2.0, help="Busy-loop burst simulating other loop work (0 = idle)")
+    parser.add_argument("--stall-ms", type=float, default=150.0, help="Long loop stall once per second (0 = none)")
+    args = parser.parse_args()
+
+    period = args.period_ms / 1000
+    load_s = args.load_ms / 1000
+    stall_s = args.stall_ms / 1000
+    print(f"Fake device: {args.chunks} chunks every {args.period_ms:.1f} ms, "
+          f"loop load bursts {args.load_ms:.1f} ms, stalls {args.stall_ms:.0f} ms/s\n")
+
+    results = [
+        asyncio.run(bench_to_thread(args.chunks, period, load_s, stall_s)),
+        asyncio.run(bench_ring_buffer(args.chunks, period, load_s, stall_s)),
+    ]
+
+    header = f"{'implementation':<24}{'chunks':>8}{'lat mean':>11}{'lat p99':>10}{'lat jitter':>12}{'gap jitter':>12}{'wakeups':>9}{'threads':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['name']:<24}{r['chunks']:>8}{r['lat_mean_ms']:>9.2f}ms{r['lat_p99_ms']:>8.2f}ms"
+              f"{r['lat_jitter_ms']:>10.2f}ms{r['gap_jitter_ms']:>10.2f}ms{r['loop_wakeups']:>9}{r['thread_dispatches']:>9}")
+
+
+if __name__ == "__main__":
+    main()
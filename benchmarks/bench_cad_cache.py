@@ -0,0 +1,79 @@
+"""
+Benchmark: serving a repeated CAD request from CadCache vs. executing the
+script again on a warm worker (model latency, which a prompt-level hit also
+saves, is not included).
+
+Usage:
+    python benchmarks/bench_cad_cache.py
+    python benchmarks/bench_cad_cache.py --runs 20 --segments 64
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from cad_cache import CadCache
+from cad_worker import CadWorkerPool
+
+SCRIPT = """from build123d import *
+
+with BuildPart() as p:
+    Cylinder(20, 40)
+    with Locations(*[(15 * cos(2 * pi * i / {n}), 15 * sin(2 * pi * i / {n}), 0) for i in range({n})]):
+        Hole(1.5)
+    fillet(p.edges().group_by(Axis.Z)[-1], radius=1)
+
+result_part = p.part
+export_stl(result_part, 'output.stl')
+"""
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def main(args):
+    code = "from math import cos, sin, pi\n" + SCRIPT.format(n=args.segments)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = str(Path(tmp) / "output.stl")
+        code_with_path = code.replace("output.stl", output)
+        pool = CadWorkerPool(size=1)
+        pool.start()
+
+        async def execute():
+            return await pool.run(code_with_path, output)
+
+        asyncio.run(execute())  # warm-up
+        exec_ms, result = timed(lambda: asyncio.run(execute()), args.runs)
+        pool.close()
+        assert result.ok, result.error
+
+        cache = CadCache(Path(tmp) / "cache")
+        key = CadCache.prompt_key("a flange with holes", "model", "system")
+        cache.put(code, result.stl, key)
+        script_ms, _ = timed(lambda: cache.get_stl(code), args.runs)
+        prompt_ms, _ = timed(lambda: cache.lookup(key), args.runs)
+        cache.close()
+
+    print(f"STL: {len(result.stl) / 1e3:.0f} KB (median of {args.runs})")
+    print(f"  execute on warm worker:  {exec_ms:9.2f} ms")
+    print(f"  script-level cache hit:  {script_ms:9.2f} ms")
+    print(f"  prompt-level cache hit:  {prompt_ms:9.2f} ms  (+ no model request)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CAD result cache benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--segments", type=int, default=32, help="holes in the test part")
+    main(parser.parse_args())
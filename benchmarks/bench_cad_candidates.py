@@ -0,0 +1,92 @@
+"""
+Benchmark: time to the first valid STL with serial generate/fix retries vs.
+racing N candidate scripts per attempt.
+
+The model is simulated (no API calls): each answer takes a random latency
+and is a broken script with probability --fail-rate; scripts run for real
+on the worker pool (preloading nothing, so no build123d is needed).
+
+Usage:
+    python benchmarks/bench_cad_candidates.py
+    python benchmarks/bench_cad_candidates.py --requests 30 --fail-rate 0.5 --candidates 1 2 3 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ["CAD_CACHE"] = "0"
+
+from cad_agent import CadAgent
+from cad_worker import CadWorkerPool
+
+GOOD = "```python\nwith open('output.stl', 'wb') as f:\n    f.write(b'solid bench')\n```"
+BAD = "```python\nraise ValueError('fillet radius too large')\n```"
+
+
+class SimulatedModels:
+    def __init__(self, rng, latency, fail_rate):
+        self.rng = rng
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.requests = 0
+
+    async def generate_content_stream(self, model, contents, config):
+        self.requests += 1
+        delay = self.rng.uniform(*self.latency)
+        text = BAD if self.rng.random() < self.fail_rate else GOOD
+
+        async def stream():
+            await asyncio.sleep(delay)
+            part = SimpleNamespace(text=text, thought=False)
+            yield SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+        return stream()
+
+
+async def measure(candidates, args, out_dir):
+    agent = CadAgent()
+    agent.workers = CadWorkerPool(size=1, preload=())
+    agent.set_candidates(candidates)
+    agent.workers.start()
+    models = SimulatedModels(random.Random(args.seed), (args.min_latency, args.max_latency), args.fail_rate)
+    agent.client = SimpleNamespace(aio=SimpleNamespace(models=models))
+
+    samples, failed = [], 0
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        result = await agent.generate_prototype("a cube", output_dir=out_dir)
+        samples.append(time.perf_counter() - start)
+        failed += result is None
+    agent.close()
+    return samples, failed, models.requests
+
+
+def main(args):
+    print(f"{args.requests} requests, model latency {args.min_latency}-{args.max_latency}s, "
+          f"fail rate {args.fail_rate:.0%}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.candidates:
+            samples, failed, requests = asyncio.run(measure(n, args, tmp))
+            p90 = sorted(samples)[int(len(samples) * 0.9) - 1]
+            print(f"  {n} candidate(s): median {statistics.median(samples):5.2f} s  p90 {p90:5.2f} s  "
+                  f"failed {failed:2d}  model requests {requests}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speculative CAD candidates benchmark")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--fail-rate", type=float, default=0.4)
+    parser.add_argument("--min-latency", type=float, default=0.2)
+    parser.add_argument("--max-latency", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
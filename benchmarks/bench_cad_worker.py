@@ -0,0 +1,101 @@
+"""
+Benchmark: per-attempt overhead of running a generated CAD script, a fresh
+`subprocess.run([sys.executable, script])` per attempt vs. a warm
+CadWorkerPool worker that already imported build123d.
+
+Usage:
+    python benchmarks/bench_cad_worker.py
+    python benchmarks/bench_cad_worker.py --runs 10 --preload numpy
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from cad_worker import CadWorkerPool
+
+BUILD123D_SCRIPT = """from build123d import *
+
+with BuildPart() as p:
+    Box(10, 10, 10)
+    fillet(p.edges(), radius=1)
+
+result_part = p.part
+export_stl(result_part, {output!r})
+"""
+
+FALLBACK_SCRIPT = """import {module}
+
+with open({output!r}, 'wb') as f:
+    f.write(b'solid benchmark')
+"""
+
+
+def script_for(preload, output):
+    if preload == "build123d":
+        return BUILD123D_SCRIPT.format(output=output)
+    return FALLBACK_SCRIPT.format(module=preload, output=output)
+
+
+def old_run(script_path):
+    """The previous CadAgent execution step."""
+    return subprocess.run([sys.executable, script_path], capture_output=True, text=True)
+
+
+async def pool_runs(pool, source, output, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await pool.run(source, output)
+        samples.append(time.perf_counter() - start)
+        assert result.ok, result.error
+    return samples
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        output = str(Path(tmp) / "output.stl")
+        source = script_for(args.preload, output)
+        script_path = Path(tmp) / "current_design.py"
+        script_path.write_text(source)
+
+        old = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            proc = old_run(str(script_path))
+            old.append(time.perf_counter() - start)
+            assert proc.returncode == 0, proc.stderr
+
+        pool = CadWorkerPool(size=1, preload=(args.preload,))
+        start = time.perf_counter()
+        pool.start()
+        warm = asyncio.run(pool_runs(pool, "pass", None, 1))[0]
+        warm_s = time.perf_counter() - start
+        new = asyncio.run(pool_runs(pool, source, output, args.runs))
+        pool.close()
+
+    print(f"Script: {args.preload}, {args.runs} runs (median)")
+    print(f"  subprocess.run per attempt: {statistics.median(old) * 1000:9.1f} ms")
+    print(f"  warm worker:                {statistics.median(new) * 1000:9.1f} ms")
+    print(f"  (one-time worker warm-up:   {warm_s * 1000:9.1f} ms, first call {warm * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CAD script execution benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--preload", default=None, help="module the script imports (default: build123d if installed)")
+    args = parser.parse_args()
+    if args.preload is None:
+        try:
+            import build123d  # noqa: F401
+            args.preload = "build123d"
+        except ImportError:
+            args.preload = "numpy"
+    main(args)
@@ -0,0 +1,105 @@
+"""
+Benchmark: chat history size and read latency, one ever-growing
+chat_history.jsonl vs. the segmented log after compaction (rotated segments,
+same-sender runs merged, gzipped).
+
+Usage:
+    python benchmarks/bench_chat_compaction.py
+    python benchmarks/bench_chat_compaction.py --lines 500000 --segment-kb 1024
+"""
+import argparse
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from chat_log import ChatLogIndex, ChatLogStore, read_tail
+
+WORDS = "the bracket needs a hole for an m3 screw make it ten millimetres wider and print it in petg".split()
+
+
+def write_session(path, lines, ts0):
+    """Per-turn fragments: runs of 1-6 entries from the same sender, a second apart."""
+    rng = random.Random(0)
+    sender, run = "User", 0
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(lines):
+            if run == 0:
+                sender = "ADA" if sender == "User" else "User"
+                run = rng.randint(1, 6)
+            run -= 1
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+            f.write(json.dumps({"timestamp": ts0 + i, "sender": sender, "text": text}) + "\n")
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main(args):
+    ts0 = 1_700_000_000.0
+    with tempfile.TemporaryDirectory() as tmp:
+        flat = Path(tmp) / "flat"
+        seg = Path(tmp) / "segmented"
+        flat.mkdir()
+        seg.mkdir()
+        write_session(flat / "chat_history.jsonl", args.lines, ts0)
+        raw = (flat / "chat_history.jsonl").stat().st_size
+
+        # Segmented: the same history appended a segment at a time, compacting in between
+        store = ChatLogStore(seg, segment_bytes=args.segment_kb * 1024)
+        start = time.perf_counter()
+        shutil.copy(flat / "chat_history.jsonl", seg / "chat_history.jsonl")
+        # Split the copied log into segment-sized chunks to mimic rotation over time
+        data = (seg / "chat_history.jsonl").read_bytes()
+        (seg / "chat_history.jsonl").unlink()
+        pos = 0
+        while pos < len(data):
+            end = data.find(b"\n", min(pos + args.segment_kb * 1024, len(data) - 1)) + 1 or len(data)
+            with open(seg / "chat_history.jsonl", "wb") as f:
+                f.write(data[pos:end])
+            pos = end
+            store.compact(force_rotate=pos < len(data))
+        compact_s = time.perf_counter() - start
+        stats = store.get_stats()
+        stored = stats["segment_bytes"] + stats["active_bytes"]
+
+        print(f"{args.lines:,} entries, {raw / 1e6:.1f} MB raw")
+        print(f"  segmented: {stats['segments']} segments + {stats['active_bytes'] / 1e3:.0f} KB active log, "
+              f"{stored / 1e6:.2f} MB on disk ({raw / stored:.1f}x smaller), "
+              f"{stats['entries'] + len(read_tail(seg / 'chat_history.jsonl', 10 ** 9)):,} entries after merging")
+        print(f"  compaction: {compact_s * 1000:.0f} ms total\n")
+
+        flat_index = ChatLogIndex(flat / "chat_history.jsonl")
+        flat_index.refresh()
+        mid = ts0 + args.lines // 2
+        cases = [
+            ("last 10", lambda: read_tail(flat / "chat_history.jsonl", 10), lambda: store.read_recent(10)),
+            ("last 5000 (spans segments)", lambda: read_tail(flat / "chat_history.jsonl", 5000),
+             lambda: store.read_recent(5000)),
+            ("10 since mid timestamp", lambda: flat_index.read_since(mid, 10), lambda: store.read_since(mid, 10)),
+        ]
+        print(f"Read latency (median of {args.runs})")
+        print(f"  {'query':<28}{'flat ms':>10}{'segmented ms':>14}")
+        for name, flat_fn, seg_fn in cases:
+            print(f"  {name:<28}{timed(flat_fn, args.runs):>10.2f}{timed(seg_fn, args.runs):>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat log compaction benchmark")
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--segment-kb", type=int, default=1024)
+    parser.add_argument("--runs", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,97 @@
+"""
+Benchmark: reading recent chat history from a large chat_history.jsonl,
+old readlines() + slice vs. read_tail, and a timestamp lookup through the
+sidecar ChatLogIndex vs. a full scan.
+
+Usage:
+    python benchmarks/bench_chat_history.py
+    python benchmarks/bench_chat_history.py --lines 1000000 --limit 10
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from chat_log import ChatLogIndex, read_tail
+
+
+def old_recent_history(path, limit):
+    """The previous ProjectManager.get_recent_chat_history."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    history = []
+    for line in lines[-limit:]:
+        try:
+            history.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return history
+
+
+def full_scan_since(path, timestamp, limit):
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry["timestamp"] >= timestamp:
+                entries.append(entry)
+                if len(entries) >= limit:
+                    break
+    return entries
+
+
+def timed(fn, runs):
+    samples = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / "chat_history.jsonl"
+        print(f"Writing {args.lines:,} synthetic entries...")
+        ts0 = 1_700_000_000.0
+        with open(log, "w", encoding="utf-8") as f:
+            for i in range(args.lines):
+                sender = "User" if i % 2 else "Multivac"
+                f.write(json.dumps({"timestamp": ts0 + i, "sender": sender, "text": f"chunk {i} of a reply"}) + "\n")
+        print(f"{log.stat().st_size / 1e6:.1f} MB\n")
+
+        old_ms, old = timed(lambda: old_recent_history(log, args.limit), args.runs)
+        new_ms, new = timed(lambda: read_tail(log, args.limit), args.runs)
+        assert old == new
+        print(f"Last {args.limit} entries (median of {args.runs})")
+        print(f"  readlines + slice: {old_ms:9.2f} ms")
+        print(f"  read_tail:         {new_ms:9.2f} ms\n")
+
+        index = ChatLogIndex(log)
+        start = time.perf_counter()
+        points = index.refresh()
+        build_ms = (time.perf_counter() - start) * 1000
+        target = ts0 + args.lines // 2
+        scan_ms, scanned = timed(lambda: full_scan_since(log, target, args.limit), args.runs)
+        idx_ms, indexed = timed(lambda: ChatLogIndex(log).read_since(target, args.limit), args.runs)
+        assert scanned == indexed
+        print(f"{args.limit} entries from the middle of the log by timestamp (median of {args.runs})")
+        print(f"  index build (once): {build_ms:9.2f} ms, {points:,} points, "
+              f"{index.index_path.stat().st_size / 1e3:.0f} KB")
+        print(f"  full scan:          {scan_ms:9.2f} ms")
+        print(f"  indexed:            {idx_ms:9.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat history read benchmark")
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5)
+    main(parser.parse_args())
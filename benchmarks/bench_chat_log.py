@@ -0,0 +1,70 @@
+"""
+Benchmark: time spent on the caller (event loop) thread per chat log entry,
+old open/append/close per message vs. ChatLogWriter, for each fsync policy.
+
+Usage:
+    python benchmarks/bench_chat_log.py
+    python benchmarks/bench_chat_log.py --messages 5000
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from chat_log import ChatLogWriter
+
+
+def entry(i):
+    return {"timestamp": time.time(), "sender": "User" if i % 2 else "Multivac", "text": f"delta {i} " * 8}
+
+
+def run_direct(path, messages):
+    """The old ProjectManager.log_chat."""
+    samples = []
+    for i in range(messages):
+        start = time.perf_counter()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry(i)) + "\n")
+        samples.append(time.perf_counter() - start)
+    return samples, 0.0
+
+
+def run_writer(path, messages, fsync):
+    writer = ChatLogWriter(fsync=fsync)
+    samples = []
+    for i in range(messages):
+        start = time.perf_counter()
+        writer.write(path, entry(i))
+        samples.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    writer.close()
+    return samples, time.perf_counter() - start
+
+
+def main(args):
+    print(f"{args.messages} messages\n")
+    header = f"{'mode':<18}{'mean us':>10}{'p99 us':>10}{'max us':>10}{'close ms':>10}"
+    print(header)
+    print("-" * len(header))
+    modes = [("direct", lambda p: run_direct(p, args.messages))]
+    modes += [(f"writer/{policy}", lambda p, policy=policy: run_writer(p, args.messages, policy))
+              for policy in ("never", "batch", "always")]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, run in modes:
+            path = Path(tmp) / f"{name.replace('/', '_')}.jsonl"
+            samples, close = run(path)
+            samples = sorted(s * 1e6 for s in samples)
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            print(f"{name:<18}{statistics.mean(samples):>10.1f}{p99:>10.1f}{samples[-1]:>10.1f}{close * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat log writer benchmark")
+    parser.add_argument("--messages", type=int, default=2000)
+    main(parser.parse_args())
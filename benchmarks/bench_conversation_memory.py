@@ -0,0 +1,91 @@
+"""
+Benchmark: LOCAL provider prompt-processing time per turn.
+
+Runs offline against tests/stub_llm_server.py with a simulated prompt cache:
+only the part of each prompt after the prefix shared with the previous request
+is "processed", at `--prompt-token-ms` per token.
+
+Modes:
+    stateless    system prompt + current message (old ask_local_llm, no memory)
+    sliding      history trimmed one message at a time to the budget
+    memory       ConversationMemory (trims to a low-water mark, stable prefix)
+
+Usage:
+    python benchmarks/bench_conversation_memory.py
+    python benchmarks/bench_conversation_memory.py --turns 60 --context 4096 --prompt-token-ms 1
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT))
+
+from conversation_memory import ConversationMemory
+from http_client import HttpClient
+from local_llm import stream_chat_completion
+from tests.stub_llm_server import StubLLMServer
+
+SYSTEM = "You are Multivac, a helpful engineering assistant. " * 120
+
+
+class SlidingWindow(ConversationMemory):
+    """Drops the oldest messages just until the window fits again."""
+
+    def _trim(self, budget):
+        if self._window_tokens <= budget:
+            return
+        while self._messages and self._window_tokens > budget:
+            self._window_tokens -= self._tokens.pop(0)
+            self._messages.pop(0)
+        self._stable = 0
+        self.trims += 1
+
+
+class Stateless(ConversationMemory):
+    def add(self, role, content):
+        pass
+
+
+async def run(mode_cls, args):
+    stub = StubLLMServer(first_token_delay=0, token_interval=0, prompt_token_delay=args.prompt_token_ms / 1000)
+    url = await stub.start()
+    client = HttpClient()
+    memory = mode_cls(SYSTEM, max_tokens=args.context)
+    try:
+        for i in range(args.turns):
+            question = f"Turn {i}: can you adjust the bracket so the holes are {i} mm apart?"
+            messages = memory.build(question)
+            reply = "".join([d async for d in stream_chat_completion(client, url, messages, "m")])
+            memory.add("user", question)
+            memory.add("assistant", reply)
+    finally:
+        await client.close()
+        await stub.stop()
+    return stub.prompt_stats, memory
+
+
+async def main(args):
+    print(f"{args.turns} turns, {args.context}-token context, {args.prompt_token_ms} ms per uncached prompt token\n")
+    header = f"{'mode':<12}{'history msgs':>14}{'prompt tok':>12}{'processed':>11}{'mean ms':>10}{'max ms':>9}{'trims':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, mode_cls in (("stateless", Stateless), ("sliding", SlidingWindow), ("memory", ConversationMemory)):
+        stats, memory = await run(mode_cls, args)
+        # Skip the cold first turn, which processes the system prompt in every mode
+        warm = stats[1:]
+        processed = [s["prompt_tokens"] - s["cached_tokens"] for s in warm]
+        prompt_ms = [s["prompt_ms"] for s in warm]
+        print(f"{name:<12}{len(memory.window):>14}{statistics.mean(s['prompt_tokens'] for s in warm):>12.0f}"
+              f"{statistics.mean(processed):>11.0f}{statistics.mean(prompt_ms):>10.1f}{max(prompt_ms):>9.1f}{memory.trims:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LOCAL provider prompt-cache benchmark")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--context", type=int, default=4096)
+    parser.add_argument("--prompt-token-ms", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
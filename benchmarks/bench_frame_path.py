@@ -0,0 +1,93 @@
+"""
+Benchmark: cost of incoming video_frame events, the old per-frame task +
+base64 encode vs. LatestFrame.set, and the cost of the one frame that is
+actually sent (including the google-genai Blob conversion, if installed).
+
+Usage:
+    python benchmarks/bench_frame_path.py
+    python benchmarks/bench_frame_path.py --frames 900 --size 120000 --sends 10
+"""
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from frame_buffer import LatestFrame
+
+try:
+    from google.genai import types
+except ImportError:
+    types = None
+
+
+class OldFrameState:
+    """The previous AudioLoop.send_frame."""
+
+    def __init__(self):
+        self._latest_image_payload = None
+
+    async def send_frame(self, frame_data):
+        if isinstance(frame_data, bytes):
+            b64_data = base64.b64encode(frame_data).decode('utf-8')
+        else:
+            b64_data = frame_data
+        self._latest_image_payload = {"mime_type": "image/jpeg", "data": b64_data}
+
+
+def to_wire(payload):
+    """What the SDK does with a realtime-input dict before sending it."""
+    if types is None:
+        return payload
+    return types.Blob(**payload).model_dump(mode="json", exclude_none=True)
+
+
+async def run_old(frames, sends):
+    state = OldFrameState()
+    every = max(1, len(frames) // sends)
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        # server.video_frame spawned a task per frame
+        asyncio.create_task(state.send_frame(frame))
+        await asyncio.sleep(0)
+        if i % every == every - 1:
+            to_wire(state._latest_image_payload)
+    return time.perf_counter() - start
+
+
+async def run_new(frames, sends):
+    latest = LatestFrame()
+    every = max(1, len(frames) // sends)
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        latest.set(frame)
+        await asyncio.sleep(0)
+        if i % every == every - 1:
+            to_wire(latest.payload())
+    return time.perf_counter() - start, latest
+
+
+def main(args):
+    frames = [os.urandom(args.size) for _ in range(8)]
+    frames = [frames[i % len(frames)] for i in range(args.frames)]
+    print(f"{args.frames} frames of {args.size / 1e3:.0f} KB, {args.sends} sent to the model "
+          f"(SDK Blob conversion: {'yes' if types else 'not installed'})\n")
+
+    old_s = asyncio.run(run_old(frames, args.sends))
+    new_s, latest = asyncio.run(run_new(frames, args.sends))
+    print(f"  old (task + base64 per frame): {old_s * 1000:9.2f} ms  ({old_s / args.frames * 1e6:7.1f} us/frame)")
+    print(f"  new (LatestFrame):             {new_s * 1000:9.2f} ms  ({new_s / args.frames * 1e6:7.1f} us/frame)")
+    print(f"  {latest.get_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Video frame path benchmark")
+    parser.add_argument("--frames", type=int, default=900, help="e.g. 30 s at 30 fps")
+    parser.add_argument("--size", type=int, default=120_000, help="bytes per JPEG frame")
+    parser.add_argument("--sends", type=int, default=10, help="frames actually sent (VAD onsets)")
+    main(parser.parse_args())
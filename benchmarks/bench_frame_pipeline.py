@@ -0,0 +1,118 @@
+"""
+Benchmark: camera frame processing, the old PIL path (BGR->RGB, PIL
+thumbnail, JPEG, base64 on every frame) vs. FramePipeline (OpenCV resize,
+dHash change detection, JPEG only for changed frames), on a recorded video.
+
+Without --video a synthetic clip is generated (mostly static desk scene with
+sensor noise and a few stretches of motion), so it runs without a camera.
+
+Usage:
+    python benchmarks/bench_frame_pipeline.py
+    python benchmarks/bench_frame_pipeline.py --video recording.mp4 --step 30
+"""
+import argparse
+import base64
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from frame_pipeline import FramePipeline
+
+try:
+    import PIL.Image
+except ImportError:
+    PIL = None
+
+
+def old_get_frame(frame):
+    """The previous AudioLoop._get_frame, minus the capture."""
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    img = PIL.Image.fromarray(frame_rgb)
+    img.thumbnail([1024, 1024])
+    image_io = io.BytesIO()
+    img.save(image_io, format="jpeg")
+    image_io.seek(0)
+    image_bytes = image_io.read()
+    return {"mime_type": "image/jpeg", "data": base64.b64encode(image_bytes).decode()}
+
+
+def write_synthetic(path, frames, width=1280, height=720, fps=30):
+    rng = np.random.default_rng(0)
+    background = cv2.resize(rng.integers(0, 255, (18, 32, 3), dtype=np.uint8), (width, height))
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for i in range(frames):
+        frame = background.copy()
+        # Motion for 2 s out of every 10 s, static otherwise
+        x = 100 + (i % (10 * fps)) * 8 if i % (10 * fps) < 2 * fps else 100
+        cv2.rectangle(frame, (x, 200), (x + 300, 500), (255, 255, 255), -1)
+        noise = rng.integers(-3, 4, frame.shape)
+        writer.write(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    writer.release()
+
+
+def read_frames(path, step):
+    cap = cv2.VideoCapture(str(path))
+    frames, i = [], 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if i % step == 0:
+            frames.append(frame)
+        i += 1
+    cap.release()
+    return frames
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        video = args.video
+        if video is None:
+            video = Path(tmp) / "synthetic.avi"
+            write_synthetic(video, args.seconds * 30)
+        # One capture per second at 30 fps, as get_frames does with the default interval
+        frames = read_frames(video, args.step)
+    if not frames:
+        sys.exit(f"No frames read from {video}")
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames ({w}x{h}) from {args.video or 'synthetic clip'}\n")
+
+    if PIL is not None:
+        start = time.perf_counter()
+        old_bytes = sum(len(old_get_frame(f)["data"]) for f in frames)
+        old_s = time.perf_counter() - start
+        print(f"  old PIL path:   {old_s * 1000:8.1f} ms ({old_s / len(frames) * 1000:5.2f} ms/frame), "
+              f"{len(frames)} frames sent, {old_bytes / 1e3:8.0f} KB (base64)")
+    else:
+        print("  old PIL path:   skipped (Pillow not installed)")
+
+    pipeline = FramePipeline(quality=args.quality, max_bytes=args.max_bytes)
+    start = time.perf_counter()
+    new_bytes = 0
+    for i, frame in enumerate(frames):
+        jpeg = pipeline.process(frame, now=float(i * args.step) / 30)
+        if jpeg is not None:
+            new_bytes += len(jpeg)
+    new_s = time.perf_counter() - start
+    stats = pipeline.get_stats()
+    print(f"  FramePipeline:  {new_s * 1000:8.1f} ms ({new_s / len(frames) * 1000:5.2f} ms/frame), "
+          f"{stats['encoded']} frames sent, {new_bytes / 1e3:8.0f} KB (raw JPEG)")
+    print(f"  {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Camera frame pipeline benchmark")
+    parser.add_argument("--video", type=Path, default=None, help="recorded video file (default: synthetic)")
+    parser.add_argument("--seconds", type=int, default=120, help="length of the synthetic clip")
+    parser.add_argument("--step", type=int, default=30, help="use every Nth frame (30 = 1 fps from 30 fps)")
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--max-bytes", type=int, default=0)
+    main(parser.parse_args())
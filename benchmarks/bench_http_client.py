@@ -0,0 +1,119 @@
+"""
+Benchmark: per-sentence TTS request latency, fresh `requests.post` per call
+(the old TTS path, via asyncio.to_thread) vs. the pooled
+keep-alive HttpClient.
+
+A local stub server mimics the ElevenLabs streaming endpoint, optionally
+delaying the first byte of each *new connection* to model the TCP/TLS handshake
+a fresh connection pays on a real network.
+
+Usage:
+    python benchmarks/bench_http_client.py
+    python benchmarks/bench_http_client.py --sentences 50 --handshake-ms 40
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import requests
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from http_client import HttpClient
+
+AUDIO_BYTES = 24000 * 2  # ~1s of 24 kHz PCM per sentence
+
+
+async def start_stub(handshake_s):
+    seen = set()
+
+    async def tts(request):
+        # Charge the handshake once per connection
+        peer = request.transport.get_extra_info("peername")
+        if peer not in seen:
+            seen.add(peer)
+            await asyncio.sleep(handshake_s)
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for offset in range(0, AUDIO_BYTES, 4096):
+            await response.write(bytes(min(4096, AUDIO_BYTES - offset)))
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/text-to-speech/voice/stream", tts)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1/text-to-speech/voice/stream"
+
+
+def fresh_request(url, text):
+    start = time.perf_counter()
+    response = requests.post(url, json={"text": text}, stream=True)
+    first = None
+    for chunk in response.iter_content(chunk_size=1024):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+async def bench_fresh(url, sentences):
+    results = []
+    for i in range(sentences):
+        results.append(await asyncio.to_thread(fresh_request, url, f"sentence {i}"))
+    return results
+
+
+async def bench_pooled(url, sentences):
+    client = HttpClient()
+    results = []
+    for i in range(sentences):
+        start = time.perf_counter()
+        response = await client.request("POST", url, json={"text": f"sentence {i}"})
+        first = None
+        async for chunk in response.content.iter_chunked(1024):
+            if first is None:
+                first = time.perf_counter() - start
+        response.release()
+        results.append((first, time.perf_counter() - start))
+    stats = client.get_stats()
+    await client.close()
+    return results, stats
+
+
+def row(name, results, connections):
+    ttfb = [r[0] * 1000 for r in results]
+    total = [r[1] * 1000 for r in results]
+    print(f"{name:<22}{statistics.mean(ttfb):>10.2f}ms{sorted(ttfb)[int(len(ttfb) * 0.95) - 1]:>10.2f}ms"
+          f"{statistics.mean(total):>10.2f}ms{connections:>13}")
+
+
+async def main(args):
+    runner, url = await start_stub(args.handshake_ms / 1000)
+    try:
+        fresh = await bench_fresh(url, args.sentences)
+        pooled, stats = await bench_pooled(url, args.sentences)
+    finally:
+        await runner.cleanup()
+
+    print(f"{args.sentences} sentences, {AUDIO_BYTES} bytes each, simulated handshake {args.handshake_ms:.0f} ms\n")
+    header = f"{'client':<22}{'ttfb mean':>12}{'ttfb p95':>12}{'total':>12}{'connections':>13}"
+    print(header)
+    print("-" * len(header))
+    row("requests (fresh)", fresh, args.sentences)
+    row("HttpClient (pooled)", pooled, stats["connections_opened"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TTS request latency benchmark")
+    parser.add_argument("--sentences", type=int, default=30)
+    parser.add_argument("--handshake-ms", type=float, default=30.0,
+                        help="Extra first-request delay per new connection (0 = loopback only)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Benchmark: LOCAL provider time-to-first-token / time-to-first-sentence,
+blocking completion (old ask_local_llm) vs. SSE streaming.
+
+Runs offline against tests/stub_llm_server.py, which simulates prompt
+processing (`--first-token-ms`) and generation speed (`--token-ms`).
+
+Usage:
+    python benchmarks/bench_local_llm.py
+    python benchmarks/bench_local_llm.py --runs 10 --first-token-ms 400 --token-ms 30
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT))
+
+from http_client import HttpClient
+from local_llm import stream_chat_completion
+from tts_pipeline import SentenceSegmenter
+from tests.stub_llm_server import StubLLMServer
+
+MESSAGES = [{"role": "user", "content": "help me design a bracket"}]
+
+
+async def run_blocking(client, url):
+    start = time.perf_counter()
+    data = await client.post_json(f"{url}/v1/chat/completions", {"model": "m", "messages": MESSAGES})
+    elapsed = time.perf_counter() - start
+    assert data["choices"][0]["message"]["content"]
+    # The UI and TTS get nothing until the whole reply is back
+    return elapsed, elapsed, elapsed
+
+
+async def run_streaming(client, url):
+    start = time.perf_counter()
+    segmenter = SentenceSegmenter()
+    first_token = first_sentence = None
+    async for delta in stream_chat_completion(client, url, MESSAGES, "m"):
+        now = time.perf_counter() - start
+        if first_token is None:
+            first_token = now
+        if first_sentence is None and segmenter.feed(delta):
+            first_sentence = now
+    total = time.perf_counter() - start
+    return first_token, first_sentence or total, total
+
+
+async def main(args):
+    stub = StubLLMServer(first_token_delay=args.first_token_ms / 1000, token_interval=args.token_ms / 1000)
+    url = await stub.start()
+    client = HttpClient()
+    results = {"blocking": [], "streaming": []}
+    try:
+        for _ in range(args.runs):
+            results["blocking"].append(await run_blocking(client, url))
+            results["streaming"].append(await run_streaming(client, url))
+    finally:
+        await client.close()
+        await stub.stop()
+
+    print(f"{args.runs} runs, {len(stub.tokens())} tokens, first token after {args.first_token_ms:.0f} ms, "
+          f"{args.token_ms:.0f} ms/token\n")
+    header = f"{'mode':<12}{'first token':>14}{'first sentence':>17}{'complete':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, rows in results.items():
+        ttft, ttfs, total = (statistics.mean(col) * 1000 for col in zip(*rows))
+        print(f"{name:<12}{ttft:>12.1f}ms{ttfs:>15.1f}ms{total:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LOCAL provider TTFT benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    asyncio.run(main(parser.parse_args()))
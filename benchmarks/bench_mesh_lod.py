@@ -0,0 +1,60 @@
+"""
+Benchmark: bytes the CAD viewer downloads before showing a design, full STL
+vs. the coarse MVM1 preview, and the server time to build each level.
+
+The part is a finely tessellated build123d flange with filleted holes (needs build123d).
+
+Usage:
+    python benchmarks/bench_mesh_lod.py
+    python benchmarks/bench_mesh_lod.py --tolerance 0.002 --holes 48
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from mesh_lod import MeshLods, decode_mesh
+
+
+def build_part(path, holes, tolerance):
+    from math import cos, pi, sin
+
+    from build123d import Axis, BuildPart, Cylinder, Hole, Locations, Sphere, export_stl, fillet
+
+    with BuildPart() as p:
+        Cylinder(20, 40)
+        with Locations(*[(15 * cos(2 * pi * i / holes), 15 * sin(2 * pi * i / holes), 0) for i in range(holes)]):
+            Hole(1.5)
+        fillet(p.edges().group_by(Axis.Z)[-1], radius=0.4)
+        with Locations((0, 0, 20)):
+            Sphere(12)
+    export_stl(p.part, str(path), tolerance=tolerance, angular_tolerance=tolerance * 10)
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "output.stl"
+        build_part(path, args.holes, args.tolerance)
+        stl_size = path.stat().st_size
+        lods = MeshLods()
+        print(f"STL: {stl_size / 1e6:.1f} MB, {(stl_size - 84) // 50} triangles")
+        for level in range(lods.levels):
+            start = time.perf_counter()
+            data, final = lods.build(str(path), "bench", level)
+            elapsed = (time.perf_counter() - start) * 1000
+            faces = len(decode_mesh(data)[1])
+            print(f"  level {level}: {faces:8d} faces  {len(data) / 1e6:7.2f} MB  "
+                  f"({len(data) / stl_size:6.1%} of STL)  built in {elapsed:6.0f} ms{'  [full]' if final else ''}")
+            if final:
+                break
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CAD preview LOD benchmark")
+    parser.add_argument("--holes", type=int, default=24)
+    parser.add_argument("--tolerance", type=float, default=0.005, help="STL export tolerance (mm)")
+    main(parser.parse_args())
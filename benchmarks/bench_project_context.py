@@ -0,0 +1,106 @@
+"""
+Benchmark: building the project context for switch_project, old full walk +
+read of every text file vs. ProjectContextBuilder (cold, warm, one file changed),
+on a project with many files and a large chat log.
+
+Usage:
+    python benchmarks/bench_project_context.py
+    python benchmarks/bench_project_context.py --files 2000 --chat-lines 200000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from project_context import ProjectContextBuilder
+
+
+def old_project_context(project_name, project_path, max_file_size=10000):
+    """The previous ProjectManager.get_project_context."""
+    context_lines = [f"=== Project Context: '{project_name}' ==="]
+    context_lines.append(f"Project directory: {project_path}")
+    context_lines.append("")
+    all_files = []
+    for root, dirs, files in os.walk(project_path):
+        for f in files:
+            all_files.append(os.path.relpath(os.path.join(root, f), project_path))
+    context_lines.append(f"Files ({len(all_files)} total):")
+    for f in all_files:
+        context_lines.append(f"  - {f}")
+    context_lines.append("")
+    text_extensions = {'.txt', '.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md', '.html', '.css', '.jsonl'}
+    for rel_path in all_files:
+        if os.path.splitext(rel_path)[1].lower() not in text_extensions:
+            continue
+        full_path = project_path / rel_path
+        file_size = full_path.stat().st_size
+        if file_size > max_file_size:
+            context_lines.append(f"--- {rel_path} (too large: {file_size} bytes, skipped) ---")
+            continue
+        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+            context_lines.append(f"--- {rel_path} ---")
+            context_lines.append(f.read())
+            context_lines.append("")
+    return "\n".join(context_lines)
+
+
+def timed(fn, runs, before=None):
+    samples = []
+    result = None
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, result
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        project = Path(tmp) / "demo"
+        exts = [".py", ".md", ".json", ".txt", ".stl"]
+        for i in range(args.files):
+            sub = project / f"dir{i % 20}"
+            sub.mkdir(parents=True, exist_ok=True)
+            (sub / f"file{i}{exts[i % len(exts)]}").write_text(f"# file {i}\n" + "x" * args.file_bytes)
+        with open(project / "chat_history.jsonl", "w", encoding="utf-8") as f:
+            for i in range(args.chat_lines):
+                f.write(json.dumps({"timestamp": i, "sender": "User", "text": f"message {i}"}) + "\n")
+        print(f"{args.files} files of ~{args.file_bytes} B, chat log {args.chat_lines:,} lines\n")
+
+        old_ms, old = timed(lambda: old_project_context("demo", project), args.runs)
+
+        cold_ms, _ = timed(lambda: ProjectContextBuilder().build("demo", project), args.runs)
+        builder = ProjectContextBuilder()
+        builder.build("demo", project)
+        warm_ms, new = timed(lambda: builder.build("demo", project), args.runs)
+
+        changed = project / "dir0" / "file0.py"
+        counter = iter(range(1, 10 ** 6))
+        def touch():
+            st = changed.stat()
+            os.utime(changed, ns=(st.st_atime_ns, st.st_mtime_ns + next(counter) * 1_000_000_000))
+        one_ms, _ = timed(lambda: builder.build("demo", project), args.runs, before=touch)
+
+        print(f"Project context (median of {args.runs})")
+        print(f"  old walk + read all: {old_ms:9.2f} ms  {len(old) / 1e6:7.2f} MB")
+        print(f"  builder, cold:       {cold_ms:9.2f} ms")
+        print(f"  builder, warm:       {warm_ms:9.2f} ms  {len(new) / 1e6:7.2f} MB")
+        print(f"  builder, 1 changed:  {one_ms:9.2f} ms  (read {builder.files_read}, cached {builder.files_cached})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Project context build benchmark")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--file-bytes", type=int, default=2000)
+    parser.add_argument("--chat-lines", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=5)
+    main(parser.parse_args())
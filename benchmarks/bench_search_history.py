@@ -0,0 +1,94 @@
+"""
+Benchmark: recalling history with search_history vs. pasting it into the
+session. Reports index build / incremental sync / query latency, and the
+characters (~tokens) sent to the model for a memory upload and a recall.
+
+Usage:
+    python benchmarks/bench_search_history.py
+    python benchmarks/bench_search_history.py --messages 100000 --memory-kb 256
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from chat_log import ChatLogStore
+from search_index import SearchIndex, format_results
+
+WORDS = ("bracket hinge enclosure lid vent screw m3 m4 petg asa pla nozzle bed temperature wall thickness "
+         "fillet chamfer hole wider shorter print layer height infill support drone frame arm motor mount "
+         "camera gimbal battery clip the a to of and it make add remove try again looks good").split()
+
+
+def sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20)))
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main(args):
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        project = Path(tmp) / "demo"
+        project.mkdir()
+        with open(project / "chat_history.jsonl", "w", encoding="utf-8") as f:
+            for i in range(args.messages):
+                f.write(json.dumps({"timestamp": 1e9 + i, "sender": "User" if i % 2 else "ADA",
+                                    "text": sentence(rng)}) + "\n")
+        for i in range(args.files):
+            (project / f"notes_{i}.md").write_text("\n".join(sentence(rng) for _ in range(40)))
+        memory = "\n".join(f"[User]: {sentence(rng)}" for _ in range(args.memory_kb * 1024 // 80))
+
+        index = SearchIndex(Path(tmp) / "index.sqlite")
+        store = ChatLogStore(project)
+        start = time.perf_counter()
+        index.sync_chat("demo", store)
+        index.sync_files("demo", project)
+        index.add_memory("upload", memory)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        def append_and_sync():
+            with open(project / "chat_history.jsonl", "a", encoding="utf-8") as f:
+                for _ in range(10):
+                    f.write(json.dumps({"timestamp": time.time(), "sender": "User", "text": sentence(rng)}) + "\n")
+            index.sync_chat("demo", store)
+            index.sync_files("demo", project)
+
+        sync_ms = timed(append_and_sync, args.runs)
+        query = "what nozzle temperature did we use for the petg enclosure lid"
+        search_ms = timed(lambda: index.search("demo", query, limit=5), args.runs)
+        recall = format_results(query, index.search("demo", query, limit=5))
+        index.close()
+
+        history_dump = "\n".join(f"[{e['sender']}]: {e['text']}" for e in store.read_recent(10))
+        print(f"{args.messages:,} chat messages, {args.files} files, {len(memory) / 1e3:.0f} KB memory upload\n")
+        print(f"  initial index build:            {build_ms:9.1f} ms")
+        print(f"  sync 10 new messages + files:   {sync_ms:9.2f} ms")
+        print(f"  search (top 5):                 {search_ms:9.2f} ms\n")
+        print("Characters sent to the model (~4 chars/token)")
+        print(f"  memory upload pasted whole:     {len(memory):9,}")
+        print(f"  last-10 history dump:           {len(history_dump):9,}")
+        print(f"  search_history top 5:           {len(recall):9,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="search_history benchmark")
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--memory-kb", type=int, default=256)
+    parser.add_argument("--runs", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,88 @@
+"""
+Benchmark: server-side cost of handing an STL to the viewer, as base64 inside
+the `cad_data` JSON event vs. publishing it in StlStore and streaming it over
+HTTP (first download, then a revalidation that answers 304).
+
+Usage:
+    python benchmarks/bench_stl_transport.py
+    python benchmarks/bench_stl_transport.py --mb 50 --runs 5
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from cad_cache import sha256
+from stl_store import StlStore, URL_PREFIX
+
+
+def measure(fn, runs):
+    samples, peaks = [], []
+    for _ in range(runs):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(samples) * 1000, max(peaks) / 1e6, result
+
+
+def main(args):
+    store = StlStore()
+    app = FastAPI()
+
+    @app.get(URL_PREFIX + "/{etag}")
+    async def cad_stl(etag: str, request: Request):
+        return store.response(etag, request.headers.get("if-none-match"))
+
+    client = TestClient(app)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "output.stl")
+        with open(path, "wb") as f:
+            f.write(os.urandom(int(args.mb * 1e6)))
+
+        def inline():
+            with open(path, "rb") as f:
+                data = f.read()
+            return json.dumps({"format": "stl", "data": base64.b64encode(data).decode("utf-8"), "file_path": path})
+
+        def published():
+            with open(path, "rb") as f:
+                etag = sha256(f.read())  # CadAgent hashes the bytes it already holds
+            return json.dumps(store.publish(path, etag=etag))
+
+        inline_ms, inline_mb, inline_event = measure(inline, args.runs)
+        publish_ms, publish_mb, event = measure(published, args.runs)
+        url = json.loads(event)["url"]
+        etag = json.loads(event)["etag"]
+        download_ms, _, response = measure(lambda: client.get(url), args.runs)
+        assert len(response.content) == os.path.getsize(path)
+        revalidate_ms, _, response = measure(lambda: client.get(url, headers={"If-None-Match": f'"{etag}"'}), args.runs)
+        assert response.status_code == 304
+
+    print(f"STL: {args.mb:.0f} MB (median of {args.runs})")
+    print(f"  base64 JSON event:  {inline_ms:8.1f} ms  event {len(inline_event) / 1e6:7.2f} MB  peak alloc {inline_mb:6.1f} MB")
+    print(f"  publish + URL:      {publish_ms:8.1f} ms  event {len(event):7d} B   peak alloc {publish_mb:6.1f} MB")
+    print(f"  HTTP download:      {download_ms:8.1f} ms  (streamed from disk)")
+    print(f"  HTTP revalidation:  {revalidate_ms:8.1f} ms  (304, no body)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="STL transport benchmark")
+    parser.add_argument("--mb", type=float, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,88 @@
+"""
+Benchmark: tool dispatch, old receive_audio list scan + if/elif chain vs.
+ToolRegistry dict lookup, and sequential vs. gathered execution of one
+tool_call message.
+
+Usage:
+    python benchmarks/bench_tool_dispatch.py
+    python benchmarks/bench_tool_dispatch.py --lookups 500000 --io-ms 100
+"""
+import argparse
+import asyncio
+import sys
+import time
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from tool_registry import ToolRegistry
+
+# Same order as the old `fc.name in [...]` list and elif chain
+TOOL_NAMES = [
+    "generate_cad", "run_web_agent", "write_file", "read_directory", "read_file", "create_project",
+    "switch_project", "list_projects", "list_smart_devices", "control_light", "discover_printers", "print_stl",
+    "get_print_status", "iterate_cad", "type_text", "press_key", "click_mouse", "double_click", "move_mouse",
+    "scroll", "open_app", "close_app", "list_windows", "focus_window", "minimize_window", "maximize_window",
+    "start_nitrogen", "stop_nitrogen", "nitrogen_status",
+]
+
+
+def chain_lookup(name):
+    """The old path: list membership test, then a linear walk of the elif chain."""
+    if name in TOOL_NAMES:
+        for index, candidate in enumerate(TOOL_NAMES):
+            if name == candidate:
+                return index
+    return None
+
+
+def bench_lookup(registry, lookups):
+    print(f"Lookup ({lookups:,} per name)")
+    print(f"{'tool':<20}{'if/elif':>12}{'registry':>12}")
+    for name in ("generate_cad", "print_stl", "nitrogen_status", "unknown_tool"):
+        chain = timeit.timeit(lambda: chain_lookup(name), number=lookups) / lookups * 1e9
+        table = timeit.timeit(lambda: registry.get(name), number=lookups) / lookups * 1e9
+        print(f"{name:<20}{chain:>10.0f}ns{table:>10.0f}ns")
+    print()
+
+
+async def bench_execution(io_ms):
+    async def io_tool(args):
+        await asyncio.sleep(io_ms / 1000)
+        return "ok"
+
+    registry = ToolRegistry()
+    for name in ("discover_printers", "get_print_status", "list_smart_devices", "list_projects"):
+        registry.register(name, io_tool)
+    calls = [SimpleNamespace(id=str(i), name=name, args={}) for i, name in enumerate(registry.names())]
+
+    start = time.perf_counter()
+    for call in calls:
+        await registry.get(call.name).handler(call.args)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await registry.dispatch(calls)
+    gathered = time.perf_counter() - start
+
+    print(f"Execution ({len(calls)} read-only calls in one tool_call message, {io_ms:.0f} ms I/O each)")
+    print(f"  sequential: {sequential * 1000:7.1f} ms")
+    print(f"  gathered:   {gathered * 1000:7.1f} ms")
+
+
+def main(args):
+    registry = ToolRegistry()
+    for name in TOOL_NAMES:
+        registry.register(name, None)
+    bench_lookup(registry, args.lookups)
+    asyncio.run(bench_execution(args.io_ms))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tool dispatch micro-benchmark")
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--io-ms", type=float, default=50)
+    main(parser.parse_args())
@@ -102,9 +102,12 @@ function Dashboard() {
     const [cadData, setCadData] = useState(null);
     const [cadThoughts, setCadThoughts] = useState(''); // Streaming AI thoughts
     const [cadRetryInfo, setCadRetryInfo] = useState({ attempt: 1, maxAttempts: 3, error: null }); // Retry status
+    const [cadCandidates, setCadCandidates] = useState({}); // Candidate reports of the current attempt, by candidate number
     const [browserData, setBrowserData] = useState({ image: null, logs: [] });
     // showMemoryPrompt removed - memory is now actively saved to project
-    const [confirmationRequest, setConfirmationRequest] = useState(null); // { id, tool, args }
+    // Pending prompts: { id, tool, args, expires_in, requests: [{ id, tool, args }] }
+    const [confirmationQueue, setConfirmationQueue] = useState([]);
+    const confirmationRequest = confirmationQueue[0] || null;
     const [kasaDevices, setKasaDevices] = useState([]);
     const [showKasaWindow, setShowKasaWindow] = useState(false);
     const [showPrinterWindow, setShowPrinterWindow] = useState(false);
@@ -397,7 +400,8 @@ function Dashboard() {
             }
         });
         socket.on('audio_data', (data) => {
-            setAiAudioData(data.data);
+            // Binary payload: 'envelope' = one 0-255 level per bin, 'pcm_s16le' = raw bytes
+            setAiAudioData(Array.from(new Uint8Array(data.data)));
         });
         socket.on('auth_status', (data) => {
             console.log("Auth Status:", data);
@@ -450,8 +454,8 @@ function Dashboard() {
         });
         socket.on('cad_status', (data) => {
             console.log("Received CAD Status:", data);
-            // Extract retry info from extended payload
-            if (data.attempt) {
+            // Extract retry info from extended payload (candidate reports come on cad_candidate)
+            if (data.attempt && data.status !== 'candidate') {
                 setCadRetryInfo({
                     attempt: data.attempt,
                     maxAttempts: data.max_attempts || 3,
@@ -460,6 +464,7 @@ function Dashboard() {
             }
             if (data.status === 'generating' || data.status === 'retrying') {
                 setCadData({ format: 'loading' });
+                setCadCandidates({}); // A new attempt races new candidates
                 setShowCadWindow(true);
                 if (data.status === 'generating' && data.attempt === 1) {
                     setCadThoughts(''); // Clear previous thoughts for new generation
@@ -478,6 +483,10 @@ function Dashboard() {
                 setCadData({ format: 'loading' });
             }
         });
+        socket.on('cad_candidate', (data) => {
+            // { candidate, candidates, attempt, phase, model_s, exec_s, elapsed_s, error }
+            setCadCandidates(prev => ({ ...prev, [data.candidate]: data }));
+        });
         socket.on('cad_thought', (data) => {
             // Append streaming thought text
             setCadThoughts(prev => prev + data.text);
@@ -528,7 +537,7 @@ function Dashboard() {
         // Handle tool confirmation requests
         socket.on('tool_confirmation_request', (data) => {
             console.log("Received Confirmation Request:", data);
-            setConfirmationRequest(data);
+            setConfirmationQueue(prev => [...prev, data]);
         });
 
         // Handle Print Window Request (from CadWindow)
@@ -694,6 +703,7 @@ function Dashboard() {
             socket.off('audio_data');
             socket.off('cad_data');
             socket.off('cad_thought');
+            socket.off('cad_candidate');
             socket.off('cad_status');
             socket.off('browser_frame');
             socket.off('transcription');
@@ -1223,20 +1233,31 @@ function Dashboard() {
 
     // handleCancelClose removed - no longer using memory prompt
 
+    const dismissConfirmation = (id) => {
+        setConfirmationQueue(prev => prev.filter(request => request.id !== id));
+    };
+
     const handleConfirmTool = () => {
         if (confirmationRequest) {
             socket.emit('confirm_tool', { id: confirmationRequest.id, confirmed: true });
-            setConfirmationRequest(null);
+            dismissConfirmation(confirmationRequest.id);
         }
     };
 
     const handleDenyTool = () => {
         if (confirmationRequest) {
             socket.emit('confirm_tool', { id: confirmationRequest.id, confirmed: false });
-            setConfirmationRequest(null);
+            dismissConfirmation(confirmationRequest.id);
         }
     };
 
+    // The backend auto-denies unanswered prompts; drop them here too
+    useEffect(() => {
+        if (!confirmationRequest || !confirmationRequest.expires_in) return;
+        const timer = setTimeout(() => dismissConfirmation(confirmationRequest.id), confirmationRequest.expires_in * 1000);
+        return () => clearTimeout(timer);
+    }, [confirmationRequest]);
+
     // Updated Bounds Checking Logic
     const updateElementPosition = (id, dx, dy) => {
         setElementPositions(prev => {
@@ -1670,6 +1691,7 @@ function Dashboard() {
                                 data={cadData}
                                 thoughts={cadThoughts}
                                 retryInfo={cadRetryInfo}
+                                candidates={cadCandidates}
                                 onClose={() => setShowCadWindow(false)}
                                 socket={socket}
                             />
@@ -1,4 +1,4 @@
-import React, { useMemo, useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Canvas, useLoader, useFrame } from '@react-three/fiber';
 import { OrbitControls, Center, Stage } from '@react-three/drei';
 import * as THREE from 'three';
@@ -8,7 +8,7 @@ import { Printer } from 'lucide-react';
 const GeometryModel = ({ geometry }) => {
     return (
         <mesh geometry={geometry} castShadow receiveShadow>
-            <meshStandardMaterial color="#06b6d4" roughness={0.3} metalness={0.8} />
+            <meshStandardMaterial color="#06b6d4" roughness={0.3} metalness={0.8} flatShading />
         </mesh>
     );
 };
@@ -27,8 +27,47 @@ const LoadingCube = () => {
     );
 };
 
-const CadWindow = ({ data, thoughts, retryInfo = {}, onClose, socket }) => {
-    // data format: { format: "stl", data: "base64..." }
+// Decodes a preview LOD (MVM1: quantized positions + 16/32-bit indices, see backend/mesh_lod.py)
+const decodeMesh = (buffer) => {
+    const view = new DataView(buffer);
+    if (String.fromCharCode(...new Uint8Array(buffer, 0, 4)) !== 'MVM1') {
+        throw new Error('Not an MVM1 mesh');
+    }
+    const vertexCount = view.getUint32(4, true);
+    const faceCount = view.getUint32(8, true);
+    const wideIndices = view.getUint32(12, true) & 1;
+    const origin = [0, 1, 2].map(i => view.getFloat32(16 + i * 4, true));
+    const step = [0, 1, 2].map(i => view.getFloat32(28 + i * 4, true));
+
+    const quantized = new Uint16Array(buffer, 40, vertexCount * 3);
+    const positions = new Float32Array(vertexCount * 3);
+    for (let i = 0; i < positions.length; i++) {
+        positions[i] = origin[i % 3] + quantized[i] * step[i % 3];
+    }
+    let offset = 40 + vertexCount * 6;
+    offset += (4 - offset % 4) % 4;
+    const index = wideIndices
+        ? new Uint32Array(buffer, offset, faceCount * 3)
+        : new Uint16Array(buffer, offset, faceCount * 3);
+
+    const geom = new THREE.BufferGeometry();
+    geom.setAttribute('position', new THREE.BufferAttribute(positions, 3));
+    geom.setIndex(new THREE.BufferAttribute(index, 1));
+    return geom;
+};
+
+// Parsed geometries by STL etag, most recent last
+const geometryCache = new Map();
+const GEOMETRY_CACHE_SIZE = 8;
+
+const CANDIDATE_COLORS = {
+    succeeded: 'text-green-400',
+    failed: 'text-red-400',
+    cancelled: 'text-gray-500',
+};
+
+const CadWindow = ({ data, thoughts, retryInfo = {}, candidates = {}, onClose, socket }) => {
+    // data format: { format: "stl", url: "/cad/stl/<etag>", etag, size }
     const [isIterating, setIsIterating] = useState(false);
     const [prompt, setPrompt] = useState("");
     const [isSending, setIsSending] = useState(false);
@@ -46,28 +85,77 @@ const CadWindow = ({ data, thoughts, retryInfo = {}, onClose, socket }) => {
         }
     }, [thoughts]);
 
-    const geometry = useMemo(() => {
-        if (!data || data.format !== 'stl' || !data.data) return null;
+    // STLs arrive as { format: "stl", url, etag, lods }; the same etag is never fetched or parsed twice
+    const [geometry, setGeometry] = useState(null);
+    useEffect(() => {
+        if (!data || data.format !== 'stl') {
+            setGeometry(null);
+            return;
+        }
+        if (data.etag && geometryCache.has(data.etag)) {
+            const cached = geometryCache.get(data.etag);
+            geometryCache.delete(data.etag);
+            geometryCache.set(data.etag, cached);
+            setGeometry(cached);
+            return;
+        }
+
+        const controller = new AbortController();
+        // Same origin as the Socket.IO connection (the backend), not the page
+        const fetchBuffer = async (path) => {
+            const response = await fetch(new URL(path, socket?.io?.uri || window.location.origin), { signal: controller.signal });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return { buffer: await response.arrayBuffer(), final: response.headers.get('X-Mesh-Final') === '1' };
+        };
+        const show = (geom) => {
+            geom.center();
+            if (!controller.signal.aborted) setGeometry(geom);
+        };
+        const remember = (geom) => {
+            if (!data.etag) return;
+            geometryCache.set(data.etag, geom);
+            if (geometryCache.size > GEOMETRY_CACHE_SIZE) {
+                geometryCache.delete(geometryCache.keys().next().value);
+            }
+        };
 
-        try {
-            // Convert Base64 to ArrayBuffer
-            const byteCharacters = atob(data.data);
-            const byteNumbers = new Array(byteCharacters.length);
-            for (let i = 0; i < byteCharacters.length; i++) {
-                byteNumbers[i] = byteCharacters.charCodeAt(i);
+        const load = async () => {
+            if (data.lods?.length) {
+                // Coarse preview first, then each refinement as it arrives
+                try {
+                    let geom = null;
+                    for (const lod of data.lods) {
+                        const { buffer, final } = await fetchBuffer(lod.url);
+                        geom = decodeMesh(buffer);
+                        show(geom);
+                        if (final) break;
+                    }
+                    remember(geom);
+                    return;
+                } catch (e) {
+                    if (e.name === 'AbortError') throw e;
+                    console.warn("CAD preview unavailable, loading the full STL:", e);
+                }
             }
-            const byteArray = new Uint8Array(byteNumbers);
-
-            // Parse directly using THREE.STLLoader
-            const loader = new STLLoader();
-            const geom = loader.parse(byteArray.buffer);
-            geom.center(); // Optional: Center the geometry
-            return geom;
-        } catch (e) {
-            console.error("Failed to decode/parse STL:", e);
-            return null;
-        }
-    }, [data]);
+            let buffer;
+            if (data.url) {
+                buffer = (await fetchBuffer(data.url)).buffer;
+            } else if (data.data) {
+                // Older payloads with the STL inline as base64
+                buffer = Uint8Array.from(atob(data.data), c => c.charCodeAt(0)).buffer;
+            } else {
+                return;
+            }
+            const geom = new STLLoader().parse(buffer);
+            show(geom);
+            remember(geom);
+        };
+
+        load().catch(e => {
+            if (e.name !== 'AbortError') console.error("Failed to load/parse STL:", e);
+        });
+        return () => controller.abort();
+    }, [data, socket]);
 
     const handleGenerate = () => {
         if (!prompt.trim()) return;
@@ -215,6 +303,19 @@ const CadWindow = ({ data, thoughts, retryInfo = {}, onClose, socket }) => {
                             <span className="text-red-500 font-bold">⚠ Error:</span> {retryInfo.error}
                         </div>
                     )}
+                    {Object.keys(candidates).length > 0 && (
+                        <div className="mb-2 space-y-0.5 text-[10px] font-mono">
+                            {Object.values(candidates).map(c => (
+                                <div key={c.candidate} className={CANDIDATE_COLORS[c.phase] || 'text-cyan-400'}>
+                                    #{c.candidate} {c.phase}
+                                    {c.model_s != null && ` · model ${c.model_s}s`}
+                                    {c.exec_s != null && ` · run ${c.exec_s}s`}
+                                    {c.elapsed_s != null && ` · after ${c.elapsed_s}s`}
+                                    {c.error && ` · ${c.error}`}
+                                </div>
+                            ))}
+                        </div>
+                    )}
                     <div className="flex-1 overflow-y-auto text-green-400/80 text-xs font-mono whitespace-pre-wrap leading-relaxed scrollbar-thin scrollbar-thumb-green-500/30">
                         {thoughts}
                         <div ref={thoughtsEndRef} />
@@ -3,6 +3,9 @@ import React from 'react';
 const ConfirmationPopup = ({ request, onConfirm, onDeny }) => {
     if (!request) return null;
 
+    // Several tool calls from one model turn share a single prompt
+    const calls = request.requests && request.requests.length ? request.requests : [request];
+
     return (
         <div className="fixed inset-0 z-[200] flex items-center justify-center bg-black/60 backdrop-blur-sm animate-fade-in">
             <div className="relative w-full max-w-lg p-8 bg-black/90 border border-cyan-500/30 rounded-3xl shadow-[0_0_50px_rgba(34,211,238,0.15)] backdrop-blur-2xl transform transition-all scale-100">
@@ -29,28 +32,32 @@ const ConfirmationPopup = ({ request, onConfirm, onDeny }) => {
                         The system is requesting permission to execute an autonomous function. Please review the parameters below.
                     </p>
 
-                    <div className="space-y-2">
-                        <div className="bg-cyan-950/30 border border-cyan-800/50 rounded-xl overflow-hidden">
-                            <div className="bg-cyan-900/40 px-4 py-2 border-b border-cyan-800/50 flex justify-between items-center">
-                                <span className="text-xs text-cyan-400 font-bold uppercase tracking-wider">Function</span>
-                                <span className="text-xs text-white/50 font-mono">system.call</span>
-                            </div>
-                            <div className="p-4">
-                                <div className="text-white font-mono text-lg font-medium">{request.tool}</div>
-                            </div>
-                        </div>
+                    <div className="space-y-2 max-h-[50vh] overflow-y-auto">
+                        {calls.map((call) => (
+                            <div key={call.id} className="space-y-2">
+                                <div className="bg-cyan-950/30 border border-cyan-800/50 rounded-xl overflow-hidden">
+                                    <div className="bg-cyan-900/40 px-4 py-2 border-b border-cyan-800/50 flex justify-between items-center">
+                                        <span className="text-xs text-cyan-400 font-bold uppercase tracking-wider">Function</span>
+                                        <span className="text-xs text-white/50 font-mono">system.call</span>
+                                    </div>
+                                    <div className="p-4">
+                                        <div className="text-white font-mono text-lg font-medium">{call.tool}</div>
+                                    </div>
+                                </div>
 
-                        <div className="bg-cyan-950/30 border border-cyan-800/50 rounded-xl overflow-hidden">
-                            <div className="bg-cyan-900/40 px-4 py-2 border-b border-cyan-800/50 flex justify-between items-center">
-                                <span className="text-xs text-cyan-400 font-bold uppercase tracking-wider">Parameters</span>
-                                <span className="text-xs text-white/50 font-mono">json.payload</span>
-                            </div>
-                            <div className="p-4 bg-black/20">
-                                <pre className="text-xs text-gray-300 font-mono overflow-x-auto whitespace-pre-wrap leading-relaxed">
-                                    {JSON.stringify(request.args, null, 2)}
-                                </pre>
+                                <div className="bg-cyan-950/30 border border-cyan-800/50 rounded-xl overflow-hidden">
+                                    <div className="bg-cyan-900/40 px-4 py-2 border-b border-cyan-800/50 flex justify-between items-center">
+                                        <span className="text-xs text-cyan-400 font-bold uppercase tracking-wider">Parameters</span>
+                                        <span className="text-xs text-white/50 font-mono">json.payload</span>
+                                    </div>
+                                    <div className="p-4 bg-black/20">
+                                        <pre className="text-xs text-gray-300 font-mono overflow-x-auto whitespace-pre-wrap leading-relaxed">
+                                            {JSON.stringify(call.args, null, 2)}
+                                        </pre>
+                                    </div>
+                                </div>
                             </div>
-                        </div>
+                        ))}
                     </div>
                 </div>
 
@@ -60,13 +67,13 @@ const ConfirmationPopup = ({ request, onConfirm, onDeny }) => {
                         onClick={onDeny}
                         className="flex-1 px-4 py-3.5 rounded-xl border border-red-500/30 bg-red-950/40 text-red-400 hover:bg-red-900/60 hover:border-red-500 hover:text-red-300 transition-all duration-200 font-bold tracking-wider uppercase text-xs"
                     >
-                        Deny Request
+                        {calls.length > 1 ? 'Deny All' : 'Deny Request'}
                     </button>
                     <button
                         onClick={onConfirm}
                         className="flex-1 px-4 py-3.5 rounded-xl border border-cyan-500/30 bg-cyan-950/40 text-cyan-400 hover:bg-cyan-900/60 hover:border-cyan-400 hover:text-cyan-300 transition-all duration-200 font-bold tracking-wider uppercase text-xs shadow-[0_0_20px_rgba(34,211,238,0.1)] hover:shadow-[0_0_30px_rgba(34,211,238,0.25)] relative overflow-hidden group"
                     >
-                        <span className="relative z-10">Authorize Execution</span>
+                        <span className="relative z-10">{calls.length > 1 ? `Authorize All (${calls.length})` : 'Authorize Execution'}</span>
                         <div className="absolute inset-0 bg-cyan-400/10 translate-y-full group-hover:translate-y-0 transition-transform duration-300"></div>
                     </button>
                 </div>
@@ -11,6 +11,7 @@ const TOOLS = [
     { id: 'create_project', label: 'Create Project' },
     { id: 'switch_project', label: 'Switch Project' },
     { id: 'list_projects', label: 'List Projects' },
+    { id: 'search_history', label: 'Search History' },
     { id: 'list_smart_devices', label: 'List Devices' },
     { id: 'control_light', label: 'Control Light' },
     { id: 'discover_printers', label: 'Discover Printers' },
@@ -38,6 +39,7 @@ const SettingsWindow = ({
 }) => {
     const [permissions, setPermissions] = useState({});
     const [faceAuthEnabled, setFaceAuthEnabled] = useState(false);
+    const [cadCandidates, setCadCandidates] = useState(1);
 
     useEffect(() => {
         // Request initial permissions
@@ -48,6 +50,7 @@ const SettingsWindow = ({
             console.log("Received settings:", settings);
             if (settings) {
                 if (settings.tool_permissions) setPermissions(settings.tool_permissions);
+                if (settings.cad_candidates) setCadCandidates(settings.cad_candidates);
                 if (typeof settings.face_auth_enabled !== 'undefined') {
                     setFaceAuthEnabled(settings.face_auth_enabled);
                     localStorage.setItem('face_auth_enabled', settings.face_auth_enabled);
@@ -82,6 +85,11 @@ const SettingsWindow = ({
         socket.emit('update_settings', { face_auth_enabled: newVal });
     };
 
+    const changeCadCandidates = (value) => {
+        setCadCandidates(value);
+        socket.emit('update_settings', { cad_candidates: value });
+    };
+
     const toggleCameraFlip = () => {
         const newVal = !isCameraFlipped;
         setIsCameraFlipped(newVal);
@@ -194,6 +202,23 @@ const SettingsWindow = ({
                 </div>
             </div>
 
+            {/* CAD Section */}
+            <div className="mb-6">
+                <div className="flex justify-between mb-2">
+                    <h3 className="text-cyan-400 font-bold text-xs uppercase tracking-wider opacity-80">CAD Candidates</h3>
+                    <span className="text-xs text-cyan-500">{cadCandidates === 1 ? 'serial' : `${cadCandidates} in parallel`}</span>
+                </div>
+                <input
+                    type="range"
+                    min="1"
+                    max="4"
+                    step="1"
+                    value={cadCandidates}
+                    onChange={(e) => changeCadCandidates(parseInt(e.target.value, 10))}
+                    className="w-full accent-cyan-400 cursor-pointer h-1 bg-gray-800 rounded-lg appearance-none"
+                />
+            </div>
+
             {/* Tool Permissions Section */}
             <div className="mb-6">
                 <h3 className="text-cyan-400 font-bold mb-3 text-xs uppercase tracking-wider opacity-80">Tool Confirmations</h3>
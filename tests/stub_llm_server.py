@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+OpenAI-compatible stub server for offline LOCAL-provider tests and benchmarks.
+
+Answers /v1/chat/completions with a canned reply, either as one JSON body or,
+with `stream: true`, as SSE chunks spaced `token_interval` apart after an
+initial `first_token_delay`. Also serves /v1/models.
+
+With `prompt_token_delay` set, prompt processing is simulated like a local
+server with a KV cache: only the part of the prompt after the prefix shared
+with the previous request costs time, and each request's token counts are
+recorded in `prompt_stats`.
+
+Usage:
+    python tests/stub_llm_server.py --port 1234 --first-token-ms 300 --token-ms 20
+    LM_STUDIO_URL=http://127.0.0.1:1234 AI_PROVIDER=LOCAL python backend/server.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+
+from aiohttp import web
+
+DEFAULT_REPLY = (
+    "Sure, I can help with that. The bracket needs two mounting holes, 5 mm each. "
+    "I'd start with a 3 mm wall and adjust after a test print. Want me to generate it?"
+)
+
+
+class StubLLMServer:
+    def __init__(self, reply: str = DEFAULT_REPLY, first_token_delay: float = 0.2, token_interval: float = 0.01,
+                 model: str = "stub-model", prompt_token_delay: float = 0.0):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_interval = token_interval
+        self.model = model
+        self.prompt_token_delay = prompt_token_delay
+        self.requests = []
+        self.prompt_stats = []
+        self._cached_prompt = ""
+        self.runner = None
+        self.url = None
+
+    def tokens(self):
+        # Word-ish tokens that keep their leading whitespace, like real deltas
+        return re.findall(r"\s*\S+", self.reply)
+
+    def process_prompt(self, messages) -> float:
+        """Returns the simulated prompt-processing time; the shared prefix with the last prompt is free."""
+        prompt = "".join(f"<|{m.get('role')}|>{m.get('content')}<|end|>" for m in messages)
+        cached = len(os.path.commonprefix([self._cached_prompt, prompt]))
+        self._cached_prompt = prompt
+        # ~4 characters per token
+        prompt_tokens = -(-len(prompt) // 4)
+        cached_tokens = cached // 4
+        seconds = (prompt_tokens - cached_tokens) * self.prompt_token_delay
+        self.prompt_stats.append({"prompt_tokens": prompt_tokens, "cached_tokens": cached_tokens,
+                                  "prompt_ms": seconds * 1000})
+        return seconds
+
+    async def models(self, request):
+        return web.json_response({"object": "list", "data": [{"id": self.model, "object": "model"}]})
+
+    async def chat(self, request):
+        body = await request.json()
+        self.requests.append(body)
+        created = int(time.time())
+        await asyncio.sleep(self.first_token_delay + self.process_prompt(body.get("messages") or []))
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.token_interval * len(self.tokens()))
+            return web.json_response({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": created, "model": self.model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": self.reply},
+                             "finish_reason": "stop"}],
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        for i, token in enumerate(self.tokens()):
+            if i:
+                await asyncio.sleep(self.token_interval)
+            chunk = {
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": self.model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        done = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": self.model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        await response.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode())
+        await response.write_eof()
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_post("/v1/chat/completions", self.chat)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--prompt-token-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    stub = StubLLMServer(first_token_delay=args.first_token_ms / 1000, token_interval=args.token_ms / 1000,
+                         prompt_token_delay=args.prompt_token_ms / 1000)
+    web.run_app(stub.app(), host="127.0.0.1", port=args.port)
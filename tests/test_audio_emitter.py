@@ -0,0 +1,85 @@
+"""
+Tests for the binary, coalesced audio_data emitter.
+"""
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from audio_emitter import AudioDataEmitter, rms_envelope
+
+
+def pcm_chunk(amplitude=8000, n=1024):
+    t = np.arange(n) / 24000
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype("<i2").tobytes()
+
+
+class RecordingEmit:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, event, payload):
+        self.calls.append((event, payload))
+
+
+class TestEnvelope:
+    """Test RMS envelope downsampling."""
+
+    def test_envelope_size_and_range(self):
+        env = rms_envelope(pcm_chunk(), bins=64)
+        assert len(env) == 64
+        assert max(env) > 0
+
+    def test_silence_is_zero(self):
+        assert rms_envelope(bytes(2048), bins=16) == bytes(16)
+
+    def test_short_buffer(self):
+        assert len(rms_envelope(pcm_chunk(n=10), bins=64)) == 64
+
+
+class TestAudioDataEmitter:
+    """Test coalescing and payload modes."""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_burst_into_one_emit(self):
+        emit = RecordingEmit()
+        emitter = AudioDataEmitter(emit, mode="pcm", interval=0.02)
+        emitter.start()
+        chunks = [pcm_chunk() for _ in range(5)]
+        for c in chunks:
+            emitter.push(c)
+        await asyncio.sleep(0.08)
+        emitter.stop()
+
+        assert len(emit.calls) == 1
+        event, payload = emit.calls[0]
+        assert event == "audio_data"
+        assert isinstance(payload["data"], bytes)
+        assert payload["data"] == b"".join(chunks)
+
+    @pytest.mark.asyncio
+    async def test_envelope_mode_cuts_egress(self):
+        emit = RecordingEmit()
+        emitter = AudioDataEmitter(emit, mode="envelope", interval=0.01, bins=64)
+        chunk = pcm_chunk()
+        emitter.push(chunk)
+        await emitter.flush()
+
+        payload = emit.calls[0][1]
+        assert payload["format"] == "envelope"
+        assert len(payload["data"]) == 64
+
+        # Legacy JSON list-of-ints payload for the same chunk
+        legacy = len(json.dumps({"data": list(chunk)}))
+        assert legacy / len(payload["data"]) > 10
+
+    @pytest.mark.asyncio
+    async def test_configure_switches_mode(self):
+        emit = RecordingEmit()
+        emitter = AudioDataEmitter(emit, mode="envelope")
+        emitter.configure(mode="pcm", interval=0.1, bins=32)
+        assert emitter.mode == "pcm"
+        assert emitter.interval == 0.1
+        emitter.configure(mode="bogus")
+        assert emitter.mode == "pcm"
@@ -0,0 +1,301 @@
+"""
+Tests for the callback-mode audio I/O layer.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from audio_io import RingBuffer, CaptureStream, PlaybackStream, PlaybackBuffer, PA_CONTINUE
+
+CHUNK = 4  # frames
+CHUNK_BYTES = CHUNK * 2
+
+
+class FakeStream:
+    def __init__(self, callback):
+        self.callback = callback
+        self.closed = False
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakePyAudio:
+    """Opens streams without a device; tests drive the callback directly."""
+
+    def __init__(self):
+        self.stream = None
+        self.open_kwargs = None
+
+    def open(self, **kwargs):
+        self.open_kwargs = kwargs
+        self.stream = FakeStream(kwargs["stream_callback"])
+        return self.stream
+
+
+class TestRingBuffer:
+    """Test the SPSC byte ring."""
+
+    def test_write_read_roundtrip(self):
+        ring = RingBuffer(16)
+        assert ring.write(b"abcdef") == 6
+        assert len(ring) == 6
+        assert ring.read(4) == b"abcd"
+        assert ring.read(10) == b"ef"
+        assert ring.read(1) == b""
+
+    def test_wraparound(self):
+        ring = RingBuffer(8)
+        ring.write(b"123456")
+        ring.read(5)
+        ring.write(b"abcdef")  # wraps past the end of the backing array
+        assert ring.read(7) == b"6abcdef"
+
+    def test_overflow_is_counted_not_overwritten(self):
+        ring = RingBuffer(4)
+        assert ring.write(b"abcdef") == 4
+        assert ring.overflow_bytes == 2
+        assert ring.read(4) == b"abcd"
+
+    def test_skip_to_only_drops_older_data(self):
+        ring = RingBuffer(16)
+        ring.write(b"old!")
+        mark = ring.write_position
+        ring.write(b"new")
+        ring.skip_to(mark)
+        assert ring.read(16) == b"new"
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            RingBuffer(0)
+
+
+class TestCaptureStream:
+    """Test batched draining of the microphone ring."""
+
+    @pytest.mark.asyncio
+    async def test_batches_complete_chunks(self):
+        pa = FakePyAudio()
+        capture = CaptureStream(pa, rate=16000, chunk_size=CHUNK)
+        capture.bind_loop()
+        capture.open()
+        assert pa.open_kwargs["input"] is True
+
+        # Three callbacks land before the loop gets to run
+        for i in range(3):
+            result = pa.stream.callback(bytes([i]) * CHUNK_BYTES, CHUNK, {}, 0)
+            assert result == (None, PA_CONTINUE)
+
+        chunks = await capture.read_chunks()
+        assert chunks == [bytes([0]) * CHUNK_BYTES, bytes([1]) * CHUNK_BYTES, bytes([2]) * CHUNK_BYTES]
+
+    @pytest.mark.asyncio
+    async def test_wakes_from_another_thread(self):
+        pa = FakePyAudio()
+        capture = CaptureStream(pa, rate=16000, chunk_size=CHUNK)
+        capture.bind_loop()
+        capture.open()
+
+        reader = asyncio.create_task(capture.read_chunks())
+        await asyncio.sleep(0)
+        assert not reader.done()
+
+        await asyncio.to_thread(pa.stream.callback, b"\x01" * CHUNK_BYTES, CHUNK, {}, 0)
+        chunks = await asyncio.wait_for(reader, 1.0)
+        assert len(chunks) == 1
+
+    @pytest.mark.asyncio
+    async def test_discard_drops_audio(self):
+        pa = FakePyAudio()
+        capture = CaptureStream(pa, rate=16000, chunk_size=CHUNK)
+        capture.bind_loop()
+        capture.open()
+        pa.stream.callback(b"\x01" * CHUNK_BYTES, CHUNK, {}, 0)
+        capture.discard()
+        assert len(capture.ring) == 0
+        capture.close()
+        assert pa.stream.closed
+
+
+class TestPlaybackStream:
+    """Test the speaker ring and its callback."""
+
+    @pytest.mark.asyncio
+    async def test_callback_pads_underrun_with_silence(self):
+        pa = FakePyAudio()
+        playback = PlaybackStream(pa, rate=24000, chunk_size=CHUNK)
+        playback.bind_loop()
+        playback.open()
+
+        await playback.write(b"\x07" * 6)
+        out, flag = pa.stream.callback(None, CHUNK, {}, 0)
+        assert out == b"\x07" * 6 + b"\x00" * 2
+        assert flag == PA_CONTINUE
+        assert playback.underruns == 1
+
+    @pytest.mark.asyncio
+    async def test_clear_drops_queued_audio_only(self):
+        pa = FakePyAudio()
+        playback = PlaybackStream(pa, rate=24000, chunk_size=CHUNK)
+        playback.bind_loop()
+        playback.open()
+
+        await playback.write(b"\x01" * CHUNK_BYTES)
+        playback.clear()
+        await playback.write(b"\x02" * CHUNK_BYTES)
+        out, _ = pa.stream.callback(None, CHUNK, {}, 0)
+        assert out == b"\x02" * CHUNK_BYTES
+
+    @pytest.mark.asyncio
+    async def test_write_waits_for_space(self):
+        pa = FakePyAudio()
+        playback = PlaybackStream(pa, rate=1000, chunk_size=CHUNK, buffer_ms=1)
+        playback.bind_loop()
+        playback.open()
+        capacity = playback.ring.capacity
+
+        writer = asyncio.create_task(playback.write(b"\x03" * (capacity + CHUNK_BYTES)))
+        await asyncio.sleep(0.01)
+        assert not writer.done()
+
+        await asyncio.to_thread(pa.stream.callback, None, CHUNK, {}, 0)
+        await asyncio.wait_for(writer, 1.0)
+        assert len(playback.ring) == capacity
+
+
+class TestPlaybackBuffer:
+    """Test the bounded jitter buffer with synthetic producers."""
+
+    # 1000 Hz mono int16 -> 2 bytes per ms
+    RATE = 1000
+
+    def make(self, **kwargs):
+        kwargs.setdefault("sample_rate", self.RATE)
+        kwargs.setdefault("max_bytes", 200)
+        kwargs.setdefault("target_ms", 0)
+        buf = PlaybackBuffer(**kwargs)
+        buf.bind_loop()
+        return buf
+
+    @pytest.mark.asyncio
+    async def test_fast_producer_drops_oldest(self):
+        buf = self.make(max_bytes=40)
+        for i in range(10):
+            buf.put_nowait(bytes([i]) * 10)
+
+        assert buf.buffered_bytes == 40
+        assert buf.overruns == 6
+        assert buf.dropped_bytes == 60
+        assert await buf.get() == bytes([6]) * 10
+
+    @pytest.mark.asyncio
+    async def test_async_put_applies_backpressure(self):
+        buf = self.make(max_bytes=20)
+        await buf.put(b"a" * 20)
+        writer = asyncio.create_task(buf.put(b"b" * 10))
+        await asyncio.sleep(0.01)
+        assert not writer.done()
+
+        assert await buf.get() == b"a" * 20
+        await asyncio.wait_for(writer, 1.0)
+        assert buf.overruns == 0
+        assert await buf.get() == b"b" * 10
+
+    @pytest.mark.asyncio
+    async def test_thread_producer_blocks_until_consumed(self):
+        buf = self.make(max_bytes=30)
+        chunks = [bytes([i]) * 10 for i in range(20)]
+
+        def produce():
+            for c in chunks:
+                assert buf.put_blocking(c, timeout=2)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        received = []
+        while len(received) < len(chunks):
+            received.append(await asyncio.wait_for(buf.get(), 1.0))
+            assert buf.buffered_bytes <= 30
+        producer.join()
+
+        assert received == chunks
+        assert buf.overruns == 0
+
+    @pytest.mark.asyncio
+    async def test_put_blocking_times_out(self):
+        buf = self.make(max_bytes=10)
+        buf.put_nowait(b"x" * 10)
+        ok = await asyncio.to_thread(buf.put_blocking, b"y" * 10, 0.01)
+        assert ok is False
+        assert buf.overruns == 1
+
+    @pytest.mark.asyncio
+    async def test_jitter_depth_holds_first_chunk(self):
+        buf = self.make(target_ms=20)  # 40 bytes
+        buf.put_nowait(b"a" * 10)
+        getter = asyncio.create_task(buf.get())
+        await asyncio.sleep(0.005)
+        assert not getter.done()
+
+        buf.put_nowait(b"b" * 30)
+        assert await asyncio.wait_for(getter, 1.0) == b"a" * 10
+        # Primed: the rest plays without waiting
+        assert await asyncio.wait_for(buf.get(), 0.005) == b"b" * 30
+
+    @pytest.mark.asyncio
+    async def test_jitter_depth_times_out_for_short_replies(self):
+        buf = self.make(target_ms=20)
+        buf.put_nowait(b"a" * 4)
+        start = time.monotonic()
+        assert await asyncio.wait_for(buf.get(), 1.0) == b"a" * 4
+        assert time.monotonic() - start >= 0.015
+
+    @pytest.mark.asyncio
+    async def test_slow_producer_counts_underruns(self):
+        buf = self.make(underrun_window=1.0)
+
+        async def produce():
+            for i in range(4):
+                await buf.put(bytes([i]) * 4)
+                await asyncio.sleep(0.01)
+
+        producer = asyncio.create_task(produce())
+        for _ in range(4):
+            await asyncio.wait_for(buf.get(), 1.0)
+        await producer
+
+        # The consumer ran dry before each of the three later chunks
+        assert buf.underruns == 3
+
+    @pytest.mark.asyncio
+    async def test_gap_after_utterance_is_not_an_underrun(self):
+        buf = self.make(underrun_window=0.01)
+        buf.put_nowait(b"a" * 4)
+        await buf.get()
+        await asyncio.sleep(0.03)
+        buf.put_nowait(b"b" * 4)
+        await buf.get()
+        assert buf.underruns == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_drops_everything_and_frees_producers(self):
+        buf = self.make(max_bytes=20)
+        for _ in range(2):
+            buf.put_nowait(b"z" * 10)
+        writer = asyncio.create_task(buf.put(b"n" * 10))
+        await asyncio.sleep(0.005)
+
+        assert buf.flush() == 2
+        await asyncio.wait_for(writer, 1.0)
+        assert await buf.get() == b"n" * 10
+
+        stats = buf.get_stats()
+        assert stats["flushes"] == 1
+        assert stats["flushed_bytes"] == 20
+        assert stats["dropped_bytes"] == 0
+        assert stats["bytes_out"] == 10
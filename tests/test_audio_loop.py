@@ -0,0 +1,270 @@
+"""
+Tests for AudioLoop session handling, on a bare AudioLoop (no devices, agents or network).
+"""
+import asyncio
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+brain = pytest.importorskip("brain", reason="brain needs pyaudio and the Gemini SDK")
+
+from cad_agent import CadAgent
+from cad_worker import CadWorkerPool
+from confirmations import ConfirmationScheduler
+from chat_log import ChatLogWriter
+from http_client import HttpClient
+from project_manager import ProjectManager
+from tool_registry import ToolRegistry
+from tts_pipeline import SentenceSegmenter
+
+
+class FakeSession:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, input=None, end_of_turn=False):
+        self.sent.append((input, end_of_turn))
+
+
+class StreamingSession:
+    """Live session with one turn of audio chunks and a tool call after the first few; then silence."""
+
+    def __init__(self, calls, chunks=20, tool_call_at=3, interval=0.005):
+        self.calls = calls
+        self.chunks = chunks
+        self.tool_call_at = tool_call_at
+        self.interval = interval
+        self.turns = 0
+        self.drained = asyncio.Event()
+        self.tool_responses = []
+
+    async def receive(self):
+        self.turns += 1
+        if self.turns > 1:
+            self.drained.set()
+            await asyncio.Event().wait()
+        for i in range(self.chunks):
+            if i == self.tool_call_at:
+                yield SimpleNamespace(data=None, server_content=None,
+                                      tool_call=SimpleNamespace(function_calls=self.calls))
+            yield SimpleNamespace(data=b"\x00" * 960, server_content=None, tool_call=None)
+            await asyncio.sleep(self.interval)
+
+    async def send_tool_response(self, function_responses):
+        self.tool_responses.append(function_responses)
+
+
+class RecordingQueue:
+    """Playback queue that notes whether a confirmation was pending as each chunk arrived."""
+
+    def __init__(self, confirmations):
+        self.confirmations = confirmations
+        self.chunks = []
+        self.while_pending = 0
+
+    def put_nowait(self, data):
+        self.chunks.append(data)
+        self.while_pending += bool(self.confirmations.pending)
+
+    def flush(self):
+        return 0
+
+
+class FakeProjects:
+    current_project = "temp"
+
+    def get_reconnect_context(self):
+        return "User: hello"
+
+    def log_chat(self, sender, text):
+        pass
+
+    def close(self):
+        pass
+
+
+def bare_loop(session=None):
+    """An AudioLoop with only the state session handling touches."""
+    loop = brain.AudioLoop.__new__(brain.AudioLoop)
+    loop.session = session or FakeSession()
+    loop.project_manager = FakeProjects()
+    loop.on_project_update = None
+    loop._start_message = None
+    loop._live_started = False
+    loop.tool_registry = ToolRegistry()
+    loop.confirmations = ConfirmationScheduler(lambda payload: None)
+    loop.http = HttpClient()
+    return loop
+
+
+class TestLiveReconnect:
+    @pytest.mark.asyncio
+    async def test_new_session_keeps_http_client_open(self):
+        loop = bare_loop()
+        await loop._on_live_connected(False, "start")
+        pool = loop.http.session
+        await loop._on_live_connected(False, "reconnect")
+        assert not pool.closed
+        assert loop.http.session is pool
+        # The summary went out as silent context
+        assert loop.session.sent and loop.session.sent[-1][1] is False
+        await loop.http.close()
+
+    @pytest.mark.asyncio
+    async def test_resume_sends_nothing(self):
+        loop = bare_loop()
+        await loop._on_live_connected(False, "start")
+        await loop._on_live_connected(True, "swap")
+        assert loop.session.sent == []
+        await loop.http.close()
+
+
+class TestReceiveAudio:
+    @pytest.mark.asyncio
+    async def test_audio_flows_while_confirmation_pending(self):
+        calls = [SimpleNamespace(id="id-write", name="write_file", args={"path": "a.txt"}),
+                 SimpleNamespace(id="id-list", name="list_projects", args={})]
+        session = StreamingSession(calls)
+        loop = bare_loop(session)
+        prompts = []
+        loop.on_tool_confirmation = prompts.append
+        loop.on_transcription = None
+        loop.permissions = {"list_projects": False}
+        loop.confirmations = ConfirmationScheduler(loop._prompt_tool_confirmation, batch_window=0.01)
+        loop.audio_in_queue = RecordingQueue(loop.confirmations)
+        loop.chat_buffer = {"sender": None, "text": ""}
+        loop._last_input_transcription = ""
+        loop._last_output_transcription = ""
+        loop.tts_segmenter = SentenceSegmenter()
+        loop.elevenlabs_voice_id = None
+
+        ran = []
+
+        async def write_file(args):
+            ran.append(args["path"])
+            return "written"
+
+        async def list_projects(args):
+            return "temp"
+
+        loop.tool_registry.register("write_file", write_file)
+        loop.tool_registry.register("list_projects", list_projects)
+
+        task = asyncio.create_task(loop.receive_audio())
+        try:
+            await asyncio.wait_for(session.drained.wait(), 5)
+            # The whole turn was received while the prompt was still open
+            queue = loop.audio_in_queue
+            assert len(queue.chunks) == session.chunks
+            assert queue.while_pending >= session.chunks - session.tool_call_at - 1
+            assert ran == [] and session.tool_responses == []
+
+            [payload] = prompts
+            assert [r["tool"] for r in payload["requests"]] == ["write_file"]
+            loop.confirmations.resolve(payload["id"], True)
+            for _ in range(100):
+                if session.tool_responses:
+                    break
+                await asyncio.sleep(0.01)
+            assert ran == ["a.txt"]
+            assert [(r.name, r.response["result"]) for r in session.tool_responses[0]] == [
+                ("write_file", "written"), ("list_projects", "temp")
+            ]
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await loop.http.close()
+
+
+class IdleLive:
+    """LiveConnection stand-in that never connects."""
+
+    def __init__(self, connect, **options):
+        self.connected = False
+
+    async def run(self):
+        await asyncio.Event().wait()
+
+    def close(self):
+        pass
+
+
+async def forever():
+    await asyncio.Event().wait()
+
+
+def runnable_loop():
+    """A bare AudioLoop whose device and network tasks idle, with a real CAD worker pool."""
+    loop = bare_loop()
+    loop.stop_event = asyncio.Event()
+    loop.video_mode = "none"
+    loop.chat_buffer = {"sender": None, "text": ""}
+    loop.cad_agent = CadAgent()
+    loop.cad_agent.workers = CadWorkerPool(size=1, preload=())
+    for name in ("send_realtime", "listen_audio", "receive_audio", "play_audio"):
+        setattr(loop, name, forever)
+    loop.tts_worker = SimpleNamespace(run=forever)
+    return loop
+
+
+class TestStartStop:
+    @pytest.mark.asyncio
+    async def test_stop_audio_closes_cad_workers_and_http_client(self, monkeypatch):
+        server = pytest.importorskip("server", reason="server needs socketio, uvicorn and the agents' dependencies")
+        monkeypatch.setattr(brain, "ai_provider", "GEMINI")
+        monkeypatch.setattr(brain, "LiveConnection", IdleLive)
+
+        async def emit(*args, **kwargs):
+            pass
+        monkeypatch.setattr(server.sio, "emit", emit)
+
+        async def start():
+            # What start_audio does once the AudioLoop is built
+            loop = runnable_loop()
+            monkeypatch.setattr(server, "audio_loop", loop)
+            monkeypatch.setattr(server, "loop_task", asyncio.create_task(loop.run()))
+            await asyncio.sleep(0.1)
+            return loop, server.loop_task
+
+        first, task = await start()
+        procs = [worker.proc for worker in first.cad_agent.workers._idle]
+        assert procs and all(proc.poll() is None for proc in procs)
+        pool = first.http.session
+        await server.stop_audio("sid")
+        assert task.done() and server.loop_task is None
+        assert all(proc.poll() is not None for proc in procs)
+        assert pool.closed
+
+        second, task = await start()
+        assert second.cad_agent.workers.get_stats()["idle"] == 1
+        await server.stop_audio("sid")
+        assert task.done()
+
+
+class TestProjectSwitch:
+    @pytest.mark.asyncio
+    async def test_switch_waiting_for_compaction_does_not_block_the_loop(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("CHAT_LOG_COMPACT_ON_START", "0")
+        projects = ProjectManager(str(tmp_path), chat_log=ChatLogWriter(flush_interval=10))
+        projects.create_project("bracket")
+        loop = bare_loop()
+        loop.project_manager = projects
+
+        # As held by a compaction in progress
+        projects._history_lock.acquire()
+        threading.Timer(0.5, projects._history_lock.release).start()
+        switch = asyncio.create_task(loop._tool_switch_project({"name": "bracket"}))
+        start = time.monotonic()
+        await asyncio.sleep(0.05)
+        assert time.monotonic() - start < 0.4  # the loop kept running while the switch waited
+        assert not switch.done()
+        assert "bracket" in await asyncio.wait_for(switch, 5)
+        assert projects.current_project == "bracket"
+        # Project context went out as silent context
+        assert loop.session.sent[-1][1] is False
+        projects.close()
+        await loop.http.close()
@@ -3,9 +3,62 @@ Tests for CAD Generation Agent.
 """
 import pytest
 import asyncio
+import hashlib
 import os
+from types import SimpleNamespace
 
 from cad_agent import CadAgent
+from cad_cache import CadCache
+from cad_worker import CadWorkerPool
+
+
+def script_reply(body):
+    return f"```python\n{body}\n```"
+
+
+WRITE_STL = "open('output.stl', 'wb').write(b'solid cube')"
+
+
+class FakeModels:
+    """
+    Stands in for client.aio.models: replies with the queued texts, one per request.
+    A reply may be (text, delay) to answer after `delay` seconds.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.prompts = []
+        self.temperatures = []
+
+    async def generate_content_stream(self, model, contents, config):
+        self.prompts.append(contents)
+        self.temperatures.append(config.temperature)
+        reply = self.replies.pop(0)
+        text, delay = reply if isinstance(reply, tuple) else (reply, 0)
+
+        async def stream():
+            await asyncio.sleep(delay)
+            part = SimpleNamespace(text=text, thought=False)
+            yield SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+        return stream()
+
+
+@pytest.fixture
+def offline_agent(monkeypatch, tmp_path):
+    """CadAgent with a fake model, a worker pool that does not preload build123d and a private cache."""
+    monkeypatch.setenv("GEMINI_API_KEY", os.getenv("GEMINI_API_KEY") or "test-key")
+    agent = CadAgent()
+    agent.workers = CadWorkerPool(size=1, preload=(), timeout=10)
+    agent.cache = CadCache(tmp_path / "cad_cache")
+    yield agent
+    agent.close()
+
+
+def use_replies(agent, *replies):
+    models = FakeModels(replies)
+    agent.client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    return models
 
 
 class TestCadAgentInit:
@@ -81,6 +134,144 @@ class TestCadGeneration:
             print(f"Sphere generation failed: {e}")
 
 
+class TestCadExecution:
+    """Generated scripts run on the warm worker pool (no API key or build123d needed)."""
+
+    async def test_generate_runs_script_on_worker(self, offline_agent, tmp_path):
+        use_replies(offline_agent, script_reply(WRITE_STL))
+        result = await offline_agent.generate_prototype("a cube", output_dir=str(tmp_path))
+        assert result["format"] == "stl"
+        assert os.path.exists(result["file_path"])
+        assert (tmp_path / "current_design.py").exists()
+        # The STL is referenced, not inlined
+        assert "data" not in result
+        with open(result["file_path"], "rb") as f:
+            assert result["etag"] == hashlib.sha256(f.read()).hexdigest()
+        assert offline_agent.get_stats()["workers"]["runs"] == 1
+
+    async def test_error_traceback_fed_back_on_retry(self, offline_agent, tmp_path):
+        models = use_replies(offline_agent, script_reply("raise ValueError('bad fillet')"), script_reply(WRITE_STL))
+        statuses = []
+        offline_agent.on_status = statuses.append
+        result = await offline_agent.generate_prototype("a cube", output_dir=str(tmp_path))
+        assert result is not None
+        assert "ValueError: bad fillet" in models.prompts[1]
+        assert any(s["status"] == "retrying" and s["error"] for s in statuses)
+
+    async def test_iterate_runs_script_on_worker(self, offline_agent, tmp_path):
+        (tmp_path / "current_design.py").write_text(WRITE_STL)
+        use_replies(offline_agent, script_reply(WRITE_STL))
+        result = await offline_agent.iterate_prototype("make it bigger", output_dir=str(tmp_path))
+        assert result is not None and os.path.exists(result["file_path"])
+
+
+class TestCadCaching:
+    """Repeated requests and scripts are served from the CadCache."""
+
+    async def test_repeated_prompt_skips_model_and_worker(self, offline_agent, tmp_path):
+        models = use_replies(offline_agent, script_reply(WRITE_STL))
+        statuses = []
+        offline_agent.on_status = statuses.append
+        first = await offline_agent.generate_prototype("A cube", output_dir=str(tmp_path / "one"))
+        second = await offline_agent.generate_prototype("  a CUBE. ", output_dir=str(tmp_path / "two"))
+        assert len(models.prompts) == 1
+        assert offline_agent.workers.runs == 1
+        assert second["etag"] == first["etag"]
+        assert os.path.exists(second["file_path"])
+        assert (tmp_path / "two" / "current_design.py").exists()
+        assert statuses[-1]["status"] == "cached"
+        assert statuses[-1]["cache"]["prompt_hits"] == 1
+
+    async def test_same_script_not_rerun(self, offline_agent, tmp_path):
+        use_replies(offline_agent, script_reply(WRITE_STL), script_reply(WRITE_STL))
+        await offline_agent.generate_prototype("a cube", output_dir=str(tmp_path))
+        result = await offline_agent.generate_prototype("a box", output_dir=str(tmp_path))
+        assert result is not None
+        assert offline_agent.workers.runs == 1
+        assert offline_agent.cache.get_stats()["script_hits"] == 1
+
+    async def test_status_reports_cache_stats(self, offline_agent, tmp_path):
+        use_replies(offline_agent, script_reply(WRITE_STL))
+        statuses = []
+        offline_agent.on_status = statuses.append
+        await offline_agent.generate_prototype("a cube", output_dir=str(tmp_path))
+        assert statuses[0]["status"] == "generating"
+        assert statuses[0]["cache"]["prompt_misses"] == 1
+
+    async def test_cache_disabled(self, offline_agent, tmp_path):
+        offline_agent.cache_enabled = False
+        models = use_replies(offline_agent, script_reply(WRITE_STL), script_reply(WRITE_STL))
+        await offline_agent.generate_prototype("a cube", output_dir=str(tmp_path))
+        await offline_agent.generate_prototype("a cube", output_dir=str(tmp_path))
+        assert len(models.prompts) == 2 and offline_agent.workers.runs == 2
+
+
+class TestCadCandidates:
+    """Speculative mode: several candidate scripts per attempt, first valid STL wins."""
+
+    async def test_first_valid_candidate_wins(self, offline_agent, tmp_path):
+        offline_agent.set_candidates(3)
+        assert offline_agent.workers.size == 3
+        models = use_replies(
+            offline_agent,
+            script_reply("raise ValueError('bad fillet')"),
+            (script_reply(WRITE_STL), 30),  # slow model answer, cancelled
+            (script_reply(WRITE_STL), 1),  # after the first candidate has failed
+        )
+        statuses, reports = [], []
+        offline_agent.on_status = statuses.append
+        offline_agent.on_candidate = reports.append
+        result = await asyncio.wait_for(
+            offline_agent.generate_prototype("a cube", output_dir=str(tmp_path)), timeout=10)
+        assert result is not None and os.path.exists(result["file_path"])
+        assert (tmp_path / "current_design.py").exists()
+        assert len(set(models.temperatures)) == 3
+
+        # Candidate reports have their own channel; cad_status only carries the attempt
+        assert [s["status"] for s in statuses] == ["generating"]
+        phases = {r["candidate"]: r for r in reports}
+        assert phases[1]["phase"] == "failed" and "bad fillet" in phases[1]["error"]
+        assert phases[2]["phase"] == "cancelled"
+        assert phases[3]["phase"] == "succeeded"
+        assert "model_s" in phases[3] and "exec_s" in phases[3]
+
+    async def test_cancelled_candidate_script_is_killed(self, offline_agent, tmp_path):
+        offline_agent.set_candidates(2)
+        use_replies(offline_agent, script_reply("import time\ntime.sleep(30)"), (script_reply(WRITE_STL), 0.5))
+        result = await asyncio.wait_for(
+            offline_agent.generate_prototype("a cube", output_dir=str(tmp_path)), timeout=10)
+        assert result is not None
+        assert offline_agent.workers.get_stats()["timeouts"] == 0
+
+    async def test_all_candidates_fail_then_fixed(self, offline_agent, tmp_path):
+        offline_agent.set_candidates(2)
+        models = use_replies(
+            offline_agent,
+            script_reply("raise ValueError('bad fillet')"),
+            script_reply("raise ValueError('bad fillet')"),
+            script_reply(WRITE_STL),
+            (script_reply("raise ValueError('still bad')"), 0.5),
+        )
+        result = await offline_agent.generate_prototype("a cube", output_dir=str(tmp_path))
+        assert result is not None
+        assert "ValueError: bad fillet" in models.prompts[2]
+        assert "Original request: a cube" in models.prompts[2]
+
+    async def test_all_attempts_fail(self, offline_agent, tmp_path):
+        offline_agent.set_candidates(2)
+        use_replies(offline_agent, *[script_reply("raise ValueError('nope')")] * 6)
+        statuses = []
+        offline_agent.on_status = statuses.append
+        assert await offline_agent.generate_prototype("a cube", output_dir=str(tmp_path)) is None
+        assert statuses[-1]["status"] == "failed"
+
+    def test_candidate_count_clamped(self, offline_agent):
+        offline_agent.set_candidates(0)
+        assert offline_agent.candidates == 1
+        offline_agent.set_candidates(99)
+        assert offline_agent.candidates == 4
+
+
 class TestCadIteration:
     """Test CAD iteration (modifying existing designs)."""
     
@@ -0,0 +1,99 @@
+"""
+Tests for the content-addressed CAD result cache.
+"""
+import pytest
+
+from cad_cache import CadCache, normalize_prompt
+
+MODEL = "test-model"
+SYSTEM = "You are a CAD engineer."
+SCRIPT = "from build123d import *\nexport_stl(Box(1, 1, 1), 'output.stl')\n"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CadCache(tmp_path / "cache")
+    yield cache
+    cache.close()
+
+
+class TestPromptKey:
+    def test_normalized(self):
+        assert normalize_prompt("  A   Cube. ") == "a cube"
+        assert CadCache.prompt_key("A cube", MODEL, SYSTEM) == CadCache.prompt_key("a  cube!", MODEL, SYSTEM)
+
+    def test_depends_on_model_instruction_and_context(self):
+        key = CadCache.prompt_key("a cube", MODEL, SYSTEM)
+        assert key != CadCache.prompt_key("a cube", "other-model", SYSTEM)
+        assert key != CadCache.prompt_key("a cube", MODEL, SYSTEM + " Use mm.")
+        assert key != CadCache.prompt_key("a cube", MODEL, SYSTEM, context=SCRIPT)
+        assert key != CadCache.prompt_key("a sphere", MODEL, SYSTEM)
+
+
+class TestLookup:
+    def test_prompt_roundtrip(self, cache):
+        key = CadCache.prompt_key("a cube", MODEL, SYSTEM)
+        assert cache.lookup(key) is None
+        cache.put(SCRIPT, b"solid cube", key)
+        assert cache.lookup(key) == (SCRIPT, b"solid cube")
+        assert cache.get_stats()["prompt_hits"] == 1
+        assert cache.get_stats()["prompt_misses"] == 1
+
+    def test_script_level(self, cache):
+        assert cache.get_stl(SCRIPT) is None
+        cache.put(SCRIPT, b"solid cube")
+        # Trailing whitespace / line endings do not change the script
+        assert cache.get_stl(SCRIPT.replace("\n", "  \r\n")) == b"solid cube"
+        assert cache.get_stl(SCRIPT + "x = 1\n") is None
+
+    def test_persists_across_instances(self, tmp_path):
+        key = CadCache.prompt_key("a cube", MODEL, SYSTEM)
+        first = CadCache(tmp_path / "cache")
+        first.put(SCRIPT, b"solid cube", key)
+        first.close()
+        second = CadCache(tmp_path / "cache")
+        assert second.lookup(key) == (SCRIPT, b"solid cube")
+        second.close()
+
+    def test_identical_stls_stored_once(self, cache):
+        cache.put(SCRIPT, b"solid cube")
+        cache.put(SCRIPT + "# same shape\n", b"solid cube")
+        assert len(list((cache.root / "blobs").iterdir())) == 1
+
+    def test_missing_blob_is_a_miss(self, cache):
+        key = CadCache.prompt_key("a cube", MODEL, SYSTEM)
+        cache.put(SCRIPT, b"solid cube", key)
+        for blob in (cache.root / "blobs").iterdir():
+            blob.unlink()
+        assert cache.lookup(key) is None
+        assert cache.get_stl(SCRIPT) is None
+
+
+class TestEviction:
+    def test_lru_within_size_bound(self, tmp_path):
+        cache = CadCache(tmp_path / "cache", max_bytes=250)
+        scripts = [f"part_{i} = {i}\n" for i in range(3)]
+        for i, script in enumerate(scripts):
+            cache.put(script, bytes([i]) * 100)
+            if i == 1:
+                cache.get_stl(scripts[0])  # 0 becomes more recent than 1
+        assert cache.get_stl(scripts[1]) is None
+        assert cache.get_stl(scripts[0]) is not None
+        assert cache.get_stl(scripts[2]) is not None
+        assert cache.get_stats()["evictions"] == 1
+        assert len(list((cache.root / "blobs").iterdir())) == 2
+        cache.close()
+
+    def test_evicted_script_drops_prompt(self, tmp_path):
+        cache = CadCache(tmp_path / "cache", max_bytes=150)
+        key = CadCache.prompt_key("a cube", MODEL, SYSTEM)
+        cache.put(SCRIPT, b"a" * 100, key)
+        cache.put("other = 1\n", b"b" * 100)
+        assert cache.lookup(key) is None
+        cache.close()
+
+    def test_oversized_result_not_cached(self, tmp_path):
+        cache = CadCache(tmp_path / "cache", max_bytes=10)
+        cache.put(SCRIPT, b"x" * 100)
+        assert cache.get_stl(SCRIPT) is None
+        cache.close()
@@ -0,0 +1,145 @@
+"""
+Tests for the warm CAD worker pool (no build123d needed: workers preload nothing).
+"""
+import asyncio
+import sys
+
+import pytest
+
+from cad_worker import CadWorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = CadWorkerPool(size=2, preload=(), timeout=10)
+    yield pool
+    pool.close()
+
+
+def export_script(payload=b"solid test"):
+    return f"with open(OUTPUT, 'wb') as f:\n    f.write({payload!r})\n"
+
+
+class TestRun:
+    async def test_returns_stl_bytes(self, pool, tmp_path):
+        out = tmp_path / "output.stl"
+        result = await pool.run(f"OUTPUT = {str(out)!r}\n" + export_script(), str(out))
+        assert result.ok
+        assert result.stl == b"solid test"
+        assert result.error is None
+
+    async def test_traceback_on_error(self, pool, tmp_path):
+        script = tmp_path / "current_design.py"
+        source = "x = 1\nraise ValueError('fillet radius too large')\n"
+        script.write_text(source)
+        result = await pool.run(source, str(tmp_path / "output.stl"), filename=str(script))
+        assert not result.ok
+        assert result.stl is None
+        assert "ValueError: fillet radius too large" in result.error
+        assert "current_design.py" in result.error and "line 2" in result.error
+        assert "cad_worker" not in result.error
+
+    async def test_stdout_captured(self, pool):
+        result = await pool.run("print('hello from the script')")
+        assert result.ok
+        assert result.stdout == "hello from the script\n"
+
+    async def test_runs_in_cwd(self, pool, tmp_path):
+        result = await pool.run("open('relative.stl', 'wb').write(b'x')", str(tmp_path / "relative.stl"),
+                                cwd=str(tmp_path))
+        assert result.stl == b"x"
+
+    async def test_fresh_namespace_per_run(self):
+        pool = CadWorkerPool(size=1, preload=())
+        try:
+            assert (await pool.run("leftover = 42")).ok
+            result = await pool.run("print(leftover)")
+            assert not result.ok
+            assert "NameError" in result.error
+        finally:
+            pool.close()
+
+    async def test_worker_reused(self):
+        pool = CadWorkerPool(size=1, preload=())
+        try:
+            first = await pool.run("import os; print(os.getpid())")
+            second = await pool.run("import os; print(os.getpid())")
+            assert first.stdout == second.stdout
+            assert pool.get_stats()["spawned"] == 1
+        finally:
+            pool.close()
+
+    async def test_sys_exit_zero_is_success(self, pool):
+        assert (await pool.run("import sys; sys.exit(0)")).ok
+        assert not (await pool.run("import sys; sys.exit(2)")).ok
+
+
+class TestFailures:
+    async def test_timeout_kills_worker(self, pool):
+        result = await pool.run("import time; time.sleep(30)", timeout=0.5)
+        assert not result.ok
+        assert "TimeoutError" in result.error
+        assert pool.get_stats()["timeouts"] == 1
+        assert (await pool.run("print('still works')")).ok
+
+    async def test_crash_replaced(self, pool):
+        result = await pool.run("import os; os._exit(3)")
+        assert not result.ok
+        assert "exit code 3" in result.error
+        assert (await pool.run("print('next')")).ok
+        assert pool.get_stats()["crashes"] == 1
+
+    async def test_cancel_kills_worker(self, pool):
+        task = asyncio.create_task(pool.run("import time; time.sleep(30)"))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert (await pool.run("print('ok')")).ok
+        assert pool.get_stats()["crashes"] == 0
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="RLIMIT_AS is POSIX only")
+    async def test_memory_limit(self):
+        pool = CadWorkerPool(size=1, preload=(), memory_limit_mb=512)
+        try:
+            result = await pool.run("block = bytearray(1024 * 1024 * 1024)")
+            assert not result.ok
+            assert "MemoryError" in result.error
+        finally:
+            pool.close()
+
+    async def test_recycled_after_max_tasks(self):
+        pool = CadWorkerPool(size=1, preload=(), max_tasks=2)
+        try:
+            pids = [(await pool.run("import os; print(os.getpid())")).stdout for _ in range(3)]
+            assert pids[0] == pids[1] != pids[2]
+        finally:
+            pool.close()
+
+
+class TestConcurrency:
+    async def test_runs_in_parallel_up_to_size(self, pool):
+        await asyncio.gather(pool.run("pass"), pool.run("pass"))  # warm both workers
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await asyncio.gather(*(pool.run("import time; time.sleep(0.5)") for _ in range(2)))
+        assert all(r.ok for r in results)
+        assert loop.time() - start < 0.9
+
+    async def test_resize(self, pool):
+        pool.start()
+        pool.resize(1)
+        assert pool.get_stats()["idle"] == 1
+        pool.resize(3)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await asyncio.gather(*(pool.run("import time; time.sleep(0.5)") for _ in range(3)))
+        assert all(r.ok for r in results)
+        assert loop.time() - start < 1.2  # serially it would take 1.5s
+        assert pool.get_stats()["size"] == 3
+
+    async def test_closed_pool_rejects(self):
+        pool = CadWorkerPool(size=1, preload=())
+        pool.close()
+        with pytest.raises(RuntimeError):
+            await pool.run("pass")
@@ -0,0 +1,337 @@
+"""
+Tests for the buffered chat log writer and its ProjectManager integration.
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from chat_log import ChatLogWriter, ChatLogIndex, ChatLogStore, merge_entries, read_tail
+from project_manager import ProjectManager
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestChatLogWriter:
+    """Test batching, flush triggers and shutdown."""
+
+    def test_write_is_deferred_until_flush(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        writer = ChatLogWriter(flush_interval=10)
+        writer.write(log, {"text": "one"})
+        writer.write(log, {"text": "two"})
+        assert not log.exists()
+
+        assert writer.flush()
+        assert [e["text"] for e in read_lines(log)] == ["one", "two"]
+        assert writer.batches == 1
+        writer.close()
+
+    def test_interval_flush(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        writer = ChatLogWriter(flush_interval=0.05)
+        writer.write(log, {"text": "hi"})
+        deadline = time.monotonic() + 2
+        while not log.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert read_lines(log) == [{"text": "hi"}]
+        writer.close()
+
+    def test_size_triggered_flush(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        writer = ChatLogWriter(flush_interval=10, max_pending=5)
+        for i in range(5):
+            writer.write(log, {"i": i})
+        deadline = time.monotonic() + 2
+        while writer.lines < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(read_lines(log)) == 5
+        writer.close()
+
+    def test_lines_grouped_per_file(self, tmp_path):
+        a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+        writer = ChatLogWriter(flush_interval=10)
+        for i in range(3):
+            writer.write(a, {"i": i})
+            writer.write(b, {"i": i})
+        writer.flush()
+        assert read_lines(a) == read_lines(b) == [{"i": 0}, {"i": 1}, {"i": 2}]
+        writer.close()
+
+    @pytest.mark.parametrize("policy", ["never", "batch", "always"])
+    def test_fsync_policies(self, tmp_path, policy):
+        log = tmp_path / "chat_history.jsonl"
+        writer = ChatLogWriter(fsync=policy)
+        writer.write(log, {"p": policy})
+        writer.close()
+        assert read_lines(log) == [{"p": policy}]
+
+    def test_invalid_fsync_policy(self):
+        with pytest.raises(ValueError):
+            ChatLogWriter(fsync="sometimes")
+
+    def test_close_flushes_and_later_writes_are_synchronous(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        writer = ChatLogWriter(flush_interval=10)
+        writer.write(log, {"text": "before"})
+        writer.close()
+        assert read_lines(log) == [{"text": "before"}]
+
+        writer.write(log, {"text": "after"})
+        assert [e["text"] for e in read_lines(log)] == ["before", "after"]
+
+    def test_concurrent_writers_lose_nothing(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        writer = ChatLogWriter(flush_interval=0.01, max_pending=8)
+
+        def produce(n):
+            for i in range(200):
+                writer.write(log, {"t": n, "i": i})
+
+        threads = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.close()
+        assert len(read_lines(log)) == 800
+
+
+def write_log(path, count, start=0, ts0=1000.0):
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(start, start + count):
+            f.write(json.dumps({"timestamp": ts0 + i, "sender": "User", "text": f"message {i}"}) + "\n")
+
+
+class TestReadTail:
+    """Test the reverse block reader."""
+
+    @pytest.mark.parametrize("block_size", [7, 64, 4096])
+    def test_last_entries_across_block_boundaries(self, tmp_path, block_size):
+        log = tmp_path / "chat_history.jsonl"
+        write_log(log, 50)
+        entries = read_tail(log, 10, block_size=block_size)
+        assert [e["text"] for e in entries] == [f"message {i}" for i in range(40, 50)]
+
+    def test_limit_larger_than_log(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        write_log(log, 3)
+        assert len(read_tail(log, 10, block_size=16)) == 3
+
+    def test_skips_malformed_and_blank_lines(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        write_log(log, 2)
+        with open(log, "a", encoding="utf-8") as f:
+            f.write("{not json\n\n")
+        write_log(log, 1, start=2)
+        assert [e["text"] for e in read_tail(log, 3, block_size=8)] == ["message 0", "message 1", "message 2"]
+
+    def test_missing_file_and_zero_limit(self, tmp_path):
+        assert read_tail(tmp_path / "nope.jsonl", 10) == []
+        log = tmp_path / "chat_history.jsonl"
+        write_log(log, 3)
+        assert read_tail(log, 0) == []
+
+
+class TestChatLogIndex:
+    """Test the sparse timestamp index."""
+
+    def test_read_since(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        write_log(log, 1000)
+        index = ChatLogIndex(log, stride=16)
+        entries = index.read_since(1500.0, limit=3)
+        assert [e["text"] for e in entries] == ["message 500", "message 501", "message 502"]
+        assert index.index_path.exists()
+        assert index.refresh() == 1000 // 16 + 1
+
+    def test_incremental_refresh_and_reload(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        write_log(log, 100)
+        ChatLogIndex(log, stride=10).refresh()
+        write_log(log, 100, start=100)
+
+        # A fresh instance picks up the sidecar and only indexes the new lines
+        index = ChatLogIndex(log, stride=10)
+        assert index.refresh() == 20
+        assert [e["text"] for e in index.read_since(1195.0)] == [f"message {i}" for i in range(195, 200)]
+
+    def test_rebuilds_after_truncation(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        write_log(log, 100)
+        ChatLogIndex(log, stride=10).refresh()
+        log.write_text("")
+        write_log(log, 5, ts0=5000.0)
+        assert [e["text"] for e in ChatLogIndex(log, stride=10).read_since(0)] == [f"message {i}" for i in range(5)]
+
+    def test_equal_timestamps_are_not_skipped(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        with open(log, "w", encoding="utf-8") as f:
+            for i in range(40):
+                f.write(json.dumps({"timestamp": 1.0 if i < 30 else 2.0, "text": str(i)}) + "\n")
+        entries = ChatLogIndex(log, stride=4).read_since(1.0)
+        assert len(entries) == 40
+
+
+def write_turns(path, turns, ts0=1000.0):
+    """Writes (sender, text) pairs one second apart."""
+    with open(path, "a", encoding="utf-8") as f:
+        for i, (sender, text) in enumerate(turns):
+            f.write(json.dumps({"timestamp": ts0 + i, "sender": sender, "text": text}) + "\n")
+
+
+class TestChatLogStore:
+    """Test rotation, compaction and reads across segments."""
+
+    def test_merge_consecutive_same_sender(self):
+        entries = [
+            {"timestamp": 1, "sender": "User", "text": "make a "},
+            {"timestamp": 2, "sender": "User", "text": " bracket"},
+            {"timestamp": 3, "sender": "ADA", "text": "Sure."},
+            {"timestamp": 500, "sender": "ADA", "text": "Done."},
+        ]
+        merged = merge_entries(entries, merge_gap=60)
+        assert [(e["sender"], e["text"]) for e in merged] == [
+            ("User", "make a bracket"), ("ADA", "Sure."), ("ADA", "Done.")]
+        assert merged[0]["timestamp"] == 1 and merged[0]["timestamp_end"] == 2
+        assert entries[0]["text"] == "make a "  # inputs untouched
+
+    def test_rotation_waits_for_segment_size(self, tmp_path):
+        write_log(tmp_path / "chat_history.jsonl", 10)
+        store = ChatLogStore(tmp_path, segment_bytes=10 ** 6)
+        assert store.compact() == {"rotated": None, "compacted": 0, "segments": 0}
+        assert (tmp_path / "chat_history.jsonl").exists()
+
+    def test_compact_rotates_merges_and_gzips(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        write_turns(log, [("User", "a"), ("User", "b"), ("ADA", "c"), ("ADA", "d"), ("User", "e")])
+        ChatLogIndex(log).refresh()
+        store = ChatLogStore(tmp_path, segment_bytes=1)
+        assert store.compact() == {"rotated": "000001.jsonl", "compacted": 1, "segments": 1}
+
+        assert not log.exists() and not (tmp_path / "chat_history.jsonl.idx").exists()
+        [header] = store.segments()
+        assert header["name"] == "000001.jsonl.gz" and header["compressed"]
+        assert header["entries"] == 3 and (header["first_ts"], header["last_ts"]) == (1000.0, 1004.0)
+        assert [e["text"] for e in store.read_recent(10)] == ["a b", "c d", "e"]
+
+    def test_reads_span_segments_and_active_log(self, tmp_path):
+        log = tmp_path / "chat_history.jsonl"
+        store = ChatLogStore(tmp_path, segment_bytes=1, merge_gap=0)
+        for n in range(3):
+            write_log(log, 10, start=n * 10)
+            store.compact()
+        write_log(log, 5, start=30)
+        assert len(store.segments()) == 3
+
+        assert [e["text"] for e in store.read_recent(12)] == [f"message {i}" for i in range(23, 35)]
+        assert [e["text"] for e in store.read_since(1008.0, limit=4)] == [f"message {i}" for i in range(8, 12)]
+        assert len(store.read_since(1000.0)) == 35
+        assert [e["text"] for e in store.read_since(1033.0)] == ["message 33", "message 34"]
+
+    def test_resumes_interrupted_compaction(self, tmp_path):
+        write_log(tmp_path / "chat_history.jsonl", 5)
+        store = ChatLogStore(tmp_path, segment_bytes=1, merge_gap=0)
+        store.rotate()
+        assert not store.segments()[0]["compressed"]
+        assert store.compact()["compacted"] == 1
+        assert len(store.read_recent(10)) == 5
+
+    def test_rebuilds_corrupt_index(self, tmp_path):
+        write_log(tmp_path / "chat_history.jsonl", 5)
+        store = ChatLogStore(tmp_path, segment_bytes=1, merge_gap=0)
+        store.compact()
+        store.index_path.write_text("{not json")
+        assert len(store.read_recent(10)) == 5
+
+
+class TestProjectManagerChatLog:
+    """Test that buffered messages are visible to readers."""
+
+    def test_recent_history_sees_buffered_messages(self, tmp_path):
+        pm = ProjectManager(str(tmp_path), chat_log=ChatLogWriter(flush_interval=10))
+        pm.log_chat("User", "hello")
+        pm.log_chat("Multivac", "Hi there.")
+        history = pm.get_recent_chat_history()
+        assert [(e["sender"], e["text"]) for e in history] == [("User", "hello"), ("Multivac", "Hi there.")]
+        pm.close()
+
+    def test_messages_follow_project_at_log_time(self, tmp_path):
+        pm = ProjectManager(str(tmp_path), chat_log=ChatLogWriter(flush_interval=10))
+        pm.log_chat("User", "in temp")
+        pm.create_project("bracket")
+        pm.switch_project("bracket")
+        pm.log_chat("User", "in bracket")
+        pm.close()
+
+        assert [e["text"] for e in read_lines(tmp_path / "projects" / "temp" / "chat_history.jsonl")] == ["in temp"]
+        assert [e["text"] for e in pm.get_recent_chat_history()] == ["in bracket"]
+
+    def test_history_since(self, tmp_path):
+        pm = ProjectManager(str(tmp_path), chat_log=ChatLogWriter(flush_interval=10))
+        pm.log_chat("User", "old")
+        cutoff = time.time()
+        time.sleep(0.01)
+        pm.log_chat("User", "new")
+        assert [e["text"] for e in pm.get_chat_history_since(cutoff)] == ["new"]
+        pm.close()
+
+    def test_history_reads_through_compacted_segments(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("CHAT_LOG_COMPACT_ON_START", "0")
+        pm = ProjectManager(str(tmp_path), chat_log=ChatLogWriter(flush_interval=10))
+        pm.create_project("bracket")
+        pm.switch_project("bracket")
+        for i in range(5):
+            pm.log_chat("User" if i % 2 else "ADA", f"turn {i}")
+        pm.flush_chat_log()
+        assert pm.compact_chat_history("bracket") is None  # current project is never compacted
+
+        pm.switch_project("temp")
+        pm.chat_segment_bytes = 1
+        assert pm.compact_chat_history("bracket")["compacted"] == 1
+        pm.switch_project("bracket")
+        pm.log_chat("User", "after compaction")
+        assert [e["text"] for e in pm.get_recent_chat_history(3)] == ["turn 3", "turn 4", "after compaction"]
+        assert "[ADA]: turn 4" in pm.get_project_context()
+        pm.close()
+
+    def test_switch_waits_for_compaction(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("CHAT_LOG_COMPACT_ON_START", "0")
+        pm = ProjectManager(str(tmp_path), chat_log=ChatLogWriter(flush_interval=10))
+        pm.create_project("bracket")
+        pm.switch_project("bracket")
+        for i in range(5):
+            pm.log_chat("User" if i % 2 else "ADA", f"turn {i}")
+        pm.switch_project("temp")
+        pm.chat_segment_bytes = 1
+
+        started, release = threading.Event(), threading.Event()
+        compact = ChatLogStore.compact
+
+        def slow_compact(store, *args, **kwargs):
+            started.set()
+            release.wait(5)
+            return compact(store, *args, **kwargs)
+
+        monkeypatch.setattr(ChatLogStore, "compact", slow_compact)
+        compaction = threading.Thread(target=pm.compact_chat_history, args=("bracket",))
+        compaction.start()
+        assert started.wait(5)
+        switch = threading.Thread(target=pm.switch_project, args=("bracket",))
+        switch.start()
+        switch.join(0.2)
+        assert switch.is_alive()  # blocked until the compaction is done
+        assert pm.current_project == "temp"
+
+        release.set()
+        compaction.join(5)
+        switch.join(5)
+        assert pm.current_project == "bracket"
+        pm.log_chat("User", "after switch")
+        assert pm.compact_chat_history("bracket") is None
+        assert [e["text"] for e in pm.get_recent_chat_history(10)] == [f"turn {i}" for i in range(5)] + ["after switch"]
+        pm.close()
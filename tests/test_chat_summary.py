@@ -0,0 +1,187 @@
+"""
+Tests for the rolling chat summary and the reconnect context restore.
+"""
+import json
+
+import pytest
+
+from chat_log import ChatLogStore, ChatLogWriter
+from chat_summary import RollingSummary, SummaryCache, SUMMARY_NAME, send_reconnect_context
+from project_manager import ProjectManager
+
+
+class FakeSession:
+    """Records what would be sent to the Live session."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, input=None, end_of_turn=False):
+        self.sent.append({"size": len(input), "end_of_turn": end_of_turn, "text": input})
+
+
+def raw_tail_message(history):
+    """The previous reconnect payload, for comparison."""
+    msg = "System Notification: Connection was lost and just re-established. Here is the recent chat history to help you resume seamlessly:\n\n"
+    for entry in history:
+        msg += f"[{entry.get('sender', 'Unknown')}]: {entry.get('text', '')}\n"
+    return msg + "\nPlease acknowledge the reconnection to the user (e.g. 'I lost connection for a moment, but I'm back...') and resume what you were doing."
+
+
+@pytest.fixture
+def pm(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAT_LOG_COMPACT_ON_START", "0")
+    manager = ProjectManager(str(tmp_path), chat_log=ChatLogWriter(flush_interval=10))
+    yield manager
+    manager.close()
+
+
+class TestRollingSummary:
+    def test_recent_turns_and_topics(self):
+        summary = RollingSummary(recent_turns=2)
+        summary.add("User", "design a bracket for the shelf", 1.0)
+        summary.add("ADA", "The bracket is ready, printing in PETG", 2.0)
+        summary.add("User", "make the bracket thicker", 3.0)
+        text = summary.render()
+        assert "Turns summarized: 3" in text
+        assert "Topics: bracket" in text
+        assert "design a bracket" not in text  # fell out of the recent window
+        assert text.endswith("[User]: make the bracket thicker")
+
+    def test_recent_topics_outrank_old_ones(self):
+        summary = RollingSummary(decay=0.9)
+        for i in range(20):
+            summary.add("User", "hinge hinge", i)
+        for i in range(20, 40):
+            summary.add("User", "drone", i)
+        assert summary.top_topics()[0] == "drone"
+
+    def test_render_is_bounded(self):
+        summary = RollingSummary(max_chars=500, turn_chars=200)
+        for i in range(1000):
+            summary.add("User", f"turn {i} " + "word " * 200, i)
+        text = summary.render()
+        assert len(text) <= 500
+        assert "turn 999" in text
+
+    def test_normalize_keeps_scores_finite(self):
+        summary = RollingSummary(decay=0.5, max_terms=5)
+        for i in range(2000):
+            summary.add("User", f"term{i % 50} common", i)
+        assert len(summary.topics) <= 10
+        assert summary.top_topics()[0] == "common"
+
+    def test_round_trip(self):
+        summary = RollingSummary()
+        for i in range(30):
+            summary.add("User" if i % 2 else "ADA", f"enclosure vent number {i}", 100.0 + i)
+        restored = RollingSummary()
+        restored.load_dict(json.loads(json.dumps(summary.to_dict())))
+        assert restored.render() == summary.render()
+        restored.add("User", "one more", 200.0)
+        summary.add("User", "one more", 200.0)
+        assert restored.render() == summary.render()
+
+
+class TestSummaryCache:
+    def test_seeded_from_log_tail_then_persisted_and_caught_up(self, tmp_path):
+        with open(tmp_path / "chat_history.jsonl", "w", encoding="utf-8") as f:
+            for i in range(100):
+                f.write(json.dumps({"timestamp": float(i), "sender": "User", "text": f"old message {i}"}) + "\n")
+        cache = SummaryCache(seed_turns=10)
+        summary = cache.get(tmp_path, ChatLogStore(tmp_path))
+        assert summary.turns == 10 and summary.first_ts == 90.0
+        cache.save(tmp_path)
+        assert (tmp_path / SUMMARY_NAME).exists()
+
+        # Entries logged after the save (e.g. before a crash) are folded in on load
+        with open(tmp_path / "chat_history.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": 500.0, "sender": "ADA", "text": "missed reply"}) + "\n")
+        summary = SummaryCache().get(tmp_path, ChatLogStore(tmp_path))
+        assert summary.turns == 11
+        assert summary.render().endswith("[ADA]: missed reply")
+
+    def test_corrupt_summary_is_reseeded(self, tmp_path):
+        (tmp_path / SUMMARY_NAME).write_text("{oops")
+        with open(tmp_path / "chat_history.jsonl", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": 1.0, "sender": "User", "text": "hello"}) + "\n")
+        assert SummaryCache().get(tmp_path, ChatLogStore(tmp_path)).turns == 1
+
+    @pytest.mark.parametrize("written", [False, True])
+    def test_turn_logged_during_catch_up_is_kept_once(self, tmp_path, written):
+        cache, store, writer = SummaryCache(), ChatLogStore(tmp_path), ChatLogWriter(flush_interval=10)
+
+        def log(text, timestamp):
+            entry = {"timestamp": timestamp, "sender": "User", "text": text}
+            writer.write(store.log_path, entry)
+            cache.add(tmp_path, entry)
+
+        log("before", 1.0)
+        read_recent = store.read_recent
+
+        def racing_read(limit):
+            log("during", 2.0)  # logged from the event loop while the log is read
+            if written:
+                writer.flush()
+            return read_recent(limit)
+
+        store.read_recent = racing_read
+        summary = cache.get(tmp_path, store, writer.flush)
+        log("after", 3.0)
+        writer.close()
+        assert [text for _, text in summary.recent] == ["before", "during", "after"]
+
+
+class TestReconnectRestore:
+    async def test_payload_is_silent_and_bounded(self, pm):
+        long_reply = "The bracket uses four M3 screws and a 2mm wall. " * 40
+        for i in range(200):
+            pm.log_chat("User", f"question {i} about the bracket")
+            pm.log_chat("ADA", long_reply)
+
+        session = FakeSession()
+        size = await send_reconnect_context(session, pm)
+        [sent] = session.sent
+        assert sent["size"] == size
+        assert sent["end_of_turn"] is False
+        assert "question 199" in sent["text"]
+        assert size <= pm.chat_summaries.max_chars + 300
+
+        old = raw_tail_message(pm.get_recent_chat_history(limit=10))
+        assert size < len(old) / 4
+
+    async def test_summary_is_maintained_incrementally(self, pm):
+        pm.log_chat("User", "first")
+        session = FakeSession()
+        await send_reconnect_context(session, pm)
+        summary = pm.chat_summaries.get(pm.get_current_project_path(), None)
+        pm.log_chat("ADA", "second")
+        assert summary.turns == 2  # updated by log_chat, not re-read from the log
+        await send_reconnect_context(session, pm)
+        assert session.sent[-1]["text"].endswith("[ADA]: second")
+
+    async def test_empty_project(self, pm):
+        session = FakeSession()
+        await send_reconnect_context(session, pm)
+        assert "No earlier conversation in project 'temp'" in session.sent[0]["text"]
+
+    async def test_falls_back_to_raw_tail(self, pm, monkeypatch):
+        pm.log_chat("User", "remember the hinge")
+
+        def broken(*args):
+            raise RuntimeError("boom")
+        monkeypatch.setattr(pm.chat_summaries, "get", broken)
+        session = FakeSession()
+        await send_reconnect_context(session, pm)
+        assert session.sent[0]["text"].endswith("[User]: remember the hinge")
+
+    def test_summary_saved_on_switch_and_hidden_from_context(self, pm):
+        pm.create_project("lamp")
+        pm.switch_project("lamp")
+        pm.log_chat("User", "warm white lamp")
+        pm.get_reconnect_context()
+        pm.switch_project("temp")
+        lamp = pm.projects_dir / "lamp"
+        assert (lamp / SUMMARY_NAME).exists()
+        pm.switch_project("lamp")
+        assert SUMMARY_NAME not in pm.get_project_context()
@@ -0,0 +1,113 @@
+"""
+Tests for non-blocking tool confirmations.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from confirmations import ConfirmationScheduler
+from tool_registry import ToolRegistry, DENIED_RESULT
+
+
+def fc(name, **args):
+    return SimpleNamespace(id=f"id-{name}", name=name, args=args)
+
+
+class Prompts:
+    """Collects the payloads sent to the UI."""
+
+    def __init__(self):
+        self.payloads = []
+        self.event = asyncio.Event()
+
+    def __call__(self, payload):
+        self.payloads.append(payload)
+        self.event.set()
+
+    async def next(self):
+        await asyncio.wait_for(self.event.wait(), 1)
+        self.event.clear()
+        return self.payloads[-1]
+
+
+class TestConfirmationScheduler:
+    """Test batching, resolution and expiry."""
+
+    @pytest.mark.asyncio
+    async def test_single_request_keeps_its_id(self):
+        prompts = Prompts()
+        scheduler = ConfirmationScheduler(prompts, batch_window=0.01)
+        task = asyncio.create_task(scheduler.request("write_file", {"path": "a.txt"}))
+        payload = await prompts.next()
+
+        assert payload["id"] == payload["requests"][0]["id"]
+        assert payload["tool"] == "write_file"
+        assert payload["args"] == {"path": "a.txt"}
+        assert scheduler.resolve(payload["id"], True)
+        assert await task is True
+        assert scheduler.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_requests_are_batched_into_one_prompt(self):
+        prompts = Prompts()
+        scheduler = ConfirmationScheduler(prompts, batch_window=0.02)
+        tasks = [asyncio.create_task(scheduler.request(name)) for name in ("type_text", "press_key", "open_app")]
+        payload = await prompts.next()
+
+        assert len(prompts.payloads) == 1
+        assert [r["tool"] for r in payload["requests"]] == ["type_text", "press_key", "open_app"]
+        scheduler.resolve(payload["id"], False)
+        assert await asyncio.gather(*tasks) == [False, False, False]
+        assert scheduler.get_stats()["denied"] == 3
+
+    @pytest.mark.asyncio
+    async def test_individual_request_in_batch(self):
+        prompts = Prompts()
+        scheduler = ConfirmationScheduler(prompts, batch_window=0.02)
+        first = asyncio.create_task(scheduler.request("read_file"))
+        second = asyncio.create_task(scheduler.request("write_file"))
+        payload = await prompts.next()
+
+        scheduler.resolve(payload["requests"][1]["id"], True)
+        assert await second is True
+        assert not first.done()
+        scheduler.resolve(payload["id"], False)
+        assert await first is False
+
+    @pytest.mark.asyncio
+    async def test_auto_deny_on_expiry(self):
+        prompts = Prompts()
+        scheduler = ConfirmationScheduler(prompts, timeout=0.05, batch_window=0.01)
+        assert await asyncio.wait_for(scheduler.request("print_stl"), 1) is False
+        assert scheduler.expired == 1
+        # A late answer finds nothing to resolve
+        assert not scheduler.resolve(prompts.payloads[0]["id"], True)
+
+    @pytest.mark.asyncio
+    async def test_deny_all(self):
+        scheduler = ConfirmationScheduler(lambda payload: None, batch_window=0.01)
+        task = asyncio.create_task(scheduler.request("control_light"))
+        await asyncio.sleep(0.02)
+        scheduler.deny_all()
+        assert await task is False
+
+
+class TestToolRegistryConfirmations:
+    """Confirmations as seen through tool dispatch."""
+
+    @pytest.mark.asyncio
+    async def test_denied_message_still_answers_the_model(self):
+        scheduler = ConfirmationScheduler(lambda payload: None, timeout=0.05, batch_window=0.01)
+        registry = ToolRegistry()
+        registry.register("write_file", lambda args: asyncio.sleep(0, "written"))
+        responses = []
+
+        async def on_results(results):
+            responses.extend(results)
+
+        task = registry.submit([fc("write_file")], on_results,
+                               confirm=lambda spec, call: scheduler.request(spec.name, call.args))
+        assert registry.in_flight == 1
+        await asyncio.wait_for(task, 1)
+        assert [result for _, result in responses] == [DENIED_RESULT]
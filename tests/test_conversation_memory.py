@@ -0,0 +1,125 @@
+"""
+Tests for the LOCAL-provider conversation memory window.
+"""
+import pytest
+import pytest_asyncio
+
+from conversation_memory import ConversationMemory, estimate_tokens
+from http_client import HttpClient
+from local_llm import stream_chat_completion
+from project_manager import ProjectManager
+from tests.stub_llm_server import StubLLMServer
+
+SYSTEM = "You are Multivac. " * 50
+
+
+def turn(i):
+    return f"Question {i}: " + "details " * 20, f"Answer {i}: " + "reply " * 30
+
+
+class TestConversationMemory:
+    """Test budgeting and prefix stability."""
+
+    def test_build_without_history(self):
+        memory = ConversationMemory(SYSTEM)
+        assert memory.build("hi") == [
+            {"role": "system", "content": SYSTEM},
+            {"role": "user", "content": "hi"},
+        ]
+
+    def test_keeps_history_in_order(self):
+        memory = ConversationMemory(SYSTEM)
+        memory.add("user", "make a cube")
+        memory.add("assistant", "Done.")
+        messages = memory.build("now a sphere")
+        assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+        assert messages[1]["content"] == "make a cube"
+        assert messages[-1]["content"] == "now a sphere"
+
+    def test_merges_consecutive_roles(self):
+        memory = ConversationMemory(SYSTEM)
+        memory.add("user", "one")
+        memory.add("user", "two")
+        memory.add("assistant", "")
+        assert memory.window == [{"role": "user", "content": "one\ntwo"}]
+        assert memory.build("three")[-1]["content"] == "one\ntwo\nthree"
+
+    def test_stays_within_budget(self):
+        memory = ConversationMemory(SYSTEM, max_tokens=1200, reserve_tokens=200)
+        for i in range(50):
+            question, answer = turn(i)
+            memory.add("user", question)
+            memory.add("assistant", answer)
+            assert memory.get_stats()["history_tokens"] <= memory.history_budget
+        assert memory.trims > 0
+        # Oldest turns are gone, newest kept, and the window opens on a user turn
+        assert memory.window[0]["role"] == "user"
+        assert memory.window[-1]["content"].startswith("Answer 49")
+
+    def test_prefix_stable_until_trim(self):
+        memory = ConversationMemory(SYSTEM, max_tokens=1200, reserve_tokens=200)
+        previous = memory.build()
+        trims = 0
+        stable_turns = 0
+        for i in range(30):
+            question, answer = turn(i)
+            memory.add("user", question)
+            memory.add("assistant", answer)
+            current = memory.build()
+            if memory.trims == trims:
+                # Append-only: the previous prompt is a prefix of the new one
+                assert current[:len(previous)] == previous
+                assert memory.prefix_messages == len(previous)
+                stable_turns += 1
+            else:
+                assert memory.prefix_messages == 1
+            trims = memory.trims
+            previous = current
+        # Hysteresis: far fewer trims than turns
+        assert memory.trims < stable_turns
+
+    def test_load_history_from_chat_log(self, tmp_path):
+        pm = ProjectManager(str(tmp_path))
+        pm.log_chat("User", "hello")
+        pm.log_chat("Multivac", "Hi there.")
+        memory = ConversationMemory(SYSTEM)
+        memory.load_history(pm.get_recent_chat_history())
+        assert memory.window == [
+            {"role": "user", "content": "hello"},
+            {"role": "assistant", "content": "Hi there."},
+        ]
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+
+
+@pytest_asyncio.fixture
+async def stub():
+    server = StubLLMServer(first_token_delay=0, token_interval=0, prompt_token_delay=0.0001)
+    await server.start()
+    yield server
+    await server.stop()
+
+
+class TestPromptCacheReuse:
+    """Test that history windows reuse the server's prompt cache."""
+
+    @pytest.mark.asyncio
+    async def test_only_new_turn_is_processed(self, stub):
+        memory = ConversationMemory(SYSTEM, max_tokens=4096)
+        client = HttpClient()
+        for i in range(3):
+            question = turn(i)[0]
+            reply = "".join([d async for d in stream_chat_completion(client, stub.url, memory.build(question), "m")])
+            memory.add("user", question)
+            memory.add("assistant", reply)
+        await client.close()
+
+        first, *rest = stub.prompt_stats
+        assert first["cached_tokens"] == 0
+        for stats in rest:
+            # System prompt and earlier turns come from the cache
+            assert stats["cached_tokens"] > estimate_tokens(SYSTEM)
+            assert stats["prompt_tokens"] - stats["cached_tokens"] < first["prompt_tokens"] / 2
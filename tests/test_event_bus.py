@@ -0,0 +1,134 @@
+"""
+Tests for the outbound Socket.IO event bus.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from event_bus import EventBus
+
+
+class RecordingEmit:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, event, payload):
+        self.calls.append((event, payload))
+
+
+class TestEventBus:
+    """Test batching, coalescing, bounds and thread-safe submission."""
+
+    @pytest.mark.asyncio
+    async def test_burst_is_one_batch_in_order(self):
+        emit = RecordingEmit()
+        bus = EventBus(emit, tick=0.01)
+        bus.start()
+        bus.publish("cad_data", {"n": 1})
+        bus.publish("error", {"msg": "x"})
+        bus.publish("browser_frame", {"n": 2})
+        await asyncio.sleep(0.05)
+        await bus.stop()
+
+        assert [e for e, _ in emit.calls] == ["cad_data", "error", "browser_frame"]
+        assert bus.batches == 1
+
+    @pytest.mark.asyncio
+    async def test_replace_keeps_latest_status(self):
+        emit = RecordingEmit()
+        bus = EventBus(emit)
+        bus.bind_loop()
+        bus.publish("cad_status", {"status": "generating", "attempt": 1})
+        bus.publish("cad_data", {"n": 1})
+        bus.publish("cad_status", {"status": "retrying", "attempt": 2})
+        await bus.flush()
+
+        assert emit.calls == [("cad_data", {"n": 1}), ("cad_status", {"status": "retrying", "attempt": 2})]
+        assert bus.coalesced == 1
+
+    @pytest.mark.asyncio
+    async def test_candidate_reports_do_not_replace_the_status(self):
+        emit = RecordingEmit()
+        bus = EventBus(emit)
+        bus.bind_loop()
+        bus.publish("cad_status", {"status": "generating", "attempt": 1})
+        for candidate, phase in ((2, "succeeded"), (1, "cancelled"), (3, "cancelled")):
+            bus.publish("cad_candidate", {"candidate": candidate, "phase": phase})
+        await bus.flush()
+
+        assert emit.calls[0] == ("cad_status", {"status": "generating", "attempt": 1})
+        assert [(p["candidate"], p["phase"]) for _, p in emit.calls[1:]] == [
+            (2, "succeeded"), (1, "cancelled"), (3, "cancelled")
+        ]
+
+    @pytest.mark.asyncio
+    async def test_append_merges_consecutive_deltas_per_sender(self):
+        emit = RecordingEmit()
+        bus = EventBus(emit)
+        bus.bind_loop()
+        bus.publish("transcription", {"sender": "User", "text": "turn on "})
+        bus.publish("transcription", {"sender": "User", "text": "the lights"})
+        bus.publish("transcription", {"sender": "ADA", "text": "Sure"})
+        bus.publish("cad_thought", {"text": "a"})
+        bus.publish("cad_thought", {"text": "b"})
+        await bus.flush()
+
+        assert emit.calls == [
+            ("transcription", {"sender": "User", "text": "turn on the lights"}),
+            ("transcription", {"sender": "ADA", "text": "Sure"}),
+            ("cad_thought", {"text": "ab"}),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_bounded_queue_counts_drops(self):
+        emit = RecordingEmit()
+        bus = EventBus(emit, max_size=2)
+        bus.bind_loop()
+        for i in range(5):
+            bus.publish("browser_frame", {"n": i})
+        assert bus.depth == 2
+
+        stats = bus.get_stats()
+        assert stats["dropped"] == 3
+        assert stats["dropped_by_event"] == {"browser_frame": 3}
+        await bus.flush()
+        assert [p["n"] for _, p in emit.calls] == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_publish_from_worker_thread(self):
+        emit = RecordingEmit()
+        bus = EventBus(emit, tick=0.01)
+        bus.start()
+
+        def worker():
+            for i in range(10):
+                bus.publish("browser_frame", {"n": i})
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        await asyncio.sleep(0.05)
+        await bus.stop()
+
+        assert len(emit.calls) == 30
+        assert bus.get_stats()["depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_emit_errors_do_not_stop_the_batch(self):
+        calls = []
+
+        async def flaky(event, payload):
+            if event == "error":
+                raise RuntimeError("socket gone")
+            calls.append(event)
+
+        bus = EventBus(flaky)
+        bus.bind_loop()
+        bus.publish("error", {"msg": "x"})
+        bus.publish("cad_data", {})
+        await bus.flush()
+        assert calls == ["cad_data"]
+        assert bus.errors == 1
@@ -0,0 +1,62 @@
+"""
+Tests for the latest-frame buffer used by video_frame / send_frame.
+"""
+import base64
+
+import pytest
+
+from frame_buffer import LatestFrame
+
+JPEG = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 4
+
+
+class TestLatestFrame:
+    def test_empty(self):
+        frame = LatestFrame()
+        assert not frame
+        assert frame.payload() is None
+
+    def test_bytes_are_kept_without_copy_or_encoding(self):
+        frame = LatestFrame()
+        frame.set(JPEG)
+        payload = frame.payload()
+        assert payload == {"mime_type": "image/jpeg", "data": JPEG}
+        assert payload["data"] is JPEG
+
+    def test_base64_string_passes_through(self):
+        encoded = base64.b64encode(JPEG).decode()
+        frame = LatestFrame()
+        frame.set(encoded)
+        assert frame.payload()["data"] is encoded
+
+    def test_memoryview_copied_once_at_dispatch(self):
+        buf = bytearray(JPEG)
+        frame = LatestFrame()
+        frame.set(memoryview(buf))
+        first = frame.payload()["data"]
+        assert isinstance(first, bytes) and first == JPEG
+        assert frame.payload()["data"] is first
+
+    def test_newer_frame_replaces_pending(self):
+        frame = LatestFrame()
+        frame.set(b"one")
+        frame.set(b"two")
+        frame.set(b"three")
+        assert frame.payload()["data"] == b"three"
+        frame.set(b"four")  # previous one was sent, so not counted as replaced
+        assert frame.get_stats() == {"received": 4, "replaced": 2, "dispatched": 1}
+
+    def test_empty_data_ignored(self):
+        frame = LatestFrame()
+        frame.set(b"")
+        assert not frame
+        assert frame.received == 0
+
+    def test_payload_is_accepted_by_sdk_blob(self):
+        types = pytest.importorskip("google.genai.types")
+        frame = LatestFrame()
+        frame.set(JPEG)
+        blob = types.Blob(**frame.payload())
+        assert base64.urlsafe_b64decode(blob.model_dump(mode="json")["data"]) == JPEG
+        frame.set(base64.b64encode(JPEG).decode())
+        assert types.Blob(**frame.payload()).data == JPEG
@@ -0,0 +1,89 @@
+"""
+Tests for the camera frame pipeline (change detection, downsampling, JPEG budget).
+"""
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from frame_pipeline import FramePipeline, dhash, hamming
+
+
+def scene(width=1280, height=720, seed=0, shift=0):
+    """A textured BGR frame; `shift` moves a bright box across it."""
+    rng = np.random.default_rng(seed)
+    frame = cv2.resize(rng.integers(0, 255, (18, 32, 3), dtype=np.uint8), (width, height),
+                       interpolation=cv2.INTER_LINEAR)
+    x = 100 + shift
+    cv2.rectangle(frame, (x, 200), (x + 300, 500), (255, 255, 255), -1)
+    return frame
+
+
+def sensor_noise(frame, amount=3, seed=1):
+    rng = np.random.default_rng(seed)
+    return np.clip(frame.astype(np.int16) + rng.integers(-amount, amount + 1, frame.shape), 0, 255).astype(np.uint8)
+
+
+class TestDhash:
+    def test_stable_under_noise(self):
+        frame = scene()
+        assert hamming(dhash(frame), dhash(sensor_noise(frame))) <= 2
+
+    def test_detects_scene_change(self):
+        assert hamming(dhash(scene(seed=0)), dhash(scene(seed=5))) > 10
+
+    def test_hash_size(self):
+        assert dhash(scene(), hash_size=16).bit_length() <= 256
+
+
+class TestChangeDetection:
+    def test_first_frame_always_sent(self):
+        pipeline = FramePipeline()
+        assert pipeline.process(scene(), now=0) is not None
+
+    def test_unchanged_frames_skipped(self):
+        pipeline = FramePipeline(max_interval=60)
+        frame = scene()
+        assert pipeline.process(frame, now=0) is not None
+        for i in range(1, 5):
+            assert pipeline.process(sensor_noise(frame, seed=i), now=i) is None
+        assert pipeline.get_stats()["skipped"] == 4
+
+    def test_changed_frame_sent(self):
+        pipeline = FramePipeline(max_interval=60)
+        pipeline.process(scene(), now=0)
+        assert pipeline.process(scene(shift=600), now=1) is not None
+
+    def test_periodic_refresh(self):
+        pipeline = FramePipeline(max_interval=10)
+        frame = scene()
+        pipeline.process(frame, now=0)
+        assert pipeline.process(frame, now=5) is None
+        assert pipeline.process(frame, now=10) is not None
+        assert pipeline.process(frame, now=11) is None
+
+    def test_reset(self):
+        pipeline = FramePipeline(max_interval=60)
+        frame = scene()
+        pipeline.process(frame, now=0)
+        pipeline.reset()
+        assert pipeline.process(frame, now=1) is not None
+
+
+class TestEncode:
+    def test_downsampled_to_max_size(self):
+        jpeg = FramePipeline(max_size=640).encode(scene(1920, 1080))
+        assert jpeg[:2] == b"\xff\xd8"
+        image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        assert image.shape[:2] == (360, 640)
+
+    def test_small_frame_not_upscaled(self):
+        jpeg = FramePipeline(max_size=1024).encode(scene(320, 240))
+        assert cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape[:2] == (240, 320)
+
+    def test_byte_budget(self):
+        frame = sensor_noise(scene(), amount=40)
+        unbounded = FramePipeline(quality=90).encode(frame)
+        budget = len(unbounded) // 4
+        bounded = FramePipeline(quality=90, max_bytes=budget).encode(frame)
+        assert len(bounded) <= budget
@@ -0,0 +1,160 @@
+"""
+Tests for the pooled aiohttp client, against a local stub server.
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from http_client import HttpClient, HttpError, RetryBudget
+
+
+class StubServer:
+    """Local HTTP server with ElevenLabs/LM Studio-shaped endpoints."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.fail_next = 0
+        self.delay = 0.0
+        self.hits = 0
+        self.runner = None
+        self.url = None
+
+    def _tracked(self, handler):
+        async def wrapped(request):
+            return await self._track(handler, request)
+        return wrapped
+
+    async def _track(self, handler, request):
+        self.hits += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.fail_next:
+                self.fail_next -= 1
+                return web.Response(status=503, text="busy")
+            return await handler(request)
+        finally:
+            self.active -= 1
+
+    async def chat(self, request):
+        body = await request.json()
+        text = body["messages"][-1]["content"]
+        return web.json_response({"choices": [{"message": {"content": f"echo: {text}"}}]})
+
+    async def tts(self, request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(4):
+            await response.write(b"\x00\x01" * 512)
+        await response.write_eof()
+        return response
+
+    async def bad(self, request):
+        return web.Response(status=400, text="bad request")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._tracked(self.chat))
+        app.router.add_post("/v1/text-to-speech/voice/stream", self._tracked(self.tts))
+        app.router.add_post("/bad", self._tracked(self.bad))
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+@pytest_asyncio.fixture
+async def stub():
+    server = StubServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+class TestHttpClient:
+    """Test pooling, limits, timeouts and retries."""
+
+    @pytest.mark.asyncio
+    async def test_sequential_sentences_reuse_one_connection(self, stub):
+        client = HttpClient(backoff=0)
+        for i in range(5):
+            response = await client.request("POST", f"{stub.url}/v1/text-to-speech/voice/stream", json={"text": str(i)})
+            body = b""
+            async for chunk in response.content.iter_chunked(1024):
+                body += chunk
+            response.release()
+            assert len(body) == 4096
+        await client.close()
+
+        assert client.connections_opened == 1
+        assert client.connections_reused == 4
+
+    @pytest.mark.asyncio
+    async def test_post_json(self, stub):
+        client = HttpClient()
+        data = await client.post_json(f"{stub.url}/v1/chat/completions", {"messages": [{"role": "user", "content": "hi"}]})
+        await client.close()
+        assert data["choices"][0]["message"]["content"] == "echo: hi"
+
+    @pytest.mark.asyncio
+    async def test_non_2xx_raises_http_error(self, stub):
+        client = HttpClient()
+        with pytest.raises(HttpError) as exc:
+            await client.post_json(f"{stub.url}/bad", {})
+        await client.close()
+        assert exc.value.status == 400
+        assert client.retried == 0
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit(self, stub):
+        stub.delay = 0.02
+        client = HttpClient(limit_per_host=2)
+        payload = {"messages": [{"role": "user", "content": "x"}]}
+        await asyncio.gather(*[client.post_json(f"{stub.url}/v1/chat/completions", payload) for _ in range(8)])
+        await client.close()
+        assert stub.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_status(self, stub):
+        stub.fail_next = 2
+        client = HttpClient(retries=2, backoff=0)
+        data = await client.post_json(f"{stub.url}/v1/chat/completions", {"messages": [{"role": "user", "content": "x"}]})
+        await client.close()
+        assert data["choices"]
+        assert client.retried == 2
+        assert stub.hits == 3
+
+    @pytest.mark.asyncio
+    async def test_retry_budget_caps_retries(self, stub):
+        stub.fail_next = 100
+        client = HttpClient(retries=5, backoff=0, retry_budget=RetryBudget(ratio=0.0, min_tokens=1))
+        with pytest.raises(HttpError):
+            await client.post_json(f"{stub.url}/v1/chat/completions", {"messages": [{"role": "user", "content": "x"}]})
+        await client.close()
+        assert client.retried == 1
+        assert client.retries_denied == 1
+        assert stub.hits == 2
+
+    @pytest.mark.asyncio
+    async def test_timeout(self, stub):
+        import aiohttp
+
+        stub.delay = 0.5
+        client = HttpClient(retries=0)
+        with pytest.raises(asyncio.TimeoutError):
+            await client.post_json(
+                f"{stub.url}/v1/chat/completions", {"messages": [{"role": "user", "content": "x"}]},
+                timeout=aiohttp.ClientTimeout(total=0.05)
+            )
+        await client.close()
+        assert client.failures == 1
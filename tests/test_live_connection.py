@@ -0,0 +1,276 @@
+"""
+Tests for the Live connection manager (resumption, warm standby, replay),
+against a fake `client.aio.live.connect`.
+"""
+import asyncio
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+from live_connection import LiveConnection, parse_duration
+
+CLOSED = object()
+
+
+def message(update=None, go_away=None, turn_complete=False, model_turn=False):
+    content = None
+    if turn_complete or model_turn:
+        content = SimpleNamespace(turn_complete=turn_complete, interrupted=False, model_turn=model_turn or None)
+    return SimpleNamespace(session_resumption_update=update, go_away=go_away, server_content=content)
+
+
+def handle_update(handle, consumed=None):
+    return message(update=SimpleNamespace(resumable=True, new_handle=handle,
+                                          last_consumed_client_message_index=consumed))
+
+
+class FakeLiveSession:
+    def __init__(self, handle):
+        self.handle = handle
+        self.sent = []
+        self.closed = False
+        self.queue = asyncio.Queue()
+
+    async def send(self, input=None, end_of_turn=False):
+        if self.closed:
+            raise ConnectionError("closed")
+        self.sent.append(input)
+
+    async def send_tool_response(self, function_responses=None):
+        self.sent.append(("tool", function_responses))
+
+    async def receive(self):
+        while True:
+            item = await self.queue.get()
+            if item is CLOSED:
+                raise ConnectionError("connection closed")
+            yield item
+            if item.server_content and item.server_content.turn_complete:
+                return
+
+    def push(self, *items):
+        for item in items:
+            self.queue.put_nowait(item)
+
+    def drop(self):
+        self.queue.put_nowait(CLOSED)
+
+
+class FakeLive:
+    """Stands in for client.aio.live.connect; records every connection."""
+
+    def __init__(self):
+        self.sessions = []
+        self.fail_next = 0
+        self.rejected_handles = set()
+        self.connected = asyncio.Event()
+
+    def connect(self, handle):
+        @contextlib.asynccontextmanager
+        async def cm():
+            if self.fail_next:
+                self.fail_next -= 1
+                raise ConnectionError("refused")
+            if handle in self.rejected_handles:
+                raise ConnectionError("invalid session handle")
+            session = FakeLiveSession(handle)
+            self.sessions.append(session)
+            self.connected.set()
+            try:
+                yield session
+            finally:
+                session.closed = True
+                session.drop()
+        return cm()
+
+    async def wait_sessions(self, n, timeout=2.0):
+        async def wait():
+            while len(self.sessions) < n:
+                await asyncio.sleep(0.005)
+        await asyncio.wait_for(wait(), timeout)
+
+
+async def until(predicate, timeout=2.0):
+    async def wait():
+        while not predicate():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(wait(), timeout)
+
+
+@pytest.fixture
+async def live():
+    fake = FakeLive()
+    events = []
+
+    async def on_connected(resumed, reason):
+        events.append((resumed, reason))
+
+    conns = []
+
+    def make(**options):
+        conn = LiveConnection(fake.connect, on_connected=on_connected, max_retry_delay=0.01, **options)
+        received = []
+
+        async def consume():
+            while True:
+                async for response in conn.receive():
+                    received.append(response)
+
+        tasks = [asyncio.create_task(conn.run()), asyncio.create_task(consume())]
+        conns.append((conn, tasks))
+        return conn, received
+
+    yield SimpleNamespace(fake=fake, events=events, make=make)
+    for conn, tasks in conns:
+        conn.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_parse_duration():
+    assert parse_duration("12s") == 12.0
+    assert parse_duration("0.5s") == 0.5
+    assert parse_duration(3) == 3.0
+    assert parse_duration(None) is None
+    assert parse_duration("soon") is None
+
+
+class TestResumption:
+    async def test_reconnect_resumes_with_latest_handle(self, live):
+        conn, received = live.make()
+        await live.fake.wait_sessions(1)
+        first = live.fake.sessions[0]
+        first.push(handle_update("h1"), handle_update("h2"), message(turn_complete=True))
+        await until(lambda: conn.handle == "h2")
+
+        first.drop()
+        await live.fake.wait_sessions(2)
+        await until(lambda: len(live.events) == 2)
+        assert live.fake.sessions[1].handle == "h2"
+        assert live.events == [(False, "start"), (True, "reconnect")]
+        assert conn.get_stats()["reconnects"] == 1
+
+    async def test_rejected_handle_starts_fresh_session(self, live):
+        conn, _ = live.make()
+        await live.fake.wait_sessions(1)
+        live.fake.sessions[0].push(handle_update("stale"))
+        await until(lambda: conn.handle == "stale")
+        live.fake.rejected_handles.add("stale")
+
+        live.fake.sessions[0].drop()
+        await live.fake.wait_sessions(2)
+        await until(lambda: len(live.events) == 2)
+        assert live.fake.sessions[1].handle is None
+        assert live.events[-1] == (False, "reconnect")
+        assert conn.handle is None
+
+    async def test_connect_failures_are_retried(self, live):
+        live.fake.fail_next = 3
+        conn, _ = live.make()
+        await live.fake.wait_sessions(1)
+        await until(lambda: conn.connected)
+
+
+class TestReplay:
+    async def test_input_captured_while_disconnected_is_sent_after_reconnect(self, live):
+        conn, _ = live.make()
+        await live.fake.wait_sessions(1)
+        await until(lambda: conn.connected)
+        live.fake.fail_next = 2
+        live.fake.sessions[0].drop()
+        await until(lambda: not conn.connected)
+
+        for i in range(5):
+            await conn.send_realtime({"data": i})
+        await live.fake.wait_sessions(2)
+        await until(lambda: conn.connected)
+        assert live.fake.sessions[1].sent == [{"data": i} for i in range(5)]
+
+    async def test_unconsumed_input_is_replayed(self, live):
+        conn, _ = live.make()
+        await live.fake.wait_sessions(1)
+        await until(lambda: conn.connected)
+        first = live.fake.sessions[0]
+        for i in range(3):
+            await conn.send_realtime({"data": i})
+        first.push(handle_update("h1", consumed=0))  # server state includes input 0 only
+        await until(lambda: conn.handle == "h1")
+        await conn.send_realtime({"data": 3})
+
+        first.drop()
+        await live.fake.wait_sessions(2)
+        await until(lambda: conn.connected)
+        assert live.fake.sessions[1].sent == [{"data": 1}, {"data": 2}, {"data": 3}]
+
+    async def test_pending_input_is_bounded(self, live):
+        conn, _ = live.make(pending_limit=3)
+        await live.fake.wait_sessions(1)
+        await until(lambda: conn.connected)
+        live.fake.fail_next = 1000
+        live.fake.sessions[0].drop()
+        await until(lambda: not conn.connected)
+        for i in range(10):
+            await conn.send_realtime({"data": i})
+        assert conn.get_stats()["pending"] == 3
+        assert conn.get_stats()["dropped"] == 7
+
+    async def test_text_waits_for_connection(self, live):
+        conn, _ = live.make()
+        await live.fake.wait_sessions(1)
+        await until(lambda: conn.connected)
+        live.fake.fail_next = 2
+        live.fake.sessions[0].drop()
+        await until(lambda: not conn.connected)
+        await asyncio.wait_for(conn.send(input="hello", end_of_turn=True), 2)
+        assert live.fake.sessions[1].sent == ["hello"]
+
+
+class TestWarmStandby:
+    async def test_swaps_before_lifetime_without_losing_input(self, live):
+        conn, received = live.make(session_lifetime=0.3, standby_lead=0.2)
+        await live.fake.wait_sessions(1)
+        live.fake.sessions[0].push(handle_update("h1"))
+        await until(lambda: conn.handle == "h1")
+
+        sent = 0
+        while len(live.fake.sessions) < 2 or not conn.connected:
+            await conn.send_realtime({"data": sent})
+            sent += 1
+            await asyncio.sleep(0.005)
+        for _ in range(5):
+            await conn.send_realtime({"data": sent})
+            sent += 1
+
+        first, second = live.fake.sessions[:2]
+        assert second.handle == "h1"
+        await until(lambda: first.closed)
+        delivered = {m["data"] for m in first.sent + second.sent}
+        assert delivered == set(range(sent))
+        assert live.events[-1] == (True, "swap")
+        assert conn.get_stats()["swaps"] >= 1
+
+        # The receive loop follows the swap
+        done = message(turn_complete=True)
+        live.fake.sessions[-1].push(done)
+        await until(lambda: received and received[-1] is done)
+
+    async def test_swap_waits_for_turn_boundary(self, live):
+        conn, _ = live.make(session_lifetime=5.0, standby_lead=4.95)
+        await live.fake.wait_sessions(1)
+        first = live.fake.sessions[0]
+        first.push(message(model_turn=True))
+        await asyncio.sleep(0.2)
+        assert len(live.fake.sessions) == 1  # model is mid-reply
+
+        first.push(message(turn_complete=True))
+        await live.fake.wait_sessions(2)
+        await until(lambda: first.closed)
+
+    async def test_go_away_triggers_swap(self, live):
+        conn, _ = live.make()
+        await live.fake.wait_sessions(1)
+        live.fake.sessions[0].push(message(go_away=SimpleNamespace(time_left="5s")))
+        await live.fake.wait_sessions(2)
+        await until(lambda: live.events[-1] == (False, "swap"))
@@ -0,0 +1,166 @@
+"""
+Tests for streamed LOCAL-provider completions, against the stub LLM server.
+"""
+import json
+import time
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from http_client import HttpClient, HttpError, iter_sse
+from local_llm import stream_chat_completion
+from tts_pipeline import SentenceSegmenter
+from tests.stub_llm_server import StubLLMServer, DEFAULT_REPLY
+
+MESSAGES = [{"role": "user", "content": "help me design a bracket"}]
+
+
+async def serve(app):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+
+@pytest_asyncio.fixture
+async def stub():
+    server = StubLLMServer(first_token_delay=0.05, token_interval=0.01)
+    await server.start()
+    yield server
+    await server.stop()
+
+
+class TestStreamChatCompletion:
+    """Test SSE consumption of /v1/chat/completions."""
+
+    @pytest.mark.asyncio
+    async def test_streams_full_reply(self, stub):
+        client = HttpClient()
+        deltas = [d async for d in stream_chat_completion(client, stub.url, MESSAGES, "stub-model")]
+        await client.close()
+
+        assert len(deltas) == len(stub.tokens())
+        assert "".join(deltas) == DEFAULT_REPLY
+        assert stub.requests[0]["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_first_token_arrives_before_completion(self, stub):
+        client = HttpClient()
+        start = time.perf_counter()
+        first_token = first_sentence = None
+        segmenter = SentenceSegmenter()
+        async for delta in stream_chat_completion(client, stub.url, MESSAGES, "stub-model"):
+            now = time.perf_counter() - start
+            if first_token is None:
+                first_token = now
+            if first_sentence is None and segmenter.feed(delta):
+                first_sentence = now
+        total = time.perf_counter() - start
+        await client.close()
+
+        # ~30 tokens at 10 ms: the first sentence is ready well before the reply ends
+        assert first_token < total / 2
+        assert first_sentence < total - 0.1
+
+    @pytest.mark.asyncio
+    async def test_non_streaming_server_fallback(self):
+        async def chat(request):
+            return web.json_response({"choices": [{"message": {"content": "whole reply"}}]})
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", chat)
+        runner, url = await serve(app)
+
+        client = HttpClient()
+        deltas = [d async for d in stream_chat_completion(client, url, MESSAGES, "m")]
+        await client.close()
+        await runner.cleanup()
+        assert deltas == ["whole reply"]
+
+    @pytest.mark.asyncio
+    async def test_error_status(self):
+        async def chat(request):
+            return web.Response(status=404, text="model not loaded")
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", chat)
+        runner, url = await serve(app)
+
+        client = HttpClient()
+        with pytest.raises(HttpError) as exc:
+            async for _ in stream_chat_completion(client, url, MESSAGES, "m"):
+                pass
+        await client.close()
+        await runner.cleanup()
+        assert exc.value.status == 404
+
+
+class TestIterSSE:
+    """Test SSE framing."""
+
+    @pytest.mark.asyncio
+    async def test_multiline_and_comments(self):
+        async def events(request):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            await response.write(b": keep-alive\n\ndata: one\ndata: two\n\nevent: x\ndata:three\n\n")
+            await response.write_eof()
+            return response
+
+        app = web.Application()
+        app.router.add_get("/events", events)
+        runner, url = await serve(app)
+
+        client = HttpClient()
+        async with await client.request("GET", f"{url}/events") as response:
+            data = [d async for d in iter_sse(response)]
+        await client.close()
+        await runner.cleanup()
+        assert data == ["one\ntwo", "three"]
+
+
+class TestToolCalls:
+    """Test assembly of streamed tool-call fragments."""
+
+    @pytest.mark.asyncio
+    async def test_streamed_tool_call_fragments(self):
+        fragments = [
+            {"tool_calls": [{"index": 0, "id": "call_a", "type": "function",
+                             "function": {"name": "print_stl", "arguments": ""}}]},
+            {"tool_calls": [{"index": 0, "function": {"arguments": "{\"printer\": "}}]},
+            {"tool_calls": [{"index": 0, "function": {"arguments": "\"prusa\"}"}}]},
+            {"tool_calls": [{"index": 1, "id": "call_b", "function": {"name": "list_projects", "arguments": "{}"}}]},
+        ]
+
+        async def chat(request):
+            body = await request.json()
+            assert body["tools"][0]["function"]["name"] == "print_stl"
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for delta in fragments:
+                chunk = {"choices": [{"index": 0, "delta": delta}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            return response
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", chat)
+        runner, url = await serve(app)
+
+        client = HttpClient()
+        tool_calls = []
+        tools = [{"type": "function", "function": {"name": "print_stl"}}]
+        deltas = [d async for d in stream_chat_completion(client, url, MESSAGES, "m", tools=tools,
+                                                         tool_calls=tool_calls)]
+        await client.close()
+        await runner.cleanup()
+
+        assert deltas == []
+        assert [(c.id, c.name, c.args) for c in tool_calls] == [
+            ("call_a", "print_stl", {"printer": "prusa"}),
+            ("call_b", "list_projects", {}),
+        ]
+        assert tool_calls[0].to_message()["function"]["arguments"] == "{\"printer\": \"prusa\"}"
@@ -0,0 +1,134 @@
+"""
+Tests for CAD preview LODs: STL parsing, welding, decimation and the MVM1 format.
+"""
+import struct
+
+import numpy as np
+import pytest
+
+from mesh_lod import MeshLods, decimate, decode_mesh, encode_mesh, read_stl, weld
+
+
+def sphere_triangles(rings=60, segments=120, radius=10.0):
+    """A UV sphere as STL-style (N, 3, 3) triangles, corners repeated per triangle."""
+    theta = np.linspace(0, np.pi, rings + 1)
+    phi = np.linspace(0, 2 * np.pi, segments + 1)
+    grid = radius * np.stack([np.outer(np.sin(theta), np.cos(phi)),
+                              np.outer(np.sin(theta), np.sin(phi)),
+                              np.outer(np.cos(theta), np.ones_like(phi))], axis=-1)
+    a, b = grid[:-1, :-1], grid[:-1, 1:]
+    c, d = grid[1:, :-1], grid[1:, 1:]
+    quads = [np.stack([a, c, d], axis=-2), np.stack([a, d, b], axis=-2)]
+    return np.concatenate([q.reshape(-1, 3, 3) for q in quads]).astype(np.float32)
+
+
+def binary_stl(triangles):
+    header = b"\0" * 80 + struct.pack("<I", len(triangles))
+    records = b"".join(b"\0" * 12 + tri.astype("<f4").tobytes() + b"\0\0" for tri in triangles)
+    return header + records
+
+
+def ascii_stl(triangles):
+    lines = ["solid test"]
+    for tri in triangles:
+        lines += ["facet normal 0 0 0", " outer loop"]
+        lines += [f"  vertex {x} {y} {z}" for x, y, z in tri]
+        lines += [" endloop", "endfacet"]
+    return ("\n".join(lines + ["endsolid test"])).encode()
+
+
+CUBE = np.array([[[0, 0, 0], [1, 1, 0], [1, 0, 0]], [[0, 0, 0], [0, 1, 0], [1, 1, 0]],
+                 [[0, 0, 1], [1, 0, 1], [1, 1, 1]], [[0, 0, 1], [1, 1, 1], [0, 1, 1]],
+                 [[0, 0, 0], [1, 0, 0], [1, 0, 1]], [[0, 0, 0], [1, 0, 1], [0, 0, 1]],
+                 [[0, 1, 0], [1, 1, 1], [1, 1, 0]], [[0, 1, 0], [0, 1, 1], [1, 1, 1]],
+                 [[0, 0, 0], [0, 0, 1], [0, 1, 1]], [[0, 0, 0], [0, 1, 1], [0, 1, 0]],
+                 [[1, 0, 0], [1, 1, 0], [1, 1, 1]], [[1, 0, 0], [1, 1, 1], [1, 0, 1]]], dtype=np.float32)
+
+
+class TestReadAndWeld:
+    def test_binary_and_ascii(self):
+        assert np.array_equal(read_stl(binary_stl(CUBE)), CUBE)
+        assert np.array_equal(read_stl(ascii_stl(CUBE)), CUBE)
+
+    def test_binary_starting_with_solid(self):
+        data = b"solid" + binary_stl(CUBE)[5:]
+        assert np.array_equal(read_stl(data), CUBE)
+
+    def test_rejects_garbage(self):
+        with pytest.raises(ValueError):
+            read_stl(b"not a mesh")
+
+    def test_weld_shares_corners(self):
+        vertices, faces = weld(CUBE)
+        assert len(vertices) == 8 and len(faces) == 12
+        assert np.allclose(vertices[faces], CUBE)
+
+    def test_weld_drops_degenerate(self):
+        sliver = np.array([[[0, 0, 0], [0, 0, 0], [1, 0, 0]]], dtype=np.float32)
+        _, faces = weld(np.concatenate([CUBE, sliver]))
+        assert len(faces) == 12
+
+
+class TestDecimate:
+    def test_meets_budget_and_keeps_shape(self):
+        vertices, faces = weld(sphere_triangles())
+        assert len(faces) > 10_000
+        small_v, small_f = decimate(vertices, faces, 2_000)
+        assert 1_000 <= len(small_f) <= 2_000
+        radii = np.linalg.norm(small_v, axis=1)
+        assert np.all(np.abs(radii - 10.0) < 0.5)
+        assert small_f.max() < len(small_v)
+
+    def test_small_mesh_untouched(self):
+        vertices, faces = weld(CUBE)
+        assert decimate(vertices, faces, 100)[1] is faces
+
+    def test_flat_faces_stay_flat(self):
+        # A finely split square: every vertex of the result stays on the plane
+        xs, ys = np.meshgrid(np.linspace(0, 1, 41), np.linspace(0, 1, 41))
+        grid = np.stack([xs, ys, np.zeros_like(xs)], axis=-1)
+        tris = np.concatenate([np.stack([grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:]], -2).reshape(-1, 3, 3),
+                               np.stack([grid[:-1, :-1], grid[1:, 1:], grid[:-1, 1:]], -2).reshape(-1, 3, 3)])
+        vertices, faces = weld(tris.astype(np.float32))
+        small_v, small_f = decimate(vertices, faces, 200)
+        assert len(small_f) <= 200
+        assert np.allclose(small_v[:, 2], 0)
+
+
+class TestFormat:
+    def test_round_trip_within_quantization(self):
+        vertices, faces = weld(sphere_triangles())
+        data = encode_mesh(vertices, faces)
+        decoded_v, decoded_f = decode_mesh(data)
+        assert np.array_equal(decoded_f, faces)
+        assert np.abs(decoded_v - vertices).max() <= 20.0 / 65535
+        assert decoded_f.dtype == np.uint16
+        assert len(data) < len(binary_stl(sphere_triangles())) / 3
+
+    def test_wide_indices(self):
+        vertices = np.random.default_rng(0).random((70_000, 3), dtype=np.float32)
+        faces = np.array([[0, 1, 69_999]])
+        decoded_v, decoded_f = decode_mesh(encode_mesh(vertices, faces))
+        assert decoded_f.dtype == np.uint32 and decoded_f.tolist() == [[0, 1, 69_999]]
+
+
+class TestMeshLods:
+    def test_levels_coarse_to_full(self, tmp_path):
+        path = tmp_path / "part.stl"
+        triangles = sphere_triangles()
+        path.write_bytes(binary_stl(triangles))
+        lods = MeshLods(targets=(500, 5_000))
+        sizes = []
+        for level in range(lods.levels):
+            data, final = lods.build(str(path), "etag", level)
+            assert final == (level == lods.levels - 1)
+            sizes.append(len(decode_mesh(data)[1]))
+        assert sizes[0] <= 500 < sizes[1] <= 5_000 < sizes[2] == len(triangles) - 2 * 120  # pole slivers dropped
+        lods.build(str(path), "etag", 0)
+        assert lods.get_stats()["hits"] == 1
+
+    def test_small_mesh_is_final_at_level_zero(self, tmp_path):
+        path = tmp_path / "cube.stl"
+        path.write_bytes(binary_stl(CUBE))
+        data, final = MeshLods().build(str(path), "cube", 0)
+        assert final and len(decode_mesh(data)[1]) == 12
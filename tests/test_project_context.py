@@ -0,0 +1,114 @@
+"""
+Tests for the incremental, budgeted project context builder.
+"""
+import json
+import os
+
+from chat_log import ChatLogStore
+from project_context import ProjectContextBuilder
+from project_manager import ProjectManager
+
+
+def touch(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+class TestProjectContextBuilder:
+    """Test caching, log summaries and the byte budget."""
+
+    def test_lists_and_inlines_text_files(self, tmp_path):
+        touch(tmp_path / "notes.md", "# Bracket")
+        touch(tmp_path / "cad" / "part.stl", "solid")
+        context = ProjectContextBuilder().build("demo", tmp_path)
+        assert "=== Project Context: 'demo' ===" in context
+        assert "Files (2 total):" in context
+        assert "--- notes.md ---\n# Bracket" in context
+        assert "part.stl" in context and "solid" not in context
+
+    def test_only_changed_files_are_reread(self, tmp_path):
+        for i in range(5):
+            touch(tmp_path / f"f{i}.py", f"x = {i}")
+        builder = ProjectContextBuilder()
+        builder.build("demo", tmp_path)
+        assert builder.files_read == 5
+
+        touch(tmp_path / "f2.py", "x = 'changed'")
+        bump_mtime(tmp_path / "f2.py")
+        context = builder.build("demo", tmp_path)
+        assert (builder.files_read, builder.files_cached) == (1, 4)
+        assert "x = 'changed'" in context
+
+    def test_deleted_files_drop_out(self, tmp_path):
+        touch(tmp_path / "a.txt", "alpha")
+        touch(tmp_path / "b.txt", "beta")
+        builder = ProjectContextBuilder()
+        builder.build("demo", tmp_path)
+        (tmp_path / "b.txt").unlink()
+        context = builder.build("demo", tmp_path)
+        assert "beta" not in context and "Files (1 total):" in context
+
+    def test_chat_log_is_summarized(self, tmp_path):
+        with open(tmp_path / "chat_history.jsonl", "w", encoding="utf-8") as f:
+            for i in range(100):
+                f.write(json.dumps({"timestamp": i, "sender": "User", "text": f"message {i}"}) + "\n")
+        touch(tmp_path / "chat_history.jsonl.idx", "binary")
+        context = ProjectContextBuilder(chat_log_messages=3).build("demo", tmp_path)
+        assert "[User]: message 99" in context
+        assert "message 96" not in context
+        assert ".idx" not in context
+
+    def test_rotated_chat_log_is_summarized_from_segments(self, tmp_path):
+        with open(tmp_path / "chat_history.jsonl", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": 1, "sender": "ADA", "text": "archived reply"}) + "\n")
+        ChatLogStore(tmp_path, segment_bytes=1).compact()
+        builder = ProjectContextBuilder()
+        context = builder.build("demo", tmp_path)
+        assert "[ADA]: archived reply" in context
+        assert "1 compacted segments" in context
+        assert ".gz" not in context
+
+        # Once a new active log exists its summary replaces the segment one
+        with open(tmp_path / "chat_history.jsonl", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": 2, "sender": "User", "text": "new turn"}) + "\n")
+        context = builder.build("demo", tmp_path)
+        assert context.count("archived reply") == 1 and "[User]: new turn" in context
+
+    def test_budget_prefers_notes_over_data(self, tmp_path):
+        touch(tmp_path / "readme.md", "r" * 300)
+        touch(tmp_path / "data.json", "d" * 300)
+        context = ProjectContextBuilder(budget_bytes=600).build("demo", tmp_path)
+        assert "r" * 300 in context
+        assert "d" * 300 not in context
+        assert "not shown: data.json" in context
+        assert len(context) <= 600 + 100
+
+    def test_budget_counts_utf8_bytes(self, tmp_path):
+        touch(tmp_path / "notes.md", "\u00e9" * 300)  # 300 characters, 600 bytes
+        context = ProjectContextBuilder(budget_bytes=500).build("demo", tmp_path)
+        assert "\u00e9" * 300 not in context
+        assert "not shown: notes.md" in context
+        assert len(context.encode("utf-8")) <= 500 + 100
+
+    def test_max_file_size_change_invalidates(self, tmp_path):
+        touch(tmp_path / "big.txt", "b" * 50)
+        builder = ProjectContextBuilder(max_file_size=10)
+        assert "too large" in builder.build("demo", tmp_path)
+        builder.set_max_file_size(100)
+        assert "b" * 50 in builder.build("demo", tmp_path)
+
+    def test_missing_project(self, tmp_path):
+        assert ProjectContextBuilder().build("gone", tmp_path / "gone") == "Project 'gone' does not exist."
+
+
+def test_project_manager_context_includes_buffered_chat(tmp_path):
+    pm = ProjectManager(str(tmp_path))
+    pm.log_chat("User", "make a bracket")
+    context = pm.get_project_context()
+    assert "[User]: make a bracket" in context
+    pm.close()
@@ -20,6 +20,28 @@ MODULES = {
     "web": "test_web_agent.py",
     "auth": "test_authenticator.py",
     "tools": "test_ada_tools.py",
+    "vad": "test_vad.py",
+    "audio_io": "test_audio_io.py",
+    "audio_emitter": "test_audio_emitter.py",
+    "event_bus": "test_event_bus.py",
+    "tts": "test_tts_pipeline.py",
+    "http": "test_http_client.py",
+    "local_llm": "test_local_llm.py",
+    "memory": "test_conversation_memory.py",
+    "tool_registry": "test_tool_registry.py",
+    "confirmations": "test_confirmations.py",
+    "chat_log": "test_chat_log.py",
+    "project_context": "test_project_context.py",
+    "search": "test_search_index.py",
+    "chat_summary": "test_chat_summary.py",
+    "live_connection": "test_live_connection.py",
+    "frame_buffer": "test_frame_buffer.py",
+    "frame_pipeline": "test_frame_pipeline.py",
+    "cad_worker": "test_cad_worker.py",
+    "cad_cache": "test_cad_cache.py",
+    "stl_store": "test_stl_store.py",
+    "mesh_lod": "test_mesh_lod.py",
+    "audio_loop": "test_audio_loop.py",
 }
 
 TESTS_DIR = Path(__file__).parent
@@ -0,0 +1,153 @@
+"""
+Tests for the full-text search index behind the search_history tool.
+"""
+import json
+import os
+
+import pytest
+
+from chat_log import ChatLogStore
+from project_manager import ProjectManager
+from search_index import SearchIndex, chunk_text, format_results, match_query
+
+
+def write_chat(project_dir, turns, ts0=1000.0):
+    with open(project_dir / "chat_history.jsonl", "a", encoding="utf-8") as f:
+        for i, (sender, text) in enumerate(turns):
+            f.write(json.dumps({"timestamp": ts0 + i, "sender": sender, "text": text}) + "\n")
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = SearchIndex(tmp_path / "index.sqlite")
+    yield idx
+    idx.close()
+
+
+class TestHelpers:
+    def test_chunk_text_splits_on_lines(self):
+        text = "\n".join(f"line {i} " + "x" * 40 for i in range(20))
+        chunks = chunk_text(text, chunk_chars=100)
+        assert all(len(c) <= 100 for c in chunks)
+        assert "\n".join(chunks) == text
+
+    def test_chunk_text_splits_long_lines(self):
+        assert [len(c) for c in chunk_text("y" * 250, chunk_chars=100)] == [100, 100, 50]
+
+    def test_match_query_escapes_syntax(self):
+        assert match_query('bracket "AND" (m3)*') == '"bracket" OR "and" OR "m3"'
+        assert match_query("?!") is None
+
+
+class TestSearchIndex:
+    def test_chat_is_indexed_incrementally(self, tmp_path, index):
+        project = tmp_path / "p"
+        project.mkdir()
+        write_chat(project, [("User", "make the bracket wider"), ("ADA", "Widened it to forty millimetres.")])
+        store = ChatLogStore(project)
+        assert index.sync_chat("p", store) == 2
+        assert index.sync_chat("p", store) == 0
+
+        write_chat(project, [("User", "now add a screw hole")], ts0=2000.0)
+        assert index.sync_chat("p", store) == 1
+        [hit] = index.search("p", "screw")
+        assert (hit["source"], hit["ref"], hit["timestamp"]) == ("chat", "User", 2000.0)
+        assert "[screw]" in hit["snippet"]
+
+    def test_equal_timestamps_are_not_reindexed_or_lost(self, tmp_path, index):
+        project = tmp_path / "p"
+        project.mkdir()
+        with open(project / "chat_history.jsonl", "w", encoding="utf-8") as f:
+            for text in ("alpha", "beta"):
+                f.write(json.dumps({"timestamp": 5.0, "sender": "User", "text": text}) + "\n")
+        store = ChatLogStore(project)
+        assert index.sync_chat("p", store) == 2
+        with open(project / "chat_history.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": 5.0, "sender": "User", "text": "gamma"}) + "\n")
+        assert index.sync_chat("p", store) == 1
+        assert len(index.search("p", "alpha beta gamma", limit=10)) == 3
+
+    def test_turns_merged_by_compaction_after_sync(self, tmp_path, index):
+        project = tmp_path / "p"
+        project.mkdir()
+        write_chat(project, [("ADA", "Widened the bracket."), ("ADA", "It is forty millimetres now.")])
+        store = ChatLogStore(project)
+        assert index.sync_chat("p", store) == 2
+
+        write_chat(project, [("ADA", "Also added a screw hole.")], ts0=1002.0)
+        assert store.compact(force_rotate=True)["compacted"] == 1  # one merged run, 1000.0 to 1002.0
+        assert index.sync_chat("p", store) == 1
+        assert index.sync_chat("p", store) == 0
+        [hit] = index.search("p", "screw")
+        assert hit["timestamp"] == 1000.0
+        assert len(index.search("p", "widened forty screw", limit=10)) == 1  # replaced, not duplicated
+
+    def test_files_reindexed_only_when_changed(self, tmp_path, index):
+        project = tmp_path / "p"
+        (project / "cad").mkdir(parents=True)
+        (project / "notes.md").write_text("Print in PETG at 240C")
+        (project / "cad" / "part.stl").write_text("solid petg")
+        assert index.sync_files("p", project) == 1
+        assert index.sync_files("p", project) == 0
+
+        (project / "notes.md").write_text("Print in ASA instead")
+        st = (project / "notes.md").stat()
+        os.utime(project / "notes.md", ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        assert index.sync_files("p", project) == 1
+        assert index.search("p", "petg") == []
+        assert index.search("p", "asa")[0]["ref"] == "notes.md"
+
+        (project / "notes.md").unlink()
+        assert index.sync_files("p", project) == 1
+        assert index.search("p", "asa") == []
+
+    def test_projects_are_isolated_but_memory_is_global(self, tmp_path, index):
+        for name in ("a", "b"):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / "notes.txt").write_text(f"project {name} uses a hinge")
+            index.sync_files(name, tmp_path / name)
+        assert [r["snippet"] for r in index.search("a", "hinge")] == ["project a uses a [hinge]"]
+
+        index.add_memory("old log", "we discussed a carbon drone frame")
+        assert index.search("b", "drone")[0]["source"] == "memory"
+        assert index.search("b", "drone", source="file") == []
+
+    def test_drop_project(self, tmp_path, index):
+        project = tmp_path / "p"
+        project.mkdir()
+        write_chat(project, [("User", "temporary bracket")])
+        index.sync_chat("p", ChatLogStore(project))
+        index.drop_project("p")
+        assert index.search("p", "bracket") == []
+        assert index.sync_chat("p", ChatLogStore(project)) == 1
+
+    def test_ranking_prefers_more_matching_terms(self, tmp_path, index):
+        project = tmp_path / "p"
+        project.mkdir()
+        write_chat(project, [("User", "the lamp is blue"), ("User", "the blue bracket needs an m3 hole"),
+                             ("User", "print the bracket")])
+        index.sync_chat("p", ChatLogStore(project))
+        assert "m3" in index.search("p", "blue bracket m3")[0]["snippet"]
+
+    def test_format_results(self):
+        assert format_results("x", []) == "No matches for 'x'."
+        text = format_results("hinge", [{"source": "file", "ref": "notes.md", "timestamp": None,
+                                         "snippet": "a [hinge]\nhere", "score": 1.0}])
+        assert text.splitlines()[1] == "[file] notes.md: a [hinge] here"
+
+
+def test_project_manager_search_history(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAT_LOG_COMPACT_ON_START", "0")
+    pm = ProjectManager(str(tmp_path))
+    pm.log_chat("User", "the enclosure needs vents")
+    (pm.get_current_project_path() / "spec.md").write_text("Enclosure wall thickness: 2mm")
+    results = pm.search_history("enclosure", limit=5)
+    assert {r["source"] for r in results} == {"chat", "file"}
+    assert pm.index_memory("a memory about the enclosure lid") == 1
+    assert "[memory]" in pm.search_history_text("lid")
+    pm.close()
+
+    # temp is wiped on startup, and so is its part of the index
+    pm = ProjectManager(str(tmp_path))
+    assert pm.search_history("vents") == []
+    pm.close()
@@ -0,0 +1,125 @@
+"""
+Tests for the STL store behind the CAD viewer's /cad/stl endpoint.
+"""
+import hashlib
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from mesh_lod import decode_mesh
+from stl_store import StlStore, URL_PREFIX
+
+STL = b"solid cube\n" + bytes(range(256)) * 64
+
+CUBE_ASCII = "solid cube\n" + "".join(
+    f"facet normal 0 0 0\nouter loop\n" + "".join(f"vertex {x} {y} {z}\n" for x, y, z in tri) + "endloop\nendfacet\n"
+    for tri in [
+        [(0, 0, 0), (1, 1, 0), (1, 0, 0)], [(0, 0, 0), (0, 1, 0), (1, 1, 0)],
+        [(0, 0, 1), (1, 0, 1), (1, 1, 1)], [(0, 0, 1), (1, 1, 1), (0, 1, 1)],
+        [(0, 0, 0), (1, 0, 0), (1, 0, 1)], [(0, 0, 0), (1, 0, 1), (0, 0, 1)],
+        [(0, 1, 0), (1, 1, 1), (1, 1, 0)], [(0, 1, 0), (0, 1, 1), (1, 1, 1)],
+        [(0, 0, 0), (0, 0, 1), (0, 1, 1)], [(0, 0, 0), (0, 1, 1), (0, 1, 0)],
+        [(1, 0, 0), (1, 1, 0), (1, 1, 1)], [(1, 0, 0), (1, 1, 1), (1, 0, 1)],
+    ]) + "endsolid cube\n"
+
+
+@pytest.fixture
+def stl_file(tmp_path):
+    path = tmp_path / "output.stl"
+    path.write_bytes(STL)
+    return path
+
+
+@pytest.fixture
+def store():
+    return StlStore()
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+
+    @app.get(URL_PREFIX + "/{etag}")
+    async def cad_stl(etag: str, request: Request):
+        return store.response(etag, request.headers.get("if-none-match"))
+
+    @app.get(URL_PREFIX + "/{etag}/lod/{level}")
+    async def cad_stl_lod(etag: str, level: int, request: Request):
+        return await store.lod_response(etag, level, request.headers.get("if-none-match"))
+
+    return TestClient(app)
+
+
+class TestPublish:
+    def test_payload_references_file(self, store, stl_file):
+        payload = store.publish(str(stl_file))
+        etag = hashlib.sha256(STL).hexdigest()
+        assert payload["url"] == f"{URL_PREFIX}/{etag}"
+        assert payload["etag"] == etag and payload["size"] == len(STL)
+        assert payload["filename"] == "output.stl"
+        assert [lod["url"] for lod in payload["lods"]] == [f"{URL_PREFIX}/{etag}/lod/{i}" for i in range(3)]
+
+    def test_known_digest_not_recomputed(self, store, stl_file):
+        assert store.publish(str(stl_file), etag="abc")["etag"] == "abc"
+        assert store.get("abc") == str(stl_file)
+
+    def test_changed_file_is_dropped(self, store, stl_file):
+        etag = store.publish(str(stl_file))["etag"]
+        stl_file.write_bytes(STL + b"more")
+        assert store.get(etag) is None
+
+    def test_bounded(self, store, tmp_path):
+        store.max_entries = 2
+        for i in range(3):
+            path = tmp_path / f"{i}.stl"
+            path.write_bytes(STL + bytes([i]))
+            store.publish(str(path))
+        assert store.get_stats()["entries"] == 2
+
+
+class TestEndpoint:
+    def test_streams_file_with_etag(self, store, client, stl_file):
+        payload = store.publish(str(stl_file))
+        response = client.get(payload["url"])
+        assert response.status_code == 200
+        assert response.content == STL
+        assert response.headers["etag"] == f'"{payload["etag"]}"'
+        assert "immutable" in response.headers["cache-control"]
+        assert store.get_stats()["bytes_served"] == len(STL)
+
+    def test_not_modified(self, store, client, stl_file):
+        payload = store.publish(str(stl_file))
+        response = client.get(payload["url"], headers={"If-None-Match": f'W/"other", "{payload["etag"]}"'})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert store.get_stats()["not_modified"] == 1
+
+    def test_unknown_or_stale_is_404(self, store, client, stl_file):
+        assert client.get(f"{URL_PREFIX}/missing").status_code == 404
+        payload = store.publish(str(stl_file))
+        os.remove(stl_file)
+        assert client.get(payload["url"]).status_code == 404
+
+    def test_lod_levels(self, store, client, tmp_path):
+        path = tmp_path / "cube.stl"
+        path.write_text(CUBE_ASCII)
+        payload = store.publish(str(path))
+        response = client.get(payload["lods"][0]["url"])
+        assert response.status_code == 200
+        assert response.headers["x-mesh-final"] == "1"  # 12 faces: nothing to decimate
+        vertices, faces = decode_mesh(response.content)
+        assert len(vertices) == 8 and len(faces) == 12
+        tag = response.headers["etag"]
+        assert tag != f'"{payload["etag"]}"'
+        assert client.get(payload["lods"][0]["url"], headers={"If-None-Match": tag}).status_code == 304
+        assert client.get(f'{payload["url"]}/lod/9').status_code == 404
+
+    def test_lod_of_invalid_stl(self, store, client, tmp_path):
+        path = tmp_path / "broken.stl"
+        path.write_bytes(b"not a mesh")
+        payload = store.publish(str(path))
+        assert client.get(payload["lods"][0]["url"]).status_code == 422
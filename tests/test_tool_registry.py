@@ -0,0 +1,161 @@
+"""
+Tests for the table-driven tool dispatch registry, using fake FunctionCall objects.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from tool_registry import ToolRegistry, DENIED_RESULT, openai_tool
+
+
+def fc(name, id=None, **args):
+    """Stand-in for google.genai.types.FunctionCall."""
+    return SimpleNamespace(id=id or f"id-{name}", name=name, args=args)
+
+
+def sleeper(result, delay=0.05, log=None):
+    async def handler(args):
+        if log is not None:
+            log.append(("start", result))
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(("end", result))
+        return result
+    return handler
+
+
+class TestDispatch:
+    """Test lookup, ordering and concurrency."""
+
+    @pytest.mark.asyncio
+    async def test_routes_by_name_and_passes_args(self):
+        registry = ToolRegistry()
+        seen = {}
+
+        async def write_file(args):
+            seen.update(args)
+            return "written"
+
+        registry.register("write_file", write_file)
+        results = await registry.dispatch([fc("write_file", path="a.txt", content="hi")])
+        assert [(call.name, result) for call, result in results] == [("write_file", "written")]
+        assert seen == {"path": "a.txt", "content": "hi"}
+
+    @pytest.mark.asyncio
+    async def test_unknown_tools_are_skipped(self):
+        registry = ToolRegistry()
+        registry.register("list_projects", sleeper("p", 0))
+        results = await registry.dispatch([fc("nope"), fc("list_projects")])
+        assert [call.name for call, _ in results] == ["list_projects"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_gathered(self):
+        registry = ToolRegistry()
+        for name in ("discover_printers", "list_smart_devices", "list_projects"):
+            registry.register(name, sleeper(name, 0.1))
+
+        start = time.perf_counter()
+        results = await registry.dispatch([fc("discover_printers"), fc("list_smart_devices"), fc("list_projects")])
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.2
+        assert [result for _, result in results] == ["discover_printers", "list_smart_devices", "list_projects"]
+
+    @pytest.mark.asyncio
+    async def test_exclusive_calls_run_in_order(self):
+        registry = ToolRegistry()
+        log = []
+        registry.register("type_text", sleeper("type", 0.02, log), concurrent=False)
+        registry.register("press_key", sleeper("press", 0.01, log), concurrent=False)
+        registry.register("list_windows", sleeper("list", 0.01, log))
+
+        await registry.dispatch([fc("list_windows"), fc("type_text"), fc("press_key")])
+        # Each exclusive call starts only after everything before it finished
+        assert log == [("start", "list"), ("end", "list"), ("start", "type"), ("end", "type"),
+                       ("start", "press"), ("end", "press")]
+
+    @pytest.mark.asyncio
+    async def test_non_blocking_acks_immediately(self):
+        registry = ToolRegistry()
+        done = asyncio.Event()
+
+        async def web_agent(args):
+            await asyncio.sleep(0.05)
+            done.set()
+
+        registry.register("run_web_agent", web_agent, blocking=False, ack="started")
+        registry.register("generate_cad", sleeper(None, 0), blocking=False)
+
+        results = await registry.dispatch([fc("run_web_agent", prompt="x"), fc("generate_cad", prompt="y")])
+        # generate_cad has no ack, so no response is sent for it
+        assert [(call.name, result) for call, result in results] == [("run_web_agent", "started")]
+        assert not done.is_set()
+        await asyncio.wait_for(done.wait(), 1)
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_become_results(self):
+        registry = ToolRegistry()
+
+        async def broken(args):
+            raise RuntimeError("printer offline")
+
+        registry.register("print_stl", broken)
+        results = await registry.dispatch([fc("print_stl")])
+        assert "printer offline" in results[0][1]
+
+
+class TestConfirmation:
+    """Test the shared confirmation hook."""
+
+    @pytest.mark.asyncio
+    async def test_denied_calls_do_not_run(self):
+        registry = ToolRegistry()
+        ran = []
+
+        async def handler(args):
+            ran.append(args)
+            return "ok"
+
+        registry.register("write_file", handler)
+        registry.register("read_file", handler)
+
+        async def confirm(spec, call):
+            return spec.name == "read_file"
+
+        results = await registry.dispatch([fc("write_file"), fc("read_file")], confirm=confirm)
+        assert [result for _, result in results] == [DENIED_RESULT, "ok"]
+        assert len(ran) == 1
+
+    @pytest.mark.asyncio
+    async def test_permission_key(self):
+        registry = ToolRegistry()
+        spec = registry.register("type_text", sleeper("x", 0), permission="computer_control")
+        assert spec.permission_key == "computer_control"
+        assert registry.register("read_file", sleeper("x", 0)).permission_key == "read_file"
+
+
+class TestSchemas:
+    """Test declaration export for both providers."""
+
+    def test_openai_tool_conversion(self):
+        declaration = {
+            "name": "print_stl",
+            "description": "Prints an STL.",
+            "parameters": {
+                "type": "OBJECT",
+                "properties": {"printer": {"type": "STRING", "description": "Printer name"}},
+                "required": ["printer"],
+            },
+        }
+        registry = ToolRegistry()
+        registry.register("print_stl", sleeper("x", 0), declaration)
+        registry.register("internal", sleeper("x", 0))
+
+        assert registry.declarations() == [declaration]
+        assert registry.openai_tools() == [openai_tool(declaration)]
+        function = openai_tool(declaration)["function"]
+        assert function["parameters"]["type"] == "object"
+        assert function["parameters"]["properties"]["printer"] == {"type": "string", "description": "Printer name"}
+        assert function["parameters"]["required"] == ["printer"]
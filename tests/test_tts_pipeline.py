@@ -0,0 +1,169 @@
+"""
+Tests for the streaming sentence segmenter and ordered TTS worker.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tts_pipeline import SentenceSegmenter, TTSWorker
+
+
+def feed_all(segmenter, text, step=3):
+    out = []
+    for i in range(0, len(text), step):
+        out.extend(segmenter.feed(text[i:i + step]))
+    return out
+
+
+class TestSentenceSegmenter:
+    """Test incremental boundary detection."""
+
+    def test_splits_streamed_sentences(self):
+        seg = SentenceSegmenter()
+        out = feed_all(seg, "Hello there. How are you? I am fine! And")
+        assert out == ["Hello there.", "How are you?", "I am fine!"]
+        assert seg.flush() == "And"
+        assert seg.flush() is None
+
+    def test_waits_for_following_whitespace(self):
+        seg = SentenceSegmenter()
+        assert seg.feed("Done.") == []
+        assert seg.feed(" Next") == ["Done."]
+
+    def test_decimals_and_abbreviations(self):
+        seg = SentenceSegmenter()
+        out = feed_all(seg, "Dr. Smith measured 3.5 mm, e.g. a small gap. J. R. Tolkien wrote it. ")
+        assert out == ["Dr. Smith measured 3.5 mm, e.g. a small gap.", "J. R. Tolkien wrote it."]
+
+    def test_closing_quotes_and_ellipsis(self):
+        seg = SentenceSegmenter()
+        out = feed_all(seg, 'He said "stop." Then... silence.\nNew line\n')
+        assert out == ['He said "stop."', "Then...", "silence.", "New line"]
+
+    def test_only_new_characters_are_scanned(self):
+        seg = SentenceSegmenter()
+        seg.feed("a" * 100)
+        assert seg._pos == 100
+        seg.feed(" b")
+        assert seg._pos == 102
+
+    def test_long_run_on_is_split(self):
+        seg = SentenceSegmenter(max_chars=20)
+        out = seg.feed("word " * 10)
+        assert out and all(len(s) <= 25 for s in out)
+
+
+class FakeTTS:
+    """Records open/play order; each play streams for `play_s` seconds."""
+
+    def __init__(self, open_s=0.02, play_s=0.03):
+        self.open_s = open_s
+        self.play_s = play_s
+        self.opened = []
+        self.played = []
+        self.lock = threading.Lock()
+
+    def open_stream(self, text):
+        time.sleep(self.open_s)
+        with self.lock:
+            self.opened.append((text, time.perf_counter()))
+        return text
+
+    def play_stream(self, handle, is_current):
+        end = time.perf_counter() + self.play_s
+        while time.perf_counter() < end:
+            if not is_current():
+                return
+            time.sleep(0.002)
+        with self.lock:
+            self.played.append(handle)
+
+
+class TestTTSWorker:
+    """Test ordering, pipelining and barge-in."""
+
+    @pytest.mark.asyncio
+    async def test_plays_in_submission_order(self):
+        tts = FakeTTS(open_s=0.0)
+        worker = TTSWorker(tts.open_stream, tts.play_stream)
+        task = asyncio.create_task(worker.run())
+        for i in range(5):
+            worker.submit(f"s{i}")
+        while len(tts.played) < 5:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+        assert tts.played == [f"s{i}" for i in range(5)]
+        assert worker.spoken == 5
+
+    @pytest.mark.asyncio
+    async def test_next_request_opens_while_current_plays(self):
+        tts = FakeTTS(open_s=0.03, play_s=0.05)
+        worker = TTSWorker(tts.open_stream, tts.play_stream, pipeline=True)
+        task = asyncio.create_task(worker.run())
+        worker.submit("first")
+        await asyncio.sleep(0.04)  # "first" is now playing
+        worker.submit("second")
+        while len(tts.played) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+        assert tts.played == ["first", "second"]
+        assert worker.prefetched == 1
+
+    @pytest.mark.asyncio
+    async def test_clear_stops_playback_and_drops_queue(self):
+        tts = FakeTTS(open_s=0.0, play_s=0.2)
+        worker = TTSWorker(tts.open_stream, tts.play_stream, pipeline=False)
+        task = asyncio.create_task(worker.run())
+        for i in range(3):
+            worker.submit(f"s{i}")
+        await asyncio.sleep(0.02)
+        worker.clear()
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        assert tts.played == []
+        assert worker.skipped == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_request_does_not_stop_worker(self):
+        tts = FakeTTS(open_s=0.0, play_s=0.0)
+
+        def flaky_open(text):
+            if text == "bad":
+                raise ConnectionError("boom")
+            return tts.open_stream(text)
+
+        worker = TTSWorker(flaky_open, tts.play_stream)
+        task = asyncio.create_task(worker.run())
+        for text in ("bad", "good"):
+            worker.submit(text)
+        while not tts.played:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+        assert tts.played == ["good"]
+        assert worker.errors == 1
+
+    @pytest.mark.asyncio
+    async def test_accepts_coroutine_functions(self):
+        played = []
+
+        async def open_stream(text):
+            await asyncio.sleep(0)
+            return text.upper()
+
+        async def play_stream(handle, is_current):
+            played.append(handle)
+
+        worker = TTSWorker(open_stream, play_stream)
+        task = asyncio.create_task(worker.run())
+        worker.submit("a")
+        worker.submit("b")
+        while len(played) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        assert played == ["A", "B"]
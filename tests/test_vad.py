@@ -0,0 +1,107 @@
+"""
+Tests for the Voice Activity Detection module.
+"""
+import math
+import struct
+
+import numpy as np
+import pytest
+
+from vad import EnergyVAD, SpectralVAD, create_vad, pcm16_rms, SPEECH_START, SPEECH_END
+
+SAMPLE_RATE = 16000
+CHUNK = 1024
+
+
+def tone(amplitude, freq=220.0, n=CHUNK, offset=0):
+    t = (np.arange(n) + offset) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype("<i2").tobytes()
+
+
+def silence(n=CHUNK):
+    return bytes(n * 2)
+
+
+def noise(amplitude, n=CHUNK, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(n) * amplitude).clip(-32768, 32767).astype("<i2").tobytes()
+
+
+class TestRms:
+    """Test the vectorized RMS against the original struct-based implementation."""
+
+    def test_matches_struct_reference(self):
+        data = noise(3000, seed=42)
+        count = len(data) // 2
+        shorts = struct.unpack(f"<{count}h", data)
+        reference = math.sqrt(sum(s ** 2 for s in shorts) / count)
+        assert pcm16_rms(data) == pytest.approx(reference, rel=1e-4)
+
+    def test_empty_buffer(self):
+        assert pcm16_rms(b"") == 0.0
+
+
+class TestEnergyVAD:
+    """Test fixed-threshold detection and hangover."""
+
+    def test_speech_start_and_end(self):
+        events = []
+        vad = EnergyVAD(threshold=800, hangover=0.5, on_event=events.append)
+
+        assert vad.process(silence()) is None
+        start = vad.process(tone(5000))
+        assert start.type == SPEECH_START
+        assert vad.is_speaking
+
+        # 0.5s hangover at 64ms/chunk -> 8 chunks of silence are still speech
+        for _ in range(7):
+            assert vad.process(silence()) is None
+        end = None
+        for _ in range(3):
+            end = end or vad.process(silence())
+        assert end.type == SPEECH_END
+        assert [e.type for e in events] == [SPEECH_START, SPEECH_END]
+
+    def test_speech_resets_hangover(self):
+        vad = EnergyVAD(threshold=800, hangover=0.2)
+        vad.process(tone(5000))
+        vad.process(silence())
+        vad.process(silence())
+        vad.process(tone(5000))
+        assert vad.process(silence()) is None
+        assert vad.is_speaking
+
+    def test_listener_errors_are_contained(self):
+        def broken(event):
+            raise RuntimeError("boom")
+
+        vad = EnergyVAD(on_event=broken)
+        assert vad.process(tone(5000)).type == SPEECH_START
+
+
+class TestSpectralVAD:
+    """Test adaptive noise floor detection."""
+
+    def test_noise_floor_tracks_background(self):
+        vad = SpectralVAD(threshold=100)
+        for i in range(50):
+            assert vad.process(noise(400, seed=i)) is None
+        assert 300 < vad.noise_floor < 500
+        assert not vad.is_speaking
+
+    def test_detects_voiced_speech_over_noise(self):
+        vad = SpectralVAD(threshold=100)
+        for i in range(30):
+            vad.process(noise(200, seed=i))
+        event = vad.process(tone(6000, offset=0))
+        assert event is not None and event.type == SPEECH_START
+        assert event.noise_floor is not None
+
+
+class TestFactory:
+    """Test the pluggable factory."""
+
+    def test_modes(self):
+        assert type(create_vad("energy")) is EnergyVAD
+        assert type(create_vad("spectral")) is SpectralVAD
+        assert type(create_vad("bogus")) is EnergyVAD